@@ -0,0 +1,68 @@
+'''
+Minimal in-process ASGI driver used by the benchmarks.
+
+Calls the FastAPI app directly (no sockets, no extra dependencies) so the
+numbers measure the application and not the HTTP client.
+'''
+
+import asyncio
+import json
+from typing import Dict, List, Optional, Tuple
+
+
+async def run_lifespan_startup(app) -> None:
+    """Send the lifespan startup event and wait for it to complete."""
+    events = asyncio.Queue()
+    await events.put({"type": "lifespan.startup"})
+    done = asyncio.Event()
+
+    async def receive():
+        return await events.get()
+
+    async def send(message):
+        if message["type"] in ("lifespan.startup.complete", "lifespan.startup.failed"):
+            done.set()
+
+    asyncio.get_running_loop().create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, receive, send))
+    await done.wait()
+
+
+async def request(app, method: str, path: str, body: Optional[dict] = None,
+                  headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+    """Perform one request against `app` and return (status, headers, body)."""
+    path, _, query = path.partition("?")
+    payload = json.dumps(body).encode() if body is not None else b""
+    raw_headers: List[Tuple[bytes, bytes]] = [(b"host", b"bench")]
+    if body is not None:
+        raw_headers.append((b"content-type", b"application/json"))
+    for key, value in (headers or {}).items():
+        raw_headers.append((key.lower().encode(), value.encode()))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "headers": raw_headers,
+        "client": ("127.0.0.1", 12345), "server": ("bench", 80),
+    }
+    sent = False
+    status = 0
+    response_headers: Dict[str, str] = {}
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update({k.decode(): v.decode() for k, v in message["headers"]})
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
@@ -0,0 +1,106 @@
+'''
+Request batching: a dashboard load as separate GETs vs one POST /api/v1/batch.
+
+Two workloads against the app in-process (benchmarks/asgi_client.py, throwaway
+SQLite database with a few hundred rows):
+  dashboard  - the admin dashboard's four list reads (frontend/vibe.js)
+  till       - a till start-up: branches, products, top sellers and /auth/me
+
+"separate" issues the GETs one after another, as the dashboard used to;
+"batch" sends them in one request. Reported: median server time per load,
+token decodes per load, and the load time once every HTTP round trip costs
+rtt_ms (default 40, a till on a shop's uplink), since in-process calls have
+no network.
+
+Usage:
+    python benchmarks/bench_batch.py [loads] [rtt_ms]
+'''
+
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from asgi_client import request, run_lifespan_startup
+
+WORKLOADS = {
+    "dashboard": ["/api/v1/customers/?fields=id", "/api/v1/products/?fields=id",
+                  "/api/v1/transactions/?fields=id,total,timeOfTransaction", "/api/v1/employees/?fields=id"],
+    "till": ["/api/v1/branches/", "/api/v1/products/?fields=id,name,sellPrice,stock",
+             "/api/v1/stats/top-products", "/api/v1/auth/me"],
+}
+
+
+def seed() -> None:
+    from datetime import date, time as dtime
+    from decimal import Decimal
+    from sqlalchemy import insert
+    from src.database import Base, engine
+    from src.model.orm import Customer, Product, Transaction
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Customer), [{"name": f"customer {i}", "age": 30, "email": f"c{i}@example.com"} for i in range(100)])
+        conn.execute(insert(Product), [{"name": f"product {i}", "stock": i, "sellPrice": Decimal("2.50"), "cost": Decimal("1.00"),
+                                        "category_id": "1", "category": "food"} for i in range(300)])
+        conn.execute(insert(Transaction), [{"total_amount": Decimal("5.00"), "total": Decimal("5.00"), "customer_id": i % 100,
+                                            "dateOfTransaction": date.today(), "timeOfTransaction": dtime(12)} for i in range(100)])
+
+
+async def separate(app, paths, headers) -> None:
+    for path in paths:
+        status, _, _ = await request(app, "GET", path, headers=headers)
+        assert status == 200, (path, status)
+
+
+async def batched(app, paths, headers) -> None:
+    status, _, _ = await request(app, "POST", "/api/v1/batch", body={"requests": [{"path": p} for p in paths]}, headers=headers)
+    assert status == 200, status
+
+
+async def measure(app, load, paths, headers, loads: int):
+    from src.utils import security
+    await load(app, paths, headers)  # warm up
+    timings = []
+    with mock.patch.object(security.jwt, "decode", wraps=security.jwt.decode) as decode:
+        for _ in range(loads):
+            start = time.perf_counter()
+            await load(app, paths, headers)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, decode.call_count / loads
+
+
+async def run(loads: int, rtt_ms: float) -> None:
+    seed()
+    import main
+    from src.utils.security import create_access_token
+
+    logging.getLogger().setLevel(logging.WARNING)  # the request log would dominate the timings
+    await run_lifespan_startup(main.app)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "bench@example.com", "role": "ADMIN"})}
+
+    print(f"median of {loads} loads, {rtt_ms:g} ms per HTTP round trip")
+    print(f"{'workload':<11}{'mode':<10}{'round trips':>12}{'server ms':>11}{'decodes':>9}{'with RTT ms':>13}")
+    for name, paths in WORKLOADS.items():
+        for mode, load, trips in (("separate", separate, len(paths)), ("batch", batched, 1)):
+            server_ms, decodes = await measure(main.app, load, paths, headers, loads)
+            print(f"{name:<11}{mode:<10}{trips:>12}{server_ms:>11.2f}{decodes:>9.0f}{server_ms + trips * rtt_ms:>13.1f}")
+
+
+def main() -> None:
+    loads = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rtt_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 40
+    asyncio.run(run(loads, rtt_ms))
+
+
+if __name__ == "__main__":
+    main()
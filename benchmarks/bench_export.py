@@ -0,0 +1,83 @@
+'''
+Parquet export: throughput, file size against JSON, and an incremental run.
+
+Seeds a SQLite database with a year of sales, exports it, compares the size
+with the same line items as JSON (what the API would return), then adds one
+more day of sales and times the incremental export.
+
+Usage:
+    python benchmarks/bench_export.py [transactions]
+'''
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from sqlalchemy import insert, select
+
+from src.database import Base, SessionLocal, engine
+from src.jobs.export import _line_items_stmt, export_transactions
+from src.model.orm import Branch, Product, Transaction, TransactionDetail
+
+
+def seed(first_id: int, count: int, start: date, days: int, products: int, rng: random.Random) -> None:
+    headers, details = [], []
+    for i in range(first_id, first_id + count):
+        price = Decimal(rng.randint(50, 5000)) / 100
+        quantity = rng.randint(1, 5)
+        headers.append({"id": i, "branch_id": rng.randint(1, 20), "customer_id": None,
+                        "total_amount": price * quantity, "total": price * quantity,
+                        "dateOfTransaction": start + timedelta(days=rng.randrange(days)),
+                        "timeOfTransaction": dtime(rng.randint(7, 21), rng.randint(0, 59), rng.randint(0, 59))})
+        details.append({"transaction_id": i, "product_id": rng.randint(1, products), "quantity": quantity, "price": price})
+    with engine.begin() as conn:
+        conn.execute(insert(Transaction), headers)
+        conn.execute(insert(TransactionDetail), details)
+
+
+def json_size(db) -> int:
+    names = {p.id: {"name": p.name, "category": p.category} for p in db.execute(select(Product.id, Product.name, Product.category))}
+    size = 0
+    for row in db.connection().execute(_line_items_stmt(Transaction, TransactionDetail, 0)):
+        size += len(json.dumps({**row._mapping, **names.get(row.product_id, {})}, default=str))
+    return size
+
+
+def main(transactions: int = 500_000, products: int = 5_000) -> None:
+    Base.metadata.create_all(engine)
+    rng = random.Random(1)
+    with engine.begin() as conn:
+        conn.execute(insert(Branch), [{"id": b, "name": f"B{b}", "location": "x"} for b in range(1, 21)])
+        conn.execute(insert(Product), [{"id": p, "name": f"Product {p}", "stock": 0, "sellPrice": 1, "cost": 1,
+                                        "category_id": "1", "category": f"category-{p % 30}"} for p in range(1, products + 1)])
+    start = date.today() - timedelta(days=365)
+    seed(1, transactions, start, 365, products, rng)
+
+    root = tempfile.mkdtemp()
+    db = SessionLocal()
+    try:
+        full = export_transactions(db, root=root, full=True)
+        print(f"Full export: {full.rows:,} rows in {full.seconds:.1f}s ({full.rows / full.seconds:,.0f} rows/s), "
+              f"{full.files:,} files, {full.bytes / 1e6:.1f} MB")
+        as_json = json_size(db)
+        print(f"Same rows as JSON: {as_json / 1e6:.1f} MB ({as_json / full.bytes:.1f}x larger)")
+
+        new = transactions // 365
+        seed(transactions + 1, new, date.today(), 1, products, rng)
+        incremental = export_transactions(db, root=root)
+        print(f"Incremental export of one day ({incremental.rows:,} rows): {incremental.seconds:.2f}s, "
+              f"{incremental.files} files")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,90 @@
+'''
+Sparse fieldsets: payload size and time per list page, full rows vs ?fields=.
+
+Builds a page of products, customers and transactions the way the list routes
+do (CRUD read + JSON encoding) with every field and with the few fields an
+admin table or shop card shows, against a SQLite file. Reported: JSON bytes
+per page and median milliseconds per page (read + encode).
+
+Usage:
+    python benchmarks/bench_fieldsets.py [rows] [repeats]
+'''
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+from decimal import Decimal
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from src.crud import CRUD
+from src.database import Base
+from src.model.MODEL import CustomerInDB, ProductInDB, TransactionInDB
+from src.model.orm import Customer, Product, Transaction
+from src.utils import fieldsets
+
+CASES = (
+    ("products", Product, ProductInDB, CRUD.get_products, "id,name,stock"),
+    ("customers", Customer, CustomerInDB, CRUD.get_customers, "id,name"),
+    ("transactions", Transaction, TransactionInDB, CRUD.get_transactions, "id,total,timeOfTransaction"),
+)
+
+
+def rows_for(model, count):
+    if model is Product:
+        return [{"name": f"product-{i}", "stock": i % 500, "sellPrice": Decimal("2.50"), "cost": Decimal("1.25"),
+                 "category_id": str(i % 20), "category": f"category-{i % 20}"} for i in range(count)]
+    if model is Customer:
+        return [{"name": f"customer {i}", "age": 20 + i % 50, "email": f"customer{i}@example.com",
+                 "membership": i % 3 == 0, "password": "x" * 97} for i in range(count)]
+    return [{"branch_id": i % 8, "customer_id": i, "total_amount": Decimal("12.40"), "total": Decimal("12.40"),
+             "dateOfTransaction": date(2025, 1, 1) + timedelta(days=i % 300), "timeOfTransaction": dtime(i % 24, i % 60)}
+            for i in range(count)]
+
+
+def page(Session, read, adapter, limit, selected) -> bytes:
+    with Session() as db:
+        return adapter.dump_json(adapter.validate_python(read(db, limit=limit, fields=selected), from_attributes=True))
+
+
+def measure(Session, read, adapter, limit, selected, repeats):
+    body = page(Session, read, adapter, limit, selected)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        page(Session, read, adapter, limit, selected)
+        timings.append(time.perf_counter() - start)
+    return len(body), statistics.median(timings) * 1000
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for _, model, _, _, _ in CASES:
+            conn.execute(insert(model), rows_for(model, rows))
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    print(f"pages of {rows} rows, median of {repeats}, SQLite")
+    print(f"{'entity':<14}{'fields':<28}{'bytes':>9}{'ms':>8}{'smaller':>9}{'faster':>8}")
+    for name, _, schema, read, fields in CASES:
+        full_bytes, full_ms = measure(Session, read, TypeAdapter(List[schema]), rows, None, repeats)
+        selected = fieldsets.parse_fields(schema, fields)
+        few_bytes, few_ms = measure(Session, read, fieldsets.encoder(schema, selected), rows, selected, repeats)
+        print(f"{name:<14}{'(all)':<28}{full_bytes:>9}{full_ms:>8.2f}")
+        print(f"{'':<14}{fields:<28}{few_bytes:>9}{few_ms:>8.2f}"
+              f"{1 - few_bytes / full_bytes:>8.0%}{full_ms / few_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+'''
+Hot-path queries before and after the index migration (0003_hot_path_indexes).
+
+Builds a SQLite database with Alembic up to revision 0002 (tables only, as
+production had them), seeds it, times the list/filter queries through the CRUD
+layer, upgrades to head and times them again.
+
+Usage:
+    python benchmarks/bench_indexes.py [transactions]
+'''
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import insert, text
+
+from src.crud import CRUD
+from src.database import SessionLocal, engine
+from src.model.orm import Branch, Customer, Employee, Product, Transaction
+from src.services.sales_heatmap import hourly_sales
+
+ROLES = ("ADMIN", "MANAGER", "HEAD_OF_BRANCH", "STOCKER", "CASHIER")
+CATEGORIES = [f"category-{i}" for i in range(40)]
+LOCATIONS = [f"city-{i}" for i in range(200)]
+
+
+def seed(transactions: int, products: int, customers: int, branches: int, employees: int) -> None:
+    rng = random.Random(1)
+    start = date.today() - timedelta(days=365)
+    with engine.begin() as conn:
+        conn.execute(insert(Branch), [{"id": b, "name": f"B{b}", "location": rng.choice(LOCATIONS)}
+                                      for b in range(1, branches + 1)])
+        conn.execute(insert(Customer), [{"id": c, "name": f"C{c}", "age": 30, "email": f"c{c}@x.com",
+                                         "membership": False, "password": "x"} for c in range(1, customers + 1)])
+        conn.execute(insert(Employee), [{"id": e, "name": f"E{e}", "age": 30, "email": f"e{e}@x.com",
+                                         "role": rng.choice(ROLES), "password": "x"} for e in range(1, employees + 1)])
+        conn.execute(insert(Product), [{"id": p, "name": f"P{p}", "stock": rng.randint(0, 500),
+                                        "sellPrice": round(rng.uniform(0.5, 200), 2), "cost": 0.5, "category_id": "1",
+                                        "category": rng.choice(CATEGORIES)} for p in range(1, products + 1)])
+        batch = []
+        for i in range(1, transactions + 1):
+            batch.append({"id": i, "branch_id": rng.randint(1, branches), "customer_id": rng.randint(1, customers),
+                          "total_amount": 10, "total": 10, "dateOfTransaction": start + timedelta(days=rng.randint(0, 365)),
+                          "timeOfTransaction": dtime(rng.randint(7, 21), rng.randint(0, 59))})
+            if len(batch) == 50_000:
+                conn.execute(insert(Transaction), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Transaction), batch)
+
+
+def queries():
+    today = date.today()
+    return {
+        "products by category + price": lambda db: CRUD.get_products(db, category="category-7", sellPrice__gte=20, sellPrice__lte=40),
+        "products by price range": lambda db: CRUD.get_products(db, sellPrice__gte=199, sellPrice__lte=200),
+        "low-stock products": lambda db: CRUD.get_low_stock_products(db, threshold=1, limit=50),
+        "employees by role (no index)": lambda db: CRUD.get_employees(db, role="HEAD_OF_BRANCH", limit=1000),
+        "branches by location": lambda db: CRUD.get_branches(db, location="city-3"),
+        "customer history page": lambda db: CRUD.get_customer_history(db, 42, limit=20),
+        "transactions by branch": lambda db: CRUD.get_transactions(db, branch_id=17, limit=1000),
+        "branch heatmap, 90 days": lambda db: hourly_sales(db, 17, today - timedelta(days=90), today),
+        "transactions by date": lambda db: CRUD.get_transactions(db, dateOfTransaction=today - timedelta(days=3), limit=1000),
+    }
+
+
+def time_queries(repeat: int = 5) -> dict:
+    results = {}
+    db = SessionLocal()
+    try:
+        for name, query in queries().items():
+            query(db)  # warm the page cache
+            start = time.perf_counter()
+            for _ in range(repeat):
+                query(db)
+            results[name] = (time.perf_counter() - start) / repeat * 1000
+    finally:
+        db.close()
+    return results
+
+
+def main(transactions: int = 1_000_000) -> None:
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    command.upgrade(config, "0002")
+
+    start = time.perf_counter()
+    seed(transactions, products=100_000, customers=50_000, branches=500, employees=20_000)
+    print(f"Seeded {transactions:,} transactions in {time.perf_counter() - start:.1f}s")
+
+    before = time_queries()
+    start = time.perf_counter()
+    command.upgrade(config, "head")
+    print(f"Index migration took {time.perf_counter() - start:.1f}s")
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    after = time_queries()
+
+    print(f"{'query':32s} {'before ms':>10s} {'after ms':>10s} {'speedup':>8s}")
+    for name in before:
+        print(f"{name:32s} {before[name]:10.2f} {after[name]:10.2f} {before[name] / after[name]:7.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,94 @@
+'''
+List endpoints: ORM entities vs Core rows, latency and allocations per page.
+
+Reads one page of products the way CRUD.get_products did before (select(Product),
+ORM objects added to the session's identity map with change-tracking state) and
+the way it does now (a Core SELECT of the ProductInDB columns, each row a
+CRUD.Record dict), then serializes the page to JSON with the same TypeAdapter the
+products router uses. Each page is read in a fresh session, as a request would.
+
+Returning the SQLAlchemy Row tuples themselves read just as fast but serialized
+slower than the ORM objects (pydantic's attribute lookups on a Row are the
+expensive part), hence the dicts.
+
+Reported per page size: median wall time and the peak memory allocated while
+reading and serializing (tracemalloc), against a SQLite file.
+
+Usage:
+    python benchmarks/bench_list_reads.py [repeats]
+'''
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from src.crud import CRUD
+from src.database import Base
+from src.model.MODEL import ProductInDB
+from src.model.orm import Product
+
+PAGE_SIZES = (100, 1000, 5000)
+adapter = TypeAdapter(List[ProductInDB])
+
+
+def orm_page(db, limit):
+    """The previous read path."""
+    return list(db.execute(select(Product).offset(0).limit(limit)).scalars().all())
+
+
+def core_page(db, limit):
+    return CRUD.get_products(db, skip=0, limit=limit)
+
+
+def serve(Session, read, limit) -> bytes:
+    with Session() as db:
+        return adapter.dump_json(adapter.validate_python(read(db, limit), from_attributes=True))
+
+
+def measure(Session, read, limit, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        serve(Session, read, limit)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    serve(Session, read, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings) * 1000, peak / 1024
+
+
+def main() -> None:
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Product), [
+            {"name": f"product-{i}", "stock": i % 500, "sellPrice": Decimal("2.50"), "cost": Decimal("1.25"),
+             "category_id": str(i % 20), "category": f"category-{i % 20}"}
+            for i in range(max(PAGE_SIZES))
+        ])
+    Session = sessionmaker(bind=engine, autoflush=False)
+    serve(Session, orm_page, 10), serve(Session, core_page, 10)  # warm up the compiled statement caches
+
+    print(f"median of {repeats} requests, read + JSON serialization, SQLite")
+    print(f"{'page size':>10}{'ORM ms':>10}{'Core ms':>10}{'speedup':>9}{'ORM KiB':>10}{'Core KiB':>10}")
+    for limit in PAGE_SIZES:
+        orm_ms, orm_kib = measure(Session, orm_page, limit, repeats)
+        core_ms, core_kib = measure(Session, core_page, limit, repeats)
+        print(f"{limit:>10}{orm_ms:>10.2f}{core_ms:>10.2f}{orm_ms / core_ms:>8.1f}x{orm_kib:>10.0f}{core_kib:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
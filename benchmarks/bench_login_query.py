@@ -0,0 +1,65 @@
+'''
+Cost of the login lookup: full ORM load vs the identity service.
+
+Seeds a throwaway SQLite database (or uses BENCH_DATABASE_URL) and times the
+query part of login only; Argon2 verification is excluded.
+
+Usage:
+    python benchmarks/bench_login_query.py [customers]
+'''
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_login.db")
+
+from sqlalchemy import insert
+
+from src.database import engine, Base, SessionLocal
+from src.model.orm import Customer, Employee
+from src.crud import CRUD
+from src.services.identity import find_identity
+
+FAKE_HASH = "$argon2id$v=19$m=65536,t=3,p=4$" + "x" * 22 + "$" + "y" * 43
+
+
+def seed(customers: int) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Customer), [
+            {"name": f"Customer {i}", "age": 30, "email": f"c{i}@example.com", "membership": False, "password": FAKE_HASH}
+            for i in range(customers)
+        ])
+        conn.execute(insert(Employee), [
+            {"name": f"Employee {i}", "age": 30, "email": f"e{i}@example.com", "role": "CASHIER", "password": FAKE_HASH}
+            for i in range(customers // 10)
+        ])
+
+
+def per_lookup_us(lookup, emails) -> float:
+    db = SessionLocal()
+    try:
+        lookup(db, emails[0])  # compile once
+        start = time.perf_counter()
+        for email in emails:
+            lookup(db, email)
+        return (time.perf_counter() - start) / len(emails) * 1e6
+    finally:
+        db.close()
+
+
+def main(customers: int) -> None:
+    seed(customers)
+    emails = [f"c{i * 7 % customers}@example.com" for i in range(2000)]
+    print(f"Login lookup ({customers:,} customers, {len(emails):,} lookups)")
+    print(f"  ORM get_customers(email=...)        {per_lookup_us(lambda db, e: CRUD.get_customers(db, email=e), emails):8.1f} us/lookup")
+    print(f"  find_identity(kind='customer')      {per_lookup_us(lambda db, e: find_identity(db, e, 'customer'), emails):8.1f} us/lookup")
+    print(f"  find_identity(any table, UNION ALL) {per_lookup_us(lambda db, e: find_identity(db, e), emails):8.1f} us/lookup")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
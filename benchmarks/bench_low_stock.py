@@ -0,0 +1,38 @@
+'''
+Cost of the low-stock query and of keeping the stock index current.
+
+Usage:
+    python benchmarks/bench_low_stock.py
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.stock_index import StockIndex
+
+
+def per_call_us(func, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main(products: int = 100_000, calls: int = 20_000) -> None:
+    index = StockIndex(refresh_seconds=30)
+    for product_id in range(1, products + 1):
+        index.set(product_id, f"P{product_id}", random.randint(0, 500))
+    print(f"Stock index with {products:,} products")
+
+    for limit in (10, 50, 200):
+        print(f"  lowest(threshold=20, limit={limit:<3})   {per_call_us(lambda i: index.lowest(20, limit), calls):7.2f} us/call")
+    updates = [(random.randint(1, products), random.randint(0, 500)) for _ in range(calls)]
+    print(f"  set_stock (sale / restock)       {per_call_us(lambda i: index.set_stock(*updates[i]), calls):7.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+'''
+Cost of verifying a checkout basket against the price snapshot.
+
+Compares the vectorized snapshot quote with fetching the basket's products
+from the database (what per-line server-side validation would need).
+
+Usage:
+    python benchmarks/bench_pricing.py
+'''
+
+import os
+import random
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+from sqlalchemy import select
+
+from src.database import Base, SessionLocal, engine
+from src.model.orm import Product
+from src.services.pricing import PriceSnapshot, verify_basket, price_snapshot
+
+
+def seed(count: int) -> None:
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    if db.query(Product).count() == 0:
+        db.add_all(
+            Product(name=f"P{i}", stock=100, sellPrice=Decimal(random.randint(10, 9999)) / 100,
+                    cost=Decimal("0.10"), category_id="1", category="c")
+            for i in range(count)
+        )
+        db.commit()
+    db.close()
+
+
+def per_call_us(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main(products: int = 50_000, lines: int = 20) -> None:
+    seed(products)
+    db = SessionLocal()
+    start = time.perf_counter()
+    count = price_snapshot.load(db)
+    print(f"Snapshot of {count:,} products: {price_snapshot.memory_bytes / 1024:.0f} KiB, "
+          f"loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    ids = random.sample(range(1, products + 1), lines)
+    quote = price_snapshot.quote(ids, [2] * lines)
+    details = [{"product_id": i, "quantity": 2, "price": p} for i, p in zip(ids, quote.line_prices)]
+
+    print(f"Basket of {lines} lines")
+    print(f"  snapshot quote                 {per_call_us(lambda: price_snapshot.quote(ids, [2] * lines), 5000):8.1f} us")
+    print(f"  verify_basket                  {per_call_us(lambda: verify_basket(db, details, quote.total, quote.total), 5000):8.1f} us")
+    print(f"  one query per line             {per_call_us(lambda: [db.get(Product, i) for i in ids] and db.expunge_all(), 200):8.1f} us")
+    print(f"  one IN (...) query             {per_call_us(lambda: db.execute(select(Product.id, Product.sellPrice).where(Product.id.in_(ids))).all(), 500):8.1f} us")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+'''
+Throughput and memory of the reorder batch job.
+
+Seeds a SQLite database (or uses BENCH_DATABASE_URL) with a year of sparse
+daily sales and runs the job. Memory is reported for the aggregation itself
+(tracemalloc, NumPy allocations included) and should track the number of
+products x branches, not the number of sales rows.
+
+Usage:
+    python benchmarks/bench_reorder.py [products] [days] [sale_probability]
+'''
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, time as dtime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+import numpy as np
+from sqlalchemy import func, insert, select
+
+from src.database import Base, SessionLocal, engine
+from src.model.orm import Branch, Product, Transaction, TransactionDetail
+from src.jobs.reorder import ReorderParameters, compute_suggestions, write_suggestions
+
+TODAY = date(2024, 1, 1)
+
+
+def seed(products: int, days: int, probability: float, branches: int = 4) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(Transaction)).scalar():
+            return
+        conn.execute(insert(Branch), [{"id": b, "name": f"B{b}", "location": "x"} for b in range(1, branches + 1)])
+        conn.execute(insert(Product), [
+            {"id": p, "name": f"P{p}", "stock": 50, "sellPrice": 1, "cost": 1, "category_id": "1", "category": "c"}
+            for p in range(1, products + 1)
+        ])
+        rng = np.random.default_rng(1)
+        next_id = 1
+        for day in range(days):
+            sold = np.nonzero(rng.random(products) < probability)[0] + 1
+            if not len(sold):
+                continue
+            ids = range(next_id, next_id + len(sold))
+            next_id += len(sold)
+            when = TODAY - timedelta(days=days - day)
+            branch = rng.integers(1, branches + 1, len(sold)).tolist()
+            quantity = rng.poisson(3, len(sold)).clip(1).tolist()
+            conn.execute(insert(Transaction), [
+                {"id": i, "branch_id": b, "total_amount": 1, "total": 1, "dateOfTransaction": when, "timeOfTransaction": dtime(12)}
+                for i, b in zip(ids, branch)
+            ])
+            conn.execute(insert(TransactionDetail), [
+                {"transaction_id": i, "product_id": int(p), "quantity": q, "price": 1}
+                for i, p, q in zip(ids, sold, quantity)
+            ])
+
+
+def main(products: int = 20_000, days: int = 365, probability: float = 0.05) -> None:
+    start = time.perf_counter()
+    seed(products, days, probability)
+    print(f"Seeded {products:,} products x {days} days in {time.perf_counter() - start:.0f}s")
+
+    db = SessionLocal()
+    params = ReorderParameters.from_settings()
+    params.history_days = days
+
+    start = time.perf_counter()
+    rows_read, columns = compute_suggestions(db, params, TODAY)
+    compute_s = time.perf_counter() - start
+
+    # Second pass for memory only (tracemalloc slows allocation down)
+    tracemalloc.start()
+    compute_suggestions(db, params, TODAY)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    count = write_suggestions(db, columns, TODAY)
+    write_s = time.perf_counter() - start
+    db.close()
+
+    print(f"Aggregated {rows_read:,} daily rows in {compute_s:.1f}s ({rows_read / compute_s:,.0f} rows/s), "
+          f"peak memory {peak / 2**20:.1f} MiB")
+    print(f"Wrote {count:,} suggestions in {write_s:.1f}s")
+
+
+if __name__ == "__main__":
+    main(*(cast(arg) for cast, arg in zip((int, int, float), sys.argv[1:])))
@@ -0,0 +1,117 @@
+'''
+Transaction shards: write throughput with 1, 2 and 4 shards.
+
+Each shard is its own SQLite file. Writer threads record sales for branches
+1..8 at the same time, through CRUD.create_transaction, for a fixed number of
+seconds. A durable MySQL primary spends about a millisecond or two per commit
+(log flush, replication ack) while the rows stay locked; an in-process SQLite
+file does not, so every commit here waits commit_ms (default 2) while holding
+the file's write lock. With one shard all sales queue behind that lock; with
+more shards the branches' sales commit in parallel.
+
+Two workloads:
+  sale records  - the transaction row only: everything is written to the shards
+  checkouts     - a sale with one line item: the line goes to the shard too, but
+                  the stock update stays in the main database (shard 0 here) and
+                  keeps most of the serialization
+
+Usage:
+    python benchmarks/bench_sharding.py [seconds] [writers] [commit_ms]
+'''
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, time as dtime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from src.crud import CRUD
+from src.database import DATABASE_URL, Base, prepare_shard, shard_router
+from src.services.pricing import price_snapshot
+
+BRANCHES = 8
+PRICE = Decimal("2.00")
+
+
+def durable(shard_engine, commit_ms: float) -> None:
+    @event.listens_for(shard_engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=60000")
+        cursor.close()
+
+    @event.listens_for(shard_engine, "commit")
+    def _flush(conn):
+        if conn.in_transaction():
+            time.sleep(commit_ms / 1000)  # the write lock is still held
+
+
+def setup(shards: int, commit_ms: float) -> None:
+    directory = tempfile.mkdtemp()
+    shard_router.configure([f"sqlite:///{os.path.join(directory, f'shard{i}.db')}" for i in range(shards)])
+    for shard, shard_engine in enumerate(shard_router.engines):
+        durable(shard_engine, commit_ms)
+        if shard == 0:
+            Base.metadata.create_all(shard_engine)
+        else:
+            prepare_shard(shard_engine, shard)
+    db = shard_router.factories[0]()
+    CRUD.create_product(db, {"id": 1, "name": "Milk", "stock": 10**9, "sellPrice": PRICE, "cost": Decimal("1.00"),
+                             "category_id": "1", "category": "food"})
+    price_snapshot.load(db)
+    db.close()
+
+
+def writer(index: int, seconds: float, with_stock: bool, counts: list) -> None:
+    db = shard_router.factories[0]()
+    sale = {"total_amount": PRICE, "total": PRICE, "dateOfTransaction": date.today(), "timeOfTransaction": dtime(12)}
+    line = {"product_id": 1, "quantity": 1, "price": PRICE}
+    deadline = time.perf_counter() + seconds
+    done = 0
+    try:
+        while time.perf_counter() < deadline:
+            branch_id = 1 + (index + done) % BRANCHES
+            if with_stock:
+                CRUD.create_transaction(db, {**sale, "branch_id": branch_id}, [dict(line)])
+            else:
+                CRUD.create_transaction(db, {**sale, "branch_id": branch_id, "customer_id": None})
+            done += 1
+    finally:
+        db.close()
+    counts[index] = done
+
+
+def run(shards: int, seconds: float, writers: int, commit_ms: float, with_stock: bool) -> float:
+    setup(shards, commit_ms)
+    counts = [0] * writers
+    threads = [threading.Thread(target=writer, args=(i, seconds, with_stock, counts)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def main() -> None:
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    commit_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 2
+    print(f"{writers} writer threads, {BRANCHES} branches, {commit_ms:g} ms per commit, {seconds:.0f}s per run")
+    for label, with_stock in (("sale records", False), ("checkouts", True)):
+        baseline = None
+        for shards in (1, 2, 4):
+            rate = run(shards, seconds, writers, commit_ms, with_stock)
+            baseline = baseline or rate
+            print(f"  {label:<12} {shards} shard{'s' if shards > 1 else ' '}: {rate:7.0f} sales/s  ({rate / baseline:.2f}x)")
+    shard_router.configure([DATABASE_URL])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+'''
+Startup benchmark: import time of `main` and time to first request.
+
+Each measurement runs in a fresh interpreter so nothing is cached between runs.
+By default it uses a throwaway SQLite database so it can run anywhere; set
+BENCH_DATABASE_URL to measure against a real MySQL server.
+
+Usage:
+    python benchmarks/bench_startup.py [runs]
+'''
+
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(mode: str) -> None:
+    """Runs inside the fresh interpreter and prints its timings as JSON."""
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    t0 = time.perf_counter()
+    import main
+    t_import = time.perf_counter() - t0
+    if mode == "import":
+        print(json.dumps({"import": t_import}))
+        return
+
+    from asgi_client import run_lifespan_startup, request
+    from src.utils.security import create_access_token
+
+    async def first_request():
+        t1 = time.perf_counter()
+        await run_lifespan_startup(main.app)
+        t_ready = time.perf_counter() - t1
+        token = create_access_token({"sub": "bench@example.com", "role": "ADMIN"})
+        t2 = time.perf_counter()
+        status, _, _ = await request(main.app, "GET", "/api/v1/products/", headers={"Authorization": f"Bearer {token}"})
+        t_first = time.perf_counter() - t2
+        return t_ready, t_first, status
+
+    t_ready, t_first, status = asyncio.run(first_request())
+    print(json.dumps({"import": t_import, "ready": t_ready, "first_request": t_first, "status": status}))
+
+
+def spawn(mode: str, env: dict) -> dict:
+    out = subprocess.run([sys.executable, __file__, "--child", mode], env=env, cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def prepare_database(url: str) -> None:
+    os.environ["DATABASE_URL"] = url
+    sys.path.insert(0, ROOT)
+    from src.database import engine, Base
+    import src.model.orm  # noqa: F401 - registers the tables
+    Base.metadata.create_all(engine)
+
+
+def report(label: str, samples: list) -> None:
+    ms = [s * 1000 for s in samples]
+    print(f"  {label:<28} median {statistics.median(ms):8.1f} ms   min {min(ms):8.1f} ms   max {max(ms):8.1f} ms")
+
+
+def main(runs: int) -> None:
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_startup.db")
+    prepare_database(url)
+    env = dict(os.environ, DATABASE_URL=url)
+
+    print(f"Startup benchmark ({runs} runs, {url.split(':')[0]})")
+    report("import main", [spawn("import", env)["import"] for _ in range(runs)])
+    for warmup in ("false", "true"):
+        results = [spawn("request", dict(env, WARMUP_ON_STARTUP=warmup)) for _ in range(runs)]
+        print(f" WARMUP_ON_STARTUP={warmup}")
+        report("startup until ready", [r["ready"] for r in results])
+        report("first GET /products/", [r["first_request"] for r in results])
+        report("import + ready + first", [r["import"] + r["ready"] + r["first_request"] for r in results])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        child(sys.argv[2])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
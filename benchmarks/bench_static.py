@@ -0,0 +1,114 @@
+'''
+Frontend assets: bytes and requests per visit, before and after the asset pipeline.
+
+Plays a browser visiting each page twice (first visit with an empty cache,
+then a repeat visit) against the previous setup (StaticFiles mount plus
+FileResponse pages) and against src/services/static_assets.py, counting the
+requests made and the bytes on the wire. Then times serving one asset.
+
+The browser model: with the old setup, pages have no conditional handling and
+assets are revalidated with If-None-Match on every visit (no max-age). With
+the pipeline, pages are revalidated and fingerprinted assets come straight
+from the cache (immutable).
+
+Usage:
+    python benchmarks/bench_static.py
+'''
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from fastapi.testclient import TestClient
+
+from src.services.static_assets import StaticAssets
+
+PAGES = {"/": "login.html", "/signup": "signup.html", "/admin": "index.html", "/shop": "user.html"}
+ASSET_REF = re.compile(r"""["'](/static/[^"']+)["']""")
+BROWSER = {"Accept-Encoding": "gzip, deflate, br"}
+
+
+def old_app() -> FastAPI:
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory="frontend"), name="static")
+    for path, filename in PAGES.items():
+        app.add_api_route(path, lambda filename=filename: FileResponse(f"frontend/{filename}"))
+    return app
+
+
+def new_app() -> FastAPI:
+    app = FastAPI()
+    assets = StaticAssets("frontend", memory_max_bytes=1_000_000)
+    assets.load()
+
+    @app.get("/static/{path:path}")
+    async def static_file(path: str, request: Request):
+        return assets.response(path, request)
+
+    for path, filename in PAGES.items():
+        async def page(request: Request, filename=filename):
+            return assets.page(filename, request)
+        app.add_api_route(path, page)
+    return app
+
+
+def wire_bytes(response) -> int:
+    return int(response.headers.get("content-length", len(response.content)))
+
+
+def visit(client: TestClient, path: str, cache: dict) -> tuple:
+    """One page view. cache: url -> (etag, cache-control). Returns (requests, bytes)."""
+    requests = size = 0
+
+    def get(url):
+        nonlocal requests, size
+        cached = cache.get(url)
+        if cached and "immutable" in cached[1]:
+            return None
+        headers = dict(BROWSER)
+        if cached and cached[0]:
+            headers["If-None-Match"] = cached[0]
+        response = client.get(url, headers=headers)
+        requests += 1
+        size += wire_bytes(response)
+        if response.status_code == 200:
+            cache[url] = (response.headers.get("etag"), response.headers.get("cache-control", ""))
+        return response
+
+    page = get(path)
+    text = page.text if page.status_code == 200 else cache[path + "#body"]
+    cache[path + "#body"] = text
+    for asset in ASSET_REF.findall(text):
+        get(asset)
+    return requests, size
+
+
+def main() -> None:
+    for label, app in (("StaticFiles + FileResponse", old_app()), ("Asset pipeline", new_app())):
+        client = TestClient(app)
+        cache: dict = {}
+        first = [visit(client, path, cache) for path in PAGES]
+        repeat = [visit(client, path, cache) for path in PAGES]
+        print(f"{label}:")
+        print(f"  first visit of {len(PAGES)} pages:  {sum(r for r, _ in first):>3} requests, "
+              f"{sum(b for _, b in first) / 1024:6.1f} KB")
+        print(f"  repeat visit:              {sum(r for r, _ in repeat):>3} requests, "
+              f"{sum(b for _, b in repeat) / 1024:6.1f} KB")
+
+        url = ASSET_REF.findall(cache["/admin#body"])[-1]  # vibe.js
+        n = 2000
+        start = time.perf_counter()
+        for _ in range(n):
+            client.get(url, headers=BROWSER)
+        print(f"  GET {url}: {(time.perf_counter() - start) / n * 1e6:.0f} us per request (in-process client)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+'''
+Stock stream hub: memory per idle subscriber and fan-out time.
+
+Opens N in-process subscribers (each an asyncio task reading hub.events(),
+as the SSE endpoint does), measures the memory they hold, then publishes a
+burst of checkouts and times one flush until every subscriber has its message.
+Also checks that a subscriber that never reads stays bounded.
+
+Usage:
+    python benchmarks/bench_stock_stream.py [subscribers]
+'''
+
+import asyncio
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.stock_hub import StockHub
+
+
+async def main(subscribers: int = 10_000) -> None:
+    hub = StockHub(max_subscribers=subscribers + 1, flush_seconds=3600, heartbeat_seconds=3600, max_queued=32)
+    received = 0
+    done = asyncio.Event()
+
+    async def client():
+        nonlocal received
+        async for message in hub.events():
+            if message.startswith("event: stock"):
+                received += 1
+                if received == subscribers:
+                    done.set()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tasks = [asyncio.create_task(client()) for _ in range(subscribers)]
+    await asyncio.sleep(0.1)  # let every task subscribe and block
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    held = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(f"{len(hub):,} idle subscribers: {held / 1e6:.1f} MB, {held / subscribers:,.0f} bytes each")
+
+    # A burst of 500 checkouts over 300 products in branches 1-3, delivered in one flush
+    rng = random.Random(1)
+    for _ in range(500):
+        for product_id in rng.sample(range(1, 301), 4):
+            hub.publish(product_id, rng.randint(0, 100))
+    hub.publish(999, 50)  # a restock
+    start = time.perf_counter()
+    queued = hub.flush()
+    flushed = time.perf_counter() - start
+    await done.wait()
+    delivered = time.perf_counter() - start
+    print(f"Burst of 2,001 changes -> {queued:,} messages: flush {flushed * 1000:.1f} ms, "
+          f"all subscribers read it after {delivered * 1000:.1f} ms")
+
+    # A stalled subscriber: its queue never grows past max_queued
+    stalled = hub.subscribe()
+    for i in range(1000):
+        hub.publish(1, i)
+        hub.flush()
+    print(f"Stalled subscriber after 1,000 flushes: {len(stalled.queue)} queued, resync pending: {stalled.overflowed}")
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000))
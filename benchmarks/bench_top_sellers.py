@@ -0,0 +1,82 @@
+'''
+Top-products query: Space-Saving sketches vs GROUP BY over TRANSACTION_DETAILS.
+
+Seeds a SQLite database with a week of sales, then compares the dashboard
+query served from the sketches with the exact SQL aggregation.
+
+Usage:
+    python benchmarks/bench_top_sellers.py [sales]
+'''
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from sqlalchemy import func, insert, select
+
+from src.database import Base, SessionLocal, engine
+from src.model.orm import Branch, Product, Transaction, TransactionDetail
+from src.services.top_sellers import TopSellers, TODAY, WEEK
+
+
+def per_call_us(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main(sales: int = 200_000, products: int = 20_000) -> None:
+    Base.metadata.create_all(engine)
+    rng = random.Random(1)
+    now = datetime.now()
+    sellers = TopSellers(capacity=256, refresh_seconds=60)
+    rows = []
+    for i in range(1, sales + 1):
+        when = now - timedelta(days=rng.randint(0, 6), minutes=rng.randint(0, 600))
+        product_id = min(int(rng.paretovariate(1.0)), products)
+        rows.append((i, rng.randint(1, 4), when, product_id, rng.randint(1, 3)))
+
+    start = time.perf_counter()
+    for _, branch_id, when, product_id, quantity in rows:
+        sellers.record(branch_id, [(product_id, quantity)], when, now)
+    print(f"Recorded {sales:,} sales: {(time.perf_counter() - start) / sales * 1e6:.1f} us per sale")
+
+    with engine.begin() as conn:
+        conn.execute(insert(Branch), [{"id": b, "name": f"B{b}", "location": "x"} for b in range(1, 5)])
+        conn.execute(insert(Product), [{"id": p, "name": f"P{p}", "stock": 0, "sellPrice": 1, "cost": 1,
+                                        "category_id": "1", "category": "c"} for p in range(1, products + 1)])
+        conn.execute(insert(Transaction), [{"id": i, "branch_id": b, "total_amount": 1, "total": 1,
+                                            "dateOfTransaction": w.date(), "timeOfTransaction": w.time()}
+                                           for i, b, w, _, _ in rows])
+        conn.execute(insert(TransactionDetail), [{"transaction_id": i, "product_id": p, "quantity": q, "price": 1}
+                                                 for i, _, _, p, q in rows])
+
+    db = SessionLocal()
+    exact = (
+        select(TransactionDetail.product_id, func.sum(TransactionDetail.quantity).label("units"))
+        .join(Transaction, Transaction.id == TransactionDetail.transaction_id)
+        .where(Transaction.branch_id == 1, Transaction.dateOfTransaction >= now.date() - timedelta(days=6))
+        .group_by(TransactionDetail.product_id)
+        .order_by(func.sum(TransactionDetail.quantity).desc())
+        .limit(10)
+    )
+    print("Top 10 products of branch 1")
+    print(f"  sketch, today                  {per_call_us(lambda: sellers.window(1, TODAY).top(10), 200):10.1f} us")
+    print(f"  sketch, 7 days (merge)         {per_call_us(lambda: sellers.window(1, WEEK).top(10), 200):10.1f} us")
+    print(f"  SQL GROUP BY, 7 days           {per_call_us(lambda: db.execute(exact).all(), 5):10.1f} us")
+
+    sketch_top = [hit.item for hit in sellers.window(1, WEEK).top(10)]
+    sql_top = [row.product_id for row in db.execute(exact)]
+    print(f"  same top 10 as SQL: {sketch_top == sql_top} (error bound {sellers.window(1, WEEK).error_bound():.0f} units)")
+    db.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,116 @@
+'''
+Write paths: statements and time per create, update and delete.
+
+Runs each write the way CRUD did it before (ORM read-modify-write, commit, then
+db.refresh; deletes loading the row and its details to cascade in the ORM) and
+the way it does now (one INSERT / UPDATE ... RETURNING / DELETE, no read back),
+against a SQLite file, counting the statements sent to the database.
+
+On MySQL, which has no UPDATE ... RETURNING, an update is the UPDATE plus one
+SELECT of the row, and a delete is the single DELETE (the database applies ON
+DELETE CASCADE itself; SQLite gets the cascade as an extra statement). Every
+statement saved there is also a network round trip.
+
+Usage:
+    python benchmarks/bench_write_paths.py [repeats]
+'''
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.crud import CRUD
+from src.database import Base
+from src.model.orm import Product, Transaction, TransactionDetail
+
+PRODUCT = {"name": "Milk", "stock": 10**6, "sellPrice": Decimal("2.00"), "cost": Decimal("1.00"),
+           "category_id": "1", "category": "food"}
+SALE = {"branch_id": None, "customer_id": None, "total_amount": Decimal("2.00"), "total": Decimal("2.00")}
+
+
+# The previous write paths
+def old_create(db, model, data):
+    item = model(**data)
+    db.add(item)
+    db.commit()
+    db.refresh(item)
+    return item
+
+
+def old_update(db, model, entity_id, updates):
+    item = db.get(model, entity_id)
+    for key, value in updates.items():
+        setattr(item, key, value)
+    db.commit()
+    db.refresh(item)
+    return item
+
+
+def old_delete(db, model, entity_id):
+    item = db.get(model, entity_id)
+    if model is Transaction:
+        item.details  # without passive_deletes the ORM loaded the details to delete them one by one
+    db.delete(item)
+    db.commit()
+    return True
+
+
+def make_sale(db) -> int:
+    """A transaction with its line (TRANSACTION_DETAILS is keyed by transaction_id alone)."""
+    sale = Transaction(**SALE, dateOfTransaction=date.today(), timeOfTransaction=dtime(12))
+    db.add(sale)
+    db.flush()
+    db.add(TransactionDetail(transaction_id=sale.id, product_id=1, quantity=1, price=Decimal("2.00")))
+    db.commit()
+    return sale.id
+
+
+def main() -> None:
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    statements = []
+    paths = {
+        "before": (old_create, old_update, old_delete),
+        "now": (CRUD.create_entity, CRUD.update_entity, CRUD.delete_entity),
+    }
+    print(f"{repeats} operations each, SQLite")
+    print(f"{'operation':<22}{'statements before':>18}{'now':>6}{'us before':>12}{'now':>8}")
+    results = {}
+    for label, (create, update, delete) in paths.items():
+        engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        db = Session()
+        product_id = create(db, Product, dict(PRODUCT)).id
+        with Session() as setup:
+            sale_ids = [make_sale(setup) for _ in range(repeats)]
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        operations = {
+            "create product": lambda i: create(db, Product, dict(PRODUCT, name=f"P{i}")),
+            "update product": lambda i: update(db, Product, product_id, {"stock": i}),
+            "delete transaction": lambda i: delete(db, Transaction, sale_ids[i]),
+        }
+        for name, operation in operations.items():
+            statements.clear()
+            start = time.perf_counter()
+            for i in range(repeats):
+                operation(i)
+                db.expunge_all()  # every request starts with an empty session
+            elapsed = time.perf_counter() - start
+            results.setdefault(name, {})[label] = (len(statements) / repeats, elapsed / repeats * 1e6)
+        db.close()
+
+    for name, by_path in results.items():
+        (old_count, old_us), (new_count, new_us) = by_path["before"], by_path["now"]
+        print(f"{name:<22}{old_count:>18.1f}{new_count:>6.1f}{old_us:>12.0f}{new_us:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,10 @@ README.md
 
 bash
 mysql -u root -p < database_schema.sql
+
+The schema is kept in step with the latest Alembic migration (migrations/).
+A database created from this file is marked with `alembic stamp head`;
+existing databases are upgraded with `alembic upgrade head`.
 '''
 
 
@@ -19,7 +23,8 @@ CREATE TABLE IF NOT EXISTS CUSTOMERS (
     age INT NOT NULL,
     email VARCHAR(100) NOT NULL UNIQUE,
     membership BOOLEAN DEFAULT FALSE,
-    password VARCHAR(255) NOT NULL DEFAULT 'password123'
+    password VARCHAR(255) NOT NULL DEFAULT 'password123',
+    version INT NOT NULL DEFAULT 1
 ) ENGINE=InnoDB;
 
 -- Create Branches table
@@ -28,7 +33,9 @@ CREATE TABLE IF NOT EXISTS BRANCHES (
     name VARCHAR(100) NOT NULL,
     location VARCHAR(255) NOT NULL,
     size INT DEFAULT 0,
-    total_stock INT DEFAULT 0
+    total_stock INT DEFAULT 0,
+    version INT NOT NULL DEFAULT 1,
+    INDEX idx_branches_location (location)
 ) ENGINE=InnoDB;
 
 -- Create Employees table
@@ -40,7 +47,8 @@ CREATE TABLE IF NOT EXISTS EMPLOYEES (
     dateOfEndOfEmployment DATE DEFAULT NULL,
     email VARCHAR(100) NOT NULL UNIQUE,
     role VARCHAR(50) NOT NULL,
-    password VARCHAR(255) NOT NULL DEFAULT 'password123'
+    password VARCHAR(255) NOT NULL DEFAULT 'password123',
+    version INT NOT NULL DEFAULT 1
 ) ENGINE=InnoDB;
 
 -- Create Products table
@@ -51,7 +59,11 @@ CREATE TABLE IF NOT EXISTS PRODUCTS (
     sellPrice DECIMAL(10, 2) NOT NULL,
     cost DECIMAL(10, 2) NOT NULL,
     category_id VARCHAR(10) NOT NULL,
-    category VARCHAR(50) NOT NULL
+    category VARCHAR(50) NOT NULL,
+    version INT NOT NULL DEFAULT 1,
+    INDEX idx_products_category_price (category, sellPrice),
+    INDEX idx_products_sell_price (sellPrice),
+    INDEX idx_products_stock (stock)
 ) ENGINE=InnoDB;
 
 -- Create Transactions table
@@ -63,6 +75,10 @@ CREATE TABLE IF NOT EXISTS TRANSACTIONS (
     dateOfTransaction DATE NOT NULL,
     timeOfTransaction TIME NOT NULL,
     total DECIMAL(10, 2) NOT NULL,
+    version INT NOT NULL DEFAULT 1,
+    INDEX idx_transactions_customer_date_time (customer_id, dateOfTransaction, timeOfTransaction),
+    INDEX idx_transactions_branch_date_time (branch_id, dateOfTransaction, timeOfTransaction),
+    INDEX idx_transactions_date (dateOfTransaction),
     FOREIGN KEY (branch_id) REFERENCES BRANCHES(id) ON DELETE SET NULL,
     FOREIGN KEY (customer_id) REFERENCES CUSTOMERS(id) ON DELETE SET NULL
 ) ENGINE=InnoDB;
@@ -75,4 +91,101 @@ CREATE TABLE IF NOT EXISTS TRANSACTION_DETAILS (
     price DECIMAL(10, 2) NOT NULL,
     FOREIGN KEY (transaction_id) REFERENCES TRANSACTIONS(id) ON DELETE CASCADE,
     FOREIGN KEY (product_id) REFERENCES PRODUCTS(id) ON DELETE SET NULL
-) ENGINE=InnoDB;
\ No newline at end of file
+) ENGINE=InnoDB;
+
+-- Create Customer_Stats table (purchase aggregates kept by checkout, RFM scores by the nightly job)
+CREATE TABLE IF NOT EXISTS CUSTOMER_STATS (
+    customer_id INT PRIMARY KEY,
+    lifetime_spend DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    visit_count INT NOT NULL DEFAULT 0,
+    first_visit DATE,
+    last_visit DATE,
+    recency_score SMALLINT,
+    frequency_score SMALLINT,
+    monetary_score SMALLINT,
+    segment VARCHAR(20),
+    membership_candidate BOOLEAN NOT NULL DEFAULT FALSE,
+    scored_at DATETIME,
+    INDEX idx_customer_stats_membership_candidate (membership_candidate),
+    FOREIGN KEY (customer_id) REFERENCES CUSTOMERS(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Create Revoked_Tokens table (used refresh tokens and revoked token families)
+-- Rows can be deleted once expires_at has passed
+CREATE TABLE IF NOT EXISTS REVOKED_TOKENS (
+    token_id CHAR(32) PRIMARY KEY,
+    scope VARCHAR(10) NOT NULL DEFAULT 'token',
+    expires_at DATETIME NOT NULL,
+    INDEX idx_revoked_tokens_expires_at (expires_at)
+) ENGINE=InnoDB;
+
+-- Create Reorder_Suggestions table (rebuilt by the reorder batch job)
+CREATE TABLE IF NOT EXISTS REORDER_SUGGESTIONS (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    branch_id INT,
+    avg_daily_demand DOUBLE NOT NULL,
+    moving_avg_demand DOUBLE NOT NULL,
+    demand_std DOUBLE NOT NULL,
+    reorder_point DOUBLE NOT NULL,
+    suggested_quantity INT NOT NULL DEFAULT 0,
+    computed_at DATETIME NOT NULL,
+    INDEX idx_reorder_suggestions_product_id (product_id),
+    INDEX idx_reorder_suggestions_branch_id (branch_id),
+    FOREIGN KEY (product_id) REFERENCES PRODUCTS(id) ON DELETE CASCADE,
+    FOREIGN KEY (branch_id) REFERENCES BRANCHES(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Create archive tables (closed months moved out of TRANSACTIONS / TRANSACTION_DETAILS by the archive job)
+-- Read-only, no foreign keys; compressed since they are rarely read
+CREATE TABLE IF NOT EXISTS TRANSACTIONS_ARCHIVE (
+    id INT PRIMARY KEY,
+    branch_id INT,
+    customer_id INT,
+    total_amount DECIMAL(10, 2) NOT NULL,
+    dateOfTransaction DATE NOT NULL,
+    timeOfTransaction TIME NOT NULL,
+    total DECIMAL(10, 2) NOT NULL,
+    INDEX idx_transactions_archive_customer_date_time (customer_id, dateOfTransaction, timeOfTransaction),
+    INDEX idx_transactions_archive_branch_date_time (branch_id, dateOfTransaction, timeOfTransaction),
+    INDEX idx_transactions_archive_date (dateOfTransaction)
+) ENGINE=InnoDB ROW_FORMAT=COMPRESSED;
+
+CREATE TABLE IF NOT EXISTS TRANSACTION_DETAILS_ARCHIVE (
+    transaction_id INT PRIMARY KEY,
+    product_id INT,
+    quantity INT NOT NULL,
+    price DECIMAL(10, 2) NOT NULL
+) ENGINE=InnoDB ROW_FORMAT=COMPRESSED;
+
+-- Branch node sync (src/jobs/sync.py)
+-- Central: catalog change log pulled by branch nodes, and the sales already received from them
+CREATE TABLE IF NOT EXISTS PRODUCT_CHANGES (
+    seq INT AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    changed_at DATETIME NOT NULL,
+    INDEX idx_product_changes_changed_at (changed_at)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS SYNC_RECEIPTS (
+    branch_id INT NOT NULL,
+    local_id INT NOT NULL,
+    transaction_id INT NOT NULL,
+    received_at DATETIME NOT NULL,
+    PRIMARY KEY (branch_id, local_id)
+) ENGINE=InnoDB;
+
+-- Branch node: sales not yet pushed, and sync cursors
+CREATE TABLE IF NOT EXISTS SYNC_OUTBOX (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    transaction_id INT NOT NULL,
+    created_at DATETIME NOT NULL,
+    pushed_at DATETIME,
+    central_id INT,
+    INDEX idx_sync_outbox_pushed_at (pushed_at)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS SYNC_STATE (
+    `key` VARCHAR(50) PRIMARY KEY,
+    value VARCHAR(255) NOT NULL
+) ENGINE=InnoDB;
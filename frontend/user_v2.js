@@ -27,21 +27,63 @@ document.addEventListener('DOMContentLoaded', () => {
 });
 
 function logout() {
+    if (stockStream) stockStream.abort();
+    if (currentUser && currentUser.refresh_token) {
+        // Revoke the session server-side; keepalive lets it finish during navigation
+        fetch(`${API_BASE}/auth/logout`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: currentUser.refresh_token }),
+            keepalive: true
+        });
+    }
     localStorage.removeItem('user');
     window.location.href = '/';
 }
 
+// Renew the access token with the stored refresh token (no password needed).
+// Concurrent callers share one request: a refresh token is single use.
+let refreshInFlight = null;
+function refreshSession() {
+    if (!currentUser.refresh_token) return Promise.resolve(false);
+    if (!refreshInFlight) {
+        refreshInFlight = fetch(`${API_BASE}/auth/refresh`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: currentUser.refresh_token })
+        }).then(async res => {
+            if (!res.ok) return false;
+            const tokens = await res.json();
+            currentUser.access_token = tokens.access_token;
+            currentUser.refresh_token = tokens.refresh_token;
+            localStorage.setItem('user', JSON.stringify(currentUser));
+            return true;
+        }).catch(() => false).finally(() => { refreshInFlight = null; });
+    }
+    return refreshInFlight;
+}
+
+// fetch() with the bearer token; on 401 renew the session once and retry
+async function authFetch(url, options = {}) {
+    const withAuth = () => ({
+        ...options,
+        headers: { ...(options.headers || {}), 'Authorization': 'Bearer ' + currentUser.access_token }
+    });
+    let res = await fetch(url, withAuth());
+    if (res.status === 401 && await refreshSession()) {
+        res = await fetch(url, withAuth());
+    }
+    return res;
+}
+
 async function loadBranches() {
     const list = document.getElementById('branch-list');
     list.innerHTML = '<div class="spinner"></div>';
 
     try {
         console.log("Fetching branches with token:", currentUser.access_token ? "PRESENT" : "MISSING");
-        const res = await fetch(`${API_BASE}/branches/`, {
-            headers: {
-                'Authorization': 'Bearer ' + currentUser.access_token,
-                'X-Debug-Source': 'user.js'
-            }
+        const res = await authFetch(`${API_BASE}/branches/`, {
+            headers: { 'X-Debug-Source': 'user.js' }
         });
         console.log("Branch fetch response status:", res.status);
         const branches = await res.json();
@@ -63,6 +105,7 @@ async function selectBranch(id, name) {
     document.getElementById('current-branch-name').innerText = `Shopping at ${name}`;
     showView('product-selection');
     loadProducts();
+    openStockStream();
 }
 
 async function loadProducts() {
@@ -70,9 +113,7 @@ async function loadProducts() {
     list.innerHTML = '<div class="spinner"></div>';
 
     try {
-        const res = await fetch(`${API_BASE}/products/`, {
-            headers: { 'Authorization': 'Bearer ' + currentUser.access_token }
-        });
+        const res = await authFetch(`${API_BASE}/products/`);
         const products = await res.json();
 
         list.innerHTML = products.map(p => {
@@ -81,7 +122,7 @@ async function loadProducts() {
                 <div class="item-card card">
                     <h4>${toTitleCase(p.name)}</h4>
                     <div class="price">$${price.toFixed(2)}</div>
-                    <div style="font-size:0.8rem; color: #94a3b8; margin-bottom:1rem">Stock: ${p.stock}</div>
+                    <div class="stock" data-product-id="${p.id}" style="font-size:0.8rem; color: #94a3b8; margin-bottom:1rem">Stock: ${p.stock}</div>
                     <button class="btn-primary" onclick="addToCart(${p.id}, '${toTitleCase(p.name)}', ${price}, this)">
                         <i class="fas fa-plus"></i> Add
                     </button>
@@ -93,6 +134,59 @@ async function loadProducts() {
     }
 }
 
+// Live stock levels from GET /stream/stock (Server-Sent Events). Read with
+// fetch() rather than EventSource so the bearer token goes in a header.
+let stockStream = null;
+
+function applyStock(changes) {
+    for (const [id, stock] of Object.entries(changes)) {
+        const el = document.querySelector(`.stock[data-product-id="${id}"]`);
+        if (el) el.innerText = stock === null ? 'Unavailable' : `Stock: ${stock}`;
+    }
+}
+
+function handleStockEvent(raw) {
+    let event = 'message', data = '';
+    for (const line of raw.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+    }
+    if (event === 'stock') applyStock(JSON.parse(data).stock);
+    else if (event === 'resync') loadProducts();  // we fell behind, reload the catalog
+}
+
+async function openStockStream() {
+    if (stockStream) stockStream.abort();
+    const controller = new AbortController();
+    stockStream = controller;
+    let delay = 1000;
+    while (!controller.signal.aborted) {
+        try {
+            const res = await authFetch(`${API_BASE}/stream/stock`, { signal: controller.signal });
+            if (!res.ok) throw new Error(`stream status ${res.status}`);
+            delay = 1000;
+            const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += value;
+                let end;
+                while ((end = buffer.indexOf('\n\n')) >= 0) {
+                    handleStockEvent(buffer.slice(0, end));
+                    buffer = buffer.slice(end + 2);
+                }
+            }
+        } catch (e) {
+            if (controller.signal.aborted) return;
+        }
+        // Disconnected: reconnect with backoff and reload, updates may have been missed
+        await new Promise(r => setTimeout(r, delay));
+        delay = Math.min(delay * 2, 30000);
+        if (!controller.signal.aborted) loadProducts();
+    }
+}
+
 function addToCart(id, name, price, btn) {
     const existing = cart.find(i => i.id === id);
     if (existing) {
@@ -120,7 +214,9 @@ function updateCartUI() {
     const count = cart.reduce((acc, i) => acc + i.quantity, 0);
     document.getElementById('cart-count').innerText = count;
 
-    const total = cart.reduce((acc, i) => acc + (i.price * i.quantity), 0);
+    // Sum in integer cents so the total matches the server's exact pricing
+    const totalCents = cart.reduce((acc, i) => acc + Math.round(i.price * 100) * i.quantity, 0);
+    const total = totalCents / 100;
     document.getElementById('cart-total').innerText = `$${total.toFixed(2)}`;
 
     const list = document.getElementById('cart-items-list');
@@ -150,7 +246,7 @@ function initCartUI() {
 async function handleCheckout() {
     if (cart.length === 0) return showToast('Cart is empty', 'error');
 
-    const total = cart.reduce((acc, i) => acc + (i.price * i.quantity), 0);
+    const total = cart.reduce((acc, i) => acc + Math.round(i.price * 100) * i.quantity, 0) / 100;
     const now = new Date();
 
     const payload = {
@@ -169,12 +265,9 @@ async function handleCheckout() {
     };
 
     try {
-        const res = await fetch(`${API_BASE}/transactions/`, {
+        const res = await authFetch(`${API_BASE}/transactions/`, {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'Authorization': 'Bearer ' + currentUser.access_token
-            },
+            headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(payload)
         });
 
@@ -183,6 +276,7 @@ async function handleCheckout() {
             cart = [];
             updateCartUI();
             document.getElementById('cart-overlay').classList.remove('open');
+            if (stockStream) stockStream.abort();
             showView('branch-selection');
         } else {
             showToast('Checkout failed', 'error');
@@ -43,10 +43,54 @@ document.addEventListener('DOMContentLoaded', () => {
 });
 
 function logout() {
+    if (currentUser && currentUser.refresh_token) {
+        // Revoke the session server-side; keepalive lets it finish during navigation
+        fetch(`${API_BASE}/auth/logout`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: currentUser.refresh_token }),
+            keepalive: true
+        });
+    }
     localStorage.removeItem('user');
     window.location.href = '/';
 }
 
+// Renew the access token with the stored refresh token (no password needed).
+// Concurrent callers share one request: a refresh token is single use.
+let refreshInFlight = null;
+function refreshSession() {
+    if (!currentUser.refresh_token) return Promise.resolve(false);
+    if (!refreshInFlight) {
+        refreshInFlight = fetch(`${API_BASE}/auth/refresh`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: currentUser.refresh_token })
+        }).then(async res => {
+            if (!res.ok) return false;
+            const tokens = await res.json();
+            currentUser.access_token = tokens.access_token;
+            currentUser.refresh_token = tokens.refresh_token;
+            localStorage.setItem('user', JSON.stringify(currentUser));
+            return true;
+        }).catch(() => false).finally(() => { refreshInFlight = null; });
+    }
+    return refreshInFlight;
+}
+
+// fetch() with the bearer token; on 401 renew the session once and retry
+async function authFetch(url, options = {}) {
+    const withAuth = () => ({
+        ...options,
+        headers: { ...(options.headers || {}), 'Authorization': 'Bearer ' + currentUser.access_token }
+    });
+    let res = await fetch(url, withAuth());
+    if (res.status === 401 && await refreshSession()) {
+        res = await fetch(url, withAuth());
+    }
+    return res;
+}
+
 function initNav() {
     document.querySelectorAll('.sidebar-nav li').forEach(item => {
         item.addEventListener('click', () => {
@@ -72,11 +116,10 @@ function loadSection(section) {
     }
 }
 
-async function fetchData(endpoint) {
+// query: optional query string, e.g. 'fields=id,name' for only the fields a view shows
+async function fetchData(endpoint, query = '') {
     try {
-        const response = await fetch(`${API_BASE}/${endpoint}/`, {
-            headers: { 'Authorization': 'Bearer ' + currentUser.access_token }
-        });
+        const response = await authFetch(`${API_BASE}/${endpoint}/${query ? '?' + query : ''}`);
         if (!response.ok) throw new Error('Network response was not ok');
         return await response.json();
     } catch (error) {
@@ -86,11 +129,31 @@ async function fetchData(endpoint) {
     }
 }
 
+// Several GETs in one round trip (POST /batch); resolves to their bodies, [] for a failed one
+async function fetchBatch(paths) {
+    try {
+        const response = await authFetch(`${API_BASE}/batch`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ requests: paths.map(path => ({ path: `${API_BASE}/${path}` })) })
+        });
+        if (!response.ok) throw new Error('Network response was not ok');
+        const { results } = await response.json();
+        return results.map(r => (r.status === 200 ? r.body : []));
+    } catch (error) {
+        console.error('Fetch error:', error);
+        showToast('Failed to fetch data', 'error');
+        return paths.map(() => []);
+    }
+}
+
 async function renderDashboard() {
-    const customers = await fetchData('customers');
-    const products = await fetchData('products');
-    const transactions = await fetchData('transactions');
-    const employees = await fetchData('employees');
+    const [customers, products, transactions, employees] = await fetchBatch([
+        'customers/?fields=id',
+        'products/?fields=id',
+        'transactions/?fields=id,total,timeOfTransaction',
+        'employees/?fields=id'
+    ]);
 
     const area = document.getElementById('content-area');
     area.innerHTML = `
@@ -305,12 +368,9 @@ function openEntityModal(entity) {
         });
 
         try {
-            const res = await fetch(`${API_BASE}/${entity === 'transactions' ? 'transactions' : entity}/`, {
+            const res = await authFetch(`${API_BASE}/${entity === 'transactions' ? 'transactions' : entity}/`, {
                 method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'Authorization': 'Bearer ' + currentUser.access_token
-                },
+                headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify(jsonData)
             });
             if (res.ok) {
@@ -332,10 +392,7 @@ async function deleteEntity(entity, id) {
     if (!confirm('Are you sure you want to delete this record?')) return;
 
     try {
-        const res = await fetch(`${API_BASE}/${entity}/${id}`, {
-            method: 'DELETE',
-            headers: { 'Authorization': 'Bearer ' + currentUser.access_token }
-        });
+        const res = await authFetch(`${API_BASE}/${entity}/${id}`, { method: 'DELETE' });
         if (res.ok) {
             showToast('Record deleted');
             loadSection(entity);
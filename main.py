@@ -1,17 +1,43 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from importlib import import_module
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from dotenv import load_dotenv
-import os
+from fastapi.responses import JSONResponse
 import logging
 
+from src.config import get_settings
+from src.utils.metrics import metrics
+from src.utils.security import require_admin
+
 # Set up logging for main.py
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# Load settings once (reads the .env file)
+settings = get_settings()
+
+from src.factory.warmup import register_warmup_step
+
+
+def lazy_step(module: str, name: str):
+    """Warm-up step that imports `module` only when it runs."""
+    def step():
+        getattr(import_module(module), name)()
+    step.__name__ = name
+    return step
+
+# In-memory caches filled at startup (see src/factory/warmup.py): the email filter
+# used by signup, the refresh-token deny-list, the price snapshot that verifies
+# checkout baskets, the index behind /products/low-stock, the top-sellers
+# sketches and the fingerprinted, precompressed frontend files. Their modules
+# are imported by the steps, not by main
+for module, name in (("src.services.email_index", "load_email_index"),
+                     ("src.services.token_store", "load_revocation_store"),
+                     ("src.services.pricing", "load_price_snapshot"),
+                     ("src.services.stock_index", "load_stock_index"),
+                     ("src.services.top_sellers", "load_top_sellers"),
+                     ("src.services.static_assets", "load_static_assets")):
+    register_warmup_step(lazy_step(module, name))
 
 # Import routers
 from src.api.routers import (
@@ -20,9 +46,39 @@ from src.api.routers import (
     products_router,
     branches_router,
     transactions_router,
-    auth_router
+    auth_router,
+    stats_router,
+    exports_router,
+    stream_router,
+    batch_router
 )
 
+# Startup / shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    from src.factory import warmup
+    if settings.warmup_on_startup:
+        try:
+            warmup.warm_up()
+        except Exception as e:
+            # A failed warm-up only costs latency, the worker can still serve
+            logger.error(f"Warm-up failed: {e}")
+    else:
+        # Ready at once; the caches fill in the background and fall back to the database meanwhile
+        warmup.warm_up_in_background()
+    # Sync bookkeeping in the write sessions (outbox on a node, change log on the central server)
+    from src.jobs.sync import install_change_tracking
+    install_change_tracking()
+    # Branch node: push local sales and pull catalog changes in the background
+    if settings.node_mode == "branch":
+        from src.jobs.sync import sync_runner
+        sync_runner.start()
+    app.state.ready = True
+    yield
+    if settings.node_mode == "branch":
+        await sync_runner.stop()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Supermarket Management System API",
@@ -30,7 +86,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    lifespan=lifespan
 )
 
 # Request Logging Middleware
@@ -67,35 +124,58 @@ app.include_router(products_router, prefix="/api/v1")
 app.include_router(branches_router, prefix="/api/v1")
 app.include_router(transactions_router, prefix="/api/v1")
 app.include_router(auth_router, prefix="/api/v1")
+app.include_router(stats_router, prefix="/api/v1")
+app.include_router(exports_router, prefix="/api/v1")
+app.include_router(stream_router, prefix="/api/v1")
+app.include_router(batch_router, prefix="/api/v1")
 
-# Serve static files
-app.mount("/static", StaticFiles(directory="frontend"), name="static")
+# Serve static files: fingerprinted names are cached for a year, see src/services/static_assets.py
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_file(path: str, request: Request):
+    from src.services.static_assets import static_assets
+    return static_assets.response(path, request)
 
 # Root endpoint - Serve Login/Role Selection
 @app.get("/", tags=["UI"])
-async def root():
-    return FileResponse("frontend/login.html")
+async def root(request: Request):
+    from src.services.static_assets import static_assets
+    return static_assets.page("login.html", request)
 
 # Signup Page
 @app.get("/signup", tags=["UI"])
-async def signup_page():
-    return FileResponse("frontend/signup.html")
+async def signup_page(request: Request):
+    from src.services.static_assets import static_assets
+    return static_assets.page("signup.html", request)
 
 # Admin Dashboard
 @app.get("/admin", tags=["UI"])
-async def admin_panel():
-    return FileResponse("frontend/index.html")
+async def admin_panel(request: Request):
+    from src.services.static_assets import static_assets
+    return static_assets.page("index.html", request)
 
 # Customer Portal
 @app.get("/shop", tags=["UI"])
-async def shop_portal():
-    return FileResponse("frontend/user.html")
+async def shop_portal(request: Request):
+    from src.services.static_assets import static_assets
+    return static_assets.page("user.html", request)
 
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 async def health_check():
     return {"status": "healthy"}
 
+# Metrics endpoint - in-process counters and gauges of this worker (admins only)
+@app.get("/metrics", tags=["Health"], dependencies=[Depends(require_admin)])
+async def metrics_snapshot():
+    return metrics.snapshot()
+
+# Readiness endpoint - only reports ready once the optional warm-up has finished
+@app.get("/ready", tags=["Health"])
+async def readiness_check(request: Request):
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
+
 # Run the app
 if __name__ == "__main__":
     import uvicorn
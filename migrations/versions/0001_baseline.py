@@ -0,0 +1,88 @@
+"""Baseline: the six tables of the original database_schema.sql
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Production databases that were created with the original schema already have
+these tables; mark them with `alembic stamp 0001` instead of upgrading.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "CUSTOMERS",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("age", sa.Integer, nullable=False),
+        sa.Column("email", sa.String(100), nullable=False, unique=True),
+        sa.Column("membership", sa.Boolean, server_default=sa.false()),
+        sa.Column("password", sa.String(255), nullable=False, server_default="password123"),
+        mysql_engine="InnoDB",
+    )
+    op.create_table(
+        "BRANCHES",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("location", sa.String(255), nullable=False),
+        sa.Column("size", sa.Integer, server_default="0"),
+        sa.Column("total_stock", sa.Integer, server_default="0"),
+        mysql_engine="InnoDB",
+    )
+    op.create_table(
+        "EMPLOYEES",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("age", sa.Integer, nullable=False),
+        sa.Column("dateOfEmployment", sa.Date),
+        sa.Column("dateOfEndOfEmployment", sa.Date, nullable=True),
+        sa.Column("email", sa.String(100), nullable=False, unique=True),
+        sa.Column("role", sa.String(50), nullable=False),
+        sa.Column("password", sa.String(255), nullable=False, server_default="password123"),
+        mysql_engine="InnoDB",
+    )
+    op.create_table(
+        "PRODUCTS",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("stock", sa.Integer, server_default="0"),
+        sa.Column("sellPrice", sa.Numeric(10, 2), nullable=False),
+        sa.Column("cost", sa.Numeric(10, 2), nullable=False),
+        sa.Column("category_id", sa.String(10), nullable=False),
+        sa.Column("category", sa.String(50), nullable=False),
+        mysql_engine="InnoDB",
+    )
+    op.create_table(
+        "TRANSACTIONS",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("branch_id", sa.Integer, sa.ForeignKey("BRANCHES.id", ondelete="SET NULL")),
+        sa.Column("customer_id", sa.Integer, sa.ForeignKey("CUSTOMERS.id", ondelete="SET NULL")),
+        sa.Column("total_amount", sa.Numeric(10, 2), nullable=False),
+        sa.Column("dateOfTransaction", sa.Date, nullable=False),
+        sa.Column("timeOfTransaction", sa.Time, nullable=False),
+        sa.Column("total", sa.Numeric(10, 2), nullable=False),
+        mysql_engine="InnoDB",
+    )
+    op.create_table(
+        "TRANSACTION_DETAILS",
+        sa.Column("transaction_id", sa.Integer, sa.ForeignKey("TRANSACTIONS.id", ondelete="CASCADE"),
+                  primary_key=True, autoincrement=True),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey("PRODUCTS.id", ondelete="SET NULL")),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("price", sa.Numeric(10, 2), nullable=False),
+        mysql_engine="InnoDB",
+    )
+
+
+def downgrade() -> None:
+    for table in ("TRANSACTION_DETAILS", "TRANSACTIONS", "PRODUCTS", "EMPLOYEES", "BRANCHES", "CUSTOMERS"):
+        op.drop_table(table)
@@ -0,0 +1,65 @@
+"""Tables added after the baseline: revoked tokens, reorder suggestions, customer stats
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+New tables only, so nothing existing is locked.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "REVOKED_TOKENS",
+        sa.Column("token_id", sa.String(32), primary_key=True),
+        sa.Column("scope", sa.String(10), nullable=False, server_default="token"),
+        sa.Column("expires_at", sa.DateTime, nullable=False),
+        sa.Index("idx_revoked_tokens_expires_at", "expires_at"),
+        mysql_engine="InnoDB",
+    )
+    op.create_table(
+        "REORDER_SUGGESTIONS",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("product_id", sa.Integer, sa.ForeignKey("PRODUCTS.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("branch_id", sa.Integer, sa.ForeignKey("BRANCHES.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("avg_daily_demand", sa.Float, nullable=False),
+        sa.Column("moving_avg_demand", sa.Float, nullable=False),
+        sa.Column("demand_std", sa.Float, nullable=False),
+        sa.Column("reorder_point", sa.Float, nullable=False),
+        sa.Column("suggested_quantity", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("computed_at", sa.DateTime, nullable=False),
+        sa.Index("idx_reorder_suggestions_product_id", "product_id"),
+        sa.Index("idx_reorder_suggestions_branch_id", "branch_id"),
+        mysql_engine="InnoDB",
+    )
+    op.create_table(
+        "CUSTOMER_STATS",
+        sa.Column("customer_id", sa.Integer, sa.ForeignKey("CUSTOMERS.id", ondelete="CASCADE"), primary_key=True,
+                  autoincrement=False),
+        sa.Column("lifetime_spend", sa.Numeric(12, 2), nullable=False, server_default="0"),
+        sa.Column("visit_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("first_visit", sa.Date),
+        sa.Column("last_visit", sa.Date),
+        sa.Column("recency_score", sa.SmallInteger),
+        sa.Column("frequency_score", sa.SmallInteger),
+        sa.Column("monetary_score", sa.SmallInteger),
+        sa.Column("segment", sa.String(20)),
+        sa.Column("membership_candidate", sa.Boolean, nullable=False, server_default=sa.false()),
+        sa.Column("scored_at", sa.DateTime),
+        sa.Index("idx_customer_stats_membership_candidate", "membership_candidate"),
+        mysql_engine="InnoDB",
+    )
+
+
+def downgrade() -> None:
+    for table in ("CUSTOMER_STATS", "REORDER_SUGGESTIONS", "REVOKED_TOKENS"):
+        op.drop_table(table)
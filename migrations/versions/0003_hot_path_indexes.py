@@ -0,0 +1,64 @@
+"""Indexes for the filters used by the CRUD layer and the routers
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+Query                                                   Index
+GET /products?category=&min_price=&max_price=           (category, sellPrice)
+GET /products?min_price=&max_price=                     (sellPrice)
+GET /products/low-stock, stock index reload             (stock)
+GET /branches/location/{location}                       (location)
+GET /transactions/customer/{id}, ?customer_id=          (customer_id, dateOfTransaction, timeOfTransaction)
+GET /transactions/branch/{id}, ?branch_id=, heatmap     (branch_id, dateOfTransaction, timeOfTransaction)
+GET /transactions?start_date=&end_date=, reorder job,   (dateOfTransaction)
+    top sellers reload
+
+GET /employees?role= gets no index: with five roles each value matches about a
+fifth of the table, and reading those rows through an index is slower than the
+table scan (see benchmarks/bench_indexes.py).
+
+On MySQL every index is added with ALGORITHM=INPLACE, LOCK=NONE: InnoDB builds
+it while reads and writes continue, and the statement fails instead of falling
+back to a locking table copy. Other dialects (SQLite in tests and benchmarks)
+use a plain CREATE INDEX.
+"""
+
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("idx_products_category_price", "PRODUCTS", ("category", "sellPrice")),
+    ("idx_products_sell_price", "PRODUCTS", ("sellPrice",)),
+    ("idx_products_stock", "PRODUCTS", ("stock",)),
+    ("idx_branches_location", "BRANCHES", ("location",)),
+    ("idx_transactions_customer_date_time", "TRANSACTIONS", ("customer_id", "dateOfTransaction", "timeOfTransaction")),
+    ("idx_transactions_branch_date_time", "TRANSACTIONS", ("branch_id", "dateOfTransaction", "timeOfTransaction")),
+    ("idx_transactions_date", "TRANSACTIONS", ("dateOfTransaction",)),
+)
+
+
+def _is_mysql() -> bool:
+    return op.get_bind().dialect.name in ("mysql", "mariadb")
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        if _is_mysql():
+            column_list = ", ".join(f"`{c}`" for c in columns)
+            op.execute(f"ALTER TABLE `{table}` ADD INDEX `{name}` ({column_list}), ALGORITHM=INPLACE, LOCK=NONE")
+        else:
+            op.create_index(name, table, list(columns))
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        if _is_mysql():
+            op.execute(f"ALTER TABLE `{table}` DROP INDEX `{name}`, ALGORITHM=INPLACE, LOCK=NONE")
+        else:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,50 @@
+"""Archive tables for closed months of TRANSACTIONS / TRANSACTION_DETAILS
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+Filled by the archive job (src/jobs/archive.py). No foreign keys, so moving
+rows never checks or locks the parent tables.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "TRANSACTIONS_ARCHIVE",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("branch_id", sa.Integer),
+        sa.Column("customer_id", sa.Integer),
+        sa.Column("total_amount", sa.Numeric(10, 2), nullable=False),
+        sa.Column("dateOfTransaction", sa.Date, nullable=False),
+        sa.Column("timeOfTransaction", sa.Time, nullable=False),
+        sa.Column("total", sa.Numeric(10, 2), nullable=False),
+        sa.Index("idx_transactions_archive_customer_date_time", "customer_id", "dateOfTransaction", "timeOfTransaction"),
+        sa.Index("idx_transactions_archive_branch_date_time", "branch_id", "dateOfTransaction", "timeOfTransaction"),
+        sa.Index("idx_transactions_archive_date", "dateOfTransaction"),
+        mysql_engine="InnoDB",
+        mysql_row_format="COMPRESSED",
+    )
+    op.create_table(
+        "TRANSACTION_DETAILS_ARCHIVE",
+        sa.Column("transaction_id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("product_id", sa.Integer),
+        sa.Column("quantity", sa.Integer, nullable=False),
+        sa.Column("price", sa.Numeric(10, 2), nullable=False),
+        mysql_engine="InnoDB",
+        mysql_row_format="COMPRESSED",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("TRANSACTION_DETAILS_ARCHIVE")
+    op.drop_table("TRANSACTIONS_ARCHIVE")
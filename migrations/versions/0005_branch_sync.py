@@ -0,0 +1,61 @@
+"""Tables for offline branch nodes and their sync with the central database
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+PRODUCT_CHANGES and SYNC_RECEIPTS are used on the central database,
+SYNC_OUTBOX and SYNC_STATE on branch nodes (src/jobs/sync.py). Both kinds of
+database run the same schema.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "PRODUCT_CHANGES",
+        sa.Column("seq", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("product_id", sa.Integer, nullable=False),
+        sa.Column("changed_at", sa.DateTime, nullable=False),
+        sa.Index("idx_product_changes_changed_at", "changed_at"),
+        mysql_engine="InnoDB",
+    )
+    op.create_table(
+        "SYNC_RECEIPTS",
+        sa.Column("branch_id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("local_id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("transaction_id", sa.Integer, nullable=False),
+        sa.Column("received_at", sa.DateTime, nullable=False),
+        mysql_engine="InnoDB",
+    )
+    op.create_table(
+        "SYNC_OUTBOX",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("transaction_id", sa.Integer, nullable=False),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+        sa.Column("pushed_at", sa.DateTime),
+        sa.Column("central_id", sa.Integer),
+        sa.Index("idx_sync_outbox_pushed_at", "pushed_at"),
+        mysql_engine="InnoDB",
+    )
+    op.create_table(
+        "SYNC_STATE",
+        sa.Column("key", sa.String(50), primary_key=True),
+        sa.Column("value", sa.String(255), nullable=False),
+        mysql_engine="InnoDB",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("SYNC_STATE")
+    op.drop_table("SYNC_OUTBOX")
+    op.drop_table("SYNC_RECEIPTS")
+    op.drop_table("PRODUCT_CHANGES")
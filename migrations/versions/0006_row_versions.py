@@ -0,0 +1,41 @@
+"""Row version column for optimistic concurrency
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+Every write through the API bumps `version`; an update that names the version
+the client read only applies if no other write came first (src/crud/CRUD.py).
+
+On MySQL the column is added with ALGORITHM=INSTANT: only the table metadata
+changes, existing rows are not rewritten.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+TABLES = ("CUSTOMERS", "BRANCHES", "EMPLOYEES", "PRODUCTS", "TRANSACTIONS")
+
+
+def _is_mysql() -> bool:
+    return op.get_bind().dialect.name in ("mysql", "mariadb")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        if _is_mysql():
+            op.execute(f"ALTER TABLE `{table}` ADD COLUMN `version` INT NOT NULL DEFAULT 1, ALGORITHM=INSTANT")
+        else:
+            op.add_column(table, sa.Column("version", sa.Integer, nullable=False, server_default="1"))
+
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("version")
@@ -0,0 +1,47 @@
+"""Lower-case stored emails
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+Logins look emails up lower-cased (src/services/identity.py). Rows written
+before signup normalised emails can be mixed-case, which only MySQL's default
+case-insensitive collation still matches; on SQLite or a binary collation those
+accounts could not log in. This rewrites them lower-cased and trimmed.
+
+Two rows of one table that differ only in case would collide on the UNIQUE
+index; the migration stops and names them so they can be merged by hand first.
+The downgrade leaves the emails as they are (the original case is not kept).
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+TABLES = ("CUSTOMERS", "EMPLOYEES")
+
+
+def _is_mysql() -> bool:
+    return op.get_bind().dialect.name in ("mysql", "mariadb")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for table in TABLES:
+        duplicates = bind.execute(sa.text(
+            f"SELECT LOWER(TRIM(email)) FROM {table} GROUP BY LOWER(TRIM(email)) HAVING COUNT(*) > 1"
+        )).scalars().all()
+        if duplicates:
+            raise RuntimeError(f"{table} has emails that differ only in case: {', '.join(duplicates)}")
+        # compare bytes: a case-insensitive collation would call 'A@x' and 'a@x' equal
+        changed = "BINARY email <> BINARY LOWER(TRIM(email))" if _is_mysql() else "email <> LOWER(TRIM(email))"
+        op.execute(f"UPDATE {table} SET email = LOWER(TRIM(email)) WHERE {changed}")
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,45 @@
+'''
+Move closed months of transactions to the archive tables.
+
+Meant to run nightly or monthly (cron / scheduled task). Safe to run while the
+API is serving: rows are moved in small chunks, each in its own transaction.
+'''
+
+import argparse
+import logging
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add the project root to sys.path to allow importing from src
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from src.config import get_settings
+from src.database import shard_router
+from src.jobs.archive import run_archive_job
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Archive transactions older than the last N full months.")
+    parser.add_argument("--keep-months", type=int, default=settings.archive_keep_months, help=f"full months to keep besides the current one (default {settings.archive_keep_months})")
+    parser.add_argument("--chunk-size", type=int, default=settings.archive_chunk_size, help=f"transactions moved per database transaction (default {settings.archive_chunk_size})")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None, help="today's date, YYYY-MM-DD (default today)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Every transaction shard has its own hot and archive tables
+    for shard, factory in enumerate(shard_router.factories):
+        db = factory()
+        try:
+            result = run_archive_job(db, keep_months=args.keep_months, chunk_size=args.chunk_size, today=args.as_of)
+        finally:
+            db.close()
+        prefix = f"Shard {shard}: " if len(shard_router) > 1 else ""
+        print(f"{prefix}Moved {result.transactions} transactions dated before {result.cutoff} "
+              f"in {result.chunks} chunks ({result.seconds:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+'''
+Calibrate Argon2 parameters for this server and store them in .env.
+
+Run it on the production hardware (not a laptop). Existing password hashes are
+upgraded to the new parameters transparently the next time each user logs in.
+'''
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path to allow importing from src
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from src.utils.argon2_calibration import calibrate, write_env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find Argon2 parameters for a target verify latency.")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="maximum verify latency per login (default 250)")
+    parser.add_argument("--max-memory-mib", type=int, default=64, help="memory budget per hash operation in MiB (default 64)")
+    parser.add_argument("--parallelism", type=int, default=0, help="lanes per hash (default: min(cpu_count, 4))")
+    parser.add_argument("--write", action="store_true", help="save the result in the .env file")
+    parser.add_argument("--env-file", default=str(ROOT / ".env"), help="path of the .env file to update")
+    args = parser.parse_args()
+
+    print(f"Calibrating Argon2id for <= {args.target_ms:.0f} ms and <= {args.max_memory_mib} MiB (cpu_count={os.cpu_count()})...")
+    params = calibrate(args.target_ms, args.max_memory_mib * 1024, args.parallelism)
+
+    print(f"  time_cost   = {params.time_cost}")
+    print(f"  memory_cost = {params.memory_cost} KiB ({params.memory_cost // 1024} MiB)")
+    print(f"  parallelism = {params.parallelism}")
+    print(f"  verify time = {params.verify_ms:.1f} ms")
+
+    if args.write:
+        write_env(Path(args.env_file), params.as_env())
+        print(f"Saved to {args.env_file}. Restart the API to apply.")
+    else:
+        for key, value in params.as_env().items():
+            print(f"{key}={value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+'''
+Export the sales history to Parquet for analytics.
+
+Meant to run nightly (cron / scheduled task); each run only writes
+transactions newer than the previous one. Needs pyarrow.
+'''
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path to allow importing from src
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from src.config import get_settings
+from src.database import SessionLocal
+from src.jobs.export import export_transactions
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Export transactions with their line items and products to Parquet.")
+    parser.add_argument("--output", default=settings.export_dir, help=f"export directory (default {settings.export_dir})")
+    parser.add_argument("--chunk-size", type=int, default=settings.export_chunk_size, help=f"rows read per chunk (default {settings.export_chunk_size})")
+    parser.add_argument("--full", action="store_true", help="discard previous files and export everything again")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        result = export_transactions(db, root=args.output, chunk_size=args.chunk_size, full=args.full)
+    finally:
+        db.close()
+    print(f"Exported {result.rows} line items ({result.transactions} transactions) to {result.files} files, "
+          f"{result.bytes / 1e6:.1f} MB in {result.seconds:.1f}s; high-water id {result.high_water_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+'''
+Create the transaction tables on every configured shard.
+
+Run once after adding a database to TRANSACTION_SHARD_URLS, before the API
+starts writing to it. Each shard gets TRANSACTIONS, TRANSACTION_DETAILS and
+their archive tables (without foreign keys) and its ids start at its own range
+(shard k: k * 100,000,000 + 1). Safe to run again. DATABASE_URL itself is
+managed by alembic as usual.
+
+Also reports the transactions of branches now on another shard that are still
+in shard 0 (recorded before sharding). Branch reads look for them there while
+TRANSACTION_SHARD_LEGACY_READS is on.
+'''
+
+import logging
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path to allow importing from src
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from sqlalchemy import func, select
+
+from src.database import SHARD_ID_SPAN, engine, prepare_shard, shard_router
+from src.model.orm import Transaction, TransactionArchive
+
+
+def legacy_rows() -> int:
+    """Transactions in shard 0 whose branch now belongs to another shard."""
+    total = 0
+    with shard_router.factories[0]() as db:
+        for model in (Transaction, TransactionArchive):
+            rows = db.execute(select(model.branch_id, func.count()).group_by(model.branch_id)).all()
+            total += sum(count for branch_id, count in rows if shard_router.for_branch(branch_id))
+    return total
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    for shard, shard_engine in enumerate(shard_router.engines):
+        if shard_engine is engine:  # managed by alembic
+            continue
+        prepare_shard(shard_engine, shard)
+        print(f"Shard {shard} ({shard_engine.url.render_as_string(hide_password=True)}): "
+              f"ids from {shard * SHARD_ID_SPAN + 1}")
+    if len(shard_router) == 1:
+        print("TRANSACTION_SHARD_URLS is not set: transactions are not sharded")
+        return
+    remaining = legacy_rows()
+    if remaining:
+        print(f"{remaining} transactions from before sharding are still in shard 0: "
+              f"keep TRANSACTION_SHARD_LEGACY_READS on")
+    else:
+        print("No branch has transactions left in shard 0: TRANSACTION_SHARD_LEGACY_READS can be turned off")
+
+
+if __name__ == "__main__":
+    main()
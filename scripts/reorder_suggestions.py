@@ -0,0 +1,51 @@
+'''
+Recompute reorder suggestions from the sales history.
+
+Meant to run nightly (cron / scheduled task). The results are served by
+GET /api/v1/products/reorder-suggestions.
+'''
+
+import argparse
+import logging
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add the project root to sys.path to allow importing from src
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from src.database import SessionLocal
+from src.jobs.reorder import ReorderParameters, run_reorder_job
+
+
+def main():
+    defaults = ReorderParameters.from_settings()
+    parser = argparse.ArgumentParser(description="Compute per product/branch reorder points and suggested order quantities.")
+    parser.add_argument("--history-days", type=int, default=defaults.history_days, help=f"days of history to read (default {defaults.history_days})")
+    parser.add_argument("--window-days", type=int, default=defaults.window_days, help=f"moving average window (default {defaults.window_days})")
+    parser.add_argument("--lead-time-days", type=int, default=defaults.lead_time_days, help=f"supplier lead time (default {defaults.lead_time_days})")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None, help="end date of the history, YYYY-MM-DD (default today)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    params = ReorderParameters(
+        history_days=args.history_days,
+        window_days=args.window_days,
+        lead_time_days=args.lead_time_days,
+        review_days=defaults.review_days,
+        service_z=defaults.service_z,
+        chunk_size=defaults.chunk_size,
+    )
+
+    db = SessionLocal()
+    try:
+        result = run_reorder_job(db, params, args.as_of)
+    finally:
+        db.close()
+    print(f"Read {result.rows_read} daily sales rows, wrote {result.suggestions} suggestions "
+          f"({result.needing_reorder} need reorder) in {result.seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+'''
+Nightly RFM scoring of all customers.
+
+Writes recency/frequency/monetary scores, a segment and the membership
+candidate flag to CUSTOMER_STATS (see src/jobs/rfm.py). Candidates are served
+by GET /api/v1/customers/membership-candidates.
+'''
+
+import argparse
+import logging
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add the project root to sys.path to allow importing from src
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from src.database import SessionLocal
+from src.jobs.rfm import run_rfm_job
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score all customers by recency, frequency and monetary value.")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None, help="date recency is measured from, YYYY-MM-DD (default today)")
+    parser.add_argument("--rebuild-aggregates", action="store_true",
+                        help="also recompute lifetime spend / visit counts from TRANSACTIONS (run when checkout is quiet)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        result = run_rfm_job(db, args.as_of, args.rebuild_aggregates)
+    finally:
+        db.close()
+    print(f"Scored {result.scored} of {result.customers} customers, "
+          f"{result.membership_candidates} membership candidates in {result.seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
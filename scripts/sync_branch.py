@@ -0,0 +1,53 @@
+'''
+Branch node sync by hand.
+
+On a branch node (NODE_MODE=branch): run one sync cycle, pushing pending sales
+and pulling the catalog. Use it to fill a new node's catalog before its first
+start; a running node syncs on its own every SYNC_INTERVAL_SECONDS.
+
+On the central server: --prune-change-log drops catalog change log entries
+older than SYNC_CHANGE_LOG_KEEP_DAYS (nodes further behind copy the whole
+catalog on their next sync). Running nodes already prune it once an hour, so
+this is only needed while no node is running.
+'''
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add the project root to sys.path to allow importing from src
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from src.config import get_settings
+from src.database import SessionLocal
+from src.jobs.sync import prune_change_log, sync_runner
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Sync a branch node with the central database, or prune the central change log.")
+    parser.add_argument("--prune-change-log", action="store_true", help="central server: prune the catalog change log")
+    parser.add_argument("--keep-days", type=int, default=settings.sync_change_log_keep_days, help=f"days of change log to keep (default {settings.sync_change_log_keep_days})")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.prune_change_log:
+        db = SessionLocal()
+        try:
+            deleted = prune_change_log(db, keep_days=args.keep_days)
+        finally:
+            db.close()
+        print(f"Removed {deleted} change log entries older than {args.keep_days} days")
+        return
+
+    if settings.node_mode != "branch":
+        parser.error("NODE_MODE is not 'branch'; run this on a branch node (or use --prune-change-log)")
+    result = sync_runner.run_once()
+    print(f"Pushed {result.push.sales} sales ({result.push.oversold} oversold), pulled {len(result.pull.changed)} products, "
+          f"removed {len(result.pull.removed)}; {result.pending} sales still pending ({result.seconds:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,10 @@ from .products import router as products_router
 from .branches import router as branches_router
 from .transactions import router as transactions_router
 from .auth import router as auth_router
+from .stats import router as stats_router
+from .exports import router as exports_router
+from .stream import router as stream_router
+from .batch import router as batch_router
 
 __all__ = [
     'customers_router',
@@ -22,5 +26,9 @@ __all__ = [
     'products_router',
     'branches_router',
     'transactions_router',
-    'auth_router'
+    'auth_router',
+    'stats_router',
+    'exports_router',
+    'stream_router',
+    'batch_router'
 ]
@@ -1,26 +1,43 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr, Field
 import logging
+import math
+import uuid
 from typing import Optional
-from datetime import timedelta
+from datetime import datetime, timedelta
+from jose import JWTError
 
 from sqlalchemy.orm import Session
-from src.database import get_db
+from src.database import get_db, SessionLocal
 from src.crud import CRUD
+from src.config import get_settings
+from src.services.email_index import normalize_email
+from src.services.identity import kind_for_role, model_for_kind
+from src.utils.metrics import metrics
+from src.utils.rate_limit import RateLimiter, ConcurrencyLimiter, RateLimitExceeded
 from src.utils.security import (
     hash_password, 
     verify_password, 
+    needs_rehash,
+    authenticate_user,
     validate_password_strength,
     create_access_token,
+    create_refresh_token,
+    decode_refresh_token,
     get_current_user,
-    ACCESS_TOKEN_EXPIRE_MINUTES
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS
 )
+from src.services.token_store import revocation_store
 
 from src.model.MODEL import (
     CustomerSignupRequest, 
     EmployeeSignupRequest, 
     LoginRequest, 
     AuthResponse,
+    Token,
+    RefreshRequest,
     TokenData
 )
 
@@ -29,38 +46,84 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 logger = logging.getLogger(__name__)
 
 
+# Admission control
+# Every login/signup costs a full Argon2 operation, so requests are limited per
+# client IP and per email, and the number of hashes in flight is capped
+settings = get_settings()
+ip_limiter = RateLimiter(settings.auth_ip_rate_per_minute / 60, settings.auth_ip_burst)
+email_limiter = RateLimiter(settings.auth_email_rate_per_minute / 60, settings.auth_email_burst)
+hash_limiter = ConcurrencyLimiter(settings.auth_max_concurrent_hashes)
+metrics.gauge("auth.hash_in_flight", lambda: hash_limiter.in_flight)
+
+
+def too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, please retry later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def admit(http_request: Request, email: str):
+    """Reject the request with a 429 if its client IP or email is over its rate."""
+    client_ip = http_request.client.host if http_request.client else "unknown"
+    for scope, limiter, key in (("ip", ip_limiter, client_ip), ("email", email_limiter, email.lower())):
+        retry_after = limiter.acquire(key)
+        if retry_after:
+            metrics.inc(f"auth.rejected.{scope}")
+            logger.warning(f"Rate limited auth request ({scope}) for {email} from {client_ip}")
+            raise too_many_requests(retry_after)
+    metrics.inc("auth.admitted")
+
+
+async def run_hashing(func, *args):
+    """Run an Argon2-heavy call off the event loop, within the concurrency cap."""
+    try:
+        with hash_limiter.slot():
+            return await run_in_threadpool(func, *args)
+    except RateLimitExceeded as e:
+        metrics.inc("auth.rejected.concurrency")
+        raise too_many_requests(e.retry_after)
+
+
+def ensure_email_available(db: Session, email: str):
+    """Raise a 400 if the email already belongs to a customer or an employee."""
+    owner = CRUD.find_email_owner(db, email)
+    if owner == "customer":
+        raise HTTPException(status_code=400, detail="Email already registered as a customer")
+    if owner == "employee":
+        raise HTTPException(status_code=400, detail="Email already registered as staff")
+
+
 # Signup Endpoints 
 # customer endpoint on the signup
 @router.post("/signup/customer", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
-async def signup_customer(request: CustomerSignupRequest, db: Session = Depends(get_db)):
+async def signup_customer(request: CustomerSignupRequest, http_request: Request, db: Session = Depends(get_db)):
     """Register a new customer account."""
 
+    # 0. Admission control (rate limits per client IP and email)
+    admit(http_request, request.email)
+
     # 1. Validate password strength
     is_valid, error_msg = validate_password_strength(request.password)
     if not is_valid:
         raise HTTPException(status_code=400, detail=error_msg)
     
-    # 2. Cross-table email uniqueness check
-    # Check if email exists in CUSTOMERS
-    if CRUD.get_customers(db, email=request.email):
-        raise HTTPException(status_code=400, detail="Email already registered as a customer")
-    
-    # Check if email exists in EMPLOYEES
-    if CRUD.get_employees(db, email=request.email):
-        raise HTTPException(status_code=400, detail="Email already registered as staff")
+    # 2. Cross-table email uniqueness check (Bloom filter, then one EXISTS query)
+    ensure_email_available(db, request.email)
     
     # 3. Create customer record
     # Note: CRUD.create_customer handles hashing the password
     try:
         customer_data = {
             "name": request.name,
-            "email": request.email,
+            "email": normalize_email(request.email),
             "password": request.password, # Pass plain password, CRUD handles hashing
             "age": request.age,
             "membership": request.membership
         }
 
-        customer = CRUD.create_customer(db, customer_data)
+        customer = await run_hashing(CRUD.create_customer, db, customer_data)
         logger.info(f"New customer registered: {request.email}")
         
         return {
@@ -70,6 +133,8 @@ async def signup_customer(request: CustomerSignupRequest, db: Session = Depends(
             "email": customer.email,
             "message": "Customer account created successfully"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating customer: {e}")
         # Return clearer message if it's likely a data issue
@@ -79,34 +144,33 @@ async def signup_customer(request: CustomerSignupRequest, db: Session = Depends(
 
 # Employee endpoint on the signup
 @router.post("/signup/employee", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
-async def signup_employee(request: EmployeeSignupRequest, db: Session = Depends(get_db)):
+async def signup_employee(request: EmployeeSignupRequest, http_request: Request, db: Session = Depends(get_db)):
     """Register a new employee account."""
 
+    # 0. Admission control (rate limits per client IP and email)
+    admit(http_request, request.email)
+
     # 1. Validate password strength
     is_valid, error_msg = validate_password_strength(request.password)
     if not is_valid:
         raise HTTPException(status_code=400, detail=error_msg)
     
-    # 2. Cross-table email uniqueness check
-    if CRUD.get_customers(db, email=request.email):
-        raise HTTPException(status_code=400, detail="Email already registered as a customer")
-    
-    if CRUD.get_employees(db, email=request.email):
-        raise HTTPException(status_code=400, detail="Email already registered as staff")
+    # 2. Cross-table email uniqueness check (Bloom filter, then one EXISTS query)
+    ensure_email_available(db, request.email)
     
     # 3. Create employee record
     # Note: CRUD.create_employee handles hashing the password
     try:
         employee_data = {
             "name": request.name,
-            "email": request.email,
+            "email": normalize_email(request.email),
             "password": request.password,
             "age": request.age,
             "role": request.role,
             "dateOfEmployment": request.dateOfEmployment # Already a date object from Pydantic
         }
 
-        employee = CRUD.create_employee(db, employee_data)
+        employee = await run_hashing(CRUD.create_employee, db, employee_data)
         logger.info(f"New employee registered: {request.email}")
         
         return {
@@ -116,66 +180,120 @@ async def signup_employee(request: EmployeeSignupRequest, db: Session = Depends(
             "email": employee.email,
             "message": "Employee account created successfully"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating employee: {e}")
         detail = str(e) if "integrity" in str(e).lower() else "Failed to create employee account"
         raise HTTPException(status_code=400, detail=detail)
 
 
+# Upgrade a password hash made with old Argon2 parameters (runs after the response is sent).
+# The hash counts against the same cap as logins; when it is full the upgrade waits for the next login
+def upgrade_password_hash(model, user_id: int, old_hash: str, plain_password: str):
+    db = SessionLocal()
+    try:
+        with hash_limiter.slot():
+            new_hash = hash_password(plain_password)
+        if CRUD.replace_password_hash(db, model, user_id, old_hash, new_hash):
+            logger.info(f"Rehashed password for {model.__tablename__} id={user_id} with current Argon2 parameters")
+    except RateLimitExceeded:
+        metrics.inc("auth.rehash_deferred")
+    except Exception as e:
+        logger.error(f"Failed to rehash password for {model.__tablename__} id={user_id}: {e}")
+    finally:
+        db.close()
+
+
+# Issue an access token and a refresh token for a session family
+def issue_tokens(email: str, role: str, family: Optional[str] = None) -> dict:
+    family = family or uuid.uuid4().hex
+    refresh_token = create_refresh_token({"sub": email, "role": role}, family=family)
+    access_token = create_access_token(
+        data={"sub": email, "role": role, "fam": family},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
 # Login Endpoint
 @router.post("/login", response_model=AuthResponse)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, http_request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """Authenticate a user and return a JWT access token."""
 
-    # Determine table based on role
-    table = "CUSTOMERS" if request.role == "customer" else "EMPLOYEES"
+    # Admission control (rate limits per client IP and email)
+    admit(http_request, request.email)
 
-    # Fetch user by email
-    if request.role == "customer":
-        users = CRUD.get_customers(db, email=request.email)
-    else:
-        users = CRUD.get_employees(db, email=request.email)
-    
-    user = users[0] if users else None
-    
-    # Check if user exists
-    if not user:
-        logger.warning(f"Login attempt for non-existent user: {request.email}")
-        raise HTTPException(status_code=401, detail="Invalid email or password")
-    
-    # Access user attributes directly from ORM object
-    stored_password = user.password
-    user_id = user.id
-    user_name = user.name
-    user_role = getattr(user, "role", request.role)
-    user_email = user.email
-    
-    # Verify password
-    if not stored_password or not verify_password(request.password, stored_password):
+    # Look up the account with a column-only query and verify the password off the event loop
+    kind = kind_for_role(request.role)
+    identity = await run_hashing(authenticate_user, db, request.email, request.password, kind)
+    if identity is None:
         logger.warning(f"Failed login attempt for {request.email}")
         raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    user_email = normalize_email(request.email)
+
+    # Transparently move the stored hash to the current Argon2 parameters
+    if needs_rehash(identity.password_hash):
+        background_tasks.add_task(upgrade_password_hash, model_for_kind(kind), identity.id, identity.password_hash, request.password)
     
-    # Generate timedelta for token expiry
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    # Create JWT access token
-    access_token = create_access_token(
-        data={"sub": user_email, "role": user_role},
-        expires_delta=access_token_expires
-    )
+    # Create the JWT access token and the refresh token of a new session
+    tokens = issue_tokens(user_email, identity.role)
     
     logger.info(f"Successful login and token generation for {request.email}")
     
     return {
-        "id": user_id,
-        "name": user_name,
-        "role": user_role,
+        "id": identity.id,
+        "name": identity.name,
+        "role": identity.role,
         "email": user_email,
         "message": "Login successful",
-        "access_token": access_token,
-        "token_type": "bearer"
+        **tokens
     }
 
+# Refresh Endpoint
+# Exchanges a refresh token for a new access/refresh pair without any password hashing.
+# Refresh tokens are single use: presenting one twice revokes the whole session.
+@router.post("/refresh", response_model=Token)
+async def refresh(request: RefreshRequest, db: Session = Depends(get_db)):
+    """Rotate a refresh token and return a new access token."""
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = decode_refresh_token(request.refresh_token)
+    except JWTError as e:
+        logger.warning(f"Refresh token rejected: {e}")
+        raise invalid
+
+    family = payload["fam"]
+    if revocation_store.is_family_revoked_in_db(db, family):
+        raise invalid
+
+    if not revocation_store.consume(db, payload["jti"], datetime.utcfromtimestamp(payload["exp"])):
+        # The token was already rotated, so someone else holds a copy of it
+        logger.warning(f"Refresh token reuse detected for {payload.get('sub')}, revoking session")
+        revocation_store.revoke_family(db, family, datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+        raise invalid
+
+    return issue_tokens(payload["sub"], payload.get("role"), family=family)
+
+
+# Logout Endpoint
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: RefreshRequest, db: Session = Depends(get_db)):
+    """Revoke the session of a refresh token (its access tokens stop working too)."""
+    try:
+        payload = decode_refresh_token(request.refresh_token)
+    except JWTError:
+        return None
+    revocation_store.revoke_family(db, payload["fam"], datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    logger.info(f"Session revoked for {payload.get('sub')}")
+    return None
+
+
 # Get Current User Endpoint
 @router.get("/me", response_model=TokenData)
 async def get_me(current_user: TokenData = Depends(get_current_user)):
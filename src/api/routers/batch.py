@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, Request, Response
+from src.model.MODEL import BatchRequest, BatchResponse, TokenData
+from src.services.batch import encode, run_batch
+from src.utils.security import get_current_user
+
+# Create router
+router = APIRouter(
+    prefix="/batch",
+    tags=["batch"]
+)
+
+# Several reads in one round trip, e.g. a dashboard load:
+# {"requests": [{"id": "branches", "path": "/api/v1/branches/"}, {"id": "me", "path": "/api/v1/auth/me"}]}
+# The caller is authenticated once for all sub-requests; each result carries its own status
+@router.post("", response_model=BatchResponse)
+async def run_batch_route(batch: BatchRequest, request: Request, current_user: TokenData = Depends(get_current_user)):
+    results = await run_batch(request.app, request.scope, batch.requests, current_user)
+    return Response(content=encode(results), media_type="application/json")
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from typing import List, Optional
+from datetime import date, timedelta
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from src.database import get_db
-from src.model.MODEL import BranchCreate, BranchInDB, BranchUpdate, TokenData
+from src.model.MODEL import BranchCreate, BranchInDB, BranchUpdate, BranchLookupResponse, LookupRequest, SalesHeatmap, TokenData
 from src.crud import CRUD
 from src.utils.security import get_current_user
+from src.utils.response_cache import response_cache
+from src.utils import fieldsets
+from src.services.sales_heatmap import branch_heatmap
+
+# Longest date range accepted by the sales heatmap
+MAX_HEATMAP_DAYS = 366
 
 # Create router
 router = APIRouter(
@@ -13,10 +21,20 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
-# List branches
+# Encoder for cached branch lists
+branch_list_adapter = TypeAdapter(List[BranchInDB])
+
+# List branches (served from the response cache, supports If-None-Match)
+# ?fields=id,name selects and returns only those fields
 @router.get("/", response_model=List[BranchInDB])
-async def list_branches(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return CRUD.get_branches(db, skip=skip, limit=limit)
+async def list_branches(request: Request, skip: int = 0, limit: int = 100, fields: Optional[str] = None,
+                        db: Session = Depends(get_db)):
+    selected = fieldsets.parse_fields(BranchInDB, fields)
+    return response_cache.serve(
+        request, db, ("BRANCHES",),
+        lambda session: CRUD.get_branches(session, skip=skip, limit=limit, fields=selected),
+        fieldsets.encoder(BranchInDB, selected) if selected else branch_list_adapter
+    )
 
 # Create branch
 @router.post("/", response_model=BranchInDB, status_code=201)
@@ -26,14 +44,41 @@ async def create_branch_route(branch: BranchCreate, db: Session = Depends(get_db
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Fetch many branches by id in one round trip
+@router.post("/lookup", response_model=BranchLookupResponse)
+async def lookup_branches(lookup: LookupRequest, db: Session = Depends(get_db)):
+    items, missing = CRUD.get_branches_by_ids(db, lookup.ids)
+    return {"items": items, "missing": missing}
+
 # Read branch
 @router.get("/{branch_id}", response_model=BranchInDB)
-async def read_branch(branch_id: int, db: Session = Depends(get_db)):
-    branch = CRUD.get_branch(db, branch_id)
+async def read_branch(branch_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    selected = fieldsets.parse_fields(BranchInDB, fields)
+    branch = CRUD.get_branch(db, branch_id, fields=selected)
     if not branch:
         raise HTTPException(status_code=404, detail="Branch not found")
+    if selected:
+        return fieldsets.respond(BranchInDB, selected, branch, many=False)
     return branch
 
+# Transactions and revenue by weekday x hour of day (defaults to the last 4 weeks)
+@router.get("/{branch_id}/sales-heatmap", response_model=SalesHeatmap)
+async def read_sales_heatmap(
+    branch_id: int,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_db)
+):
+    end = to_date or date.today()
+    start = from_date or end - timedelta(days=27)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (end - start).days >= MAX_HEATMAP_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_HEATMAP_DAYS} days")
+    if not CRUD.get_branch(db, branch_id):
+        raise HTTPException(status_code=404, detail="Branch not found")
+    return branch_heatmap(db, branch_id, start, end)
+
 # Update branch
 @router.put("/{branch_id}", response_model=BranchInDB)
 async def update_branch_route(branch_id: int, branch: BranchUpdate, db: Session = Depends(get_db)):
@@ -42,6 +87,8 @@ async def update_branch_route(branch_id: int, branch: BranchUpdate, db: Session
         if not updated:
             raise HTTPException(status_code=404, detail="Branch not found")
         return updated
+    except CRUD.VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
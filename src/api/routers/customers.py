@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from src.database import get_db
-from src.model.MODEL import CustomerCreate, CustomerInDB, CustomerUpdate, TokenData
+from src.model.MODEL import CustomerCreate, CustomerInDB, CustomerUpdate, CustomerLookupResponse, CustomerStatsInDB, LookupRequest, TokenData
 from src.crud import CRUD
 from src.utils.security import get_current_user
+from src.utils import fieldsets
 
 # Create router
 router = APIRouter(
@@ -13,10 +14,14 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
-# List customers
+# List customers (?fields=id,name selects and returns only those fields)
 @router.get("/", response_model=List[CustomerInDB])
-async def list_customers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return CRUD.get_customers(db, skip=skip, limit=limit)
+async def list_customers(skip: int = 0, limit: int = 100, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    selected = fieldsets.parse_fields(CustomerInDB, fields)
+    customers = CRUD.get_customers(db, skip=skip, limit=limit, fields=selected)
+    if selected:
+        return fieldsets.respond(CustomerInDB, selected, customers)
+    return customers
 
 # Create customer
 @router.post("/", response_model=CustomerInDB, status_code=201)
@@ -26,12 +31,26 @@ async def create_customer_route(customer: CustomerCreate, db: Session = Depends(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Fetch many customers by id in one round trip
+@router.post("/lookup", response_model=CustomerLookupResponse)
+async def lookup_customers(lookup: LookupRequest, db: Session = Depends(get_db)):
+    items, missing = CRUD.get_customers_by_ids(db, lookup.ids)
+    return {"items": items, "missing": missing}
+
+# Non-members flagged by the nightly RFM pass (scripts/score_customers.py)
+@router.get("/membership-candidates", response_model=List[CustomerStatsInDB])
+async def list_membership_candidates(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return CRUD.get_membership_candidates(db, skip=skip, limit=limit)
+
 # Read customer
 @router.get("/{customer_id}", response_model=CustomerInDB)
-async def read_customer(customer_id: int, db: Session = Depends(get_db)):
-    customer = CRUD.get_customer(db, customer_id)
+async def read_customer(customer_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    selected = fieldsets.parse_fields(CustomerInDB, fields)
+    customer = CRUD.get_customer(db, customer_id, fields=selected)
     if customer is None:
         raise HTTPException(status_code=404, detail="Customer not found")
+    if selected:
+        return fieldsets.respond(CustomerInDB, selected, customer, many=False)
     return customer
 
 # Update customer
@@ -42,6 +61,8 @@ async def update_customer_route(customer_id: int, customer: CustomerUpdate, db:
         if updated is None:
             raise HTTPException(status_code=404, detail="Customer not found")
         return updated
+    except CRUD.VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -6,6 +6,7 @@ from src.database import get_db
 from src.model.MODEL import EmployeeCreate, EmployeeInDB, EmployeeUpdate, Role, TokenData
 from src.crud import CRUD
 from src.utils.security import get_current_user
+from src.utils import fieldsets
 
 # Create router
 router = APIRouter(
@@ -24,21 +25,29 @@ async def create_employee_route(employee: EmployeeCreate, db: Session = Depends(
 
 # Read employees
 @router.get("/", response_model=List[EmployeeInDB])
-async def read_employees(skip: int = 0, limit: int = 100, role: Optional[Role] = None, db: Session = Depends(get_db)):
+async def read_employees(skip: int = 0, limit: int = 100, role: Optional[Role] = None, fields: Optional[str] = None,
+                         db: Session = Depends(get_db)):
+    selected = fieldsets.parse_fields(EmployeeInDB, fields)
     try:
         filters = {}
         if role:
             filters["role"] = role
-        return CRUD.get_employees(db, skip=skip, limit=limit, **filters)
+        employees = CRUD.get_employees(db, skip=skip, limit=limit, fields=selected, **filters)
+        if selected:
+            return fieldsets.respond(EmployeeInDB, selected, employees)
+        return employees
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Read employee
 @router.get("/{employee_id}", response_model=EmployeeInDB)
-async def read_employee(employee_id: int, db: Session = Depends(get_db)):
-    employee = CRUD.get_employee(db, employee_id)
+async def read_employee(employee_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    selected = fieldsets.parse_fields(EmployeeInDB, fields)
+    employee = CRUD.get_employee(db, employee_id, fields=selected)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
+    if selected:
+        return fieldsets.respond(EmployeeInDB, selected, employee, many=False)
     return employee
 
 # Update employee
@@ -49,6 +58,8 @@ async def update_employee_route(employee_id: int, employee: EmployeeUpdate, db:
         if not updated:
             raise HTTPException(status_code=404, detail="Employee not found")
         return updated
+    except CRUD.VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from src.model.MODEL import ExportStatus
+from src.utils.security import require_admin
+
+# Create router (admin only). The export job, and pyarrow with it, is imported by
+# the routes on first use
+router = APIRouter(
+    prefix="/exports",
+    tags=["exports"],
+    dependencies=[Depends(require_admin)]
+)
+
+# Status of the Parquet export: high-water mark, last run, whether one is running
+@router.get("/transactions", response_model=ExportStatus)
+async def export_status():
+    from src.jobs.export import export_runner
+    return export_runner.status()
+
+# Start an incremental export (or a full one with ?full=true) in the background
+# Files go to EXPORT_DIR, see src/jobs/export.py for the layout
+@router.post("/transactions", response_model=ExportStatus, status_code=202)
+async def start_export(background_tasks: BackgroundTasks, full: bool = False):
+    from src.jobs.export import export_runner
+    status = export_runner.status()
+    if not status["available"]:
+        raise HTTPException(status_code=503, detail="Parquet export needs pyarrow on the server")
+    if not export_runner.claim():
+        raise HTTPException(status_code=409, detail="An export is already running")
+    background_tasks.add_task(export_runner.run, full)
+    return {**status, "running": True}
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from typing import List, Optional
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from src.database import get_db
-from src.model.MODEL import ProductCreate, ProductInDB, ProductUpdate, TokenData
+from src.model.MODEL import (
+    ProductCreate, ProductInDB, ProductUpdate, ProductLookupResponse,
+    LookupRequest, MAX_LOOKUP_IDS, LowStockItem, RestockRequest,
+    ReorderSuggestionInDB, TokenData
+)
 from src.crud import CRUD
 from src.utils.security import get_current_user
+from src.utils.response_cache import response_cache
+from src.utils import fieldsets
+from src.utils.metrics import metrics
+from src.services.stock_index import stock_index
+from src.config import get_settings
 
 # Create router 
 router = APIRouter(
@@ -13,24 +23,60 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
+def central_only():
+    """Branch nodes receive the catalog from the central database (src/jobs/sync.py)."""
+    if get_settings().node_mode == "branch":
+        raise HTTPException(status_code=409, detail="The catalog is read-only on a branch node; change it on the central server")
+
 # create product route
-@router.post("/", response_model=ProductInDB, status_code=201)
+@router.post("/", response_model=ProductInDB, status_code=201, dependencies=[Depends(central_only)])
 async def create_product_route(product: ProductCreate, db: Session = Depends(get_db)):
     try:
         return CRUD.create_product(db, product.model_dump())
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-# Read products
+# Encoder for cached product lists
+product_list_adapter = TypeAdapter(List[ProductInDB])
+
+# Parse a comma separated id list (?ids=1,2,3)
+def parse_ids(ids: str) -> List[int]:
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma separated list of integers")
+    if not parsed or len(parsed) > MAX_LOOKUP_IDS:
+        raise HTTPException(status_code=400, detail=f"ids must contain between 1 and {MAX_LOOKUP_IDS} values")
+    return parsed
+
+# Read products (served from the response cache, supports If-None-Match)
+# With ?ids=1,2,3 the given products are returned in that order and
+# ids that do not exist are listed in the X-Missing-Ids header
+# ?fields=id,name,stock selects and returns only those fields
 @router.get("/", response_model=List[ProductInDB])
 async def read_products(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     category: Optional[str] = None,
+    ids: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
+    selected = fieldsets.parse_fields(ProductInDB, fields)
+    if ids is not None:
+        items, missing = CRUD.get_products_by_ids(db, parse_ids(ids))
+        if missing:
+            response.headers["X-Missing-Ids"] = ",".join(map(str, missing))
+        if selected:
+            encoded = fieldsets.respond(ProductInDB, selected, items)
+            encoded.headers.update(response.headers)
+            return encoded
+        return items
+
     try:
         filters = {}
         if min_price is not None:
@@ -40,41 +86,96 @@ async def read_products(
         if category:
             filters["category"] = category
             
-        return CRUD.get_products(db, skip=skip, limit=limit, **filters)
+        return response_cache.serve(
+            request, db, ("PRODUCTS",),
+            lambda session: CRUD.get_products(session, skip=skip, limit=limit, fields=selected, **filters),
+            fieldsets.encoder(ProductInDB, selected) if selected else product_list_adapter
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Fetch many products by id in one round trip
+@router.post("/lookup", response_model=ProductLookupResponse)
+async def lookup_products(lookup: LookupRequest, db: Session = Depends(get_db)):
+    items, missing = CRUD.get_products_by_ids(db, lookup.ids)
+    return {"items": items, "missing": missing}
+
+# Products at or below a stock threshold, lowest first
+# Served from the in-memory stock index (no database access); the database is
+# only queried while the index has not been loaded
+@router.get("/low-stock", response_model=List[LowStockItem])
+async def read_low_stock(
+    threshold: int = Query(10, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    if not stock_index.loaded:
+        metrics.inc("stock_index.fallback")
+        return CRUD.get_low_stock_products(db, threshold, limit)
+    stock_index.refresh_in_background()
+    metrics.inc("stock_index.served")
+    return [entry._asdict() for entry in stock_index.lowest(threshold, limit)]
+
+# Reorder suggestions computed by the nightly job (scripts/reorder_suggestions.py)
+# Declared before /{product_id} so the path is not parsed as an id
+@router.get("/reorder-suggestions", response_model=List[ReorderSuggestionInDB])
+async def read_reorder_suggestions(
+    branch_id: Optional[int] = None,
+    needed_only: bool = True,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    return CRUD.get_reorder_suggestions(db, branch_id=branch_id, needed_only=needed_only, skip=skip, limit=limit)
+
 # Read product
 @router.get("/{product_id}", response_model=ProductInDB)
-async def read_product(product_id: int, db: Session = Depends(get_db)):
-    product = CRUD.get_product(db, product_id)
+async def read_product(product_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    selected = fieldsets.parse_fields(ProductInDB, fields)
+    product = CRUD.get_product(db, product_id, fields=selected)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    if selected:
+        return fieldsets.respond(ProductInDB, selected, product, many=False)
     return product
 
 # Update product
-@router.put("/{product_id}", response_model=ProductInDB)
+@router.put("/{product_id}", response_model=ProductInDB, dependencies=[Depends(central_only)])
 async def update_product_route(product_id: int, product: ProductUpdate, db: Session = Depends(get_db)):
     try:
         updated = CRUD.update_product(db, product_id, product.model_dump(exclude_unset=True))
         if not updated:
             raise HTTPException(status_code=404, detail="Product not found")
         return updated
+    except CRUD.VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Delete product
-@router.delete("/{product_id}", status_code=204)
+@router.delete("/{product_id}", status_code=204, dependencies=[Depends(central_only)])
 async def delete_product_route(product_id: int, db: Session = Depends(get_db)):
     success = CRUD.delete_product(db, product_id)
     if not success:
         raise HTTPException(status_code=404, detail="Product not found")
     return None
 
-# Get products by category
+# Add delivered units to a product's stock
+@router.post("/{product_id}/restock", response_model=ProductInDB, dependencies=[Depends(central_only)])
+async def restock_product_route(product_id: int, restock: RestockRequest, db: Session = Depends(get_db)):
+    product = CRUD.restock_product(db, product_id, restock.quantity)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+# Get products by category (served from the response cache)
 @router.get("/category/{category}", response_model=List[ProductInDB])
-async def get_products_by_category(category: str, db: Session = Depends(get_db)):
+async def get_products_by_category(request: Request, category: str, db: Session = Depends(get_db)):
     try:
-        return CRUD.get_products(db, category=category)
+        return response_cache.serve(
+            request, db, ("PRODUCTS",),
+            lambda session: CRUD.get_products(session, category=category),
+            product_list_adapter
+        )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
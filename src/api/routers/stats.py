@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from src.model.MODEL import TopProductsResponse
+from src.services.top_sellers import top_sellers, HOUR, TODAY, WEEK
+from src.utils.security import get_current_user
+from src.utils.metrics import metrics
+
+# Create router
+router = APIRouter(
+    prefix="/stats",
+    tags=["stats"],
+    dependencies=[Depends(get_current_user)]
+)
+
+# Live top products per branch (all branches when branch_id is omitted)
+# Served from in-memory Space-Saving sketches, see src/services/top_sellers.py
+# for the error bounds
+@router.get("/top-products", response_model=TopProductsResponse)
+async def top_products(
+    branch_id: Optional[int] = None,
+    window: str = Query(TODAY, pattern=f"^({HOUR}|{TODAY}|{WEEK})$"),
+    limit: int = Query(10, ge=1, le=100)
+):
+    top_sellers.refresh_in_background()
+    metrics.inc("top_sellers.served")
+
+    sketch = top_sellers.window(branch_id, window)
+    return {
+        "branch_id": branch_id,
+        "window": window,
+        "total_units": sketch.total,
+        "error_bound": sketch.error_bound(),
+        "items": [
+            {"product_id": hit.item, "units": hit.count, "min_units": hit.count - hit.error}
+            for hit in sketch.top(limit)
+        ],
+    }
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from src.services.stock_hub import stock_hub
+from src.utils.security import get_current_user
+from src.utils.metrics import metrics
+
+# Create router
+router = APIRouter(
+    prefix="/stream",
+    tags=["stream"],
+    dependencies=[Depends(get_current_user)]
+)
+
+# Live stock levels as Server-Sent Events (see src/services/stock_hub.py for the
+# event format, coalescing and backpressure)
+@router.get("/stock")
+async def stream_stock():
+    if stock_hub.is_full():
+        metrics.inc("stock_stream.rejected")
+        raise HTTPException(status_code=503, detail="Too many stock subscribers, retry later",
+                            headers={"Retry-After": "30"})
+    return StreamingResponse(
+        stock_hub.events(),
+        media_type="text/event-stream",
+        # No caching or proxy buffering, events must reach the client as they are sent
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
-from datetime import date
+from datetime import date, time
+import base64
 from sqlalchemy.orm import Session
 from src.database import get_db
 from src.model.MODEL import (
     TransactionCreate, TransactionInDB, TransactionResponse,
-    TransactionDetailInDB, TokenData
+    TransactionDetailInDB, CustomerHistoryPage, TokenData
 )
 from src.crud import CRUD
 from src.utils.security import get_current_user
+from src.utils import fieldsets
 
 # Create router
 router = APIRouter(
@@ -38,8 +40,10 @@ async def read_transactions(
     customer_id: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
+    selected = fieldsets.parse_fields(TransactionInDB, fields)
     try:
         filters = {}
         if branch_id is not None:
@@ -50,17 +54,23 @@ async def read_transactions(
             filters["dateOfTransaction__gte"] = start_date
         if end_date:
             filters["dateOfTransaction__lte"] = end_date
-            
-        return CRUD.get_transactions(db, skip=skip, limit=limit, **filters)
+
+        transactions = CRUD.get_transactions(db, skip=skip, limit=limit, fields=selected, **filters)
+        if selected:
+            return fieldsets.respond(TransactionInDB, selected, transactions)
+        return transactions
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-# Read transaction
+# Read transaction (with ?fields= only those fields of the transaction, without its details)
 @router.get("/{transaction_id}", response_model=TransactionResponse)
-async def read_transaction(transaction_id: int, db: Session = Depends(get_db)):
-    transaction = CRUD.get_transaction(db, transaction_id)
+async def read_transaction(transaction_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    selected = fieldsets.parse_fields(TransactionInDB, fields)
+    transaction = CRUD.get_transaction(db, transaction_id, fields=selected)
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
+    if selected:
+        return fieldsets.respond(TransactionInDB, selected, transaction, many=False)
     
     details = CRUD.get_transaction_details(db, transaction_id)
     
@@ -93,6 +103,8 @@ async def update_transaction_route(
         if not updated:
             raise HTTPException(status_code=404, detail="Transaction not found")
         return updated
+    except CRUD.VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -104,13 +116,36 @@ async def delete_transaction_route(transaction_id: int, db: Session = Depends(ge
         raise HTTPException(status_code=404, detail="Transaction not found")
     return None
 
-# Get customer transactions
-@router.get("/customer/{customer_id}", response_model=List[TransactionInDB])
-async def get_customer_transactions(customer_id: int, db: Session = Depends(get_db)):
+# Opaque pagination cursor for the customer history: (date, time, id) of the
+# last transaction on the previous page
+def encode_cursor(key: tuple) -> str:
+    day, at, transaction_id = key
+    raw = f"{day.isoformat()}|{at.isoformat()}|{transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
     try:
-        return CRUD.get_transactions(db, customer_id=customer_id)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        day, at, transaction_id = raw.split("|")
+        return date.fromisoformat(day), time.fromisoformat(at), int(transaction_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Get customer transactions, newest first, with the customer's purchase summary
+@router.get("/customer/{customer_id}", response_model=CustomerHistoryPage)
+async def get_customer_transactions(
+    customer_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    after = decode_cursor(cursor) if cursor else None
+    items, next_key = CRUD.get_customer_history(db, customer_id, limit=limit, after=after)
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(next_key) if next_key else None,
+        "summary": CRUD.get_customer_stats(db, customer_id),
+    }
 
 # Get branch transactions
 @router.get("/branch/{branch_id}", response_model=List[TransactionInDB])
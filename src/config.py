@@ -0,0 +1,156 @@
+'''
+Application settings loaded once from the environment and the .env file.
+
+Every module reads configuration through get_settings() instead of calling
+load_dotenv()/os.getenv() on its own, so the .env file is parsed a single time
+per process and the values are validated in one place.
+'''
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Literal, Optional
+
+from pydantic import ValidationError
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# .env lives at the project root, next to main.py
+ENV_FILE = Path(__file__).resolve().parent.parent / ".env"
+
+
+class Settings(BaseSettings):
+    """Typed view of the environment variables used by the API."""
+
+    model_config = SettingsConfigDict(env_file=ENV_FILE, env_file_encoding="utf-8", extra="ignore")
+
+    # Database
+    database_url: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+
+    # JWT
+    secret_key: str
+    algorithm: str
+    access_token_expire_minutes: int
+    refresh_token_expire_days: int = 14
+    # Deny-list of revoked sessions: re-read from REVOKED_TOKENS (and expired rows
+    # purged) when older than this (picks up logouts made through other workers)
+    revoked_tokens_refresh_seconds: float = 60
+
+    # Argon2 password hashing (defaults are the argon2-cffi RFC 9106 profile);
+    # tune them for the servers with scripts/calibrate_argon2.py
+    argon2_time_cost: int = 3
+    argon2_memory_cost: int = 65536  # KiB
+    argon2_parallelism: int = 4
+
+    # Admission control for login/signup (token buckets per worker process)
+    auth_ip_rate_per_minute: float = 60
+    auth_ip_burst: int = 20
+    auth_email_rate_per_minute: float = 5
+    auth_email_burst: int = 5
+    auth_max_concurrent_hashes: int = 4
+
+    # Bloom filter of registered emails used by signup
+    email_filter_capacity: int = 1_000_000
+    email_filter_fp_rate: float = 0.01
+    # A "not registered" answer is only trusted this long after the last rebuild
+    # (emails created by other workers are not in this worker's filter)
+    email_filter_refresh_seconds: float = 60
+
+    # Response cache for read-mostly list routes
+    response_cache_ttl_seconds: float = 5
+    response_cache_stale_seconds: float = 60
+    response_cache_max_entries: int = 1024
+
+    # Low-stock index: rebuild from the database when older than this
+    # (picks up stock changes made by other workers)
+    stock_index_refresh_seconds: float = 30
+
+    # Price snapshot used by checkout: rebuilt from the database when older than
+    # this (picks up price changes made by other workers or directly in the database)
+    price_snapshot_refresh_seconds: float = 30
+
+    # Sales heatmap: cached hour buckets of past days expire after this long
+    # (picks up backdated sales and edits made through other workers)
+    sales_heatmap_cache_seconds: float = 600
+
+    # Live top sellers (Space-Saving sketches): counters per sketch, and how
+    # often the sketches are rebuilt from the database
+    top_sellers_capacity: int = 256
+    top_sellers_refresh_seconds: float = 60
+
+    # Reorder suggestions batch job (src/jobs/reorder.py)
+    reorder_history_days: int = 365
+    reorder_window_days: int = 28  # moving average window
+    reorder_lead_time_days: int = 7
+    reorder_review_days: int = 7  # days of demand covered by one order
+    reorder_service_z: float = 1.65  # safety stock factor, ~95% service level
+    reorder_chunk_size: int = 50_000
+
+    # Transaction archive job (src/jobs/archive.py). The reorder job only reads
+    # the hot tables, so keep at least REORDER_HISTORY_DAYS worth of months.
+    archive_keep_months: int = 12  # full months kept in TRANSACTIONS besides the current one
+    archive_chunk_size: int = 1000  # transactions moved per database transaction
+    archive_pause_seconds: float = 0.05  # between chunks, lets other writers and replicas catch up
+
+    # Live stock stream (src/services/stock_hub.py, GET /api/v1/stream/stock)
+    stock_stream_max_subscribers: int = 10_000  # per worker
+    stock_stream_flush_seconds: float = 0.25  # changes within this interval are sent as one message
+    stock_stream_heartbeat_seconds: float = 15
+    stock_stream_max_queued: int = 32  # unread messages per subscriber before it is told to resync
+    stock_stream_poll_seconds: float = 0  # > 0 with several workers: also poll PRODUCTS.stock
+
+    # Parquet export of the sales history (src/jobs/export.py, needs pyarrow)
+    export_dir: str = "exports/transactions"
+    export_chunk_size: int = 50_000
+    # Ids above the highest one seen this long ago are only exported up to the
+    # first gap (the gap may be a sale that is still being committed)
+    export_settle_seconds: float = 300
+
+    # Transaction shards (src/database.py). Empty: transactions stay in DATABASE_URL.
+    # Otherwise comma-separated database URLs, the first one being DATABASE_URL
+    # itself so existing transactions stay where they are. A branch's sales go to
+    # shard branch_id % shards unless TRANSACTION_SHARD_MAP says otherwise. On a branch
+    # node they are the central database's shards (the first being CENTRAL_DATABASE_URL),
+    # which the node's pushed sales are written to; the node's own database is not sharded
+    transaction_shard_urls: str = ""
+    transaction_shard_map: str = ""  # e.g. "1:0,7:2" (branch:shard)
+    # Branch reads also look in shard 0, where a branch's transactions from before
+    # sharding stay; turn off once scripts/prepare_shards.py reports none left
+    transaction_shard_legacy_reads: bool = True
+
+    # Offline branch node (src/jobs/sync.py). With NODE_MODE=branch, DATABASE_URL is
+    # the node's own SQLite file: sales are recorded locally and pushed to
+    # CENTRAL_DATABASE_URL, catalog changes are pulled from it
+    node_mode: Literal["central", "branch"] = "central"
+    node_branch_id: Optional[int] = None
+    central_database_url: Optional[str] = None
+    sync_interval_seconds: float = 10
+    sync_batch_size: int = 200  # sales pushed / catalog changes pulled per database transaction
+    sync_change_log_keep_days: int = 30  # central: nodes further behind re-read the whole catalog
+    # Central: keep the catalog change log the branch nodes pull (needs migration 0005).
+    # Off by default, so a server without branch nodes does not write it
+    branch_sync_enabled: bool = False
+
+    # Frontend assets (src/services/static_assets.py): fingerprinted, precompressed,
+    # files up to STATIC_MEMORY_MAX_BYTES (and every page and stylesheet) kept in memory
+    static_dir: str = "frontend"
+    static_memory_max_bytes: int = 1_000_000
+    static_watch: bool = False  # re-scan STATIC_DIR on change (development)
+
+    # Request batching (POST /api/v1/batch): sub-requests of one batch run at most
+    # BATCH_MAX_CONCURRENCY at a time, each lane with one database session
+    batch_max_concurrency: int = 4
+    batch_item_timeout_seconds: float = 10
+
+    # Startup
+    warmup_on_startup: bool = False
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Return the process-wide settings, loading them on first use."""
+    try:
+        return Settings()
+    except ValidationError as e:
+        missing = ", ".join(str(err["loc"][0]).upper() for err in e.errors())
+        raise RuntimeError(f"Invalid or missing settings: {missing}. Please check your .env file.") from e
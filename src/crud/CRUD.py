@@ -1,12 +1,29 @@
+import heapq
 import logging
-from typing import Any, Dict, List, Optional, Type, Union, Sequence
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple, Type, Union, Sequence
 from sqlalchemy.orm import Session
-from sqlalchemy import select, update as sqlalchemy_update, delete as sqlalchemy_delete, and_
+from sqlalchemy import select, update as sqlalchemy_update, delete as sqlalchemy_delete, and_, or_, case, bindparam, literal, union_all
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel, ValidationError
 
 # Import ORM models
-from src.model.orm import Customer, Employee, Product, Branch, Transaction, TransactionDetail
-from src.database import SessionLocal
+from src.model.orm import (
+    Customer, Employee, Product, Branch, Transaction, TransactionDetail, TransactionArchive, TransactionDetailArchive,
+    ReorderSuggestion, CustomerStats,
+)
+from src.jobs.archive import archived_through, reaches_archive
+from src.jobs.sync import catalog_change_log_enabled, log_product_changes
+from src.database import shard_router
+from src.services.email_index import email_index, normalize_email
+from src.services.pricing import price_snapshot, verify_basket
+from src.services.stock_index import stock_index
+from src.services.stock_hub import stock_hub
+from src.services.top_sellers import top_sellers
+from src.services.sales_heatmap import closed_days
+from src.utils.metrics import metrics
+from src.utils.response_cache import table_versions
 
 # Import Pydantic models for validation/return types
 from src.model.MODEL import (
@@ -30,6 +47,97 @@ logger = logging.getLogger(__name__)
 def get_entity_by_id(db: Session, model: Any, entity_id: int):
     return db.get(model, entity_id)
 
+# Maximum number of ids sent in one IN (...) clause
+LOOKUP_CHUNK_SIZE = 500
+
+def get_entities_by_ids(db: Session, model: Any, ids: Sequence[int]) -> Tuple[List[Any], List[int]]:
+    """
+    Fetch many rows by primary key with IN (...) queries (chunked for long lists).
+    Returns (rows in request order, ids that were not found); duplicate ids are collapsed.
+    """
+    unique_ids = list(dict.fromkeys(ids))
+    found: Dict[int, Any] = {}
+    for start in range(0, len(unique_ids), LOOKUP_CHUNK_SIZE):
+        chunk = unique_ids[start:start + LOOKUP_CHUNK_SIZE]
+        for item in db.execute(select(model).where(model.id.in_(chunk))).scalars():
+            found[item.id] = item
+    items = [found[i] for i in unique_ids if i in found]
+    missing = [i for i in unique_ids if i not in found]
+    return items, missing
+
+class VersionConflictError(ValueError):
+    """An update named the version it read, but another write changed the row since."""
+
+    def __init__(self, model: Any, entity_id: int, expected: int, current: int):
+        super().__init__(f"{model.__name__} {entity_id} was changed by someone else "
+                         f"(version {current}, expected {expected}); reload it and try again")
+        self.current = current
+
+def _commit_known(db: Session, *items: Any) -> None:
+    """
+    Commit without reading the written rows back: the objects already hold
+    what was written (defaults included), so they are detached instead of
+    being expired by the commit and reloaded with a SELECT on first access.
+    """
+    for item in items:
+        db.expunge(item)
+    db.commit()
+
+# Read-only list queries: Core SELECTs of the columns the response model shows,
+# returned as Records. Nothing is added to the session's identity map or tracked
+# for changes, and pydantic validates a dict faster than it reads attributes.
+class Record(dict):
+    """One result row as a dict; fields can also be read as attributes, like the ORM objects."""
+    __slots__ = ()
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+def records(result: Any) -> List[Record]:
+    keys = tuple(result.keys())
+    return [Record(zip(keys, row)) for row in result]
+
+def list_columns(model: Any, schema: Type[BaseModel], fields: Optional[Sequence[str]] = None) -> List[Any]:
+    """
+    Table columns of `model` that `schema` returns (excluded fields such as
+    password are not read), narrowed to `fields` when a fieldset was requested.
+    """
+    return [column for name, column in model.__table__.c.items()
+            if name in schema.model_fields and not schema.model_fields[name].exclude
+            and (fields is None or name in fields)]
+
+def _filter_clauses(model: Any, filters: Dict[str, Any]) -> List[Any]:
+    """field=value, field__gte=value and field__lte=value on the model's table; unknown fields are ignored."""
+    columns = model.__table__.c
+    clauses = []
+    for k, v in filters.items():
+        if k.endswith("__gte") and k[:-5] in columns:
+            clauses.append(columns[k[:-5]] >= v)
+        elif k.endswith("__lte") and k[:-5] in columns:
+            clauses.append(columns[k[:-5]] <= v)
+        elif k in columns:
+            clauses.append(columns[k] == v)
+    return clauses
+
+def _list_rows(db: Session, model: Any, schema: Type[BaseModel], skip: int, limit: int,
+               filters: Dict[str, Any], fields: Optional[Sequence[str]] = None) -> List[Record]:
+    query = select(*list_columns(model, schema, fields)).where(*_filter_clauses(model, filters))
+    return records(db.execute(query.offset(skip).limit(limit)))
+
+def get_record(db: Session, model: Any, schema: Type[BaseModel], entity_id: int,
+               fields: Optional[Sequence[str]] = None) -> Optional[Record]:
+    """One row by primary key as a Record of the response columns (or `fields`)."""
+    query = select(*list_columns(model, schema, fields)).where(model.__table__.c.id == entity_id)
+    rows = records(db.execute(query))
+    return rows[0] if rows else None
+
+def _with_keys(fields: Optional[Sequence[str]], *keys: str) -> Optional[Tuple[str, ...]]:
+    """A fieldset plus the columns a query needs to order and merge its rows."""
+    return None if fields is None else tuple(dict.fromkeys((*fields, *keys)))
+
 def create_entity(db: Session, model: Any, data: Dict[str, Any]):
     # Hash password if present
     if "password" in data:
@@ -38,8 +146,42 @@ def create_entity(db: Session, model: Any, data: Dict[str, Any]):
     
     db_item = model(**data)
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    db.flush() # INSERT, fills in the id
+    _commit_known(db, db_item)
+    table_versions.bump(model.__tablename__)
+    return db_item
+
+def _update_row(db: Session, model: Any, entity_id: int, updates: Dict[str, Any]) -> Optional[Any]:
+    """
+    One UPDATE ... WHERE id statement that also bumps the row's version, in the
+    caller's transaction. If updates contains "version" (the version the client
+    read), the row is only changed if it still has it, else VersionConflictError.
+    Keys that are not columns are ignored. Returns the updated row (RETURNING
+    where the database has it), None if there is no such row.
+    """
+    updates = dict(updates)
+    expected = updates.pop("version", None)
+    values = {key: value for key, value in updates.items() if key in model.__table__.c and key != "id"}
+    stmt = (
+        sqlalchemy_update(model)
+        .where(model.id == entity_id)
+        .values(**values, version=model.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if expected is not None:
+        stmt = stmt.where(model.version == expected)
+    if db.get_bind().dialect.update_returning:
+        db_item = db.execute(stmt.returning(model), execution_options={"populate_existing": True}).scalar_one_or_none()
+    elif db.execute(stmt).rowcount:
+        # MySQL has no UPDATE ... RETURNING: read the row back in the same transaction (the UPDATE holds its lock)
+        db_item = db.execute(select(model).where(model.id == entity_id).execution_options(populate_existing=True)).scalar_one()
+    else:
+        db_item = None
+    if db_item is None and expected is not None:
+        current = db.execute(select(model.version).where(model.id == entity_id)).scalar()
+        if current is not None:
+            db.rollback()
+            raise VersionConflictError(model, entity_id, expected, current)
     return db_item
 
 def update_entity(db: Session, model: Any, entity_id: int, updates: Dict[str, Any]):
@@ -48,43 +190,114 @@ def update_entity(db: Session, model: Any, entity_id: int, updates: Dict[str, An
         from src.utils.security import hash_password
         updates["password"] = hash_password(updates["password"])
         
-    db_item = get_entity_by_id(db, model, entity_id)
-    if not db_item:
+    db_item = _update_row(db, model, entity_id, updates)
+    if db_item is None:
+        db.rollback()
         return None
-    
-    for key, value in updates.items():
-        setattr(db_item, key, value)
-    
-    db.commit()
-    db.refresh(db_item)
+    _commit_known(db, db_item)
+    table_versions.bump(model.__tablename__)
     return db_item
 
+def _apply_on_delete(db: Session, model: Any, ids: Sequence[int]) -> None:
+    """
+    The foreign keys' ON DELETE CASCADE / SET NULL actions, as statements.
+    SQLite runs without PRAGMA foreign_keys here (a branch node records sales
+    for branches it does not store), so it would not apply them itself.
+    """
+    for table in model.metadata.sorted_tables:
+        for fk in table.foreign_keys:
+            if fk.column.table is not model.__table__ or not fk.ondelete:
+                continue
+            referencing = fk.parent.in_(ids)
+            if fk.ondelete.upper() == "CASCADE":
+                db.execute(table.delete().where(referencing))
+            elif fk.ondelete.upper() == "SET NULL":
+                db.execute(table.update().where(referencing).values({fk.parent.name: None}))
+
+def _delete_row(db: Session, model: Any, entity_id: int) -> bool:
+    """
+    One DELETE ... WHERE id statement, in the caller's transaction. Rows that
+    reference it follow the foreign keys' ON DELETE actions in the database
+    (the relationships use passive_deletes, so nothing is loaded first).
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        _apply_on_delete(db, model, [entity_id])
+    stmt = sqlalchemy_delete(model).where(model.id == entity_id).execution_options(synchronize_session=False)
+    return db.execute(stmt).rowcount > 0
+
 def delete_entity(db: Session, model: Any, entity_id: int):
-    db_item = get_entity_by_id(db, model, entity_id)
-    if not db_item:
+    if not _delete_row(db, model, entity_id):
+        db.rollback()
         return False
-    db.delete(db_item)
     db.commit()
+    table_versions.bump(model.__tablename__)
     return True
 
+def replace_password_hash(db: Session, model: Any, entity_id: int, old_hash: str, new_hash: str) -> bool:
+    """Swap a password hash only if it has not changed since it was read."""
+    stmt = (
+        sqlalchemy_update(model)
+        .where(model.id == entity_id, model.password == old_hash)
+        .values(password=new_hash)
+    )
+    result = db.execute(stmt)
+    db.commit()
+    table_versions.bump(model.__tablename__)
+    return result.rowcount == 1
+
 # Specific CRUD operations
 
+# --- ACCOUNTS (shared by customers and employees) ---
+# Emails are stored lower-cased (migration 0007 converted older rows), so lookups are plain equality on the unique indexes
+def _with_normalized_email(data: Dict[str, Any]) -> Dict[str, Any]:
+    if data.get("email") is None:
+        return data
+    return {**data, "email": normalize_email(data["email"])}
+
+# Both tables are checked with one indexed query that only returns which table matched
+_email_owner_stmt = union_all(
+    select(literal("customer").label("kind")).where(Customer.email == bindparam("email")),
+    select(literal("employee").label("kind")).where(Employee.email == bindparam("email")),
+).limit(1)
+
+def find_email_owner(db: Session, email: str) -> Optional[str]:
+    """
+    Return 'customer' or 'employee' if the email is registered, else None. The
+    query is skipped when the email filter is fresh and rules the email out.
+    """
+    if email_index.loaded:
+        email_index.refresh_in_background()
+    if not email_index.might_exist(email):
+        metrics.inc("email_filter.negative")
+        return None
+    owner = db.execute(_email_owner_stmt, {"email": normalize_email(email)}).scalar()
+    if email_index.loaded and not email_index.is_stale():
+        metrics.inc("email_filter.false_positive" if owner is None else "email_filter.positive")
+    return owner
+
+
 # --- CUSTOMERS ---
 def create_customer(db: Session, customer_data: Dict[str, Any]) -> Customer:
-    return create_entity(db, Customer, customer_data)
+    customer = create_entity(db, Customer, _with_normalized_email(customer_data))
+    email_index.add(customer.email)
+    return customer
 
-def get_customer(db: Session, customer_id: int) -> Optional[Customer]:
+def get_customer(db: Session, customer_id: int, fields: Optional[Sequence[str]] = None) -> Optional[Union[Customer, Record]]:
+    if fields is not None:
+        return get_record(db, Customer, CustomerInDB, customer_id, fields)
     return get_entity_by_id(db, Customer, customer_id)
 
-def get_customers(db: Session, skip: int = 0, limit: int = 100, **filters) -> List[Customer]:
-    query = select(Customer)
-    if filters:
-        filter_clauses = [getattr(Customer, k) == v for k, v in filters.items() if hasattr(Customer, k)]
-        query = query.where(and_(*filter_clauses))
-    return list(db.execute(query.offset(skip).limit(limit)).scalars().all())
+def get_customers_by_ids(db: Session, customer_ids: Sequence[int]) -> Tuple[List[Customer], List[int]]:
+    return get_entities_by_ids(db, Customer, customer_ids)
+
+def get_customers(db: Session, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None, **filters) -> List[Record]:
+    return _list_rows(db, Customer, CustomerInDB, skip, limit, filters, fields)
 
 def update_customer(db: Session, customer_id: int, updates: Dict[str, Any]) -> Optional[Customer]:
-    return update_entity(db, Customer, customer_id, updates)
+    customer = update_entity(db, Customer, customer_id, _with_normalized_email(updates))
+    if customer and "email" in updates:
+        email_index.add(customer.email)
+    return customer
 
 def delete_customer(db: Session, customer_id: int) -> bool:
     return delete_entity(db, Customer, customer_id)
@@ -92,20 +305,23 @@ def delete_customer(db: Session, customer_id: int) -> bool:
 
 # --- EMPLOYEES ---
 def create_employee(db: Session, employee_data: Dict[str, Any]) -> Employee:
-    return create_entity(db, Employee, employee_data)
+    employee = create_entity(db, Employee, _with_normalized_email(employee_data))
+    email_index.add(employee.email)
+    return employee
 
-def get_employee(db: Session, employee_id: int) -> Optional[Employee]:
+def get_employee(db: Session, employee_id: int, fields: Optional[Sequence[str]] = None) -> Optional[Union[Employee, Record]]:
+    if fields is not None:
+        return get_record(db, Employee, EmployeeInDB, employee_id, fields)
     return get_entity_by_id(db, Employee, employee_id)
 
-def get_employees(db: Session, skip: int = 0, limit: int = 100, **filters) -> List[Employee]:
-    query = select(Employee)
-    if filters:
-        filter_clauses = [getattr(Employee, k) == v for k, v in filters.items() if hasattr(Employee, k)]
-        query = query.where(and_(*filter_clauses))
-    return list(db.execute(query.offset(skip).limit(limit)).scalars().all())
+def get_employees(db: Session, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None, **filters) -> List[Record]:
+    return _list_rows(db, Employee, EmployeeInDB, skip, limit, filters, fields)
 
 def update_employee(db: Session, employee_id: int, updates: Dict[str, Any]) -> Optional[Employee]:
-    return update_entity(db, Employee, employee_id, updates)
+    employee = update_entity(db, Employee, employee_id, _with_normalized_email(updates))
+    if employee and "email" in updates:
+        email_index.add(employee.email)
+    return employee
 
 def delete_employee(db: Session, employee_id: int) -> bool:
     return delete_entity(db, Employee, employee_id)
@@ -113,52 +329,103 @@ def delete_employee(db: Session, employee_id: int) -> bool:
 
 # --- PRODUCTS ---
 def create_product(db: Session, product_data: Dict[str, Any]) -> Product:
-    return create_entity(db, Product, product_data)
-
-def get_product(db: Session, product_id: int) -> Optional[Product]:
+    db_product = create_entity(db, Product, product_data)
+    price_snapshot.apply_product(db_product)
+    stock_index.set(db_product.id, db_product.name, db_product.stock)
+    stock_hub.publish(db_product.id, db_product.stock)
+    return db_product
+
+def get_product(db: Session, product_id: int, fields: Optional[Sequence[str]] = None) -> Optional[Union[Product, Record]]:
+    if fields is not None:
+        return get_record(db, Product, ProductInDB, product_id, fields)
     return get_entity_by_id(db, Product, product_id)
 
-def get_products(db: Session, skip: int = 0, limit: int = 100, **filters) -> List[Product]:
-    query = select(Product)
-    filter_parts = []
-    for k, v in filters.items():
-        if k.endswith("__gte"):
-            field = k[:-5]
-            if hasattr(Product, field):
-                filter_parts.append(getattr(Product, field) >= v)
-        elif k.endswith("__lte"):
-            field = k[:-5]
-            if hasattr(Product, field):
-                filter_parts.append(getattr(Product, field) <= v)
-        else:
-            if hasattr(Product, k):
-                filter_parts.append(getattr(Product, k) == v)
-    
-    if filter_parts:
-        query = query.where(and_(*filter_parts))
-        
-    return list(db.execute(query.offset(skip).limit(limit)).scalars().all())
+def get_products_by_ids(db: Session, product_ids: Sequence[int]) -> Tuple[List[Product], List[int]]:
+    return get_entities_by_ids(db, Product, product_ids)
+
+def get_products(db: Session, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None, **filters) -> List[Record]:
+    return _list_rows(db, Product, ProductInDB, skip, limit, filters, fields)
+
+def _write_product(db: Session, product_id: int, updates: Dict[str, Any]) -> Optional[Product]:
+    db_product = _update_row(db, Product, product_id, updates)
+    if db_product is None:
+        db.rollback()
+        return None
+    # A bulk UPDATE is not seen by the flush hook of the change log
+    if catalog_change_log_enabled():
+        log_product_changes(db, [product_id])
+    _commit_known(db, db_product)
+    table_versions.bump(Product.__tablename__)
+    return db_product
 
 def update_product(db: Session, product_id: int, updates: Dict[str, Any]) -> Optional[Product]:
-    return update_entity(db, Product, product_id, updates)
+    db_product = _write_product(db, product_id, updates)
+    if db_product:
+        price_snapshot.apply_product(db_product)
+        stock_index.set(db_product.id, db_product.name, db_product.stock)
+        stock_hub.publish(db_product.id, db_product.stock)
+    return db_product
 
 def delete_product(db: Session, product_id: int) -> bool:
-    return delete_entity(db, Product, product_id)
+    if not _delete_row(db, Product, product_id):
+        db.rollback()
+        return False
+    if catalog_change_log_enabled():
+        log_product_changes(db, [product_id])
+    db.commit()
+    table_versions.bump(Product.__tablename__)
+    price_snapshot.remove_product(product_id)
+    stock_index.remove(product_id)
+    stock_hub.publish(product_id, None)
+    return True
+
+def restock_product(db: Session, product_id: int, quantity: int) -> Optional[Product]:
+    """Add delivered units to a product's stock (atomic increment in the database)."""
+    db_product = _write_product(db, product_id, {"stock": Product.stock + quantity})
+    if db_product is None:
+        return None
+    price_snapshot.apply_product(db_product)
+    stock_index.set(db_product.id, db_product.name, db_product.stock)
+    stock_hub.publish(db_product.id, db_product.stock)
+    logger.info(f"Restocked product {product_id} with {quantity} units")
+    return db_product
+
+def get_low_stock_products(db: Session, threshold: int, limit: int = 50) -> List[Any]:
+    """Database fallback for the low-stock index: (id, name, stock) rows, lowest stock first."""
+    query = (
+        select(Product.id.label("product_id"), Product.name, Product.stock)
+        .where(Product.stock <= threshold)
+        .order_by(Product.stock, Product.id)
+        .limit(limit)
+    )
+    return list(db.execute(query).all())
+
+def get_reorder_suggestions(db: Session, branch_id: Optional[int] = None, needed_only: bool = True,
+                            skip: int = 0, limit: int = 100) -> List[ReorderSuggestion]:
+    """Latest reorder job results, largest suggested orders first."""
+    query = select(ReorderSuggestion)
+    if branch_id is not None:
+        query = query.where(ReorderSuggestion.branch_id == branch_id)
+    if needed_only:
+        query = query.where(ReorderSuggestion.suggested_quantity > 0)
+    query = query.order_by(ReorderSuggestion.suggested_quantity.desc(), ReorderSuggestion.id)
+    return list(db.execute(query.offset(skip).limit(limit)).scalars().all())
 
 
 # --- BRANCHES ---
 def create_branch(db: Session, branch_data: Dict[str, Any]) -> Branch:
     return create_entity(db, Branch, branch_data)
 
-def get_branch(db: Session, branch_id: int) -> Optional[Branch]:
+def get_branch(db: Session, branch_id: int, fields: Optional[Sequence[str]] = None) -> Optional[Union[Branch, Record]]:
+    if fields is not None:
+        return get_record(db, Branch, BranchInDB, branch_id, fields)
     return get_entity_by_id(db, Branch, branch_id)
 
-def get_branches(db: Session, skip: int = 0, limit: int = 100, **filters) -> List[Branch]:
-    query = select(Branch)
-    if filters:
-        filter_clauses = [getattr(Branch, k) == v for k, v in filters.items() if hasattr(Branch, k)]
-        query = query.where(and_(*filter_clauses))
-    return list(db.execute(query.offset(skip).limit(limit)).scalars().all())
+def get_branches_by_ids(db: Session, branch_ids: Sequence[int]) -> Tuple[List[Branch], List[int]]:
+    return get_entities_by_ids(db, Branch, branch_ids)
+
+def get_branches(db: Session, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None, **filters) -> List[Record]:
+    return _list_rows(db, Branch, BranchInDB, skip, limit, filters, fields)
 
 def update_branch(db: Session, branch_id: int, updates: Dict[str, Any]) -> Optional[Branch]:
     return update_entity(db, Branch, branch_id, updates)
@@ -169,84 +436,245 @@ def delete_branch(db: Session, branch_id: int) -> bool:
 
 # --- TRANSACTIONS ---
 def create_transaction(db: Session, transaction_data: Dict[str, Any], details: Optional[List[Dict[str, Any]]] = None) -> Transaction:
-    try:
-        # Create transaction
-        db_transaction = Transaction(**transaction_data)
-        db.add(db_transaction)
-        db.flush() # Get transaction ID
-
+    # Reject baskets whose prices or totals don't match the server's (raises PricingError)
+    if details:
+        verify_basket(db, details, transaction_data.get("total_amount"), transaction_data.get("total"))
+
+    branch_id = transaction_data.get("branch_id")
+    with shard_router.session(db, shard_router.for_branch(branch_id)) as shard:
+        sale_committed = False
+        try:
+            # Create transaction, on the shard that owns the branch (db itself without sharding)
+            db_transaction = Transaction(**transaction_data)
+            shard.add(db_transaction)
+            shard.flush() # Get transaction ID
+
+            new_stock = {}
+            if details:
+                for detail_data in details:
+                    # Add transaction ID to details
+                    detail_data["transaction_id"] = db_transaction.id
+                    shard.add(TransactionDetail(**detail_data))
+                new_stock = _reduce_stock(db, details)
+
+            if db_transaction.customer_id is not None:
+                record_customer_purchase(db, db_transaction.customer_id, db_transaction.total, db_transaction.dateOfTransaction)
+
+            if shard is not db:
+                # Two databases: the sale is committed first, stock and customer stats follow
+                _commit_known(shard, db_transaction)
+                sale_committed = True
+                db.commit()
+            else:
+                _commit_known(db, db_transaction)
+        except Exception as e:
+            db.rollback()
+            shard.rollback()
+            if not sale_committed:
+                logger.error(f"Failed to create transaction: {e}")
+                raise
+            # The sale happened and is stored; report the missed stock/stats update instead of failing it
+            metrics.inc("shards.incomplete_sales")
+            logger.error(f"Transaction {db_transaction.id} was stored but stock and customer stats were not updated: {e}")
+            new_stock = None
+
+        # Stock changed too, so cached product lists are outdated
+        table_versions.bump(Transaction.__tablename__, TransactionDetail.__tablename__, Product.__tablename__)
+        if details and new_stock is not None:
+            price_snapshot.reduce_stock([d["product_id"] for d in details], [d["quantity"] for d in details])
+        for product_id, stock in (new_stock or {}).items():
+            stock_index.set_stock(product_id, stock)
+            stock_hub.publish(product_id, stock)
+        # A backdated sale changes a day the heatmap cache treats as closed
+        sale_day = transaction_data.get("dateOfTransaction")
+        if branch_id is not None and isinstance(sale_day, date) and sale_day < date.today():
+            closed_days.invalidate(branch_id, sale_day)
         if details:
-            for detail_data in details:
-                # Add transaction ID to details
-                detail_data["transaction_id"] = db_transaction.id
-                db_detail = TransactionDetail(**detail_data)
-                db.add(db_detail)
-                
-                # Update stock
-                product = db.get(Product, db_detail.product_id)
-                if product:
-                    product.stock = max(0, product.stock - db_detail.quantity)
-                    logger.info(f"Reduced stock for product {product.id} by {db_detail.quantity}")
-        
-        db.commit()
-        db.refresh(db_transaction)
+            sold_at = None
+            if isinstance(sale_day, date):
+                sold_at = datetime.combine(sale_day, transaction_data.get("timeOfTransaction") or time())
+            top_sellers.record(branch_id, [(d["product_id"], d["quantity"]) for d in details], sold_at)
         return db_transaction
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Failed to create transaction: {e}")
-        raise
 
-def get_transaction(db: Session, transaction_id: int) -> Optional[Transaction]:
-    return get_entity_by_id(db, Transaction, transaction_id)
-
-def get_transactions(db: Session, skip: int = 0, limit: int = 100, **filters) -> List[Transaction]:
-    query = select(Transaction)
-    if filters:
-        filter_clauses = [getattr(Transaction, k) == v for k, v in filters.items() if hasattr(Transaction, k)]
-        query = query.where(and_(*filter_clauses))
+def _reduce_stock(db: Session, details: List[Dict[str, Any]]) -> Dict[int, int]:
+    """
+    Take sold quantities off the stock in the database (never below zero), in
+    the caller's transaction: an atomic UPDATE per product instead of reading
+    the row and writing it back, so concurrent checkouts don't lose updates.
+    Returns product id -> new stock for the products that exist.
+    """
+    sold: Dict[int, int] = {}
+    for detail in details:
+        sold[detail["product_id"]] = sold.get(detail["product_id"], 0) + detail["quantity"]
+    products = Product.__table__
+    remaining = products.c.stock - bindparam("quantity")
+    stmt = (
+        sqlalchemy_update(products)
+        .where(products.c.id == bindparam("product_id"))
+        .values(stock=case((remaining < 0, 0), else_=remaining), version=products.c.version + 1)
+    )
+    params = [{"product_id": product_id, "quantity": quantity} for product_id, quantity in sold.items()]
+    if db.get_bind().dialect.update_returning:
+        new_stock = {}
+        for p in params:
+            new_stock.update(db.execute(stmt.returning(products.c.id, products.c.stock), p).all())
+    else:
+        db.execute(stmt, params)
+        new_stock = dict(db.execute(select(products.c.id, products.c.stock).where(products.c.id.in_(list(sold)))).all())
+    # A bulk UPDATE is not seen by the flush hook of the change log. A branch node
+    # keeps no change log: its sales reach the central stock through the push
+    if catalog_change_log_enabled():
+        log_product_changes(db, new_stock)
+    logger.info(f"Reduced stock for products {sorted(new_stock)}")
+    return new_stock
+
+def record_customer_purchase(db: Session, customer_id: int, amount: Decimal, day: date) -> None:
+    """
+    Add one visit to the customer's CUSTOMER_STATS row, creating it on the first
+    purchase. Runs inside the caller's transaction and does not commit.
+    """
+    bump = (
+        sqlalchemy_update(CustomerStats)
+        .where(CustomerStats.customer_id == customer_id)
+        .values(
+            lifetime_spend=CustomerStats.lifetime_spend + amount,
+            visit_count=CustomerStats.visit_count + 1,
+            first_visit=case((or_(CustomerStats.first_visit.is_(None), CustomerStats.first_visit > day), day), else_=CustomerStats.first_visit),
+            last_visit=case((or_(CustomerStats.last_visit.is_(None), CustomerStats.last_visit < day), day), else_=CustomerStats.last_visit),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(bump).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.add(CustomerStats(customer_id=customer_id, lifetime_spend=amount, visit_count=1, first_visit=day, last_visit=day))
+    except IntegrityError:
+        # Another checkout created the row first
+        db.execute(bump)
+
+def get_transaction(db: Session, transaction_id: int,
+                    fields: Optional[Sequence[str]] = None) -> Optional[Union[Transaction, TransactionArchive, Record]]:
+    """Hot table first, then the archive (archived transactions are read-only); the id tells the shard."""
+    with shard_router.session(db, shard_router.for_transaction(transaction_id)) as shard:
+        if fields is not None:
+            fields = _with_keys(fields, "id")
+            return (get_record(shard, Transaction, TransactionInDB, transaction_id, fields)
+                    or get_record(shard, TransactionArchive, TransactionInDB, transaction_id, fields))
+        return get_entity_by_id(shard, Transaction, transaction_id) or shard.get(TransactionArchive, transaction_id)
+
+def get_transactions(db: Session, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None,
+                     **filters) -> List[Record]:
+    """
+    Transactions ordered by id. With a branch_id only the branch's shards are
+    read (its own, and shard 0 for its rows from before sharding); otherwise
+    every shard. Each shard read returns its first skip + limit rows, in
+    parallel, and the sorted pages are merged. Rows always carry the id
+    (needed to merge), whatever `fields` asks for.
+    """
+    fields = _with_keys(fields, "id")
+    shards = shard_router.branch_shards(filters["branch_id"]) if "branch_id" in filters else range(len(shard_router))
+    if len(shards) == 1:
+        with shard_router.session(db, shards[0]) as shard:
+            return _transactions_page(shard, skip, limit, filters, fields)
+    metrics.inc("shards.scatter_reads")
+    pages = shard_router.scatter(db, lambda shard: _transactions_page(shard, 0, skip + limit, filters, fields), shards)
+    return list(heapq.merge(*pages, key=lambda t: t.id))[skip:skip + limit]
+
+def _transactions_page(db: Session, skip: int, limit: int, filters: Dict[str, Any],
+                       fields: Optional[Sequence[str]] = None) -> List[Record]:
+    """
+    Transactions from the hot table; when a date range starts at or before the
+    newest archived day, archived transactions are merged in (ordered by id).
+    Archived rows have no version column (the response shows the default).
+    """
+    hot = Transaction.__table__
+    query = select(*list_columns(Transaction, TransactionInDB, fields)).where(*_filter_clauses(Transaction, filters))
+    start = filters.get("dateOfTransaction__gte", filters.get("dateOfTransaction"))
+    if not reaches_archive(db, start):
+        return records(db.execute(query.order_by(hot.c.id).offset(skip).limit(limit)))
+
+    metrics.inc("archive.reads")
+    archive = TransactionArchive.__table__
+    archived = select(*list_columns(TransactionArchive, TransactionInDB, fields)).where(*_filter_clauses(TransactionArchive, filters))
+    hot_rows = records(db.execute(query.order_by(hot.c.id).limit(skip + limit)))
+    archived_rows = records(db.execute(archived.order_by(archive.c.id).limit(skip + limit)))
+    merged = heapq.merge(archived_rows, hot_rows, key=lambda t: t.id)
+    return list(merged)[skip:skip + limit]
+
+HistoryKey = Tuple[date, time, int]
+
+def _history_query(model: Any, customer_id: int, after: Optional[HistoryKey], limit: int):
+    query = select(*list_columns(model, TransactionInDB)).where(model.customer_id == customer_id)
+    if after is not None:
+        day, at, last_id = after
+        query = query.where(or_(
+            model.dateOfTransaction < day,
+            and_(model.dateOfTransaction == day, or_(
+                model.timeOfTransaction < at,
+                and_(model.timeOfTransaction == at, model.id < last_id),
+            )),
+        ))
+    return query.order_by(
+        model.dateOfTransaction.desc(), model.timeOfTransaction.desc(), model.id.desc()
+    ).limit(limit)
+
+def _history_key(transaction: Any) -> HistoryKey:
+    return (transaction.dateOfTransaction, transaction.timeOfTransaction, transaction.id)
+
+def get_customer_history(db: Session, customer_id: int, limit: int = 50,
+                         after: Optional[HistoryKey] = None) -> Tuple[List[Any], Optional[HistoryKey]]:
+    """
+    One page of a customer's transactions, newest first. Keyset pagination on
+    (date, time, id), which the customer/date/time index serves directly;
+    returns the page and the key to pass as `after` for the next one.
+    A customer buys at any branch, so every shard is read (in parallel) and
+    the pages are merged.
+    """
+    pages = shard_router.scatter(db, lambda shard: _customer_history_rows(shard, customer_id, limit, after))
+    rows = list(heapq.merge(*pages, key=_history_key, reverse=True))[:limit + 1]
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], _history_key(rows[limit - 1])
+
+def _customer_history_rows(db: Session, customer_id: int, limit: int, after: Optional[HistoryKey]) -> List[Any]:
+    """Up to limit + 1 rows of one database, newest first. The archive is only read once the page reaches back to archived days."""
+    rows = records(db.execute(_history_query(Transaction, customer_id, after, limit + 1)))
+    newest_archived = archived_through(db)
+    if newest_archived is not None and (len(rows) <= limit or rows[-1].dateOfTransaction <= newest_archived):
+        archived = records(db.execute(_history_query(TransactionArchive, customer_id, after, limit + 1)))
+        rows = sorted(rows + list(archived), key=_history_key, reverse=True)[:limit + 1]
+    return rows
+
+def get_customer_stats(db: Session, customer_id: int) -> Optional[CustomerStats]:
+    return db.get(CustomerStats, customer_id)
+
+def get_membership_candidates(db: Session, skip: int = 0, limit: int = 100) -> List[CustomerStats]:
+    """Non-members the last RFM pass flagged for membership, best customers first."""
+    query = (
+        select(CustomerStats)
+        .where(CustomerStats.membership_candidate.is_(True))
+        .order_by(CustomerStats.lifetime_spend.desc(), CustomerStats.customer_id)
+    )
     return list(db.execute(query.offset(skip).limit(limit)).scalars().all())
 
 def update_transaction(db: Session, transaction_id: int, updates: Dict[str, Any]) -> Optional[Transaction]:
-    return update_entity(db, Transaction, transaction_id, updates)
+    with shard_router.session(db, shard_router.for_transaction(transaction_id)) as shard:
+        updated = update_entity(shard, Transaction, transaction_id, updates)
+    closed_days.invalidate()
+    return updated
 
 def delete_transaction(db: Session, transaction_id: int) -> bool:
-    return delete_entity(db, Transaction, transaction_id)
-
-def get_transaction_details(db: Session, transaction_id: int) -> List[TransactionDetail]:
-    query = select(TransactionDetail).where(TransactionDetail.transaction_id == transaction_id)
-    return db.execute(query).scalars().all()
-
-# Legacy compatibility helper (shoud be removed later)
-def execute_read(query: str, params: Optional[tuple] = None, theModel: Optional[Type[BaseModel]] = None):
-    """
-    DEPRECATED: Use ORM methods instead.
-    Simple wrapper to maintain compatibility while migrating routers.
-    """
-    logger.warning(f"DEPRECATED: execute_read used with query: {query}")
-    # This is a temporary hack for auth.py until it's fully migrated
-    # It only supports simple "SELECT * FROM TABLE WHERE email = %s"
-    db = SessionLocal()
-    try:
-        import re
-        table_match = re.search(r"FROM (\w+)", query, re.IGNORECASE)
-        email_match = re.search(r"email = %s", query, re.IGNORECASE)
-        
-        if table_match and email_match and params:
-            table_name = table_match.group(1).upper()
-            email = params[0]
-            
-            if table_name == "CUSTOMERS":
-                stmt = select(Customer).where(Customer.email == email)
-                result = db.execute(stmt).scalar_one_or_none()
-            elif table_name == "EMPLOYEES":
-                stmt = select(Employee).where(Employee.email == email)
-                result = db.execute(stmt).scalar_one_or_none()
-            else:
-                return None
-                
-            if result and theModel:
-                return theModel.model_validate(result)
-            return result
-        return None
-    finally:
-        db.close()
+    with shard_router.session(db, shard_router.for_transaction(transaction_id)) as shard:
+        deleted = delete_entity(shard, Transaction, transaction_id)
+    closed_days.invalidate()
+    return deleted
+
+def get_transaction_details(db: Session, transaction_id: int) -> List[Union[TransactionDetail, TransactionDetailArchive]]:
+    with shard_router.session(db, shard_router.for_transaction(transaction_id)) as shard:
+        query = select(TransactionDetail).where(TransactionDetail.transaction_id == transaction_id)
+        details = shard.execute(query).scalars().all()
+        if details:
+            return details
+        query = select(TransactionDetailArchive).where(TransactionDetailArchive.transaction_id == transaction_id)
+        return shard.execute(query).scalars().all()
@@ -4,21 +4,45 @@
  and tables, and also to insert, update, delete, and query data from the database without using pure SQL.
 '''
 
-from sqlalchemy import create_engine
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+from sqlalchemy import Column, ForeignKey, Index, MetaData, Table, create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
-import os
-from dotenv import load_dotenv
+from src.config import get_settings
 
-# Load environment variables
-load_dotenv()
+T = TypeVar("T")
 
 # Database configuration
-DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set in environment variables. Please check your .env file.")
+settings = get_settings()
+DATABASE_URL = settings.database_url
+
+def _engine_kwargs(url: str) -> dict:
+    """Pool options for the engine; SQLite uses its own pool classes without sizing."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow}
+
+def enable_wal(engine) -> None:
+    """
+    SQLite in WAL mode (branch nodes): readers don't block the writer, and
+    synchronous=NORMAL only syncs at checkpoints, which keeps checkout commits fast.
+    """
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
 
 # Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+engine = create_engine(DATABASE_URL, pool_pre_ping=True, **_engine_kwargs(DATABASE_URL))
+if settings.node_mode == "branch" and engine.dialect.name == "sqlite":
+    enable_wal(engine)
 
 # SessionLocal class for dependency injection
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -28,10 +52,189 @@ class Base(DeclarativeBase):
     pass
 
 # function to get DB session
+# Session of the batch lane running the current request (src/services/batch.py)
+request_session: ContextVar[Optional[Session]] = ContextVar("request_session", default=None)
+
 def get_db():
     """Dependency to get DB session"""
+    shared = request_session.get()
+    if shared is not None:
+        # a batched sub-request: the batch closes the session once it is done
+        yield shared
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# --- Transaction shards ---
+# Each shard owns a range of transaction ids, so an id alone tells which shard
+# holds it: shard k assigns ids k * SHARD_ID_SPAN + 1 ... (k + 1) * SHARD_ID_SPAN.
+SHARD_ID_SPAN = 100_000_000
+# Tables stored on every shard; customers, products, stats... stay in DATABASE_URL.
+# A branch node's pushed sales are received on the branch's shard, together with their receipts
+SHARDED_TABLES = ("TRANSACTIONS", "TRANSACTION_DETAILS", "TRANSACTIONS_ARCHIVE", "TRANSACTION_DETAILS_ARCHIVE",
+                  "SYNC_RECEIPTS")
+
+
+def shard_urls(spec: str) -> List[str]:
+    return [url.strip() for url in spec.split(",") if url.strip()]
+
+
+def parse_shard_map(spec: str) -> Dict[int, int]:
+    """"1:0,7:2" -> {1: 0, 7: 2}"""
+    mapping = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        branch, _, shard = item.partition(":")
+        mapping[int(branch)] = int(shard)
+    return mapping
+
+
+class ShardRouter:
+    """
+    Maps branch_id to the database holding that branch's transactions.
+
+    Branch-scoped writes run on one shard (session()), customer-scoped and
+    global reads on all of them in parallel (scatter()); the caller merges the
+    per-shard results. Branch reads use branch_shards(): a branch's
+    transactions from before sharding stay in shard 0, so with legacy_reads
+    shard 0 is read too. With a single shard every call uses the request's own
+    session, exactly as without sharding.
+    """
+
+    def __init__(self):
+        self.engines: List = []
+        self.factories: List[sessionmaker] = []
+        self.branch_map: Dict[int, int] = {}
+        self.legacy_reads = True
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def configure(self, urls: Sequence[str], branch_map: Optional[Dict[int, int]] = None,
+                  legacy_reads: bool = True) -> None:
+        urls = list(urls) or [DATABASE_URL]
+        self.engines, self.factories = [], []
+        for url in urls:
+            if url == DATABASE_URL:
+                self.engines.append(engine)
+                self.factories.append(SessionLocal)
+            else:
+                shard_engine = create_engine(url, pool_pre_ping=True, **_engine_kwargs(url))
+                self.engines.append(shard_engine)
+                self.factories.append(sessionmaker(autocommit=False, autoflush=False, bind=shard_engine))
+        self.branch_map = dict(branch_map or {})
+        self.legacy_reads = legacy_reads
+        if any(not 0 <= shard < len(urls) for shard in self.branch_map.values()):
+            raise RuntimeError(f"TRANSACTION_SHARD_MAP refers to a shard beyond the {len(urls)} configured")
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self._pool = ThreadPoolExecutor(max_workers=4 * len(urls), thread_name_prefix="shard") if len(urls) > 1 else None
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def for_branch(self, branch_id: Optional[int]) -> int:
+        if branch_id is None or len(self.engines) == 1:
+            return 0
+        return self.branch_map.get(branch_id, branch_id % len(self.engines))
+
+    def branch_shards(self, branch_id: Optional[int]) -> List[int]:
+        """Shards to read for a branch: its own, and shard 0 while pre-sharding rows may be there."""
+        shard = self.for_branch(branch_id)
+        return [0, shard] if shard and self.legacy_reads else [shard]
+
+    def shard_of(self, session: Session) -> int:
+        """Index of the shard a session (e.g. one passed to a scatter() function) is bound to."""
+        if len(self.engines) == 1:
+            return 0
+        bind = session.get_bind()
+        return next(i for i, shard_engine in enumerate(self.engines) if shard_engine is bind)
+
+    def for_transaction(self, transaction_id: int) -> int:
+        return min(max(transaction_id - 1, 0) // SHARD_ID_SPAN, len(self.engines) - 1)
+
+    @contextmanager
+    def session(self, db: Session, shard: int) -> Iterator[Session]:
+        """The request's own session if it is bound to the shard (or nothing is sharded), otherwise a new one."""
+        if len(self.engines) == 1 or db.get_bind() is self.engines[shard]:
+            yield db
+            return
+        session = self.factories[shard]()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def _run_on(self, shard: int, fn: Callable[[Session], T]) -> T:
+        session = self.factories[shard]()
+        try:
+            return fn(session)
+        finally:
+            session.close()
+
+    def scatter(self, db: Session, fn: Callable[[Session], T], shards: Optional[Sequence[int]] = None) -> List[T]:
+        """fn(session) on every shard (or on `shards`), in parallel; results in shard order."""
+        shards = range(len(self.engines)) if shards is None else shards
+        if len(shards) == 1:
+            with self.session(db, shards[0]) as session:
+                return [fn(session)]
+        own = next((i for i in shards if db.get_bind() is self.engines[i]), None)
+        futures = {i: self._pool.submit(self._run_on, i, fn) for i in shards if i != own}
+        local = fn(db) if own is not None else None
+        return [local if i == own else futures[i].result() for i in shards]
+
+
+def shard_metadata() -> MetaData:
+    """
+    The sharded tables as created on a shard: only the foreign keys between
+    them (branches, customers and products live in DATABASE_URL), SQLite
+    AUTOINCREMENT so the id range can be set.
+    """
+    import src.model.orm  # noqa: F401  (registers the tables on Base.metadata)
+
+    def copy(column: Column) -> Column:
+        fks = [ForeignKey(fk.target_fullname, ondelete=fk.ondelete) for fk in column.foreign_keys
+               if fk.column.table.name in SHARDED_TABLES]
+        return Column(column.name, column.type, *fks, primary_key=column.primary_key, nullable=column.nullable,
+                      server_default=column.server_default,
+                      autoincrement=column.table.name == "TRANSACTIONS" and column.primary_key)
+
+    metadata = MetaData()
+    for name in SHARDED_TABLES:
+        table = Base.metadata.tables[name]
+        Table(
+            name, metadata,
+            *[copy(c) for c in table.columns],
+            *[Index(index.name, *[c.name for c in index.columns]) for index in table.indexes],
+            sqlite_autoincrement=name == "TRANSACTIONS",
+            **table.kwargs,
+        )
+    return metadata
+
+
+def prepare_shard(shard_engine, shard: int) -> None:
+    """Create the sharded tables (if missing) and start the shard's ids at its range. Idempotent."""
+    shard_metadata().create_all(shard_engine)
+    first_id = shard * SHARD_ID_SPAN
+    if not first_id:
+        return
+    with shard_engine.begin() as conn:
+        if shard_engine.dialect.name == "sqlite":
+            current = conn.exec_driver_sql("SELECT seq FROM sqlite_sequence WHERE name = 'TRANSACTIONS'").scalar()
+            if current is None:
+                conn.exec_driver_sql(f"INSERT INTO sqlite_sequence (name, seq) VALUES ('TRANSACTIONS', {first_id})")
+            elif current < first_id:
+                conn.exec_driver_sql(f"UPDATE sqlite_sequence SET seq = {first_id} WHERE name = 'TRANSACTIONS'")
+        else:
+            # MySQL never lowers AUTO_INCREMENT below the current maximum id
+            conn.exec_driver_sql(f"ALTER TABLE TRANSACTIONS AUTO_INCREMENT = {first_id + 1}")
+
+
+shard_router = ShardRouter()
+shard_router.configure(
+    # on a branch node the shard settings describe the central database (src/jobs/sync.py)
+    [] if settings.node_mode == "branch" else shard_urls(settings.transaction_shard_urls),
+    parse_shard_map(settings.transaction_shard_map),
+    settings.transaction_shard_legacy_reads,
+)
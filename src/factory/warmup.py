@@ -0,0 +1,90 @@
+'''
+Startup warm-up for freshly started workers.
+
+Run before the worker reports itself ready so the first real request does not
+pay for opening database connections, configuring the ORM mappers or compiling
+the SQL of the hot list queries.
+
+The registered steps (filling the in-memory caches) run as part of the warm-up
+with WARMUP_ON_STARTUP. Without it the worker is ready at once and the steps run
+in a background thread; until a cache is loaded its users go to the database.
+'''
+
+import logging
+import threading
+import time
+from typing import Callable, List
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from src.config import get_settings
+from src.database import engine, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Extra warm-up steps (cache priming etc.) registered by other modules
+_warmup_steps: List[Callable[[], None]] = []
+
+
+def register_warmup_step(step: Callable[[], None]) -> Callable[[], None]:
+    """Register a callable to run during warm-up. Usable as a decorator."""
+    _warmup_steps.append(step)
+    return step
+
+
+def run_warmup_steps() -> None:
+    for step in list(_warmup_steps):
+        step()
+
+
+def warm_up_in_background() -> threading.Thread:
+    """Run the registered steps in a daemon thread (the worker does not wait for them)."""
+    thread = threading.Thread(target=run_warmup_steps, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def open_pool_connections(count: int) -> None:
+    """Check out `count` connections at once so the pool holds them open."""
+    connections = []
+    try:
+        for _ in range(count):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            connections.append(conn)
+    finally:
+        # Returning them to the pool keeps the sockets alive for later requests
+        for conn in connections:
+            conn.close()
+
+
+def compile_hot_statements() -> None:
+    """Run the hot list queries once so their compiled SQL is cached on the engine."""
+    from src.crud import CRUD
+
+    db = SessionLocal()
+    try:
+        CRUD.get_branches(db, limit=1)
+        CRUD.get_products(db, limit=1)
+        CRUD.get_products(db, limit=1, category="")
+        CRUD.get_customers(db, limit=1, email="")
+        CRUD.get_employees(db, limit=1, email="")
+        CRUD.get_transactions(db, limit=1)
+    finally:
+        db.close()
+
+
+def warm_up() -> float:
+    """Run every warm-up step and return the time it took in seconds."""
+    settings = get_settings()
+    start = time.perf_counter()
+
+    configure_mappers()
+    open_pool_connections(settings.db_pool_size)
+    compile_hot_statements()
+    run_warmup_steps()
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Warm-up finished in {elapsed * 1000:.1f} ms")
+    return elapsed
@@ -0,0 +1,119 @@
+'''
+Moves closed months of TRANSACTIONS / TRANSACTION_DETAILS to the archive
+tables, so the hot tables only hold the current month and the last
+ARCHIVE_KEEP_MONTHS full months.
+
+Rows are moved in chunks of ARCHIVE_CHUNK_SIZE transactions, each chunk in its
+own short database transaction (copy headers and details, delete them from the
+hot tables, commit), so locks are held for milliseconds and an interrupted run
+leaves no duplicates; the next run continues where it stopped.
+
+Reads stay transparent: get_transaction falls back to the archive by id, and
+date-range reads (transaction list, customer history, sales heatmap) also query
+the archive when the range reaches back to archived dates (reaches_archive).
+Archived rows are read-only; update and delete only see the hot tables.
+
+Usage:
+    python scripts/archive_transactions.py
+'''
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from src.config import get_settings
+from src.model.orm import Transaction, TransactionArchive, TransactionDetail, TransactionDetailArchive
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_COLUMNS = ("id", "branch_id", "customer_id", "total_amount", "dateOfTransaction", "timeOfTransaction", "total")
+DETAIL_COLUMNS = ("transaction_id", "product_id", "quantity", "price")
+
+
+@dataclass
+class ArchiveResult:
+    cutoff: date
+    transactions: int
+    chunks: int
+    seconds: float
+
+
+def archive_cutoff(today: date, keep_months: int) -> date:
+    """First day that stays hot: the 1st of the month keep_months before today's month."""
+    months = today.year * 12 + today.month - 1 - keep_months
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def archived_through(db: Session) -> Optional[date]:
+    """Latest date in the archive (None if it is empty); one index lookup."""
+    return db.execute(select(func.max(TransactionArchive.dateOfTransaction))).scalar()
+
+
+def reaches_archive(db: Session, start: Optional[date]) -> bool:
+    """Whether a date range starting at `start` can contain archived transactions."""
+    if start is None:
+        return False
+    newest = archived_through(db)
+    return newest is not None and start <= newest
+
+
+def archive_chunk(db: Session, cutoff: date, chunk_size: int) -> int:
+    """Move up to chunk_size transactions dated before cutoff. Returns how many were moved."""
+    ids = list(db.execute(
+        select(Transaction.id)
+        .where(Transaction.dateOfTransaction < cutoff)
+        .order_by(Transaction.id)
+        .limit(chunk_size)
+    ).scalars())
+    if not ids:
+        return 0
+    try:
+        db.execute(insert(TransactionArchive).from_select(
+            TRANSACTION_COLUMNS,
+            select(*(getattr(Transaction, c) for c in TRANSACTION_COLUMNS)).where(Transaction.id.in_(ids)),
+        ))
+        db.execute(insert(TransactionDetailArchive).from_select(
+            DETAIL_COLUMNS,
+            select(*(getattr(TransactionDetail, c) for c in DETAIL_COLUMNS)).where(TransactionDetail.transaction_id.in_(ids)),
+        ))
+        db.execute(delete(TransactionDetail).where(TransactionDetail.transaction_id.in_(ids)))
+        db.execute(delete(Transaction).where(Transaction.id.in_(ids)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(ids)
+
+
+def run_archive_job(db: Session, keep_months: Optional[int] = None, chunk_size: Optional[int] = None,
+                    pause_seconds: Optional[float] = None, today: Optional[date] = None) -> ArchiveResult:
+    settings = get_settings()
+    keep_months = settings.archive_keep_months if keep_months is None else keep_months
+    chunk_size = chunk_size or settings.archive_chunk_size
+    pause_seconds = settings.archive_pause_seconds if pause_seconds is None else pause_seconds
+    cutoff = archive_cutoff(today or date.today(), keep_months)
+
+    started = time.perf_counter()
+    moved = chunks = 0
+    while True:
+        count = archive_chunk(db, cutoff, chunk_size)
+        if not count:
+            break
+        moved += count
+        chunks += 1
+        metrics.inc("archive_job.transactions", count)
+        if count < chunk_size:
+            break
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    result = ArchiveResult(cutoff=cutoff, transactions=moved, chunks=chunks, seconds=time.perf_counter() - started)
+    metrics.inc("archive_job.runs")
+    logger.info(f"Archive job: moved {moved} transactions dated before {cutoff} in {chunks} chunks, {result.seconds:.1f}s")
+    return result
@@ -0,0 +1,350 @@
+'''
+Columnar export of the sales history for analytics.
+
+Streams TRANSACTIONS joined with TRANSACTION_DETAILS (and the archive tables)
+in chunks of EXPORT_CHUNK_SIZE rows into Parquet files, one row per line item
+with the product's name and category, partitioned Hive-style by month and
+branch:
+
+    <EXPORT_DIR>/month=2024-06/branch=3/part-<run>-<n>.parquet
+
+Every file keeps the typed dateOfTransaction and branch_id columns; the
+directory keys (month, branch) let readers skip partitions with filters.
+Daily partitions would hold a few hundred rows per branch, far below what
+Parquet handles well (each file carries its own footer and statistics).
+Rows are read in partition order, so each file is written in one go.
+
+Columns are typed (DECIMAL(10,2) for money, DATE, TIME) and compressed with
+zstd, so pandas / polars / DuckDB read them directly:
+
+    pd.read_parquet("exports/transactions")
+
+Exports are incremental: the highest transaction id written is kept in
+<EXPORT_DIR>/_export_state.json and the next run only reads newer
+transactions. With transaction shards every shard is read in parallel and
+keeps its own high-water id (each shard has its own id range).
+
+Ids are handed out when a sale starts and become visible when it commits, so
+a sale still being committed can sit below ids that are already visible.
+A run therefore only exports up to the first gap in the ids, except below the
+highest id it saw at least EXPORT_SETTLE_SECONDS ago: gaps there are sales
+that were rolled back or deleted, not ones still to come. Files are
+written under a temporary name and renamed, and the state is only advanced
+once every file is complete, so an interrupted run is simply repeated. Edits to already exported transactions are not picked up;
+use a full export (--full) for that.
+
+pyarrow is optional (pip install pyarrow); without it the export raises
+ExportUnavailable and the rest of the API is unaffected.
+
+Usage:
+    python scripts/export_parquet.py
+'''
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import Session, aliased
+
+from src.config import get_settings
+from src.database import SHARD_ID_SPAN, shard_router
+from src.model.orm import Product, Transaction, TransactionArchive, TransactionDetail, TransactionDetailArchive
+from src.utils.metrics import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "_export_state.json"
+COMPRESSION = "zstd"
+# Partitions written to at once; older writers are closed (a later row for the same partition starts a new file)
+MAX_OPEN_WRITERS = 256
+
+
+class ExportUnavailable(RuntimeError):
+    pass
+
+
+@dataclass
+class ExportResult:
+    rows: int
+    transactions: int
+    files: int
+    bytes: int
+    high_water_id: int
+    seconds: float
+
+
+def arrow_schema():
+    if pa is None:
+        raise ExportUnavailable("Parquet export needs pyarrow (pip install pyarrow)")
+    money = pa.decimal128(10, 2)
+    return pa.schema([
+        ("transaction_id", pa.int64()),
+        ("dateOfTransaction", pa.date32()),
+        ("timeOfTransaction", pa.time64("us")),
+        ("branch_id", pa.int32()),
+        ("customer_id", pa.int32()),
+        ("total_amount", money),
+        ("total", money),
+        ("product_id", pa.int32()),
+        ("product_name", pa.string()),
+        ("category", pa.string()),
+        ("quantity", pa.int32()),
+        ("price", money),
+    ])
+
+
+def read_state(root: str) -> dict:
+    try:
+        with open(os.path.join(root, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"high_water_id": 0}
+
+
+def _high_water_ids(state: dict, shards: int) -> List[int]:
+    """Per shard; a state written before sharding has one id, which belongs to shard 0."""
+    per_shard = state.get("high_water_ids")
+    if per_shard is None:
+        per_shard = {"0": state["high_water_id"]}
+    # a shard not exported yet starts below its id range
+    return [per_shard.get(str(shard), shard * SHARD_ID_SPAN) for shard in range(shards)]
+
+
+def _max_id(db: Session) -> Optional[int]:
+    return max((i for i in (db.scalar(select(func.max(model.id))) for model in (Transaction, TransactionArchive))
+                if i is not None), default=None)
+
+
+def _contiguous_end(db: Session, start: int) -> int:
+    """Highest n such that every id in (start, n] is in TRANSACTIONS or TRANSACTIONS_ARCHIVE."""
+    def present(i):
+        return exists().where(Transaction.id == i) | exists().where(TransactionArchive.id == i)
+
+    if not db.scalar(select(present(start + 1))):
+        return start
+    ends = []
+    for model in (Transaction, TransactionArchive):
+        row = aliased(model)
+        ends.append(db.scalar(select(func.min(row.id)).where(row.id > start, ~present(row.id + 1))))
+    return min(end for end in ends if end is not None)
+
+
+def _safe_high_water(db: Session, after_id: int, probe: Optional[List[float]], settle_seconds: float,
+                     now: float) -> Tuple[int, Optional[List[float]]]:
+    """Highest id that can be exported, and the probe to keep for the next run.
+
+    The probe is [max id, time] of an earlier run; every id up to it has committed
+    (or never will) once it is settle_seconds old.
+    """
+    settled = after_id
+    if probe is not None and now - probe[1] >= settle_seconds:
+        settled = max(after_id, int(probe[0]))
+        probe = None
+    if probe is None:
+        max_id = _max_id(db)
+        probe = [max_id, now] if max_id is not None else None
+    return _contiguous_end(db, settled), probe
+
+
+def _write_state(root: str, state: dict) -> None:
+    path = os.path.join(root, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2, default=str)
+    os.replace(path + ".tmp", path)
+
+
+def _line_items_stmt(header, detail, after_id: int, up_to_id: int):
+    # Product names are added from PRODUCTS afterwards: shards have no PRODUCTS table
+    return (
+        select(
+            header.id, header.dateOfTransaction, header.timeOfTransaction, header.branch_id, header.customer_id,
+            header.total_amount, header.total, detail.product_id, detail.quantity, detail.price,
+        )
+        .outerjoin(detail, detail.transaction_id == header.id)
+        .where(header.id > after_id, header.id <= up_to_id)
+        .order_by(header.dateOfTransaction, header.branch_id, header.id)
+    )
+
+
+class _PartitionWriters:
+    """Open ParquetWriters by (month, branch), each writing to a temporary file. Shared by the shard readers."""
+
+    def __init__(self, root: str, run_id: str, schema):
+        self.root = root
+        self.run_id = run_id
+        self.schema = schema
+        self.writers: Dict[Tuple, "pq.ParquetWriter"] = {}
+        self.pending: List[str] = []
+        self.sequence = 0
+        self._lock = threading.Lock()
+
+    def write(self, key: Tuple, table) -> None:
+        with self._lock:
+            self._write(key, table)
+
+    def _write(self, key: Tuple, table) -> None:
+        writer = self.writers.pop(key, None)
+        if writer is None:
+            if len(self.writers) >= MAX_OPEN_WRITERS:
+                oldest = next(iter(self.writers))
+                self.writers.pop(oldest).close()
+            month, branch_id = key
+            directory = os.path.join(self.root, f"month={month}", f"branch={'none' if branch_id is None else branch_id}")
+            os.makedirs(directory, exist_ok=True)
+            self.sequence += 1
+            path = os.path.join(directory, f"part-{self.run_id}-{self.sequence}.parquet")
+            writer = pq.ParquetWriter(path + ".tmp", self.schema, compression=COMPRESSION)
+            self.pending.append(path)
+        self.writers[key] = writer  # most recently used last
+        writer.write_table(table)
+
+    def close(self) -> Tuple[int, int]:
+        """Close everything and publish the files. Returns (files, bytes)."""
+        for writer in self.writers.values():
+            writer.close()
+        self.writers.clear()
+        size = 0
+        for path in self.pending:
+            os.replace(path + ".tmp", path)
+            size += os.path.getsize(path)
+        return len(self.pending), size
+
+    def discard(self) -> None:
+        for writer in self.writers.values():
+            writer.close()
+        for path in self.pending:
+            if os.path.exists(path + ".tmp"):
+                os.remove(path + ".tmp")
+
+
+def export_transactions(db: Session, root: Optional[str] = None, chunk_size: Optional[int] = None,
+                        full: bool = False, settle_seconds: Optional[float] = None) -> ExportResult:
+    schema = arrow_schema()
+    settings = get_settings()
+    root = root or settings.export_dir
+    chunk_size = chunk_size or settings.export_chunk_size
+    settle_seconds = settings.export_settle_seconds if settle_seconds is None else settle_seconds
+    started = time.perf_counter()
+
+    os.makedirs(root, exist_ok=True)
+    if full:
+        # Only remove what the export itself wrote
+        for name in os.listdir(root):
+            if name.startswith("month="):
+                shutil.rmtree(os.path.join(root, name))
+        if os.path.exists(os.path.join(root, STATE_FILE)):
+            os.remove(os.path.join(root, STATE_FILE))
+    state = read_state(root)
+    after_ids = _high_water_ids(state, len(shard_router))
+    probes = state.get("probes", {})
+    now = time.time()
+    names = {product_id: (name, category)
+             for product_id, name, category in db.execute(select(Product.id, Product.name, Product.category))}
+
+    writers = _PartitionWriters(root, uuid.uuid4().hex[:12], schema)
+
+    def export_shard(shard: Session) -> Tuple[int, int, int, Optional[List[float]]]:
+        """(rows, transactions, high-water id, probe) of one shard."""
+        shard_no = shard_router.shard_of(shard)
+        after_id = after_ids[shard_no]
+        high_water, probe = _safe_high_water(shard, after_id, probes.get(str(shard_no)), settle_seconds, now)
+        rows = transactions = 0
+        for header, detail in ((TransactionArchive, TransactionDetailArchive), (Transaction, TransactionDetail)):
+            result = shard.connection().execute(
+                _line_items_stmt(header, detail, after_id, high_water).execution_options(yield_per=chunk_size)
+            )
+            for chunk in result.partitions():
+                columns = list(zip(*chunk))
+                products = [names.get(product_id, (None, None)) for product_id in columns[7]]
+                columns[8:8] = list(zip(*products))
+                table = pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+                )
+                partitions: Dict[Tuple, List[int]] = {}
+                for i, (day, branch_id) in enumerate(zip(columns[1], columns[3])):
+                    partitions.setdefault((f"{day:%Y-%m}", branch_id), []).append(i)
+                for key, indices in partitions.items():
+                    writers.write(key, table.take(pa.array(indices, type=pa.int32())))
+                rows += len(chunk)
+                transactions += len(set(columns[0]))
+            result.close()
+        return rows, transactions, high_water, probe
+
+    try:
+        per_shard = shard_router.scatter(db, export_shard)
+        files, size = writers.close()
+    except Exception:
+        writers.discard()
+        raise
+
+    rows = sum(shard_rows for shard_rows, _, _, _ in per_shard)
+    transactions = sum(shard_transactions for _, shard_transactions, _, _ in per_shard)
+    high_water_ids = [high_water for _, _, high_water, _ in per_shard]
+    high_water = max(high_water_ids)
+    state = {"high_water_id": high_water, "high_water_ids": {str(shard): i for shard, i in enumerate(high_water_ids)},
+             "probes": {str(shard): probe for shard, (_, _, _, probe) in enumerate(per_shard) if probe is not None},
+             "exported_at": datetime.utcnow().isoformat(), "rows": rows, "files": files}
+    _write_state(root, state)
+    export = ExportResult(rows=rows, transactions=transactions, files=files, bytes=size,
+                          high_water_id=high_water, seconds=time.perf_counter() - started)
+    metrics.inc("export.rows", rows)
+    logger.info(f"Exported {rows} line items of {transactions} transactions to {files} files "
+                f"({size / 1e6:.1f} MB) in {export.seconds:.1f}s, high-water id {high_water}")
+    return export
+
+
+class ExportRunner:
+    """Runs at most one export at a time per process (for the admin endpoint)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+        self.last_result: Optional[ExportResult] = None
+        self.last_error: Optional[str] = None
+
+    def claim(self) -> bool:
+        with self._lock:
+            if self.running:
+                return False
+            self.running = True
+            return True
+
+    def run(self, full: bool = False) -> None:
+        from src.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.last_result = export_transactions(db, full=full)
+            self.last_error = None
+        except Exception as e:
+            logger.error(f"Export failed: {e}")
+            self.last_error = str(e)
+        finally:
+            db.close()
+            self.running = False
+
+    def status(self) -> dict:
+        return {
+            "available": pa is not None,
+            "running": self.running,
+            "state": read_state(get_settings().export_dir),
+            "last_result": asdict(self.last_result) if self.last_result else None,
+            "last_error": self.last_error,
+        }
+
+
+export_runner = ExportRunner()
@@ -0,0 +1,222 @@
+'''
+Reorder-point and demand forecasting batch job.
+
+Streams daily sales per (product, branch) from TRANSACTION_DETAILS joined to
+TRANSACTIONS (grouped by the database) in chunks, and folds every chunk into
+NumPy accumulators with np.bincount. Memory depends only on the number of
+products and branches, never on the length of the history. With transaction
+shards every shard is streamed in parallel into its own accumulators, which
+are added up.
+
+Per product and branch:
+    avg_daily_demand   mean units per day over the history window (zero days included)
+    moving_avg_demand  mean units per day over the last REORDER_WINDOW_DAYS
+    demand_std         standard deviation of daily demand
+    reorder_point      moving_avg * lead_time + z * std * sqrt(lead_time)
+
+Stock is kept per product, not per branch, so the suggested quantity is the
+product's shortfall (sum over branches of reorder point plus one review period
+of demand, minus stock) split between branches by their share of that need.
+
+The results replace the contents of REORDER_SUGGESTIONS in one transaction.
+
+Usage:
+    python scripts/reorder_suggestions.py
+'''
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from src.config import get_settings
+from src.database import shard_router
+from src.model.orm import Branch, Product, ReorderSuggestion, Transaction, TransactionDetail
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT batch when writing the results
+WRITE_BATCH_SIZE = 5000
+
+
+@dataclass
+class ReorderParameters:
+    history_days: int
+    window_days: int
+    lead_time_days: int
+    review_days: int
+    service_z: float
+    chunk_size: int
+
+    @classmethod
+    def from_settings(cls) -> "ReorderParameters":
+        settings = get_settings()
+        return cls(
+            history_days=settings.reorder_history_days,
+            window_days=settings.reorder_window_days,
+            lead_time_days=settings.reorder_lead_time_days,
+            review_days=settings.reorder_review_days,
+            service_z=settings.reorder_service_z,
+            chunk_size=settings.reorder_chunk_size,
+        )
+
+
+@dataclass
+class ReorderResult:
+    rows_read: int
+    suggestions: int
+    needing_reorder: int
+    seconds: float
+
+
+def _daily_sales_stmt(start: date, end: date):
+    """Units sold per product, branch and day in [start, end)."""
+    return (
+        select(
+            TransactionDetail.product_id,
+            Transaction.branch_id,
+            Transaction.dateOfTransaction,
+            func.sum(TransactionDetail.quantity),
+        )
+        .join(Transaction, Transaction.id == TransactionDetail.transaction_id)
+        .where(
+            Transaction.dateOfTransaction >= start,
+            Transaction.dateOfTransaction < end,
+            TransactionDetail.product_id.is_not(None),
+        )
+        .group_by(TransactionDetail.product_id, Transaction.branch_id, Transaction.dateOfTransaction)
+    )
+
+
+def _daily_sales_sums(db: Session, start: date, end: date, params: ReorderParameters, window_start_day: int,
+                      max_product: int, branch_slot: np.ndarray, slots: int) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    """Stream one database's daily sales into (rows read, total, total of squares, recent window) by dense key."""
+    size = (max_product + 1) * slots
+    total = np.zeros(size)
+    total_sq = np.zeros(size)
+    recent = np.zeros(size)
+    rows_read = 0
+
+    # Core connection: plain tuples, no ORM result processing per row
+    result = db.connection().execute(_daily_sales_stmt(start, end).execution_options(yield_per=params.chunk_size))
+    for chunk in result.partitions():
+        rows_read += len(chunk)
+        product_ids, branches, days, quantities = zip(*chunk)
+        pid = np.fromiter(product_ids, dtype=np.int64, count=len(chunk))
+        bid = np.fromiter((b or 0 for b in branches), dtype=np.int64, count=len(chunk))
+        day = np.fromiter((d.toordinal() for d in days), dtype=np.int64, count=len(chunk)) - start.toordinal()
+        qty = np.fromiter(quantities, dtype=np.float64, count=len(chunk))
+
+        # Skip products/branches created while the job was running
+        known = (pid <= max_product) & (bid < len(branch_slot))
+        pid, bid, day, qty = pid[known], bid[known], day[known], qty[known]
+        keys = pid * slots + branch_slot[bid]
+
+        total += np.bincount(keys, weights=qty, minlength=size)
+        total_sq += np.bincount(keys, weights=qty * qty, minlength=size)
+        in_window = day >= window_start_day
+        recent += np.bincount(keys[in_window], weights=qty[in_window], minlength=size)
+    result.close()
+    return rows_read, total, total_sq, recent
+
+
+def compute_suggestions(db: Session, params: Optional[ReorderParameters] = None, today: Optional[date] = None):
+    """
+    Run the aggregation and return (rows_read, columns) where columns is a dict
+    of equally long arrays, one entry per (product, branch) with sales.
+    """
+    params = params or ReorderParameters.from_settings()
+    end = today or date.today()
+    start = end - timedelta(days=params.history_days)
+    window_start_day = params.history_days - params.window_days
+
+    # Dense key = product_id * slots + branch slot (slot 0 is "no branch")
+    max_product = db.execute(select(func.max(Product.id))).scalar() or 0
+    branch_ids = np.array(sorted(db.execute(select(Branch.id)).scalars()), dtype=np.int64)
+    branch_slot = np.zeros((branch_ids.max() if len(branch_ids) else 0) + 1, dtype=np.int64)
+    branch_slot[branch_ids] = np.arange(1, len(branch_ids) + 1)
+    slots = len(branch_ids) + 1
+
+    sums = shard_router.scatter(db, lambda shard: _daily_sales_sums(
+        shard, start, end, params, window_start_day, max_product, branch_slot, slots))
+    rows_read = sum(rows for rows, _, _, _ in sums)
+    total, total_sq, recent = (np.sum(arrays, axis=0) for arrays in zip(*(s[1:] for s in sums)))
+
+    keys = np.nonzero(total)[0]
+    product_of_key = keys // slots
+    slot_of_key = keys % slots
+    branch_of_slot = np.concatenate(([0], branch_ids))
+
+    mean = total[keys] / params.history_days
+    std = np.sqrt(np.maximum(total_sq[keys] / params.history_days - mean * mean, 0.0))
+    moving_avg = recent[keys] / params.window_days
+    reorder_point = moving_avg * params.lead_time_days + params.service_z * std * np.sqrt(params.lead_time_days)
+
+    # Product level shortfall, shared between branches by their need
+    stock = np.zeros(max_product + 1)
+    for product_id, product_stock in db.execute(select(Product.id, Product.stock)):
+        if product_id <= max_product:
+            stock[product_id] = product_stock or 0
+    need = reorder_point + moving_avg * params.review_days
+    product_need = np.bincount(product_of_key, weights=need, minlength=max_product + 1)
+    shortfall = np.maximum(product_need - stock, 0.0)
+    below_reorder_point = stock < np.bincount(product_of_key, weights=reorder_point, minlength=max_product + 1)
+    share = np.divide(need, product_need[product_of_key], out=np.zeros_like(need), where=product_need[product_of_key] > 0)
+    suggested = np.where(below_reorder_point[product_of_key], np.ceil(shortfall[product_of_key] * share), 0).astype(np.int64)
+
+    columns = {
+        "product_id": product_of_key,
+        "branch_id": branch_of_slot[slot_of_key],
+        "avg_daily_demand": mean,
+        "moving_avg_demand": moving_avg,
+        "demand_std": std,
+        "reorder_point": reorder_point,
+        "suggested_quantity": suggested,
+    }
+    return rows_read, columns
+
+
+def write_suggestions(db: Session, columns: dict, computed_at: datetime) -> int:
+    """Replace the REORDER_SUGGESTIONS table with the computed rows (one transaction)."""
+    count = len(columns["product_id"])
+    names = list(columns)
+    lists = [columns[name].tolist() for name in names]
+    try:
+        db.execute(delete(ReorderSuggestion))
+        for start in range(0, count, WRITE_BATCH_SIZE):
+            batch = [
+                dict(zip(names, values), computed_at=computed_at)
+                for values in zip(*(column[start:start + WRITE_BATCH_SIZE] for column in lists))
+            ]
+            for row in batch:
+                row["branch_id"] = row["branch_id"] or None
+            db.execute(insert(ReorderSuggestion), batch)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return count
+
+
+def run_reorder_job(db: Session, params: Optional[ReorderParameters] = None, today: Optional[date] = None) -> ReorderResult:
+    started = time.perf_counter()
+    rows_read, columns = compute_suggestions(db, params, today)
+    count = write_suggestions(db, columns, datetime.utcnow())
+    result = ReorderResult(
+        rows_read=rows_read,
+        suggestions=count,
+        needing_reorder=int((columns["suggested_quantity"] > 0).sum()),
+        seconds=time.perf_counter() - started,
+    )
+    metrics.inc("reorder_job.runs")
+    logger.info(
+        f"Reorder job: {result.rows_read} daily rows -> {result.suggestions} suggestions "
+        f"({result.needing_reorder} need reorder) in {result.seconds:.1f}s"
+    )
+    return result
@@ -0,0 +1,242 @@
+'''
+Nightly RFM (recency, frequency, monetary) scoring of all customers.
+
+Reads one row per customer (CUSTOMERS left-joined to a GROUP BY over
+TRANSACTIONS and TRANSACTIONS_ARCHIVE) in chunks into NumPy arrays, scores each dimension 1-5 by
+quintile, assigns a segment and flags non-members in the best segments as
+membership candidates. With transaction shards the GROUP BY runs on every
+shard in parallel, the per-customer totals are combined, and CUSTOMERS is
+read on its own.
+
+Scores are written to CUSTOMER_STATS. The purchase aggregates in that table
+are maintained by checkout; the job only fills them in for customers that
+have no row yet (history from before the table existed), unless
+rebuild_aggregates is set, which also overwrites them with the exact values
+(e.g. after transactions were edited or deleted; run it when checkout is quiet).
+
+Usage:
+    python scripts/score_customers.py
+'''
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, func, insert, select, union_all, update
+from sqlalchemy.orm import Session
+
+from src.database import shard_router
+from src.model.orm import Customer, CustomerStats, Transaction, TransactionArchive
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 50_000
+WRITE_BATCH_SIZE = 5000
+
+# Segments checked in order, first match wins: (name, min R, min F, min M, max R)
+SEGMENTS = (
+    ("champions", 4, 4, 4, 5),
+    ("loyal", 1, 4, 1, 5),
+    ("at_risk", 1, 3, 1, 2),
+    ("new", 4, 1, 1, 5),
+    ("hibernating", 1, 1, 1, 2),
+    ("potential", 1, 1, 1, 5),
+)
+MEMBERSHIP_SEGMENTS = ("champions", "loyal")
+NO_PURCHASES = "no_purchases"
+
+
+@dataclass
+class RfmResult:
+    customers: int
+    scored: int
+    membership_candidates: int
+    seconds: float
+
+
+def quintile_scores(values: np.ndarray, higher_is_better: bool = True) -> np.ndarray:
+    """Score 1-5 by quintile; equal values always get the same score."""
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.int64)
+    edges = np.quantile(values, [0.2, 0.4, 0.6, 0.8])
+    bucket = np.searchsorted(edges, values, side="left")  # 0..4
+    return bucket + 1 if higher_is_better else 5 - bucket
+
+
+def assign_segments(r: np.ndarray, f: np.ndarray, m: np.ndarray) -> np.ndarray:
+    segment = np.full(len(r), "potential", dtype=object)
+    unassigned = np.ones(len(r), dtype=bool)
+    for name, min_r, min_f, min_m, max_r in SEGMENTS:
+        match = unassigned & (r >= min_r) & (r <= max_r) & (f >= min_f) & (m >= min_m)
+        segment[match] = name
+        unassigned &= ~match
+    return segment
+
+
+def _customer_totals_stmt():
+    history = union_all(*(
+        select(model.customer_id, model.total, model.dateOfTransaction).where(model.customer_id.is_not(None))
+        for model in (Transaction, TransactionArchive)
+    )).subquery()
+    return (
+        select(
+            history.c.customer_id,
+            func.count().label("visits"),
+            func.sum(history.c.total).label("spend"),
+            func.min(history.c.dateOfTransaction).label("first_visit"),
+            func.max(history.c.dateOfTransaction).label("last_visit"),
+        )
+        .group_by(history.c.customer_id)
+    )
+
+
+def _customer_rows_stmt():
+    totals = _customer_totals_stmt().subquery()
+    return (
+        select(Customer.id, Customer.membership, totals.c.visits, totals.c.spend,
+               totals.c.first_visit, totals.c.last_visit)
+        .outerjoin(totals, totals.c.customer_id == Customer.id)
+    )
+
+
+Totals = Tuple[int, object, Optional[date], Optional[date]]  # visits, spend, first and last visit
+
+
+def _shard_totals(db: Session) -> Dict[int, Totals]:
+    result = db.connection().execute(_customer_totals_stmt().execution_options(yield_per=CHUNK_SIZE))
+    totals = {row[0]: tuple(row[1:]) for chunk in result.partitions() for row in chunk}
+    result.close()
+    return totals
+
+
+def _sharded_customer_rows(db: Session):
+    """Like _customer_rows_stmt, with the totals of every shard combined: chunks of rows."""
+    totals: Dict[int, Totals] = {}
+    for shard_totals in shard_router.scatter(db, _shard_totals):
+        for customer_id, (n, spend, first_visit, last_visit) in shard_totals.items():
+            seen = totals.get(customer_id)
+            if seen is not None:
+                n, spend = n + seen[0], spend + seen[1]
+                first_visit, last_visit = min(first_visit, seen[2]), max(last_visit, seen[3])
+            totals[customer_id] = (n, spend, first_visit, last_visit)
+    result = db.connection().execute(select(Customer.id, Customer.membership).execution_options(yield_per=CHUNK_SIZE))
+    for chunk in result.partitions():
+        yield [(customer_id, membership, *totals.get(customer_id, (None, None, None, None)))
+               for customer_id, membership in chunk]
+    result.close()
+
+
+def _customer_rows(db: Session):
+    """Chunks of (id, membership, visits, spend, first visit, last visit), one row per customer."""
+    if len(shard_router) > 1:
+        yield from _sharded_customer_rows(db)
+        return
+    result = db.connection().execute(_customer_rows_stmt().execution_options(yield_per=CHUNK_SIZE))
+    yield from result.partitions()
+    result.close()
+
+
+def score_customers(db: Session, today: Optional[date] = None):
+    """Return a dict of equally long columns (arrays or lists), one entry per customer."""
+    today = today or date.today()
+    ids, members, visits, spend, first, last = [], [], [], [], [], []
+    for chunk in _customer_rows(db):
+        for customer_id, membership, n, total, first_visit, last_visit in chunk:
+            ids.append(customer_id)
+            members.append(bool(membership))
+            visits.append(n or 0)
+            spend.append(total or 0)
+            first.append(first_visit)
+            last.append(last_visit)
+
+    visits = np.array(visits, dtype=np.int64)
+    spend_arr = np.array([float(x) for x in spend], dtype=np.float64)
+    buyers = visits > 0
+    recency = np.array([(today - d).days if d else 0 for d in last], dtype=np.int64)
+
+    r = np.zeros(len(ids), dtype=np.int64)
+    f = np.zeros(len(ids), dtype=np.int64)
+    m = np.zeros(len(ids), dtype=np.int64)
+    r[buyers] = quintile_scores(recency[buyers], higher_is_better=False)
+    f[buyers] = quintile_scores(visits[buyers])
+    m[buyers] = quintile_scores(spend_arr[buyers])
+
+    segment = np.full(len(ids), NO_PURCHASES, dtype=object)
+    segment[buyers] = assign_segments(r[buyers], f[buyers], m[buyers])
+    candidate = ~np.array(members, dtype=bool) & np.isin(segment, MEMBERSHIP_SEGMENTS)
+
+    return {
+        "customer_id": np.array(ids, dtype=np.int64),
+        "visit_count": visits,
+        "lifetime_spend": spend,  # exact Decimal sums
+        "first_visit": first,
+        "last_visit": last,
+        "recency_score": r,
+        "frequency_score": f,
+        "monetary_score": m,
+        "segment": segment,
+        "membership_candidate": candidate,
+    }
+
+
+def write_scores(db: Session, scores: dict, scored_at: datetime, rebuild_aggregates: bool = False) -> None:
+    existing = set(db.execute(select(CustomerStats.customer_id)).scalars())
+
+    inserts, updates = [], []
+    for i, customer_id in enumerate(scores["customer_id"].tolist()):
+        row = {
+            "recency_score": int(scores["recency_score"][i]) or None,
+            "frequency_score": int(scores["frequency_score"][i]) or None,
+            "monetary_score": int(scores["monetary_score"][i]) or None,
+            "segment": scores["segment"][i],
+            "membership_candidate": bool(scores["membership_candidate"][i]),
+            "scored_at": scored_at,
+        }
+        aggregates = {
+            "lifetime_spend": scores["lifetime_spend"][i],
+            "visit_count": int(scores["visit_count"][i]),
+            "first_visit": scores["first_visit"][i],
+            "last_visit": scores["last_visit"][i],
+        }
+        if customer_id in existing:
+            updates.append({"key": customer_id, **row, **(aggregates if rebuild_aggregates else {})})
+        else:
+            inserts.append({"customer_id": customer_id, **row, **aggregates})
+
+    try:
+        for start in range(0, len(inserts), WRITE_BATCH_SIZE):
+            db.execute(insert(CustomerStats), inserts[start:start + WRITE_BATCH_SIZE])
+        columns = [c for c in (updates[0] if updates else {}) if c != "key"]
+        statement = (
+            update(CustomerStats.__table__)
+            .where(CustomerStats.__table__.c.customer_id == bindparam("key"))
+            .values({c: bindparam(c) for c in columns})
+        )
+        for start in range(0, len(updates), WRITE_BATCH_SIZE):
+            db.connection().execute(statement, updates[start:start + WRITE_BATCH_SIZE])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def run_rfm_job(db: Session, today: Optional[date] = None, rebuild_aggregates: bool = False) -> RfmResult:
+    started = time.perf_counter()
+    scores = score_customers(db, today)
+    write_scores(db, scores, datetime.utcnow(), rebuild_aggregates)
+    result = RfmResult(
+        customers=len(scores["customer_id"]),
+        scored=int((scores["visit_count"] > 0).sum()),
+        membership_candidates=int(scores["membership_candidate"].sum()),
+        seconds=time.perf_counter() - started,
+    )
+    metrics.inc("rfm_job.runs")
+    logger.info(
+        f"RFM job: {result.customers} customers, {result.scored} with purchases, "
+        f"{result.membership_candidates} membership candidates in {result.seconds:.1f}s"
+    )
+    return result
@@ -0,0 +1,517 @@
+'''
+Offline-first branch nodes: sync between a branch's local database and the
+central database.
+
+A branch node is this same app started with NODE_MODE=branch and DATABASE_URL
+pointing at a local SQLite file (WAL mode, see src/database.py). Tills talk to
+the node over the LAN, so checkout never waits on the WAN and keeps working
+while the link is down. Access tokens are verified locally with the shared
+SECRET_KEY; logging in still goes to the central API.
+
+Every SYNC_INTERVAL_SECONDS the node runs one sync cycle in a worker thread:
+
+Push (sales, node -> central). On a node, every new transaction also gets a
+SYNC_OUTBOX row in the same local commit (track_outbox). Pending rows are sent
+in batches of SYNC_BATCH_SIZE: a batch is inserted centrally in one
+transaction, together with a SYNC_RECEIPTS row per sale (branch, local id), and
+then marked as pushed locally. If the node stops between the two commits, the
+next push finds the receipts and only marks the rows, so a sale is never
+applied twice. When the central transactions are sharded (TRANSACTION_SHARD_URLS
+on the node), the sales and their receipts are written to the branch's shard in
+one commit, and the stock and customer stats follow in the central database,
+as for a checkout there.
+
+Pull (catalog, central -> node). With BRANCH_SYNC_ENABLED on the central
+server, its commits that touch products add one PRODUCT_CHANGES row per product
+(track_catalog_changes, log_product_changes).
+The node reads the log after its cursor (SYNC_STATE), fetches the current rows
+of the changed products and upserts or deletes them locally. The first sync,
+and a node that fell behind the pruned log, copy the whole catalog instead.
+The nodes also prune the central log (entries older than
+SYNC_CHANGE_LOG_KEEP_DAYS), at most once every CHANGE_LOG_PRUNE_SECONDS.
+
+Conflict rules:
+- Names, prices and costs: the central database wins. A sale keeps the price
+  it was rung up at, which is what the customer paid.
+- Stock is changed in two places. Sales travel as deltas (stock - quantity,
+  floored at 0), never as absolute values, so sales from every branch add up
+  in any order. Absolute values (restocks, edits) come from the central
+  database, and the node re-applies its own sales that are not pushed yet on
+  top: local stock = central stock - unpushed local quantity.
+- A pushed sale is never rejected, it already happened at the till. When it
+  takes the central stock below zero the stock stays at 0 and the sale is
+  counted as oversold (logged, metric sync.oversold).
+- The catalog is read-only on a node (product writes answer 409 there).
+
+Usage: started by main.py when NODE_MODE=branch. One cycle by hand (e.g. to
+fill a new node's catalog before its first start):
+    python scripts/sync_branch.py
+'''
+
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import bindparam, case, delete, event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from src.config import get_settings
+from src.database import ShardRouter, parse_shard_map, shard_urls
+from src.model.orm import Product, ProductChange, SyncOutbox, SyncReceipt, SyncState, Transaction, TransactionDetail
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CURSOR = "catalog_cursor"
+CATALOG_HOLE_SINCE = "catalog_hole_since"
+# A gap in the change log is a change not committed yet, or an insert that was
+# rolled back; after this long it is taken to be the latter and skipped
+HOLE_GRACE_SECONDS = 60
+CHANGE_LOG_PRUNE_SECONDS = 3600
+# Replicated as-is; stock follows the conflict rule above
+CATALOG_COLUMNS = ("name", "sellPrice", "cost", "category_id", "category", "version")
+
+products = Product.__table__
+details_table = TransactionDetail.__table__
+outbox_table = SyncOutbox.__table__
+
+
+# --- Change capture ---
+def catalog_change_log_enabled() -> bool:
+    """True on a central server with BRANCH_SYNC_ENABLED: product writes go to the change log."""
+    settings = get_settings()
+    return settings.node_mode != "branch" and settings.branch_sync_enabled
+
+
+def log_product_changes(db: Session, product_ids) -> None:
+    """Add products to the catalog change log, inside the caller's transaction."""
+    ids = sorted(set(product_ids))
+    if ids:
+        now = datetime.utcnow()
+        db.connection().execute(insert(ProductChange.__table__), [{"product_id": i, "changed_at": now} for i in ids])
+
+
+def track_catalog_changes(session_factory) -> None:
+    """Central: log every product a session flushes (created, edited, sold or deleted)."""
+    @event.listens_for(session_factory, "after_flush")
+    def _log_flushed_products(session, flush_context):
+        log_product_changes(session, (obj.id for obj in chain(session.new, session.dirty, session.deleted)
+                                      if isinstance(obj, Product)))
+
+
+def track_outbox(session_factory) -> None:
+    """Branch node: queue every new sale for the push, in the sale's own transaction."""
+    @event.listens_for(session_factory, "after_flush")
+    def _queue_new_sales(session, flush_context):
+        ids = [obj.id for obj in session.new if isinstance(obj, Transaction)]
+        if ids:
+            now = datetime.utcnow()
+            session.connection().execute(insert(outbox_table), [{"transaction_id": i, "created_at": now} for i in ids])
+
+
+def prune_change_log(db: Session, keep_days: Optional[int] = None) -> int:
+    """Central: drop change log entries older than SYNC_CHANGE_LOG_KEEP_DAYS."""
+    keep_days = get_settings().sync_change_log_keep_days if keep_days is None else keep_days
+    cutoff = datetime.utcnow() - timedelta(days=keep_days)
+    deleted = db.execute(delete(ProductChange).where(ProductChange.changed_at < cutoff)).rowcount
+    db.commit()
+    return deleted
+
+
+# --- Push ---
+@dataclass
+class PushResult:
+    sales: int = 0
+    already_received: int = 0
+    oversold: int = 0
+
+
+def _apply_sales_to_stock(central: Session, sold: Dict[int, int]) -> int:
+    """Subtract sold quantities from the central stock as deltas. Returns oversold products."""
+    current = dict(central.execute(select(products.c.id, products.c.stock).where(products.c.id.in_(list(sold)))).all())
+    oversold = [p for p, quantity in sold.items() if p in current and (current[p] or 0) < quantity]
+    remaining = products.c.stock - bindparam("quantity")
+    central.execute(
+        update(products).where(products.c.id == bindparam("product_id"))
+        .values(stock=case((remaining < 0, 0), else_=remaining), version=products.c.version + 1),
+        [{"product_id": p, "quantity": quantity} for p, quantity in sold.items()],
+    )
+    log_product_changes(central, sold)
+    if oversold:
+        logger.warning(f"Pushed sales took stock below zero for products {oversold}; stock left at 0")
+    return len(oversold)
+
+
+def _sales_session(central: Session, shards: Optional[ShardRouter], branch_id: int):
+    """The central session, or one on the branch's shard when the central transactions are sharded."""
+    if shards is None:
+        return nullcontext(central)
+    return shards.session(central, shards.for_branch(branch_id))
+
+
+def _push_batch(local: Session, central: Session, branch_id: int, local_ids: List[int], result: PushResult,
+                shards: Optional[ShardRouter] = None) -> Dict[int, int]:
+    """Insert one batch of local sales centrally. Returns local id -> central id."""
+    with _sales_session(central, shards, branch_id) as sales_db:
+        return _push_batch_to(local, central, sales_db, branch_id, local_ids, result)
+
+
+def _push_batch_to(local: Session, central: Session, sales_db: Session, branch_id: int, local_ids: List[int],
+                   result: PushResult) -> Dict[int, int]:
+    from src.crud.CRUD import record_customer_purchase
+
+    # Receipts from before sharding are in the central database
+    received: Dict[int, int] = {}
+    for db in ((central,) if sales_db is central else (central, sales_db)):
+        received.update(db.execute(
+            select(SyncReceipt.local_id, SyncReceipt.transaction_id)
+            .where(SyncReceipt.branch_id == branch_id, SyncReceipt.local_id.in_(local_ids))
+        ).all())
+    result.already_received += len(received)
+    new_ids = [i for i in local_ids if i not in received]
+    sales = {t.id: t for t in local.execute(select(Transaction).where(Transaction.id.in_(new_ids))).scalars()}
+    lines: Dict[int, List[TransactionDetail]] = {}
+    for detail in local.execute(select(TransactionDetail).where(TransactionDetail.transaction_id.in_(new_ids))).scalars():
+        lines.setdefault(detail.transaction_id, []).append(detail)
+
+    # Sales deleted locally before they were pushed are skipped
+    copies = {
+        local_id: Transaction(branch_id=sale.branch_id, customer_id=sale.customer_id, total_amount=sale.total_amount,
+                              total=sale.total, dateOfTransaction=sale.dateOfTransaction,
+                              timeOfTransaction=sale.timeOfTransaction)
+        for local_id, sale in sales.items()
+    }
+    sales_db.add_all(copies.values())
+    sales_db.flush()  # central ids
+
+    now = datetime.utcnow()
+    sold: Dict[int, int] = {}
+    for local_id, copy in copies.items():
+        for detail in lines.get(local_id, []):
+            sales_db.add(TransactionDetail(transaction_id=copy.id, product_id=detail.product_id,
+                                           quantity=detail.quantity, price=detail.price))
+            if detail.product_id is not None:
+                sold[detail.product_id] = sold.get(detail.product_id, 0) + detail.quantity
+        if copy.customer_id is not None:
+            record_customer_purchase(central, copy.customer_id, copy.total, copy.dateOfTransaction)
+        sales_db.add(SyncReceipt(branch_id=branch_id, local_id=local_id, transaction_id=copy.id, received_at=now))
+        received[local_id] = copy.id
+    if sold:
+        result.oversold += _apply_sales_to_stock(central, sold)
+    if sales_db is central:
+        central.commit()
+    else:
+        # Two databases: the sales and their receipts are committed first, stock and customer stats follow
+        sales_db.commit()
+        try:
+            central.commit()
+        except Exception as e:
+            # The sales are stored and will not be pushed again; report the missed update instead
+            central.rollback()
+            metrics.inc("shards.incomplete_sales")
+            logger.error(f"Pushed sales of branch {branch_id} were stored but stock and customer stats were not updated: {e}")
+    result.sales += len(copies)
+    return received
+
+
+def push_sales(local: Session, central: Session, branch_id: int, batch_size: int,
+               shards: Optional[ShardRouter] = None) -> PushResult:
+    result = PushResult()
+    while True:
+        pending = list(local.execute(
+            select(SyncOutbox).where(SyncOutbox.pushed_at.is_(None)).order_by(SyncOutbox.id).limit(batch_size)
+        ).scalars())
+        if not pending:
+            break
+        central_ids = _push_batch(local, central, branch_id, [row.transaction_id for row in pending], result, shards)
+        now = datetime.utcnow()
+        for row in pending:
+            row.pushed_at = now
+            row.central_id = central_ids.get(row.transaction_id)
+        local.commit()
+        if len(pending) < batch_size:
+            break
+    metrics.inc("sync.pushed_sales", result.sales)
+    metrics.inc("sync.oversold", result.oversold)
+    return result
+
+
+def pending_sales(local: Session) -> int:
+    return local.execute(select(func.count()).select_from(SyncOutbox).where(SyncOutbox.pushed_at.is_(None))).scalar()
+
+
+# --- Pull ---
+@dataclass
+class PullResult:
+    changed: Set[int] = field(default_factory=set)
+    removed: Set[int] = field(default_factory=set)
+    snapshot: bool = False
+
+
+def _get_state(local: Session, key: str) -> Optional[str]:
+    state = local.get(SyncState, key)
+    return state.value if state else None
+
+
+def _set_state(local: Session, key: str, value: Optional[str]) -> None:
+    state = local.get(SyncState, key)
+    if value is None:
+        if state is not None:
+            local.delete(state)
+    elif state is None:
+        local.add(SyncState(key=key, value=value))
+    else:
+        state.value = value
+
+
+def _apply_catalog(local: Session, rows, removed: Set[int], result: PullResult) -> None:
+    """Upsert central product rows and delete removed ones; stock = central stock - unpushed local sales."""
+    ids = [row.id for row in rows]
+    existing = set(local.execute(select(products.c.id).where(products.c.id.in_(ids))).scalars()) if ids else set()
+    new_rows = [dict(row._mapping) for row in rows if row.id not in existing]
+    if new_rows:
+        local.execute(insert(products), new_rows)
+    updates = [{"pid": row.id, **{f"v_{c}": getattr(row, c) for c in CATALOG_COLUMNS}} for row in rows if row.id in existing]
+    if updates:
+        local.execute(
+            update(products).where(products.c.id == bindparam("pid")).values({c: bindparam(f"v_{c}") for c in CATALOG_COLUMNS}),
+            updates,
+        )
+    if rows:
+        unpushed = (
+            select(func.coalesce(func.sum(details_table.c.quantity), 0))
+            .join(outbox_table, outbox_table.c.transaction_id == details_table.c.transaction_id)
+            .where(details_table.c.product_id == products.c.id, outbox_table.c.pushed_at.is_(None))
+            .scalar_subquery()
+        )
+        remaining = bindparam("central_stock") - unpushed
+        local.execute(
+            update(products).where(products.c.id == bindparam("pid")).values(stock=case((remaining < 0, 0), else_=remaining)),
+            [{"pid": row.id, "central_stock": row.stock} for row in rows],
+        )
+    if removed:
+        local.execute(delete(products).where(products.c.id.in_(removed)))
+    result.changed.update(ids)
+    result.removed.update(removed)
+
+
+def _advance(cursor: int, seqs: List[int]) -> int:
+    """Last change log entry read without a gap after the cursor."""
+    for seq in seqs:
+        if seq != cursor + 1:
+            break
+        cursor = seq
+    return cursor
+
+
+def pull_catalog(local: Session, central: Session, batch_size: int) -> PullResult:
+    result = PullResult()
+    cursor = _get_state(local, CATALOG_CURSOR)
+    oldest = central.execute(select(func.min(ProductChange.seq))).scalar()
+    if cursor is None or (oldest is not None and oldest > int(cursor) + 1):
+        # First sync, or entries this node needs were pruned: copy the whole catalog.
+        # The cursor is read first, so changes made meanwhile are pulled again.
+        latest = central.execute(select(func.coalesce(func.max(ProductChange.seq), 0))).scalar()
+        rows = central.execute(select(products)).all()
+        local_ids = set(local.execute(select(products.c.id)).scalars())
+        _apply_catalog(local, rows, local_ids - {row.id for row in rows}, result)
+        _set_state(local, CATALOG_CURSOR, str(latest))
+        _set_state(local, CATALOG_HOLE_SINCE, None)
+        local.commit()
+        result.snapshot = True
+        cursor = latest
+
+    cursor = int(cursor)
+    while True:
+        changes = central.execute(
+            select(ProductChange.seq, ProductChange.product_id)
+            .where(ProductChange.seq > cursor).order_by(ProductChange.seq).limit(batch_size)
+        ).all()
+        if not changes:
+            break
+        ids = {change.product_id for change in changes}
+        rows = central.execute(select(products).where(products.c.id.in_(ids))).all()
+        _apply_catalog(local, rows, ids - {row.id for row in rows}, result)
+
+        # Applying a product twice is harmless, so entries after a gap are applied
+        # now but the cursor stays before the gap until it fills or expires
+        advanced = _advance(cursor, [change.seq for change in changes])
+        if advanced < changes[-1].seq:
+            hole_since = _get_state(local, CATALOG_HOLE_SINCE)
+            if hole_since is None:
+                _set_state(local, CATALOG_HOLE_SINCE, str(time.time()))
+            elif time.time() - float(hole_since) > HOLE_GRACE_SECONDS:
+                advanced = changes[-1].seq
+                _set_state(local, CATALOG_HOLE_SINCE, None)
+        else:
+            _set_state(local, CATALOG_HOLE_SINCE, None)
+        _set_state(local, CATALOG_CURSOR, str(advanced))
+        local.commit()
+        if advanced == cursor or len(changes) < batch_size:
+            break
+        cursor = advanced
+    metrics.inc("sync.pulled_products", len(result.changed) + len(result.removed))
+    return result
+
+
+# --- One cycle ---
+@dataclass
+class SyncResult:
+    push: PushResult
+    pull: PullResult
+    pending: int
+    seconds: float
+
+
+def sync_once(local: Session, central: Session, branch_id: int, batch_size: Optional[int] = None,
+              shards: Optional[ShardRouter] = None) -> SyncResult:
+    """
+    Push pending sales first, so the pulled stock already includes them.
+    `shards` routes the pushed sales when the central transactions are sharded.
+    """
+    batch_size = batch_size or get_settings().sync_batch_size
+    started = time.perf_counter()
+    try:
+        push = push_sales(local, central, branch_id, batch_size, shards)
+        pull = pull_catalog(local, central, batch_size)
+    except Exception:
+        local.rollback()
+        central.rollback()
+        raise
+    result = SyncResult(push=push, pull=pull, pending=pending_sales(local), seconds=time.perf_counter() - started)
+    logger.info(f"Sync: pushed {push.sales} sales ({push.oversold} oversold), pulled {len(pull.changed)} products, "
+                f"removed {len(pull.removed)}{' (full catalog)' if pull.snapshot else ''} in {result.seconds:.2f}s")
+    return result
+
+
+class SyncRunner:
+    """Runs sync_once every SYNC_INTERVAL_SECONDS on a branch node and refreshes the in-memory catalog caches."""
+
+    def __init__(self):
+        self._central: Optional[ShardRouter] = None
+        self._task: Optional[asyncio.Task] = None
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.pending = 0
+        self._pruned_at: Optional[float] = None
+
+    def _central_shards(self) -> ShardRouter:
+        """The central database (shard 0) and its transaction shards, if any."""
+        if self._central is None:
+            settings = get_settings()
+            if not settings.central_database_url or settings.node_branch_id is None:
+                raise RuntimeError("NODE_MODE=branch needs CENTRAL_DATABASE_URL and NODE_BRANCH_ID. Please check your .env file.")
+            urls = shard_urls(settings.transaction_shard_urls) or [settings.central_database_url]
+            if urls[0] != settings.central_database_url:
+                raise RuntimeError("On a branch node the first TRANSACTION_SHARD_URLS entry must be CENTRAL_DATABASE_URL. "
+                                   "Please check your .env file.")
+            router = ShardRouter()
+            router.configure(urls, parse_shard_map(settings.transaction_shard_map), settings.transaction_shard_legacy_reads)
+            self._central = router
+        return self._central
+
+    def run_once(self) -> SyncResult:
+        from src.database import SessionLocal
+
+        settings = get_settings()
+        shards = self._central_shards()
+        local, central = SessionLocal(), shards.factories[0]()
+        try:
+            result = sync_once(local, central, settings.node_branch_id, shards=shards)
+            self._refresh_caches(local, result.pull)
+            self._prune_change_log(central)
+        finally:
+            local.close()
+            central.close()
+        self.pending = result.pending
+        self.last_success = time.time()
+        self.last_error = None
+        return result
+
+    def _prune_change_log(self, central: Session) -> None:
+        """Prune the central change log once every CHANGE_LOG_PRUNE_SECONDS; a failure does not fail the sync."""
+        if self._pruned_at is not None and time.monotonic() - self._pruned_at < CHANGE_LOG_PRUNE_SECONDS:
+            return
+        self._pruned_at = time.monotonic()
+        try:
+            deleted = prune_change_log(central)
+        except Exception as e:
+            central.rollback()
+            logger.warning(f"Pruning the catalog change log failed: {e}")
+            return
+        if deleted:
+            logger.info(f"Pruned {deleted} catalog change log entries")
+
+    def _refresh_caches(self, local: Session, pull: PullResult) -> None:
+        if not (pull.changed or pull.removed):
+            return
+        from src.services.pricing import price_snapshot
+        from src.services.stock_hub import stock_hub
+        from src.services.stock_index import stock_index
+        from src.utils.response_cache import table_versions
+
+        for product in local.execute(select(Product).where(Product.id.in_(pull.changed))).scalars():
+            price_snapshot.apply_product(product)
+            stock_index.set(product.id, product.name, product.stock)
+            stock_hub.publish(product.id, product.stock)
+        for product_id in pull.removed:
+            price_snapshot.remove_product(product_id)
+            stock_index.remove(product_id)
+            stock_hub.publish(product_id, None)
+        table_versions.bump(Product.__tablename__)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.run_once)
+            except Exception as e:
+                # Link down or central database unavailable: sales stay in the outbox
+                self.last_error = str(e)
+                metrics.inc("sync.failures")
+                logger.warning(f"Sync failed, retrying in {get_settings().sync_interval_seconds}s: {e}")
+            await asyncio.sleep(get_settings().sync_interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+sync_runner = SyncRunner()
+metrics.gauge("sync.pending_sales", lambda: sync_runner.pending)
+metrics.gauge("sync.seconds_since_success",
+              lambda: round(time.time() - sync_runner.last_success, 1) if sync_runner.last_success else None)
+
+
+_tracking_installed = False
+
+
+def install_change_tracking() -> None:
+    """
+    Hook the app's sessions (called once from the main.py lifespan): outbox on a
+    branch node, catalog change log on a central server with BRANCH_SYNC_ENABLED.
+    """
+    global _tracking_installed
+    from src.database import SessionLocal
+
+    if _tracking_installed:
+        return
+    if get_settings().node_mode == "branch":
+        track_outbox(SessionLocal)
+    elif catalog_change_log_enabled():
+        track_catalog_changes(SessionLocal)
+    _tracking_installed = True
@@ -14,7 +14,7 @@
 from datetime import date, time, datetime
 from decimal import Decimal
 from enum import Enum
-from typing import Optional, List, ClassVar, Any
+from typing import Optional, List, ClassVar, Any, Dict, Literal
 import enum
 from dataclasses import dataclass
 from pydantic import (
@@ -181,12 +181,14 @@ class CustomerUpdate(Customers):
     age: Optional[conint(gt=0, lt=120)] = None
     email: Optional[EmailStr] = None
     membership: Optional[bool] = None
+    version: Optional[int] = Field(None, description="version the client read; if the row has changed since, the update is refused with 409")
 
 class EmployeeUpdate(Employees):
     name: Optional[constr(min_length=1, max_length=100)] = None
     age: Optional[conint(gt=16, lt=70)] = None
     date_of_end_employment: Optional[date] = None
     role: Optional[Role] = None
+    version: Optional[int] = Field(None, description="version the client read; if the row has changed since, the update is refused with 409")
 
 class ProductUpdate(Products):
     name: Optional[constr(min_length=1, max_length=100)] = None
@@ -195,17 +197,20 @@ class ProductUpdate(Products):
     cost: Optional[condecimal(gt=0, decimal_places=2)] = None
     category_id: Optional[int] = None
     category: Optional[constr(min_length=1, max_length=50)] = None
+    version: Optional[int] = Field(None, description="version the client read; if the row has changed since, the update is refused with 409")
 
 class BranchUpdate(Branches):
     location: Optional[constr(min_length=1, max_length=200)] = None
     size: Optional[constr(min_length=1, max_length=50)] = None
     total_stock: Optional[conint(ge=0)] = None
+    version: Optional[int] = Field(None, description="version the client read; if the row has changed since, the update is refused with 409")
 
 # Database models made to read from the database
 # these models include the 'id' field which is auto-generated by the database
 
 class CustomerInDB(Customers):
     id: int
+    version: int = Field(1, description="row version, bumped by every write")
 
     # The 'from_attributes' parameter tells Pydantic to use the attributes of the class as the fields of the model
     class Config:
@@ -213,24 +218,28 @@ class CustomerInDB(Customers):
 
 class EmployeeInDB(Employees):
     id: int
+    version: int = Field(1, description="row version, bumped by every write")
 
     class Config:
         from_attributes = True
 
 class ProductInDB(Products):
     id: int
+    version: int = Field(1, description="row version, bumped by every write")
 
     class Config:
         from_attributes = True
 
 class BranchInDB(Branches):
     id: int
+    version: int = Field(1, description="row version, bumped by every write")
 
     class Config:
         from_attributes = True
 
 class TransactionInDB(Transactions):
     id: int
+    version: int = Field(1, description="row version, bumped by every write")
 
     class Config:
         from_attributes = True
@@ -245,6 +254,127 @@ class TransactionDetailInDB(TransactionDetails):
 class TransactionResponse(TransactionInDB):
     details: List[TransactionDetailInDB]
     
+# Batch lookup models (POST /{entity}/lookup)
+# Maximum number of ids accepted in one lookup
+MAX_LOOKUP_IDS = 1000
+
+class LookupRequest(BaseModel):
+    """List of ids to fetch in one request"""
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_LOOKUP_IDS, description="ids to fetch, results keep this order")
+
+class CustomerLookupResponse(BaseModel):
+    items: List[CustomerInDB]
+    missing: List[int] = Field(default_factory=list, description="requested ids that do not exist")
+
+class ProductLookupResponse(BaseModel):
+    items: List[ProductInDB]
+    missing: List[int] = Field(default_factory=list, description="requested ids that do not exist")
+
+class BranchLookupResponse(BaseModel):
+    items: List[BranchInDB]
+    missing: List[int] = Field(default_factory=list, description="requested ids that do not exist")
+
+# Request batching (POST /batch)
+# Maximum number of sub-requests in one batch
+MAX_BATCH_REQUESTS = 20
+
+class BatchItem(BaseModel):
+    """One read of a batch, e.g. {"id": "products", "path": "/api/v1/products/?fields=id,name"}"""
+    id: Optional[str] = Field(None, max_length=64, description="echoed in the result; defaults to the item's position")
+    method: Literal["GET"] = "GET"
+    path: str = Field(..., max_length=2048, description="API path with its query string")
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem] = Field(..., min_length=1, max_length=MAX_BATCH_REQUESTS)
+
+class BatchItemResult(BaseModel):
+    id: str
+    status: int = Field(..., description="HTTP status of the sub-request")
+    headers: Dict[str, str] = Field(default_factory=dict, description="ETag, Warning and X-Missing-Ids of the sub-response")
+    body: Any = Field(None, description="the sub-response's JSON body")
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
+
+# Low-stock listing and restocking
+class LowStockItem(BaseModel):
+    product_id: int
+    name: str
+    stock: int
+
+    class Config:
+        from_attributes = True
+
+class RestockRequest(BaseModel):
+    quantity: int = Field(..., gt=0, description="units added to the product's stock")
+
+# Customer purchase summary and history
+class CustomerStatsInDB(BaseModel):
+    customer_id: int
+    lifetime_spend: Decimal
+    visit_count: int
+    first_visit: Optional[date] = None
+    last_visit: Optional[date] = None
+    average_basket: Decimal
+    recency_score: Optional[int] = Field(None, description="1-5, 5 = most recent (nightly RFM pass)")
+    frequency_score: Optional[int] = Field(None, description="1-5, 5 = most visits")
+    monetary_score: Optional[int] = Field(None, description="1-5, 5 = highest spend")
+    segment: Optional[str] = None
+    membership_candidate: bool = False
+    scored_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class CustomerHistoryPage(BaseModel):
+    items: List[TransactionInDB]
+    next_cursor: Optional[str] = Field(None, description="pass as ?cursor= to get the next (older) page")
+    summary: Optional[CustomerStatsInDB] = Field(None, description="null until the customer's first purchase")
+
+# Branch sales heatmap (weekday x hour of day)
+class SalesHeatmap(BaseModel):
+    branch_id: int
+    start: date
+    end: date
+    weekdays: List[str] = Field(description="row labels, Mon..Sun")
+    transactions: List[List[int]] = Field(description="7 x 24 matrix of transaction counts, [weekday][hour]")
+    revenue: List[List[Decimal]] = Field(description="7 x 24 matrix of revenue (sum of totals), [weekday][hour]")
+
+# Live top sellers (GET /stats/top-products)
+class TopProduct(BaseModel):
+    product_id: int
+    units: float = Field(description="estimated units sold, never below the true value")
+    min_units: float = Field(description="guaranteed lower bound on the units sold")
+
+class TopProductsResponse(BaseModel):
+    branch_id: Optional[int] = Field(None, description="null for all branches")
+    window: str
+    total_units: float = Field(description="units sold in the window")
+    error_bound: float = Field(description="maximum over-estimate of any count (total_units / sketch capacity)")
+    items: List[TopProduct]
+
+# Parquet export of the sales history (admin)
+class ExportStatus(BaseModel):
+    available: bool = Field(description="false when pyarrow is not installed")
+    running: bool
+    state: Dict[str, Any] = Field(description="high-water mark and summary of the last completed export")
+    last_result: Optional[Dict[str, Any]] = Field(None, description="result of the last export started by this worker")
+    last_error: Optional[str] = None
+
+# Reorder suggestions (written by the reorder batch job)
+class ReorderSuggestionInDB(BaseModel):
+    product_id: int
+    branch_id: Optional[int] = Field(None, description="branch of the demand, null for sales without a branch")
+    avg_daily_demand: float = Field(description="mean units sold per day over the history window")
+    moving_avg_demand: float = Field(description="mean units sold per day over the recent window")
+    demand_std: float = Field(description="standard deviation of daily demand")
+    reorder_point: float = Field(description="stock level at which to reorder")
+    suggested_quantity: int = Field(description="units to order now (0 if stock is sufficient)")
+    computed_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # Authentication Models
 
 # Base signup request model
@@ -282,14 +412,21 @@ class AuthResponse(BaseModel):
     email: EmailStr
     message: str
     access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
     token_type: Optional[str] = None
 
 # Token model for JWT tokens
 class Token(BaseModel):
     """Token response model"""
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str
 
+# Refresh / logout request model
+class RefreshRequest(BaseModel):
+    """Refresh token request model"""
+    refresh_token: str
+
 # Token data model for decoded tokens
 class TokenData(BaseModel):
     """Token data model for decoded tokens"""
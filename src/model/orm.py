@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, Time, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, SmallInteger, String, Boolean, Date, Time, DateTime, Numeric, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import List, Optional
-from datetime import date, time
+from datetime import date, time, datetime
 from decimal import Decimal
 from src.database import Base
 
@@ -14,8 +14,11 @@ class Customer(Base):
     email: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
     membership: Mapped[bool] = mapped_column(Boolean, default=False)
     password: Mapped[str] = mapped_column(String(255), nullable=False, default="password123")
+    # Bumped by every write; an update that names the version it read fails if another write came first
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
 
-    transactions = relationship("Transaction", back_populates="customer")
+    # ON DELETE SET NULL in the database: deleting a customer does not load their transactions
+    transactions = relationship("Transaction", back_populates="customer", passive_deletes=True)
 
 class Branch(Base):
     __tablename__ = "BRANCHES"
@@ -25,8 +28,13 @@ class Branch(Base):
     location: Mapped[str] = mapped_column(String(255), nullable=False)
     size: Mapped[int] = mapped_column(Integer, default=0)
     total_stock: Mapped[int] = mapped_column(Integer, default=0)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
 
-    transactions = relationship("Transaction", back_populates="branch")
+    transactions = relationship("Transaction", back_populates="branch", passive_deletes=True)
+
+    __table_args__ = (
+        Index("idx_branches_location", "location"),
+    )
 
 class Employee(Base):
     __tablename__ = "EMPLOYEES"
@@ -39,6 +47,7 @@ class Employee(Base):
     email: Mapped[str] = mapped_column(String(100), nullable=False, unique=True)
     role: Mapped[str] = mapped_column(String(50), nullable=False)
     password: Mapped[str] = mapped_column(String(255), nullable=False, default="password123")
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
 
 class Product(Base):
     __tablename__ = "PRODUCTS"
@@ -50,8 +59,17 @@ class Product(Base):
     cost: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
     category_id: Mapped[str] = mapped_column(String(10), nullable=False)
     category: Mapped[str] = mapped_column(String(50), nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+
+    transaction_details = relationship("TransactionDetail", back_populates="product", passive_deletes=True)
 
-    transaction_details = relationship("TransactionDetail", back_populates="product")
+    __table_args__ = (
+        # Category listing with a price range, and price range alone
+        Index("idx_products_category_price", "category", "sellPrice"),
+        Index("idx_products_sell_price", "sellPrice"),
+        # Low-stock listing
+        Index("idx_products_stock", "stock"),
+    )
 
 class Transaction(Base):
     __tablename__ = "TRANSACTIONS"
@@ -63,10 +81,21 @@ class Transaction(Base):
     dateOfTransaction: Mapped[date] = mapped_column(Date, nullable=False)
     timeOfTransaction: Mapped[time] = mapped_column(Time, nullable=False)
     total: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
 
     branch = relationship("Branch", back_populates="transactions")
     customer = relationship("Customer", back_populates="transactions")
-    details = relationship("TransactionDetail", back_populates="transaction", cascade="all, delete-orphan")
+    # The details go with the transaction through ON DELETE CASCADE, without being loaded
+    details = relationship("TransactionDetail", back_populates="transaction", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Customer purchase history, newest first (keyset pagination)
+        Index("idx_transactions_customer_date_time", "customer_id", "dateOfTransaction", "timeOfTransaction"),
+        # Branch sales by day and hour (sales heatmap)
+        Index("idx_transactions_branch_date_time", "branch_id", "dateOfTransaction", "timeOfTransaction"),
+        # Date range over all branches (transaction list, reorder job, top sellers reload)
+        Index("idx_transactions_date", "dateOfTransaction"),
+    )
 
 class TransactionDetail(Base):
     __tablename__ = "TRANSACTION_DETAILS"
@@ -78,3 +107,134 @@ class TransactionDetail(Base):
 
     transaction = relationship("Transaction", back_populates="details")
     product = relationship("Product", back_populates="transaction_details")
+
+class TransactionArchive(Base):
+    __tablename__ = "TRANSACTIONS_ARCHIVE"
+
+    # Closed months moved out of TRANSACTIONS by the archive job (src/jobs/archive.py); read-only.
+    # No foreign keys: archived rows keep the ids they had when they were moved.
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    branch_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    customer_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    total_amount: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    dateOfTransaction: Mapped[date] = mapped_column(Date, nullable=False)
+    timeOfTransaction: Mapped[time] = mapped_column(Time, nullable=False)
+    total: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+
+    __table_args__ = (
+        Index("idx_transactions_archive_customer_date_time", "customer_id", "dateOfTransaction", "timeOfTransaction"),
+        Index("idx_transactions_archive_branch_date_time", "branch_id", "dateOfTransaction", "timeOfTransaction"),
+        Index("idx_transactions_archive_date", "dateOfTransaction"),
+        {"mysql_row_format": "COMPRESSED"},
+    )
+
+class TransactionDetailArchive(Base):
+    __tablename__ = "TRANSACTION_DETAILS_ARCHIVE"
+
+    transaction_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    product_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+
+    __table_args__ = {"mysql_row_format": "COMPRESSED"}
+
+class CustomerStats(Base):
+    __tablename__ = "CUSTOMER_STATS"
+
+    # Purchase aggregates updated by create_transaction, RFM scores by the nightly job (src/jobs/rfm.py)
+    customer_id: Mapped[int] = mapped_column(Integer, ForeignKey("CUSTOMERS.id", ondelete="CASCADE"), primary_key=True)
+    lifetime_spend: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False, default=0)
+    visit_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_visit: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    last_visit: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    recency_score: Mapped[Optional[int]] = mapped_column(SmallInteger, nullable=True)
+    frequency_score: Mapped[Optional[int]] = mapped_column(SmallInteger, nullable=True)
+    monetary_score: Mapped[Optional[int]] = mapped_column(SmallInteger, nullable=True)
+    segment: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+    membership_candidate: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    scored_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    @property
+    def average_basket(self) -> Decimal:
+        if not self.visit_count:
+            return Decimal("0.00")
+        return (Decimal(self.lifetime_spend) / self.visit_count).quantize(Decimal("0.01"))
+
+    __table_args__ = (
+        Index("idx_customer_stats_membership_candidate", "membership_candidate"),
+    )
+
+class RevokedToken(Base):
+    __tablename__ = "REVOKED_TOKENS"
+
+    # jti of a used/revoked refresh token, or the id of a revoked token family
+    token_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    scope: Mapped[str] = mapped_column(String(10), nullable=False, default="token")
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_revoked_tokens_expires_at", "expires_at"),
+    )
+
+class ReorderSuggestion(Base):
+    __tablename__ = "REORDER_SUGGESTIONS"
+
+    # Rebuilt by the reorder job (src/jobs/reorder.py), one row per product and branch
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    product_id: Mapped[int] = mapped_column(Integer, ForeignKey("PRODUCTS.id", ondelete="CASCADE"), nullable=False)
+    branch_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("BRANCHES.id", ondelete="CASCADE"), nullable=True)
+    avg_daily_demand: Mapped[float] = mapped_column(Float, nullable=False)
+    moving_avg_demand: Mapped[float] = mapped_column(Float, nullable=False)
+    demand_std: Mapped[float] = mapped_column(Float, nullable=False)
+    reorder_point: Mapped[float] = mapped_column(Float, nullable=False)
+    suggested_quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    computed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_reorder_suggestions_product_id", "product_id"),
+        Index("idx_reorder_suggestions_branch_id", "branch_id"),
+    )
+
+class ProductChange(Base):
+    __tablename__ = "PRODUCT_CHANGES"
+
+    # Central catalog change log, read by branch nodes (src/jobs/sync.py): one row per
+    # product changed by a commit. No foreign key, deletions are logged too.
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_product_changes_changed_at", "changed_at"),
+    )
+
+class SyncReceipt(Base):
+    __tablename__ = "SYNC_RECEIPTS"
+
+    # Central: sales received from branch nodes, so a repeated push is not applied twice
+    branch_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    local_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    transaction_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    received_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+class SyncOutbox(Base):
+    __tablename__ = "SYNC_OUTBOX"
+
+    # Branch node: sales recorded locally, written in the same transaction as the sale
+    # and marked once the central database has them
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    transaction_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    pushed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    central_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("idx_sync_outbox_pushed_at", "pushed_at"),
+    )
+
+class SyncState(Base):
+    __tablename__ = "SYNC_STATE"
+
+    # Branch node: sync cursors (last change log entry pulled, ...)
+    key: Mapped[str] = mapped_column(String(50), primary_key=True)
+    value: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -0,0 +1,163 @@
+'''
+Request batching (POST /api/v1/batch): runs the batch's sub-requests inside
+this process.
+
+Each sub-request goes through the ASGI app like a request of its own (same
+routes, query validation, response cache and error handling) but without an
+HTTP round trip. The caller is authenticated once by the batch route; while
+its sub-requests run, get_current_user returns that user (batch_user) instead
+of decoding the token again.
+
+Sub-requests run in at most BATCH_MAX_CONCURRENCY lanes. A lane takes the next
+waiting sub-request when its previous one is done, and keeps one database
+session for all of them (get_db hands it out through request_session), so a
+batch holds at most that many connections and checks each one out once. Only
+GETs of the read routes in BATCHABLE_PREFIXES are run; the streaming and export
+routes are not. A sub-request still running after BATCH_ITEM_TIMEOUT_SECONDS is
+answered with 504 (it finishes in the background with its own session).
+
+The results are assembled from the sub-responses' JSON bytes without decoding
+and re-encoding them.
+'''
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, MutableMapping, Optional, Sequence, Tuple
+
+from src.config import get_settings
+from src.database import SessionLocal, request_session
+from src.model.MODEL import BatchItem, TokenData
+from src.utils.metrics import metrics
+from src.utils.security import batch_user
+
+logger = logging.getLogger(__name__)
+
+# Routes a batch may read
+BATCHABLE_PREFIXES = tuple(f"/api/v1/{name}" for name in (
+    "customers", "employees", "products", "branches", "transactions", "stats", "auth/me",
+))
+# Request headers passed on to the sub-requests, and sub-response headers returned
+FORWARDED_HEADERS = (b"authorization", b"user-agent", b"x-debug-source")
+RESULT_HEADERS = ("etag", "warning", "x-missing-ids")
+# Keys of the batch request's ASGI scope that the sub-requests share
+SHARED_SCOPE_KEYS = ("asgi", "http_version", "scheme", "server", "client", "root_path", "app")
+
+
+@dataclass
+class BatchResult:
+    id: str
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b"null"  # JSON
+
+    def encode(self) -> bytes:
+        return (b'{"id":' + json.dumps(self.id).encode() + b',"status":' + str(self.status).encode()
+                + b',"headers":' + json.dumps(self.headers).encode() + b',"body":' + self.body + b"}")
+
+
+def error(item_id: str, status: int, detail: str) -> BatchResult:
+    return BatchResult(item_id, status, body=json.dumps({"detail": detail}).encode())
+
+
+def batchable(path: str) -> bool:
+    return any(path == prefix or path.startswith(prefix + "/") for prefix in BATCHABLE_PREFIXES)
+
+
+async def call(app, base_scope: MutableMapping[str, Any], item_id: str, target: str,
+               headers: List[Tuple[bytes, bytes]]) -> BatchResult:
+    """Run one GET through the app and capture its response."""
+    path, _, query = target.partition("?")
+    scope = {key: base_scope[key] for key in SHARED_SCOPE_KEYS if key in base_scope}
+    scope.update({"type": "http", "method": "GET", "path": path, "raw_path": path.encode(),
+                  "query_string": query.encode(), "headers": headers})
+    finished = asyncio.Event()
+    request_sent = False
+    status = 500
+    response_headers: Dict[str, str] = {}
+    content_type = ""
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for key, value in message.get("headers", []):
+                name = key.decode("latin-1").lower()
+                if name == "content-type":
+                    content_type = value.decode("latin-1")
+                elif name in RESULT_HEADERS:
+                    response_headers[name] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception as e:
+        # ServerErrorMiddleware has sent its 500 and re-raises
+        logger.error(f"Batched request {target} failed: {e}")
+        return error(item_id, 500, "Internal Server Error")
+    finally:
+        finished.set()
+    body = b"".join(chunks)
+    if not body:
+        body = b"null"
+    elif not content_type.startswith("application/json"):
+        body = json.dumps(body.decode("utf-8", "replace")).encode()
+    return BatchResult(item_id, status, response_headers, body)
+
+
+async def run_batch(app, base_scope: MutableMapping[str, Any], items: Sequence[BatchItem],
+                    user: TokenData) -> List[BatchResult]:
+    """Results in the order of `items`; every item gets one, whatever its status."""
+    settings = get_settings()
+    headers = [(key, value) for key, value in base_scope.get("headers", []) if key in FORWARDED_HEADERS]
+    results: List[Optional[BatchResult]] = [None] * len(items)
+    waiting = iter(enumerate(items))
+
+    async def lane() -> None:
+        # each lane is its own task, so these context variables only apply to its sub-requests
+        batch_user.set(user)
+        db = SessionLocal()
+        try:
+            for index, item in waiting:
+                item_id = item.id if item.id is not None else str(index)
+                if not batchable(item.path.partition("?")[0]):
+                    results[index] = error(item_id, 400, f"{item.path} cannot be batched; paths must start with one of: "
+                                                         f"{', '.join(BATCHABLE_PREFIXES)}")
+                    continue
+                request_session.set(db)
+                task = asyncio.ensure_future(call(app, base_scope, item_id, item.path, headers))
+                try:
+                    results[index] = await asyncio.wait_for(asyncio.shield(task), settings.batch_item_timeout_seconds)
+                except asyncio.TimeoutError:
+                    metrics.inc("batch.timeouts")
+                    results[index] = error(item_id, 504, f"No response within {settings.batch_item_timeout_seconds:g} seconds")
+                    # the late sub-request keeps the session until it ends; the lane goes on with a new one
+                    task.add_done_callback(lambda _, session=db: session.close())
+                    db = SessionLocal()
+                finally:
+                    # a failed statement must not leave the session unusable for the lane's next sub-request
+                    db.rollback()
+        finally:
+            db.close()
+
+    lanes = min(max(settings.batch_max_concurrency, 1), len(items))
+    await asyncio.gather(*(lane() for _ in range(lanes)))
+    metrics.inc("batch.batches")
+    metrics.inc("batch.subrequests", len(items))
+    metrics.inc("batch.round_trips_saved", len(items) - 1)
+    return results
+
+
+def encode(results: Sequence[BatchResult]) -> bytes:
+    return b'{"results":[' + b",".join(result.encode() for result in results) + b"]}"
@@ -0,0 +1,115 @@
+'''
+In-memory index of every registered email (customers and employees).
+
+A Bloom filter built from both tables at startup and updated on every create,
+so signup can clear most new emails without a database round trip. A "maybe
+present" answer still goes to the database.
+
+The filter is per worker process: emails created by another worker are only
+in it after the next rebuild. So a "not present" answer is only trusted while
+the filter is fresh (rebuilt less than EMAIL_FILTER_REFRESH_SECONDS ago); once
+it is older every lookup goes to the database and the first one starts a
+rebuild in the background. The UNIQUE constraints on CUSTOMERS.email and
+EMPLOYEES.email remain the source of truth for duplicates within a table.
+'''
+
+import logging
+import time
+
+from sqlalchemy import select
+
+from src.config import get_settings
+from src.model.orm import Customer, Employee
+from src.utils.bloom import BloomFilter
+from src.utils.metrics import metrics
+from src.utils.refreshable import RefreshableSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+class EmailIndex(RefreshableSnapshot):
+    name = "email-filter"
+
+    def __init__(self, capacity: int, fp_rate: float, refresh_seconds: float = 60):
+        super().__init__(refresh_seconds)
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.filter = BloomFilter(capacity, fp_rate)
+        # Emails added while a rebuild reads the tables, carried over to the new filter
+        self._added_during_load = None
+
+    def load(self, db) -> int:
+        """(Re)build the filter from both tables. Returns the number of emails loaded."""
+        started = time.monotonic()
+        with self._lock:
+            self._added_during_load = []
+        fresh = BloomFilter(self.capacity, self.fp_rate)
+        try:
+            for model in (Customer, Employee):
+                for email in db.execute(select(model.email).execution_options(yield_per=5000)).scalars():
+                    fresh.add(normalize_email(email))
+        except Exception:
+            with self._lock:
+                self._added_during_load = None
+            raise
+        with self._lock:
+            for email in self._added_during_load:
+                fresh.add(email)
+            self._added_during_load = None
+            self.filter = fresh
+            self.loaded = True
+            self.loaded_at = started
+        if fresh.count > self.capacity:
+            logger.warning(f"Email filter holds {fresh.count} emails, above its capacity of {self.capacity}; raise EMAIL_FILTER_CAPACITY")
+        logger.info(f"Email filter loaded with {fresh.count} emails ({fresh.memory_bytes // 1024} KiB)")
+        return fresh.count
+
+    def add(self, email: str) -> None:
+        with self._lock:
+            self.filter.add(normalize_email(email))
+            if self._added_during_load is not None:
+                self._added_during_load.append(normalize_email(email))
+
+    def might_exist(self, email: str) -> bool:
+        """False means the email is certainly not registered (only answered while the filter is fresh)."""
+        if not self.loaded or self.is_stale():
+            return True
+        return normalize_email(email) in self.filter
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded else None,
+            "items": self.filter.count,
+            "capacity": self.capacity,
+            "memory_bytes": self.filter.memory_bytes,
+            "num_hashes": self.filter.num_hashes,
+            "target_fp_rate": self.fp_rate,
+            "expected_fp_rate": self.filter.expected_fp_rate(),
+        }
+
+
+settings = get_settings()
+email_index = EmailIndex(settings.email_filter_capacity, settings.email_filter_fp_rate,
+                         settings.email_filter_refresh_seconds)
+
+metrics.gauge("email_filter.items", lambda: email_index.filter.count)
+metrics.gauge("email_filter.memory_bytes", lambda: email_index.filter.memory_bytes)
+metrics.gauge("email_filter.expected_fp_rate", lambda: email_index.filter.expected_fp_rate())
+
+
+def load_email_index() -> None:
+    """Build the filter at startup; on failure signup simply keeps querying the database."""
+    from src.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        email_index.load(db)
+    except Exception as e:
+        logger.error(f"Could not load email filter, falling back to database checks: {e}")
+    finally:
+        db.close()
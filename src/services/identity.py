@@ -0,0 +1,62 @@
+'''
+Identity lookup for authentication.
+
+Resolves an email to the few columns login needs (kind, id, name, role,
+password_hash) with column-only selects on the unique email indexes. The
+statements are built once at import so SQLAlchemy reuses their compiled form,
+and no ORM objects are loaded into the session.
+
+Emails are looked up lower-cased. Every write stores them that way and
+migration 0007 lower-cased older rows, so the lookup stays a plain equality on
+the unique index whatever the column's collation (SQLite and binary MySQL
+collations compare case-sensitively).
+'''
+
+from typing import NamedTuple, Optional
+
+from sqlalchemy import bindparam, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from src.model.orm import Customer, Employee
+from src.services.email_index import normalize_email
+
+CUSTOMER = "customer"
+EMPLOYEE = "employee"
+
+
+class Identity(NamedTuple):
+    kind: str  # 'customer' or 'employee'
+    id: int
+    name: str
+    role: str
+    password_hash: str
+
+
+_customer_stmt = select(
+    literal(CUSTOMER).label("kind"), Customer.id, Customer.name,
+    literal(CUSTOMER).label("role"), Customer.password,
+).where(Customer.email == bindparam("email"))
+
+_employee_stmt = select(
+    literal(EMPLOYEE).label("kind"), Employee.id, Employee.name,
+    Employee.role, Employee.password,
+).where(Employee.email == bindparam("email"))
+
+_any_stmt = union_all(_customer_stmt, _employee_stmt).limit(1)
+
+_statements = {CUSTOMER: _customer_stmt, EMPLOYEE: _employee_stmt, None: _any_stmt}
+
+
+def kind_for_role(role: str) -> str:
+    """Map the login form's role ('customer', 'admin', ...) to the account kind."""
+    return CUSTOMER if role == CUSTOMER else EMPLOYEE
+
+
+def find_identity(db: Session, email: str, kind: Optional[str] = None) -> Optional[Identity]:
+    """Look up an account by email, in one table (`kind`) or in both."""
+    row = db.execute(_statements[kind], {"email": normalize_email(email)}).first()
+    return Identity(*row) if row else None
+
+
+def model_for_kind(kind: str):
+    return Customer if kind == CUSTOMER else Employee
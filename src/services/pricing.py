@@ -0,0 +1,246 @@
+'''
+Server-side pricing engine.
+
+Keeps a compact snapshot of every product's sell price, cost and stock in
+NumPy arrays indexed by product id (prices as integer cents, so all arithmetic
+is exact). Checkout prices a whole basket with one vectorized pass over the
+snapshot instead of one query per line, and rejects baskets whose line prices
+or totals do not match.
+
+The snapshot is loaded at startup (or lazily by the first checkout) and kept
+current by this worker's CRUD product and transaction writes. Other workers and
+direct database edits are picked up two ways: the snapshot is rebuilt in the
+background once it is older than PRICE_SNAPSHOT_REFRESH_SECONDS, and before a
+basket is rejected its products are re-read from the database, so a stale
+snapshot never turns a correct basket away.
+'''
+
+import logging
+import time
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from src.config import get_settings
+from src.model.orm import Product
+from src.utils.metrics import metrics
+from src.utils.refreshable import RefreshableSnapshot
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+
+
+class PricingError(ValueError):
+    """The basket sent by the client does not match the server's prices."""
+
+
+def to_cents(amount) -> int:
+    """Convert a Decimal/float/str amount to integer cents, rounding half up."""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> Decimal:
+    return (Decimal(int(cents)) / 100).quantize(CENT)
+
+
+@dataclass
+class BasketQuote:
+    line_prices: List[Decimal]  # unit sell price per line
+    line_totals: List[Decimal]
+    total: Decimal
+    cost: Decimal
+    unit_cents: np.ndarray
+
+
+class PriceColumns(NamedTuple):
+    sell_cents: np.ndarray
+    cost_cents: np.ndarray
+    stock: np.ndarray
+    present: np.ndarray
+
+    @classmethod
+    def empty(cls, capacity: int) -> "PriceColumns":
+        return cls(*(np.zeros(capacity, dtype=dtype) for dtype in (np.int64, np.int64, np.int64, bool)))
+
+    def grown(self, capacity: int) -> "PriceColumns":
+        bigger = PriceColumns.empty(capacity)
+        for old, new in zip(self, bigger):
+            new[:len(old)] = old
+        return bigger
+
+
+# The four arrays are replaced together as one PriceColumns tuple, so a reader
+# that takes `self.columns` once never mixes arrays from before and after a
+# reload or a resize. Writers hold the lock; quote() does not need it.
+class PriceSnapshot(RefreshableSnapshot):
+    name = "price-snapshot"
+
+    def __init__(self, capacity: int = 1024, refresh_seconds: float = 30):
+        super().__init__(refresh_seconds)
+        self.columns = PriceColumns.empty(capacity)
+
+    def _ensure_capacity(self, max_id: int) -> PriceColumns:
+        columns = self.columns
+        size = len(columns.present)
+        if max_id < size:
+            return columns
+        while size <= max_id:
+            size *= 2
+        self.columns = columns.grown(size)
+        return self.columns
+
+    def load(self, db) -> int:
+        """Build the snapshot from the PRODUCTS table. Returns the number of products."""
+        rows = db.execute(select(Product.id, Product.sellPrice, Product.cost, Product.stock)).all()
+        ids = np.fromiter((r.id for r in rows), dtype=np.int64, count=len(rows))
+        columns = PriceColumns.empty(max(1024, (int(ids.max(initial=0)) + 1) * 2))
+        columns.sell_cents[ids] = np.fromiter((to_cents(r.sellPrice) for r in rows), dtype=np.int64, count=len(rows))
+        columns.cost_cents[ids] = np.fromiter((to_cents(r.cost) for r in rows), dtype=np.int64, count=len(rows))
+        columns.stock[ids] = np.fromiter((r.stock or 0 for r in rows), dtype=np.int64, count=len(rows))
+        columns.present[ids] = True
+        with self._lock:
+            self.columns = columns
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+        logger.info(f"Price snapshot loaded with {len(rows)} products ({self.memory_bytes // 1024} KiB)")
+        return len(rows)
+
+    def _set(self, product_id: int, sell_price, cost, stock) -> None:
+        columns = self._ensure_capacity(product_id)
+        columns.sell_cents[product_id] = to_cents(sell_price)
+        columns.cost_cents[product_id] = to_cents(cost)
+        columns.stock[product_id] = stock or 0
+        columns.present[product_id] = True
+
+    # Incremental updates from the CRUD writes
+    def apply_product(self, product) -> None:
+        with self._lock:
+            self._set(product.id, product.sellPrice, product.cost, product.stock)
+
+    def reload(self, db, product_ids: Sequence[int]) -> None:
+        """Re-read some products from the database (ids no longer there are removed)."""
+        ids = set(product_ids)
+        rows = db.execute(
+            select(Product.id, Product.sellPrice, Product.cost, Product.stock).where(Product.id.in_(ids))
+        ).all()
+        with self._lock:
+            for row in rows:
+                self._set(row.id, row.sellPrice, row.cost, row.stock)
+            present = self.columns.present
+            for product_id in ids.difference(row.id for row in rows):
+                if 0 <= product_id < len(present):
+                    present[product_id] = False
+
+    def remove_product(self, product_id: int) -> None:
+        with self._lock:
+            present = self.columns.present
+            if product_id < len(present):
+                present[product_id] = False
+
+    def reduce_stock(self, product_ids: Sequence[int], quantities: Sequence[int]) -> None:
+        ids = np.asarray(product_ids, dtype=np.int64)
+        qty = np.asarray(quantities, dtype=np.int64)
+        with self._lock:
+            stock = self.columns.stock
+            in_range = ids < len(stock)
+            np.subtract.at(stock, ids[in_range], qty[in_range])
+            np.maximum(stock, 0, out=stock)
+
+    def quote(self, product_ids: Sequence[int], quantities: Sequence[int]) -> BasketQuote:
+        """Price a basket in one vectorized pass. Raises PricingError for unknown products."""
+        columns = self.columns
+        ids = np.asarray(product_ids, dtype=np.int64)
+        qty = np.asarray(quantities, dtype=np.int64)
+        known = (ids >= 0) & (ids < len(columns.present))
+        known[known] = columns.present[ids[known]]
+        if not known.all():
+            raise PricingError(f"Unknown product id(s): {sorted(set(ids[~known].tolist()))}")
+
+        unit = columns.sell_cents[ids]
+        line_totals = unit * qty
+        return BasketQuote(
+            line_prices=[from_cents(c) for c in unit.tolist()],
+            line_totals=[from_cents(c) for c in line_totals.tolist()],
+            total=from_cents(line_totals.sum()),
+            cost=from_cents((columns.cost_cents[ids] * qty).sum()),
+            unit_cents=unit,
+        )
+
+    def get_stock(self, product_id: int) -> Optional[int]:
+        columns = self.columns
+        if product_id < len(columns.present) and columns.present[product_id]:
+            return int(columns.stock[product_id])
+        return None
+
+    @property
+    def product_count(self) -> int:
+        return int(self.columns.present.sum())
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(column.nbytes for column in self.columns)
+
+
+price_snapshot = PriceSnapshot(refresh_seconds=get_settings().price_snapshot_refresh_seconds)
+metrics.gauge("pricing.snapshot_products", lambda: price_snapshot.product_count)
+metrics.gauge("pricing.snapshot_memory_bytes", lambda: price_snapshot.memory_bytes)
+
+
+def verify_basket(db, details: List[dict], total_amount, total) -> BasketQuote:
+    """
+    Price the basket from the snapshot and check the client's figures against it.
+    Every line price must equal the current sell price, and both totals must equal
+    the basket total to the cent. Unknown products and price mismatches are
+    checked again against the database before the basket is rejected.
+    """
+    if not price_snapshot.loaded:
+        price_snapshot.load(db)
+    else:
+        price_snapshot.refresh_in_background()
+
+    product_ids = [d["product_id"] for d in details]
+    quantities = [d["quantity"] for d in details]
+    client_prices = np.array([to_cents(d["price"]) for d in details], dtype=np.int64)
+    try:
+        quote = price_snapshot.quote(product_ids, quantities)
+        wrong = np.nonzero(client_prices != quote.unit_cents)[0]
+    except PricingError:
+        wrong = None
+    if wrong is None or len(wrong):
+        # the snapshot may be behind a write made by another worker
+        metrics.inc("pricing.reloads")
+        price_snapshot.reload(db, product_ids)
+        quote = price_snapshot.quote(product_ids, quantities)
+        wrong = np.nonzero(client_prices != quote.unit_cents)[0]
+    metrics.inc("pricing.quotes")
+
+    if len(wrong):
+        metrics.inc("pricing.rejected")
+        line = int(wrong[0])
+        raise PricingError(
+            f"Price mismatch for product {details[line]['product_id']}: "
+            f"expected {quote.line_prices[line]}, got {Decimal(str(details[line]['price'])).quantize(CENT)}"
+        )
+
+    for field, value in (("total_amount", total_amount), ("total", total)):
+        if to_cents(value) != to_cents(quote.total):
+            metrics.inc("pricing.rejected")
+            raise PricingError(f"Basket {field} mismatch: expected {quote.total}, got {Decimal(str(value)).quantize(CENT)}")
+    return quote
+
+
+def load_price_snapshot() -> None:
+    """Build the snapshot at startup; on failure the first checkout loads it."""
+    from src.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        price_snapshot.load(db)
+    except Exception as e:
+        logger.error(f"Could not load price snapshot: {e}")
+    finally:
+        db.close()
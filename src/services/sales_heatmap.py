@@ -0,0 +1,178 @@
+'''
+Branch sales heatmap: transactions and revenue by weekday x hour of day.
+
+The database buckets a branch's transactions per (day, hour) with the
+branch/date/time index, so only up to 24 small rows per day are returned.
+The per-day hour vectors are folded into the 7 x 24 matrix here (the weekday
+follows from the date).
+
+Days that are over never change, so their hour vectors are cached per
+(branch, day) and a report over a long range only queries the days it has not
+seen yet plus today. Writes that change past days (a backdated checkout,
+editing or deleting a transaction) invalidate the affected entries in this
+worker; entries also expire after SALES_HEATMAP_CACHE_SECONDS, so such writes
+made through other workers show up too.
+Ranges that reach back to archived months also read TRANSACTIONS_ARCHIVE.
+'''
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import extract, func, select
+from sqlalchemy.orm import Session
+
+from src.config import get_settings
+from src.database import shard_router
+from src.jobs.archive import reaches_archive
+from src.model.orm import Transaction, TransactionArchive
+from src.utils.metrics import metrics
+
+HOURS = 24
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+# (transactions per hour, revenue per hour)
+DayBuckets = Tuple[Tuple[int, ...], Tuple[Decimal, ...]]
+EMPTY_DAY: DayBuckets = ((0,) * HOURS, (Decimal("0.00"),) * HOURS)
+
+
+class ClosedDayCache:
+    """LRU of hour buckets for days that are over, keyed by (branch_id, day); entries expire after ttl seconds."""
+
+    def __init__(self, max_days: int = 100_000, ttl: float = 600):
+        self.max_days = max_days
+        self.ttl = ttl
+        self._days: "OrderedDict[Tuple[int, date], Tuple[DayBuckets, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, branch_id: int, day: date) -> Optional[DayBuckets]:
+        with self._lock:
+            entry = self._days.get((branch_id, day))
+            if entry is None:
+                return None
+            buckets, stored_at = entry
+            if time.monotonic() - stored_at >= self.ttl:
+                del self._days[(branch_id, day)]
+                metrics.inc("sales_heatmap.expired_days")
+                return None
+            self._days.move_to_end((branch_id, day))
+            return buckets
+
+    def put(self, branch_id: int, day: date, buckets: DayBuckets) -> None:
+        with self._lock:
+            self._days[(branch_id, day)] = (buckets, time.monotonic())
+            self._days.move_to_end((branch_id, day))
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+
+    def invalidate(self, branch_id: Optional[int] = None, day: Optional[date] = None) -> None:
+        """Drop one day, one branch, or everything."""
+        with self._lock:
+            if branch_id is None:
+                self._days.clear()
+            elif day is not None:
+                self._days.pop((branch_id, day), None)
+            else:
+                for key in [k for k in self._days if k[0] == branch_id]:
+                    del self._days[key]
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+
+closed_days = ClosedDayCache(ttl=get_settings().sales_heatmap_cache_seconds)
+metrics.gauge("sales_heatmap.cached_days", lambda: len(closed_days))
+
+
+def _hourly_sales_query(model, branch_id: int, start: date, end: date):
+    hour = extract("hour", model.timeOfTransaction)
+    return (
+        select(model.dateOfTransaction, hour, func.count(), func.sum(model.total))
+        .where(
+            model.branch_id == branch_id,
+            model.dateOfTransaction >= start,
+            model.dateOfTransaction <= end,
+        )
+        .group_by(model.dateOfTransaction, hour)
+    )
+
+
+def hourly_sales(db: Session, branch_id: int, start: date, end: date):
+    """(day, hour, transactions, revenue) for every hour with sales in [start, end]."""
+    def read(shard: Session):
+        rows = shard.execute(_hourly_sales_query(Transaction, branch_id, start, end)).all()
+        if reaches_archive(shard, start):
+            # A (day, hour) can appear in both tables; _day_buckets adds them up
+            rows += shard.execute(_hourly_sales_query(TransactionArchive, branch_id, start, end)).all()
+        return rows
+
+    # likewise for a (day, hour) in shard 0 from before sharding and in the branch's shard
+    return [row for rows in shard_router.scatter(db, read, shard_router.branch_shards(branch_id)) for row in rows]
+
+
+def _day_buckets(rows) -> Dict[date, DayBuckets]:
+    counts: Dict[date, List[int]] = {}
+    revenue: Dict[date, List[Decimal]] = {}
+    for day, hour, transactions, total in rows:
+        if day not in counts:
+            counts[day] = [0] * HOURS
+            revenue[day] = [Decimal("0.00")] * HOURS
+        counts[day][int(hour)] += transactions
+        revenue[day][int(hour)] += Decimal(total or 0)
+    return {day: (tuple(counts[day]), tuple(revenue[day])) for day in counts}
+
+
+def _consecutive_runs(days: List[date]) -> List[List[date]]:
+    runs: List[List[date]] = []
+    for day in days:
+        if runs and (day - runs[-1][-1]).days == 1:
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+    return runs
+
+
+def branch_heatmap(db: Session, branch_id: int, start: date, end: date, today: Optional[date] = None) -> dict:
+    """Transactions and revenue by weekday (Mon..Sun) x hour for one branch over [start, end]."""
+    today = today or date.today()
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    per_day: Dict[date, DayBuckets] = {}
+    missing = []
+    for day in days:
+        buckets = closed_days.get(branch_id, day) if day < today else None
+        if buckets is None:
+            missing.append(day)
+        else:
+            per_day[day] = buckets
+    metrics.inc("sales_heatmap.days_cached", len(days) - len(missing))
+
+    # One query per run of consecutive uncached days (typically one old gap and today)
+    metrics.inc("sales_heatmap.days_queried", len(missing))
+    for run in _consecutive_runs(missing):
+        fetched = _day_buckets(hourly_sales(db, branch_id, run[0], run[-1]))
+        for day in run:
+            buckets = fetched.get(day, EMPTY_DAY)
+            per_day[day] = buckets
+            if day < today:
+                closed_days.put(branch_id, day, buckets)
+
+    transactions = [[0] * HOURS for _ in WEEKDAYS]
+    revenue = [[Decimal("0.00")] * HOURS for _ in WEEKDAYS]
+    for day, (counts, totals) in per_day.items():
+        row = day.weekday()
+        for hour in range(HOURS):
+            if counts[hour]:
+                transactions[row][hour] += counts[hour]
+                revenue[row][hour] += totals[hour]
+
+    return {
+        "branch_id": branch_id,
+        "start": start,
+        "end": end,
+        "weekdays": list(WEEKDAYS),
+        "transactions": transactions,
+        "revenue": revenue,
+    }
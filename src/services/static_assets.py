@@ -0,0 +1,226 @@
+'''
+Static asset pipeline for the frontend (replaces StaticFiles + FileResponse).
+
+At startup every file under STATIC_DIR is read once and fingerprinted:
+style.css is published as /static/style.<hash>.css, where <hash> is taken from
+its content. Hashed URLs never change meaning, so they are served with
+`Cache-Control: public, max-age=31536000, immutable` and a repeat visitor does
+not ask for them again until a deploy changes the file.
+
+HTML pages (and CSS, for url(...) references) are rewritten to point at the
+hashed names; the pages themselves are served with `no-cache` and an ETag, so
+the browser revalidates them and usually gets a 304 with no body. The old
+unhashed URLs (/static/style.css) keep working the same way.
+
+Compressible files get gzip and, when the optional `brotli` package is
+installed, brotli variants, built once at the highest level. The variant is
+picked from Accept-Encoding per request. Files up to STATIC_MEMORY_MAX_BYTES are
+served from memory, larger ones from disk (with the same cache headers). Pages
+and CSS are always kept in memory whatever their size: the file on disk still
+has the unrewritten links.
+
+Set STATIC_WATCH=true while editing the frontend: the directory is re-scanned
+when a file changes, instead of only at startup.
+'''
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+from src.config import get_settings
+from src.utils.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+URL_PREFIX = "/static/"
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg", ".txt", ".map", ".xml"}
+MIN_COMPRESS_BYTES = 256
+# /static/<name> inside quotes or url(...), with an optional ?v= cache buster
+STATIC_REF = re.compile(r"""(?P<open>["'(])/static/(?P<name>[^"'()?#\s]+)(?:\?[^"'()#\s]*)?""")
+
+
+@dataclass
+class Asset:
+    name: str  # path under STATIC_DIR, e.g. "style.css"
+    url_name: str  # fingerprinted name, e.g. "style.3f2a9c1b0d4e.css" (same as name for pages)
+    media_type: str
+    digest: str
+    size: int
+    body: Optional[bytes]  # None: too large and not rewritten, served from disk
+    disk_path: str
+    variants: Dict[str, bytes] = field(default_factory=dict)  # content-encoding -> body
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+def accepted_encodings(header: str) -> set:
+    encodings = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if token:
+            encodings.add(token.strip().lower())
+    return encodings
+
+
+class StaticAssets:
+    def __init__(self, directory: str, memory_max_bytes: int, watch: bool = False):
+        self.directory = directory
+        self.memory_max_bytes = memory_max_bytes
+        self.watch = watch
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.by_name: Dict[str, Asset] = {}  # original names (and pages)
+        self.by_url: Dict[str, Asset] = {}  # fingerprinted names
+        self._signature: Tuple = ()
+
+    # Building
+    def _scan(self) -> Dict[str, os.stat_result]:
+        files = {}
+        for root, dirs, names in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for filename in names:
+                if filename.startswith(".") or filename.endswith(("~", ".gz", ".br")):
+                    continue
+                path = os.path.join(root, filename)
+                files[os.path.relpath(path, self.directory).replace(os.sep, "/")] = os.stat(path)
+        return files
+
+    def _rewrite(self, text: str, urls: Dict[str, str]) -> str:
+        def replace(match):
+            url_name = urls.get(match.group("name"))
+            if url_name is None:
+                return match.group(0)
+            return f"{match.group('open')}{URL_PREFIX}{url_name}"
+        return STATIC_REF.sub(replace, text)
+
+    def _build(self, name: str, data: bytes, fingerprint: bool, rewritten: bool = False) -> Asset:
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"  # text/* gets charset=utf-8
+        in_memory = rewritten or len(data) <= self.memory_max_bytes
+        asset = Asset(name=name, url_name=f"{stem}.{digest}{ext}" if fingerprint else name,
+                      media_type=media_type, digest=digest, size=len(data),
+                      body=data if in_memory else None, disk_path=os.path.join(self.directory, name))
+        if in_memory and ext.lower() in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+            candidates = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                candidates["br"] = brotli.compress(data, quality=11)
+            asset.variants = {enc: body for enc, body in candidates.items() if len(body) < len(data)}
+        return asset
+
+    def load(self) -> None:
+        files = self._scan()
+        by_name, by_url, urls = {}, {}, {}
+        # Plain assets first, then CSS (may reference them), then pages (reference both)
+        order = sorted(files, key=lambda n: (n.endswith(".html"), n.endswith(".css"), n))
+        for name in order:
+            with open(os.path.join(self.directory, name), "rb") as f:
+                data = f.read()
+            is_page = name.endswith(".html")
+            rewritten = is_page or name.endswith(".css")
+            if rewritten:
+                data = self._rewrite(data.decode("utf-8"), urls).encode("utf-8")
+            asset = self._build(name, data, fingerprint=not is_page, rewritten=rewritten)
+            by_name[name] = asset
+            if not is_page:
+                by_url[asset.url_name] = asset
+                urls[name] = asset.url_name
+        with self._lock:
+            self.by_name, self.by_url = by_name, by_url
+            self._signature = tuple(sorted((n, s.st_mtime_ns, s.st_size) for n, s in files.items()))
+            self.loaded = True
+        memory = sum(len(a.body or b"") + sum(map(len, a.variants.values())) for a in by_name.values())
+        logger.info(f"Static assets: {len(by_name)} files from {self.directory}, {memory / 1024:.0f} KB in memory"
+                    f"{'' if brotli is not None else ' (no brotli, gzip only)'}")
+
+    def _ensure_current(self) -> None:
+        if not self.loaded:
+            self.load()
+        elif self.watch:
+            files = self._scan()
+            if tuple(sorted((n, s.st_mtime_ns, s.st_size) for n, s in files.items())) != self._signature:
+                self.load()
+
+    def url_for(self, name: str) -> str:
+        """Public URL of a static file, e.g. url_for("vibe.js") -> /static/vibe.<hash>.js"""
+        self._ensure_current()
+        return URL_PREFIX + self.by_name[name].url_name
+
+    # Serving
+    def response(self, path: str, request: Request) -> Response:
+        """GET /static/<path>: a fingerprinted name (immutable) or an original one (revalidated)."""
+        self._ensure_current()
+        asset = self.by_url.get(path)
+        cache_control = IMMUTABLE
+        if asset is None:
+            asset = self.by_name.get(path)
+            cache_control = REVALIDATE
+        if asset is None:
+            metrics.inc("static.not_found")
+            return Response(status_code=404)
+        return self._send(asset, cache_control, request)
+
+    def page(self, name: str, request: Request) -> Response:
+        """An HTML page with links rewritten to fingerprinted assets."""
+        self._ensure_current()
+        return self._send(self.by_name[name], REVALIDATE, request)
+
+    def _send(self, asset: Asset, cache_control: str, request: Request) -> Response:
+        encoding = None
+        if asset.variants:
+            accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+            encoding = next((enc for enc in ("br", "gzip") if enc in accepted and enc in asset.variants), None)
+        headers = {"Cache-Control": cache_control, "ETag": asset.etag(encoding)}
+        if asset.variants:
+            headers["Vary"] = "Accept-Encoding"
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or asset.etag(encoding) in
+                              {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}):
+            metrics.inc("static.not_modified")
+            return Response(status_code=304, headers=headers)
+
+        metrics.inc("static.hits")
+        if asset.body is None:
+            return FileResponse(asset.disk_path, media_type=asset.media_type, headers=headers)
+        body = asset.variants[encoding] if encoding else asset.body
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        metrics.inc("static.bytes", len(body))
+        return Response(content=body, media_type=asset.media_type, headers=headers)
+
+
+settings = get_settings()
+static_assets = StaticAssets(
+    directory=settings.static_dir,
+    memory_max_bytes=settings.static_memory_max_bytes,
+    watch=settings.static_watch,
+)
+metrics.gauge("static.assets", lambda: len(static_assets.by_name))
+
+
+def load_static_assets() -> None:
+    """Fingerprint and compress the frontend at startup; on failure the first request retries."""
+    try:
+        static_assets.load()
+    except Exception as e:
+        logger.error(f"Could not load static assets: {e}")
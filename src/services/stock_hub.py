@@ -0,0 +1,195 @@
+'''
+In-process pub/sub hub for live stock levels (GET /api/v1/stream/stock, SSE).
+
+Writers (checkout, product create/update/delete, restock) call publish() after
+their commit; it only records the product's new stock under a lock, so it is
+cheap and safe from any thread. A flusher task on the event loop wakes every
+STOCK_STREAM_FLUSH_SECONDS, takes the changes of that interval (a product that
+changed ten times is sent once, with its latest stock), encodes one SSE message
+and appends it to each subscriber's queue.
+
+Backpressure: a subscriber that does not read (slow or stalled connection)
+accumulates at most STOCK_STREAM_MAX_QUEUED messages. Beyond that its queue is
+dropped and it gets a single `resync` event telling the client to reload the
+catalog, so a slow client never holds memory or delays anyone else. An idle
+subscriber costs a small object, an asyncio.Event and an empty deque.
+
+Stock is shared by all branches (PRODUCTS.stock), so every subscriber gets
+every change, whichever branch's sale or which catalog edit caused it.
+
+The hub is per worker process. With several workers, set
+STOCK_STREAM_POLL_SECONDS so each worker also picks up stock changed by the
+others, by comparing PRODUCTS.stock with the last poll.
+
+Events:
+    event: stock    data: {"stock": {"<product_id>": <stock or null if deleted>, ...}}
+    event: resync   data: {}
+    : ping          (comment, every STOCK_STREAM_HEARTBEAT_SECONDS)
+'''
+
+import asyncio
+import json
+import logging
+import threading
+from collections import deque
+from typing import AsyncIterator, Dict, Optional, Set
+
+from src.config import get_settings
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class HubFull(Exception):
+    pass
+
+
+class Subscription:
+    __slots__ = ("queue", "wakeup", "overflowed")
+
+    def __init__(self):
+        self.queue: deque = deque()
+        self.wakeup = asyncio.Event()
+        self.overflowed = False
+
+
+def encode(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class StockHub:
+    def __init__(self, max_subscribers: int, flush_seconds: float, heartbeat_seconds: float,
+                 max_queued: int, poll_seconds: float = 0):
+        self.max_subscribers = max_subscribers
+        self.flush_seconds = flush_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_queued = max_queued
+        self.poll_seconds = poll_seconds
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        # product_id -> latest stock
+        self._stock: Dict[int, Optional[int]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._polled: Optional[Dict[int, int]] = None
+
+    # Publishing (any thread)
+    def publish(self, product_id: int, stock: Optional[int]) -> None:
+        if not self._subscribers:
+            return
+        with self._lock:
+            self._stock[product_id] = stock
+
+    # Subscribing (event loop)
+    def is_full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def subscribe(self, check_capacity: bool = True) -> Subscription:
+        if check_capacity and self.is_full():
+            metrics.inc("stock_stream.rejected")
+            raise HubFull()
+        subscription = Subscription()
+        self._subscribers.add(subscription)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._run_flusher())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    async def events(self) -> AsyncIterator[str]:
+        """
+        SSE text for one subscriber until the client goes away. Subscribes on
+        the first iteration, so a response that is never sent leaves nothing
+        behind (the route checks is_full() before starting the response).
+        """
+        subscription = self.subscribe(check_capacity=False)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    # asyncio.timeout, not wait_for: wait_for can swallow the
+                    # cancellation of a disconnecting client when the event fires at the same time
+                    async with asyncio.timeout(self.heartbeat_seconds):
+                        await subscription.wakeup.wait()
+                except TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                subscription.wakeup.clear()
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield encode("resync", {})
+                while subscription.queue:
+                    yield subscription.queue.popleft()
+        finally:
+            self.unsubscribe(subscription)
+
+    # Fan-out
+    def flush(self) -> int:
+        """Deliver the changes collected since the last flush. Returns messages queued."""
+        with self._lock:
+            if not self._stock:
+                return 0
+            stock, self._stock = self._stock, {}
+
+        message = encode("stock", {"stock": stock})
+        queued = 0
+        for subscription in list(self._subscribers):
+            if subscription.overflowed:
+                continue
+            if len(subscription.queue) >= self.max_queued:
+                subscription.queue.clear()
+                subscription.overflowed = True
+                metrics.inc("stock_stream.overflows")
+            else:
+                subscription.queue.append(message)
+                queued += 1
+            subscription.wakeup.set()
+        metrics.inc("stock_stream.messages", queued)
+        return queued
+
+    async def _run_flusher(self) -> None:
+        since_poll = 0.0
+        while self._subscribers:
+            await asyncio.sleep(self.flush_seconds)
+            since_poll += self.flush_seconds
+            if self.poll_seconds and since_poll >= self.poll_seconds:
+                since_poll = 0.0
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self.poll)
+                except Exception as e:
+                    logger.warning(f"Stock poll failed: {e}")
+            self.flush()
+        self._polled = None
+
+    def poll(self) -> None:
+        """Publish stock changed by other workers since the previous poll."""
+        from sqlalchemy import select
+        from src.database import SessionLocal
+        from src.model.orm import Product
+
+        db = SessionLocal()
+        try:
+            current = dict(db.execute(select(Product.id, Product.stock)).all())
+        finally:
+            db.close()
+        previous, self._polled = self._polled, current
+        if previous is None:
+            return
+        for product_id, stock in current.items():
+            if previous.get(product_id) != stock:
+                self.publish(product_id, stock)
+        for product_id in previous.keys() - current.keys():
+            self.publish(product_id, None)
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+
+settings = get_settings()
+stock_hub = StockHub(
+    max_subscribers=settings.stock_stream_max_subscribers,
+    flush_seconds=settings.stock_stream_flush_seconds,
+    heartbeat_seconds=settings.stock_stream_heartbeat_seconds,
+    max_queued=settings.stock_stream_max_queued,
+    poll_seconds=settings.stock_stream_poll_seconds,
+)
+metrics.gauge("stock_stream.subscribers", lambda: len(stock_hub))
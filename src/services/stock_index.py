@@ -0,0 +1,97 @@
+'''
+In-memory index of products ordered by stock, for the low-stock endpoint.
+
+A sorted list of (stock, product_id) kept with bisect, plus a dict of each
+product's current entry. The k lowest-stock products at or below a threshold
+are a slice from the front of the list: O(log n + k), no database access.
+
+The CRUD writes that change stock (create/update/delete product, restock,
+create_transaction) update the index after they commit. The index is per
+worker process, so it is also rebuilt from the database when it is older than
+STOCK_INDEX_REFRESH_SECONDS (in the background, the current copy is served
+meanwhile) to pick up writes made by other workers. Until the first load
+succeeds the endpoint queries the database instead.
+'''
+
+import bisect
+import logging
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+from sqlalchemy import select
+
+from src.config import get_settings
+from src.model.orm import Product
+from src.utils.metrics import metrics
+from src.utils.refreshable import RefreshableSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class StockEntry(NamedTuple):
+    product_id: int
+    name: str
+    stock: int
+
+
+class StockIndex(RefreshableSnapshot):
+    name = "stock-index"
+
+    def __init__(self, refresh_seconds: float):
+        super().__init__(refresh_seconds)
+        self._order: List[Tuple[int, int]] = []  # sorted (stock, product_id)
+        self._entries: Dict[int, StockEntry] = {}
+
+    def load(self, db) -> int:
+        """(Re)build the index from the PRODUCTS table. Returns the number of products."""
+        rows = db.execute(select(Product.id, Product.name, Product.stock)).all()
+        entries = {r.id: StockEntry(r.id, r.name, r.stock or 0) for r in rows}
+        order = sorted((e.stock, e.product_id) for e in entries.values())
+        with self._lock:
+            self._entries = entries
+            self._order = order
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+        logger.info(f"Stock index loaded with {len(entries)} products")
+        return len(entries)
+
+    def _discard(self, product_id: int) -> None:
+        old = self._entries.pop(product_id, None)
+        if old is not None:
+            pos = bisect.bisect_left(self._order, (old.stock, product_id))
+            if pos < len(self._order) and self._order[pos] == (old.stock, product_id):
+                del self._order[pos]
+
+    def set(self, product_id: int, name: str, stock: int) -> None:
+        stock = stock or 0
+        with self._lock:
+            self._discard(product_id)
+            self._entries[product_id] = StockEntry(product_id, name, stock)
+            bisect.insort(self._order, (stock, product_id))
+
+    def set_stock(self, product_id: int, stock: int) -> None:
+        entry = self._entries.get(product_id)
+        if entry is not None:
+            self.set(product_id, entry.name, stock)
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            self._discard(product_id)
+
+    def lowest(self, threshold: int, limit: int) -> List[StockEntry]:
+        """Products with stock <= threshold, lowest stock first (ties by id)."""
+        with self._lock:
+            end = bisect.bisect_right(self._order, (threshold, float("inf")))
+            return [self._entries[product_id] for _, product_id in self._order[:min(end, limit)]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+stock_index = StockIndex(refresh_seconds=get_settings().stock_index_refresh_seconds)
+metrics.gauge("stock_index.products", lambda: len(stock_index))
+
+
+def load_stock_index() -> None:
+    """Build the index at startup; on failure the endpoint falls back to the database."""
+    stock_index.refresh()
@@ -0,0 +1,151 @@
+'''
+Revocation store for refresh tokens.
+
+Only used or revoked ids are stored (not every issued token), each with its
+expiry so rows can be purged once the token could no longer be presented:
+
+- scope 'token':  jti of a refresh token that has been rotated (used once)
+- scope 'family': id of a whole login session revoked on logout or reuse
+
+Lookups go to an in-memory deny-list (dict, O(1)). Writes go to the
+REVOKED_TOKENS table as well; inserting a jti is the atomic "consume" step of
+rotation, so a token replayed on another worker still hits the primary key.
+
+The deny-list is re-read from the table (and expired rows purged) every
+REVOKED_TOKENS_REFRESH_SECONDS, so logouts made through other workers reach
+this one. Until it has been loaded, lookups go to the table.
+'''
+
+import logging
+import time
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.config import get_settings
+from src.model.orm import RevokedToken
+from src.utils.metrics import metrics
+from src.utils.refreshable import RefreshableSnapshot
+
+logger = logging.getLogger(__name__)
+
+TOKEN = "token"
+FAMILY = "family"
+
+# Prune expired in-memory entries every N revocations
+PRUNE_EVERY = 1000
+
+
+class RevocationStore(RefreshableSnapshot):
+    name = "revocations"
+
+    def __init__(self, refresh_seconds: float = 60):
+        super().__init__(refresh_seconds)
+        self._tokens: Dict[str, datetime] = {}
+        self._families: Dict[str, datetime] = {}
+        self._writes = 0
+
+    def _remember(self, token_id: str, scope: str, expires_at: datetime) -> None:
+        with self._lock:
+            (self._families if scope == FAMILY else self._tokens)[token_id] = expires_at
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune(datetime.utcnow())
+
+    def _prune(self, now: datetime) -> None:
+        for entries in (self._tokens, self._families):
+            for key in [k for k, exp in entries.items() if exp <= now]:
+                del entries[key]
+
+    def is_token_revoked(self, jti: str) -> bool:
+        return jti in self._tokens
+
+    def is_family_revoked(self, family: str) -> bool:
+        return family in self._families
+
+    def is_family_revoked_in_db(self, db: Session, family: str) -> bool:
+        """Memory first, then the table (catches revocations made by other workers)."""
+        if family in self._families:
+            return True
+        row = db.get(RevokedToken, family)
+        if row is not None and row.scope == FAMILY:
+            self._remember(family, FAMILY, row.expires_at)
+            return True
+        return False
+
+    def consume(self, db: Session, jti: str, expires_at: datetime) -> bool:
+        """Mark a refresh token as used. Returns False if it had already been used."""
+        if jti in self._tokens:
+            return False
+        try:
+            db.add(RevokedToken(token_id=jti, scope=TOKEN, expires_at=expires_at))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            self._remember(jti, TOKEN, expires_at)
+            return False
+        self._remember(jti, TOKEN, expires_at)
+        metrics.inc("refresh_tokens.rotated")
+        return True
+
+    def revoke_family(self, db: Session, family: str, expires_at: datetime) -> None:
+        """Revoke every token of a login session."""
+        if db.get(RevokedToken, family) is None:
+            try:
+                db.add(RevokedToken(token_id=family, scope=FAMILY, expires_at=expires_at))
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+        self._remember(family, FAMILY, expires_at)
+        metrics.inc("refresh_tokens.families_revoked")
+
+    def load(self, db: Session) -> int:
+        """Load unexpired revocations from the table and purge expired rows."""
+        started = time.monotonic()
+        now = datetime.utcnow()
+        db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        db.commit()
+        rows = db.execute(select(RevokedToken.token_id, RevokedToken.scope, RevokedToken.expires_at)).all()
+        with self._lock:
+            # Revocations remembered while the table was read are kept
+            for r in rows:
+                (self._families if r.scope == FAMILY else self._tokens)[r.token_id] = r.expires_at
+            self._prune(now)
+            self.loaded = True
+            self.loaded_at = started
+        logger.info(f"Loaded {len(rows)} token revocations")
+        return len(rows)
+
+    def __len__(self) -> int:
+        return len(self._tokens) + len(self._families)
+
+
+revocation_store = RevocationStore(get_settings().revoked_tokens_refresh_seconds)
+metrics.gauge("refresh_tokens.deny_list_size", lambda: len(revocation_store))
+
+
+def load_revocation_store() -> None:
+    """Fill the deny-list at startup; on failure lookups keep going to the table."""
+    from src.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        revocation_store.load(db)
+    except Exception as e:
+        logger.error(f"Could not load token revocations: {e}")
+    finally:
+        db.close()
+
+
+def is_family_revoked_in_table(family: str) -> bool:
+    """is_family_revoked_in_db with a session of its own (for callers without one)."""
+    from src.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return revocation_store.is_family_revoked_in_db(db, family)
+    finally:
+        db.close()
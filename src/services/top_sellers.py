@@ -0,0 +1,163 @@
+'''
+Live "top products" per branch and time window.
+
+Units sold are fed into Space-Saving sketches (src/utils/space_saving.py), one
+per branch and bucket (calendar day, and clock hour), plus one per bucket for
+all branches together. create_transaction records each sale after commit;
+windows longer than a day merge the day sketches.
+
+Windows:  hour  = the current clock hour
+          today = the current calendar day
+          7d    = today and the previous 6 days
+
+Accuracy: with N units sold in the window and k = TOP_SELLERS_CAPACITY, each
+reported count is at most N/k above the true count, count - error is a lower
+bound, and any product that sold more than N/k units is always listed.
+
+The sketches are per worker process. They are rebuilt from the database (one
+GROUP BY over the last 7 days) at startup and every TOP_SELLERS_REFRESH_SECONDS
+in the background, which also picks up sales made on other workers.
+'''
+
+import logging
+import time
+from collections import defaultdict
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from src.config import get_settings
+from src.database import shard_router
+from src.model.orm import Transaction, TransactionDetail
+from src.utils.metrics import metrics
+from src.utils.refreshable import RefreshableSnapshot
+from src.utils.space_saving import SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+HOUR = "hour"
+TODAY = "today"
+WEEK = "7d"
+WINDOWS = (HOUR, TODAY, WEEK)
+WEEK_DAYS = 7
+
+ALL_BRANCHES = None
+
+
+class TopSellers(RefreshableSnapshot):
+    name = "top-sellers"
+
+    def __init__(self, capacity: int, refresh_seconds: float):
+        super().__init__(refresh_seconds)
+        self.capacity = capacity
+        self._days: Dict[Tuple[Optional[int], date], SpaceSaving] = {}
+        self._hours: Dict[Tuple[Optional[int], date, int], SpaceSaving] = {}
+
+    def _sketch(self, table: dict, key) -> SpaceSaving:
+        sketch = table.get(key)
+        if sketch is None:
+            sketch = table[key] = SpaceSaving(self.capacity)
+        return sketch
+
+    def record(self, branch_id: Optional[int], items: Iterable[Tuple[int, int]], when: Optional[datetime] = None,
+               now: Optional[datetime] = None) -> None:
+        """Add a sale's (product_id, quantity) lines to the buckets of its time; a backdated sale
+        only counts in the windows it falls in."""
+        now = now or datetime.now()
+        when = when or now
+        today, day = now.date(), when.date()
+        if not today - timedelta(days=WEEK_DAYS - 1) <= day <= today:
+            return
+        this_hour = (day, when.hour) == (today, now.hour)
+        branches = (ALL_BRANCHES,) if branch_id is None else (ALL_BRANCHES, branch_id)
+        with self._lock:
+            for branch in branches:
+                sketches = [self._sketch(self._days, (branch, day))]
+                if this_hour:
+                    sketches.append(self._sketch(self._hours, (branch, day, now.hour)))
+                for product_id, quantity in items:
+                    if product_id is not None:
+                        for sketch in sketches:
+                            sketch.offer(product_id, quantity)
+            self._prune(today, now.hour)
+
+    def _prune(self, day: date, hour: int) -> None:
+        oldest = day - timedelta(days=WEEK_DAYS - 1)
+        for key in [k for k in self._days if k[1] < oldest]:
+            del self._days[key]
+        for key in [k for k in self._hours if (k[1], k[2]) != (day, hour)]:
+            del self._hours[key]
+
+    def window(self, branch_id: Optional[int], window: str, now: Optional[datetime] = None) -> SpaceSaving:
+        """Sketch of the given window (empty if nothing was sold)."""
+        now = now or datetime.now()
+        today = now.date()
+        with self._lock:
+            if window == HOUR:
+                sketch = self._hours.get((branch_id, today, now.hour))
+            elif window == TODAY:
+                sketch = self._days.get((branch_id, today))
+            else:
+                days = [self._days.get((branch_id, today - timedelta(days=i))) for i in range(WEEK_DAYS)]
+                sketch = SpaceSaving.merge((d for d in days if d is not None), self.capacity)
+            # Copy under the lock so callers can read it while sales keep coming in
+            return SpaceSaving.merge([sketch], self.capacity) if sketch is not None else SpaceSaving(self.capacity)
+
+    def load(self, db, now: Optional[datetime] = None) -> int:
+        """Rebuild all buckets from the database. Returns the number of rows read."""
+        now = now or datetime.now()
+        today = now.date()
+        fresh = TopSellers(self.capacity, self.refresh_seconds)
+        units = func.sum(TransactionDetail.quantity)
+        base = (
+            select(Transaction.branch_id, Transaction.dateOfTransaction, TransactionDetail.product_id, units)
+            .join(Transaction, Transaction.id == TransactionDetail.transaction_id)
+            .where(TransactionDetail.product_id.is_not(None))
+        )
+        days = base.where(
+            Transaction.dateOfTransaction > today - timedelta(days=WEEK_DAYS),
+            Transaction.dateOfTransaction <= today,
+        ).group_by(Transaction.branch_id, Transaction.dateOfTransaction, TransactionDetail.product_id)
+        hour = base.where(
+            Transaction.dateOfTransaction == today,
+            Transaction.timeOfTransaction >= dtime(now.hour),
+        ).group_by(Transaction.branch_id, Transaction.dateOfTransaction, TransactionDetail.product_id)
+
+        rows = 0
+        for statement, table in ((days, fresh._days), (hour, fresh._hours)):
+            lines = defaultdict(list)
+            for branch_id, day, product_id, quantity in self._rows(db, statement):
+                lines[(branch_id, day)].append((product_id, int(quantity)))
+                rows += 1
+            for (branch_id, day), items in lines.items():
+                for branch in ((ALL_BRANCHES,) if branch_id is None else (ALL_BRANCHES, branch_id)):
+                    key = (branch, day) if table is fresh._days else (branch, day, now.hour)
+                    sketch = fresh._sketch(table, key)
+                    for product_id, quantity in items:
+                        sketch.offer(product_id, quantity)
+
+        with self._lock:
+            self._days, self._hours = fresh._days, fresh._hours
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+        logger.info(f"Top sellers loaded from {rows} rows")
+        return rows
+
+    @staticmethod
+    def _rows(db, statement) -> List:
+        """The statement's rows from every transaction shard (each branch lives on one, so groups don't overlap)."""
+        return [row for rows in shard_router.scatter(db, lambda shard: shard.execute(statement).all()) for row in rows]
+
+    def __len__(self) -> int:
+        return len(self._days) + len(self._hours)
+
+
+settings = get_settings()
+top_sellers = TopSellers(capacity=settings.top_sellers_capacity, refresh_seconds=settings.top_sellers_refresh_seconds)
+metrics.gauge("top_sellers.sketches", lambda: len(top_sellers))
+
+
+def load_top_sellers() -> None:
+    """Build the sketches at startup; on failure they fill up from new sales."""
+    top_sellers.refresh()
@@ -0,0 +1,89 @@
+'''
+Argon2 parameter calibration.
+
+Finds the strongest Argon2id parameters whose verify latency stays within a
+target on the current machine and within a memory budget, so every login has
+an explicit, measured CPU and memory cost. Used by scripts/calibrate_argon2.py.
+'''
+
+import os
+import statistics
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+
+from argon2 import PasswordHasher
+
+# Smallest memory cost we are willing to go down to (KiB)
+MIN_MEMORY_COST = 8 * 1024
+# Upper bound for the time cost search
+MAX_TIME_COST = 20
+
+
+@dataclass
+class Argon2Parameters:
+    time_cost: int
+    memory_cost: int  # KiB
+    parallelism: int
+    verify_ms: float
+
+    def as_env(self) -> Dict[str, str]:
+        """Environment variable form, as read by src.config.Settings."""
+        return {
+            "ARGON2_TIME_COST": str(self.time_cost),
+            "ARGON2_MEMORY_COST": str(self.memory_cost),
+            "ARGON2_PARALLELISM": str(self.parallelism),
+        }
+
+
+def measure_verify_ms(time_cost: int, memory_cost: int, parallelism: int, samples: int = 5) -> float:
+    """Median time of one verify with the given parameters, in milliseconds."""
+    hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    hashed = hasher.hash("calibration-Password1")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.verify(hashed, "calibration-Password1")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, max_memory_kib: int, parallelism: int = 0, samples: int = 5) -> Argon2Parameters:
+    """
+    Pick Argon2 parameters for a target verify latency and memory budget.
+
+    Memory is the primary cost (it is what makes GPU attacks expensive), so we
+    use the whole budget and halve it only if even time_cost=1 is over the
+    target. Then time_cost is raised while verify stays within the target.
+    """
+    if parallelism <= 0:
+        parallelism = min(os.cpu_count() or 1, 4)
+
+    memory_cost = max_memory_kib
+    verify_ms = measure_verify_ms(1, memory_cost, parallelism, samples)
+    while verify_ms > target_ms and memory_cost // 2 >= MIN_MEMORY_COST:
+        memory_cost //= 2
+        verify_ms = measure_verify_ms(1, memory_cost, parallelism, samples)
+
+    time_cost = 1
+    while time_cost < MAX_TIME_COST:
+        candidate_ms = measure_verify_ms(time_cost + 1, memory_cost, parallelism, samples)
+        if candidate_ms > target_ms:
+            break
+        time_cost += 1
+        verify_ms = candidate_ms
+
+    return Argon2Parameters(time_cost, memory_cost, parallelism, verify_ms)
+
+
+def write_env(path: Path, values: Dict[str, str]) -> None:
+    """Set `values` in a .env file, replacing existing keys and appending new ones."""
+    lines = path.read_text(encoding="utf-8").splitlines() if path.exists() else []
+    remaining = dict(values)
+    for i, line in enumerate(lines):
+        key = line.split("=", 1)[0].strip()
+        if key in remaining:
+            lines[i] = f"{key}={remaining.pop(key)}"
+    lines.extend(f"{key}={value}" for key, value in remaining.items())
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
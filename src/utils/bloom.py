@@ -0,0 +1,49 @@
+'''
+Bloom filter for fast "definitely not present" membership checks.
+
+Sized from the expected number of items and the target false-positive rate.
+Uses double hashing over one blake2b digest, so each add/check is a single
+hash call plus k bit operations.
+'''
+
+import hashlib
+import math
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        if capacity <= 0 or not 0 < fp_rate < 1:
+            raise ValueError("capacity must be positive and fp_rate between 0 and 1")
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        # Optimal size: m = -n ln(p) / (ln 2)^2 bits, k = m/n ln 2 hashes
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+    def expected_fp_rate(self) -> float:
+        """False-positive probability for the number of items added so far."""
+        if self.count == 0:
+            return 0.0
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
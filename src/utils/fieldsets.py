@@ -0,0 +1,69 @@
+'''
+Sparse fieldsets: ?fields=id,name,stock on list and get routes.
+
+- The fields a client may ask for are the fields of the entity's response
+  model (CustomerInDB, ProductInDB, ...). Fields the model excludes, such as
+  the password, are never on the list.
+- The CRUD read functions select only the requested columns.
+- Responses are encoded by a model with just those fields. The model and its
+  TypeAdapter are built once per fieldset and cached; the order of the names
+  in the query does not matter.
+'''
+
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+from src.utils.metrics import metrics
+
+# Most fieldsets ever cached (each is a small model and two TypeAdapters)
+MAX_CACHED_FIELDSETS = 256
+
+FieldSet = Tuple[str, ...]
+
+
+@lru_cache(maxsize=None)
+def allowed_fields(schema: Type[BaseModel]) -> FieldSet:
+    """Allow-list of an entity: its response model's fields, in declaration order."""
+    return tuple(name for name, field in schema.model_fields.items() if not field.exclude)
+
+
+def parse_fields(schema: Type[BaseModel], fields: Optional[str]) -> Optional[FieldSet]:
+    """The requested fields in canonical order, or None when ?fields= was not given."""
+    if fields is None:
+        return None
+    allowed = allowed_fields(schema)
+    requested = {part.strip() for part in fields.split(",") if part.strip()}
+    unknown = requested.difference(allowed)
+    if not requested or unknown:
+        detail = f"Unknown fields: {', '.join(sorted(unknown))}. " if unknown else ""
+        raise HTTPException(status_code=400, detail=f"{detail}fields must be a comma separated subset of: {', '.join(allowed)}")
+    return tuple(name for name in allowed if name in requested)
+
+
+@lru_cache(maxsize=MAX_CACHED_FIELDSETS)
+def fieldset_model(schema: Type[BaseModel], fields: FieldSet) -> Type[BaseModel]:
+    """A model with only `fields` of `schema` (same types, defaults and descriptions)."""
+    metrics.inc("fieldsets.models_built")
+    return create_model(
+        f"{schema.__name__}[{','.join(fields)}]",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields},
+    )
+
+
+@lru_cache(maxsize=MAX_CACHED_FIELDSETS)
+def encoder(schema: Type[BaseModel], fields: FieldSet, many: bool = True) -> TypeAdapter:
+    """TypeAdapter for a list (or a single item) of the fieldset model."""
+    model = fieldset_model(schema, fields)
+    return TypeAdapter(List[model] if many else model)
+
+
+def respond(schema: Type[BaseModel], fields: FieldSet, data: Any, many: bool = True) -> Response:
+    """Encode `data` (records, ORM objects or dicts) with the fieldset's cached encoder."""
+    adapter = encoder(schema, fields, many)
+    metrics.inc("fieldsets.responses")
+    return Response(content=adapter.dump_json(adapter.validate_python(data, from_attributes=True)),
+                    media_type="application/json")
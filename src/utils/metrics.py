@@ -0,0 +1,49 @@
+'''
+In-process metrics registry.
+
+Counters are plain integers behind a lock; gauges are callables evaluated when
+the metrics are read, so reporting a value costs nothing on the hot path.
+Exposed as JSON by GET /metrics in main.py.
+'''
+
+import threading
+from typing import Callable, Dict, Union
+
+Number = Union[int, float]
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Number] = {}
+        self._gauges: Dict[str, Callable[[], Number]] = {}
+
+    def inc(self, name: str, amount: Number = 1) -> None:
+        """Increase counter `name` by `amount`."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def gauge(self, name: str, read: Callable[[], Number]) -> None:
+        """Register a gauge whose value is read from `read()` at snapshot time."""
+        with self._lock:
+            self._gauges[name] = read
+
+    def get(self, name: str) -> Number:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Number]:
+        """Current value of every counter and gauge, sorted by name."""
+        with self._lock:
+            values = dict(self._counters)
+            gauges = dict(self._gauges)
+        for name, read in gauges.items():
+            try:
+                values[name] = read()
+            except Exception:
+                continue
+        return dict(sorted(values.items()))
+
+
+# Process-wide registry
+metrics = Metrics()
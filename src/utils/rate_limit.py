@@ -0,0 +1,85 @@
+'''
+In-process admission control for expensive endpoints.
+
+- RateLimiter: token buckets keyed by an arbitrary string (client IP, email),
+  kept in a bounded LRU so memory stays flat under key-spraying.
+- ConcurrencyLimiter: caps how many expensive operations (Argon2 hashes) run
+  at once; callers that do not get a slot are rejected instead of queued.
+
+Both are per worker process and cost a few microseconds per check.
+'''
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request is not admitted; carries the suggested wait in seconds."""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded ({scope})")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token bucket per key: `rate` tokens per second, at most `burst` stored."""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        # key -> [tokens, last refill timestamp]
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """Take `cost` tokens for `key`. Returns 0 if admitted, else seconds until it would be."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self.burst, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            return (cost - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class ConcurrencyLimiter:
+    """Non-blocking cap on the number of operations in flight."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @contextmanager
+    def slot(self, retry_after: float = 1.0):
+        """Hold one slot for the duration of the block, or raise RateLimitExceeded."""
+        with self._lock:
+            if self._in_flight >= self.limit:
+                raise RateLimitExceeded("concurrency", retry_after)
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
@@ -0,0 +1,60 @@
+'''
+Base class for the per-process, in-memory snapshots of database tables
+(email filter, token deny-list, price snapshot, stock index, top sellers).
+
+A subclass implements load(db), which rebuilds the snapshot and sets `loaded`
+and `loaded_at`. Once the snapshot is older than `refresh_seconds` it is stale;
+refresh_in_background() then rebuilds it on a daemon thread while readers keep
+using the current copy. At most one refresh runs at a time per snapshot.
+'''
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshableSnapshot:
+    # Used in log messages and as the name of the refresh thread ("<name>-refresh")
+    name = "snapshot"
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.loaded = False
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def load(self, db) -> int:
+        raise NotImplementedError
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.loaded_at > self.refresh_seconds
+
+    def claim_refresh(self) -> bool:
+        """True for the single caller that should start a background refresh."""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            return True
+
+    def refresh(self) -> None:
+        from src.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.load(db)
+        except Exception as e:
+            logger.warning(f"Refresh of {self.name} failed: {e}")
+        finally:
+            db.close()
+            self._refreshing = False
+
+    def refresh_in_background(self) -> bool:
+        """Start a refresh thread if the snapshot is stale and none is running. True if one was started."""
+        if not (self.is_stale() and self.claim_refresh()):
+            return False
+        threading.Thread(target=self.refresh, name=f"{self.name}-refresh", daemon=True).start()
+        return True
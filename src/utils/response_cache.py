@@ -0,0 +1,166 @@
+'''
+HTTP response cache for read-mostly list routes.
+
+- Every table has a version counter that the CRUD write functions bump after
+  a commit. A cached body is reused only while the versions of the tables it
+  was built from are unchanged.
+- Responses carry a strong ETag, a digest of the body only (the table versions
+  are per process, so they stay out of it and every worker gives the same body
+  the same tag). A client that sends a matching If-None-Match gets a 304
+  without any SQL or serialization.
+- Entries are fresh for RESPONSE_CACHE_TTL_SECONDS (this bounds how long
+  writes made by other worker processes can go unseen). For a further
+  RESPONSE_CACHE_STALE_SECONDS the stale body is served immediately while one
+  background task revalidates it. If the database fails while revalidating,
+  the stale body is served rather than an error.
+
+Hit ratio and bytes saved are reported in /metrics.
+'''
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.background import BackgroundTask
+
+from src.config import get_settings
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TableVersions:
+    """Per-table write counters of this process."""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *tables: str) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def get(self, tables: Sequence[str]) -> Tuple[int, ...]:
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+
+table_versions = TableVersions()
+
+
+@dataclass
+class CacheEntry:
+    etag: str
+    body: bytes
+    versions: Tuple[int, ...]
+    stored_at: float
+
+
+class ResponseCache:
+    def __init__(self, ttl: float, stale_ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._revalidating = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+        return f"{request.url.path}?{query}"
+
+    def _store(self, key: str, versions: Tuple[int, ...], body: bytes) -> CacheEntry:
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        entry = CacheEntry(etag, body, versions, time.monotonic())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _respond(self, request: Request, entry: CacheEntry, stale: bool = False,
+                 background: Optional[BackgroundTask] = None) -> Response:
+        headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+        if stale:
+            headers["Warning"] = '110 - "Response is Stale"'
+        if_none_match = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+        if entry.etag in if_none_match or "*" in if_none_match:
+            metrics.inc("response_cache.not_modified")
+            metrics.inc("response_cache.bytes_saved", len(entry.body))
+            return Response(status_code=304, headers=headers, background=background)
+        return Response(content=entry.body, media_type="application/json", headers=headers, background=background)
+
+    def _revalidate(self, key: str, tables: Sequence[str], produce: Callable[[Any], Any], adapter: TypeAdapter) -> None:
+        """Background refresh of a stale entry with its own database session."""
+        from src.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            versions = table_versions.get(tables)
+            self._store(key, versions, adapter.dump_json(adapter.validate_python(produce(db), from_attributes=True)))
+        except Exception as e:
+            logger.warning(f"Background revalidation of {key} failed: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._revalidating.discard(key)
+
+    def serve(self, request: Request, db, tables: Sequence[str], produce: Callable[[Any], Any], adapter: TypeAdapter) -> Response:
+        """
+        Return the cached response for this request, or build it with
+        `produce(db)` (ORM objects or models) encoded through `adapter`.
+        """
+        key = self.key_for(request)
+        versions = table_versions.get(tables)
+        entry = self._entries.get(key)
+
+        if entry is not None and entry.versions == versions:
+            age = time.monotonic() - entry.stored_at
+            if age < self.ttl:
+                metrics.inc("response_cache.hits")
+                return self._respond(request, entry)
+            if age < self.ttl + self.stale_ttl:
+                metrics.inc("response_cache.stale_served")
+                with self._lock:
+                    start = key not in self._revalidating
+                    self._revalidating.add(key)
+                task = BackgroundTask(self._revalidate, key, tables, produce, adapter) if start else None
+                return self._respond(request, entry, stale=True, background=task)
+
+        metrics.inc("response_cache.misses")
+        try:
+            data = adapter.validate_python(produce(db), from_attributes=True)
+        except SQLAlchemyError as e:
+            if entry is None:
+                raise
+            logger.warning(f"Database error while refreshing {key}, serving stale response: {e}")
+            metrics.inc("response_cache.stale_on_error")
+            return self._respond(request, entry, stale=True)
+        return self._respond(request, self._store(key, versions, adapter.dump_json(data)))
+
+    def hit_ratio(self) -> float:
+        served = metrics.get("response_cache.hits") + metrics.get("response_cache.stale_served")
+        total = served + metrics.get("response_cache.misses")
+        return served / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+settings = get_settings()
+response_cache = ResponseCache(
+    ttl=settings.response_cache_ttl_seconds,
+    stale_ttl=settings.response_cache_stale_seconds,
+    max_entries=settings.response_cache_max_entries,
+)
+metrics.gauge("response_cache.hit_ratio", response_cache.hit_ratio)
+metrics.gauge("response_cache.entries", lambda: len(response_cache))
@@ -4,40 +4,33 @@ Utility functions for password hashing, JWT token creation, and user authenticat
 
 '''
 
-import os
 import logging
+import uuid
+from contextvars import ContextVar
 from datetime import datetime, timedelta
 from typing import Optional, Any, Dict, Union
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 
-from src.crud.CRUD import execute_read
-from src.model.MODEL import TokenData
+from sqlalchemy.orm import Session
+
+from src.config import get_settings
+from src.model.MODEL import Role, TokenData
+from src.services.identity import Identity, find_identity
+from src.services.token_store import is_family_revoked_in_table, revocation_store
 
 # Security Configuration
-# Get secret key from environment variable
-SECRET_KEY = os.getenv("SECRET_KEY")
-if not SECRET_KEY:
-    raise RuntimeError("SECRET_KEY is not set in environment variables. Please check your .env file.")
-
-#Get algorithm from environment variable
-ALGORITHM = os.getenv("ALGORITHM")
-if not ALGORITHM:
-    raise RuntimeError("ALGORITHM is not set in environment variables.")
-
-#Get expire minutes from environment variable
-expire_minutes_str = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
-if not expire_minutes_str:
-    raise RuntimeError("ACCESS_TOKEN_EXPIRE_MINUTES is not set in environment variables.")
-
-#Convert expire minutes to integer
-try:
-    ACCESS_TOKEN_EXPIRE_MINUTES = int(expire_minutes_str)
-except ValueError:
-    raise RuntimeError("ACCESS_TOKEN_EXPIRE_MINUTES must be an integer.")
+# Secret key, algorithm and token lifetime come from the cached settings object,
+# which validates that they are present and well-typed
+settings = get_settings()
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
 
 # Get OAuth2 scheme for token extraction
 # The tokenUrl should point to the login endpoint
@@ -45,8 +38,12 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
 logger = logging.getLogger(__name__)
 
-# Initialize Argon2 password hasher with secure defaults
-ph = PasswordHasher()
+# Initialize Argon2 password hasher with the calibrated parameters
+ph = PasswordHasher(
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost,
+    parallelism=settings.argon2_parallelism,
+)
 
 
 # Password Hashing with argon2
@@ -65,8 +62,6 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash using Argon2."""
     try:
         ph.verify(hashed_password, plain_password)
-        if ph.check_needs_rehash(hashed_password):
-            logger.info("Password hash needs rehashing with updated parameters")
         return True
     except VerifyMismatchError:
         logger.debug("Password verification failed")
@@ -75,6 +70,27 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         logger.error(f"Error verifying password: {e}")
         return False
 
+# Check whether a stored hash was made with different parameters than the current ones
+def needs_rehash(hashed_password: str) -> bool:
+    """Return True if the hash should be upgraded to the current Argon2 parameters."""
+    try:
+        return ph.check_needs_rehash(hashed_password)
+    except Exception as e:
+        logger.error(f"Error checking password hash parameters: {e}")
+        return False
+
+
+# Look up an account and check its password
+def authenticate_user(db: Session, email: str, password: str, kind: Optional[str] = None) -> Optional[Identity]:
+    """Return the account's identity if the email exists and the password matches."""
+    identity = find_identity(db, email, kind)
+    if identity is None:
+        logger.debug("Authentication failed: unknown email")
+        return None
+    if not identity.password_hash or not verify_password(password, identity.password_hash):
+        return None
+    return identity
+
 
 # Validate password strength before allowing it to be set
 def validate_password_strength(password: str) -> tuple[bool, str]:
@@ -106,9 +122,43 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Refresh tokens are long-lived, single-use JWTs. Each one carries its own id (jti)
+# and the id of the login session it belongs to (fam), so a session can be revoked
+def create_refresh_token(data: dict, family: Optional[str] = None) -> str:
+    """Create a new refresh token, optionally continuing an existing session family."""
+    to_encode = data.copy()
+    to_encode.update({
+        "type": "refresh",
+        "jti": uuid.uuid4().hex,
+        "fam": family or uuid.uuid4().hex,
+        "exp": datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    })
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_refresh_token(token: str) -> dict:
+    """Decode a refresh token, raising JWTError if it is invalid, expired or not a refresh token."""
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    if payload.get("type") != "refresh" or not payload.get("jti") or not payload.get("fam"):
+        raise JWTError("Not a refresh token")
+    return payload
+
+# User of the batch whose sub-requests are running (POST /batch authenticates once for all of them)
+batch_user: ContextVar[Optional[TokenData]] = ContextVar("batch_user", default=None)
+
+# Is the session of an access token revoked? The deny-list answers once it is loaded
+# (startup loads it in the background unless WARMUP_ON_STARTUP); before that the table does
+async def is_session_revoked(family: str) -> bool:
+    if revocation_store.loaded:
+        revocation_store.refresh_in_background()
+        return revocation_store.is_family_revoked(family)
+    return await run_in_threadpool(is_family_revoked_in_table, family)
+
 # get the current active user
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """Dependency to validate JWT and return current user identifier."""
+    authenticated = batch_user.get()
+    if authenticated is not None:
+        return authenticated
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -123,6 +173,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         role: str = payload.get("role")
         logger.info(f"Token decoded successfully for user: {email}")
 
+        # refresh tokens cannot be used as access tokens, and a logged-out
+        # session's access tokens are rejected by the deny-list
+        if payload.get("type") == "refresh":
+            logger.warning("Refresh token presented as an access token")
+            raise credentials_exception
+        family = payload.get("fam")
+        if family and await is_session_revoked(family):
+            logger.warning(f"Access token from a revoked session for user: {email}")
+            raise credentials_exception
+
         #validate decoded email and role
         if email is None:
             logger.warning("Token decoded but 'sub' (email) is missing")
@@ -131,6 +191,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError as e:
         logger.warning(f"JWT decoding failed: {str(e)}")
         raise credentials_exception
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error during token validation: {str(e)}")
         raise credentials_exception
@@ -138,9 +200,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     # Optional: Verify user exists in database
     # For now, we trust the token payload for efficiency, 
     # but a full check would be:
-    # user = execute_read("SELECT id FROM CUSTOMERS WHERE email = %s UNION SELECT id FROM EMPLOYEES WHERE email = %s", (token_data.email, token_data.email))
+    # user = find_identity(db, token_data.email)
     # if user is None:
     #     raise credentials_exception
     
     #return decoded email and role
     return token_data
+
+# Dependency for admin-only routes (on top of a valid token)
+async def require_admin(current_user: TokenData = Depends(get_current_user)) -> TokenData:
+    if (current_user.role or "").upper() != Role.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return current_user
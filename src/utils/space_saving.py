@@ -0,0 +1,89 @@
+'''
+Space-Saving sketch for streaming heavy hitters (Metwally et al., 2005).
+
+Tracks at most `capacity` items with weighted counts. When a new item arrives
+and the sketch is full, the item with the smallest count is replaced and the
+newcomer inherits that count as its error.
+
+Error bounds, with N the total weight offered and k the capacity:
+- every reported count over-estimates:  true <= count <= true + N / k
+- count - error is a guaranteed lower bound on the true count
+- every item whose true count exceeds N / k is in the sketch
+'''
+
+from typing import Dict, Hashable, Iterable, List, NamedTuple
+
+
+class HeavyHitter(NamedTuple):
+    item: Hashable
+    count: float  # estimate, never below the true count
+    error: float  # count - error is a lower bound on the true count
+
+
+class SpaceSaving:
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.counts: Dict[Hashable, float] = {}
+        self.errors: Dict[Hashable, float] = {}
+        self.total = 0.0
+
+    def offer(self, item: Hashable, weight: float = 1) -> None:
+        self.total += weight
+        counts = self.counts
+        if item in counts:
+            counts[item] += weight
+        elif len(counts) < self.capacity:
+            counts[item] = weight
+            self.errors[item] = 0
+        else:
+            victim = min(counts, key=counts.__getitem__)
+            floor = counts.pop(victim)
+            del self.errors[victim]
+            counts[item] = floor + weight
+            self.errors[item] = floor
+
+    def min_count(self) -> float:
+        """Upper bound on the count of any item not in the sketch."""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def error_bound(self) -> float:
+        return self.total / self.capacity
+
+    def top(self, n: int) -> List[HeavyHitter]:
+        ranked = sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+        return [HeavyHitter(item, count, self.errors[item]) for item, count in ranked]
+
+    @classmethod
+    def merge(cls, sketches: Iterable["SpaceSaving"], capacity: int) -> "SpaceSaving":
+        """
+        Combine sketches of disjoint streams (e.g. one per day). An item missing
+        from a sketch is charged that sketch's min_count as count and error, so
+        the merged bounds still hold with N the combined total.
+        """
+        sketches = list(sketches)
+        merged = cls(capacity)
+        floors = [s.min_count() for s in sketches]
+        items = set().union(*(s.counts for s in sketches)) if sketches else set()
+        for item in items:
+            count = error = 0.0
+            for sketch, floor in zip(sketches, floors):
+                if item in sketch.counts:
+                    count += sketch.counts[item]
+                    error += sketch.errors[item]
+                else:
+                    count += floor
+                    error += floor
+            merged.counts[item] = count
+            merged.errors[item] = error
+        merged.total = sum(s.total for s in sketches)
+        # Keep the `capacity` largest counts
+        if len(merged.counts) > capacity:
+            keep = sorted(merged.counts, key=merged.counts.__getitem__, reverse=True)[:capacity]
+            merged.counts = {item: merged.counts[item] for item in keep}
+            merged.errors = {item: merged.errors[item] for item in keep}
+        return merged
+
+    def __len__(self) -> int:
+        return len(self.counts)
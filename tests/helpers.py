@@ -0,0 +1,52 @@
+'''
+Shared setup for the tests that call a FastAPI app through TestClient.
+
+AppTestCase gives every test its own in-memory SQLite database (self.Session)
+that the app reaches through src.database.SessionLocal, so get_db and the
+background refreshes that open their own session both use it.
+'''
+
+import gc
+import os
+import sys
+import unittest
+from typing import Optional
+from unittest import mock
+# Add src to path
+sys.path.append(os.getcwd())
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.database import Base
+from src.utils.security import create_access_token
+
+
+def bearer(role: str = "ADMIN", sub: str = "a@b.com") -> dict:
+    """Authorization header with an access token for `role`."""
+    return {"Authorization": "Bearer " + create_access_token({"sub": sub, "role": role})}
+
+
+class AppTestCase(unittest.TestCase):
+    app: FastAPI  # set by the subclass
+    role: Optional[str] = "ADMIN"  # token sent with every request; None sends none
+
+    def setUp(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        self.Session = sessionmaker(bind=engine)
+        self.patch(mock.patch("src.database.SessionLocal", self.Session))
+        # finalize connections left by earlier tests here, not in the client's event loop thread
+        gc.collect()
+        self.client = TestClient(self.app)
+        if self.role is not None:
+            self.client.headers.update(bearer(self.role))
+
+    def patch(self, *patches) -> None:
+        """Start the patches for the duration of the test."""
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
@@ -0,0 +1,86 @@
+import os
+import sys
+import unittest
+from datetime import date, time
+from decimal import Decimal
+# Add src to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from src.crud import CRUD
+from src.database import Base
+from src.jobs.archive import archive_cutoff, run_archive_job
+from src.model.orm import Branch, Customer, Transaction, TransactionArchive, TransactionDetail
+from src.services.sales_heatmap import closed_days, hourly_sales
+
+TODAY = date(2024, 6, 12)
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all([Branch(id=1, name="A", location="x"),
+                         Customer(id=1, name="C", age=30, email="c@x.com", password="x")])
+        # Two transactions per month from Jan 2023 to Jun 2024
+        next_id = 1
+        for month in range(18):
+            day = date(2023 + month // 12, month % 12 + 1, 10)
+            for hour in (9, 17):
+                self.db.add(Transaction(id=next_id, branch_id=1, customer_id=1, total_amount=Decimal("5.00"),
+                                        total=Decimal("5.00"), dateOfTransaction=day, timeOfTransaction=time(hour)))
+                self.db.add(TransactionDetail(transaction_id=next_id, product_id=None, quantity=1, price=Decimal("5.00")))
+                next_id += 1
+        self.db.commit()
+        closed_days.invalidate()
+
+    def count(self, model):
+        return self.db.execute(select(func.count()).select_from(model)).scalar()
+
+    def test_cutoff(self):
+        self.assertEqual(archive_cutoff(TODAY, 12), date(2023, 6, 1))
+        self.assertEqual(archive_cutoff(date(2024, 1, 31), 1), date(2023, 12, 1))
+        self.assertEqual(archive_cutoff(TODAY, 0), date(2024, 6, 1))
+
+    def test_moves_closed_months_in_chunks(self):
+        result = run_archive_job(self.db, keep_months=12, chunk_size=3, pause_seconds=0, today=TODAY)
+        # Jan..May 2023 are archived
+        self.assertEqual(result.transactions, 10)
+        self.assertEqual(result.chunks, 4)
+        self.assertEqual(self.count(Transaction), 26)
+        self.assertEqual(self.count(TransactionDetail), 26)
+        self.assertEqual(self.count(TransactionArchive), 10)
+        oldest = self.db.execute(select(func.min(Transaction.dateOfTransaction))).scalar()
+        self.assertEqual(oldest, date(2023, 6, 10))
+        # Running again moves nothing
+        self.assertEqual(run_archive_job(self.db, keep_months=12, pause_seconds=0, today=TODAY).transactions, 0)
+
+    def test_reads_are_transparent(self):
+        run_archive_job(self.db, keep_months=12, pause_seconds=0, today=TODAY)
+        archived = CRUD.get_transaction(self.db, 1)
+        self.assertEqual(archived.dateOfTransaction, date(2023, 1, 10))
+        self.assertEqual(len(CRUD.get_transaction_details(self.db, 1)), 1)
+
+        # Unbounded lists only read the hot table; a date range reaching back includes the archive
+        self.assertEqual(len(CRUD.get_transactions(self.db, limit=1000)), 26)
+        spring = CRUD.get_transactions(self.db, dateOfTransaction__gte=date(2023, 4, 1),
+                                       dateOfTransaction__lte=date(2023, 7, 31))
+        self.assertEqual([t.id for t in spring], [7, 8, 9, 10, 11, 12, 13, 14])
+
+        ids, after = [], None
+        while True:
+            page, after = CRUD.get_customer_history(self.db, 1, limit=7, after=after)
+            ids += [t.id for t in page]
+            if after is None:
+                break
+        self.assertEqual(ids, list(range(36, 0, -1)))
+
+        rows = hourly_sales(self.db, 1, date(2023, 1, 1), date(2023, 12, 31))
+        self.assertEqual(sum(count for _, _, count, _ in rows), 24)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+# Add src to path
+sys.path.append(os.getcwd())
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from sqlalchemy import func, select
+
+from src.api.routers.batch import router as batch_router
+from src.config import get_settings
+from src.database import get_db
+from src.model.orm import Branch
+from src.utils import security
+from src.utils.security import get_current_user
+from tests.helpers import AppTestCase, bearer
+
+# Read routes standing in for the real ones (no database needed)
+sessions = []
+probe = APIRouter(prefix="/api/v1/stats", dependencies=[Depends(get_current_user)])
+
+
+@probe.get("/probe/{n}")
+def probe_route(n: int, db=Depends(get_db)):
+    sessions.append(db)
+    if n == 404:
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"n": n}
+
+
+@probe.get("/broken")
+def broken_route(db=Depends(get_db)):
+    db.add(Branch(name="No location"))
+    db.flush()
+
+
+@probe.get("/branches")
+def branches_route(db=Depends(get_db)):
+    return {"count": db.execute(select(func.count()).select_from(Branch)).scalar()}
+
+
+@probe.get("/slow")
+async def slow_route():
+    await asyncio.sleep(1)
+    return {}
+
+
+app = FastAPI()
+app.include_router(batch_router, prefix="/api/v1")
+app.include_router(probe)
+
+
+class TestBatch(AppTestCase):
+    app = app
+    role = None  # sent per batch, so a batch without it can be tried
+
+    def setUp(self):
+        super().setUp()
+        self.patch(mock.patch("src.services.batch.SessionLocal", self.Session))
+        sessions.clear()
+        self.headers = bearer()
+
+    def batch(self, *paths, headers=None):
+        requests = [{"path": path} for path in paths]
+        return self.client.post("/api/v1/batch", json={"requests": requests},
+                                headers=self.headers if headers is None else headers)
+
+    def test_results_keep_order_and_status(self):
+        response = self.client.post("/api/v1/batch", headers=self.headers, json={"requests": [
+            {"id": "first", "path": "/api/v1/stats/probe/1"},
+            {"path": "/api/v1/stats/probe/404"},
+            {"path": "/api/v1/stats/probe/x"},
+            {"path": "/api/v1/exports/transactions"},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([(r["id"], r["status"]) for r in results], [("first", 200), ("1", 404), ("2", 422), ("3", 400)])
+        self.assertEqual(results[0]["body"], {"n": 1})
+
+    def test_authenticates_once_and_pools_sessions(self):
+        with mock.patch.object(security.jwt, "decode", wraps=security.jwt.decode) as decode:
+            response = self.batch(*(f"/api/v1/stats/probe/{n}" for n in range(10)))
+        self.assertEqual([r["body"]["n"] for r in response.json()["results"]], list(range(10)))
+        self.assertEqual(decode.call_count, 1)
+        self.assertLessEqual(len({id(db) for db in sessions}), get_settings().batch_max_concurrency)
+
+        self.assertEqual(self.batch("/api/v1/stats/probe/1", headers={}).status_code, 401)
+
+    def test_caps(self):
+        self.assertEqual(self.batch(*["/api/v1/stats/probe/1"] * 21).status_code, 422)
+        self.assertEqual(self.batch().status_code, 422)
+        settings = get_settings()
+        timeout, settings.batch_item_timeout_seconds = settings.batch_item_timeout_seconds, 0.05
+        try:
+            results = self.batch("/api/v1/stats/slow", "/api/v1/stats/probe/2").json()["results"]
+        finally:
+            settings.batch_item_timeout_seconds = timeout
+        self.assertEqual([r["status"] for r in results], [504, 200])
+
+    def test_failed_subrequest_does_not_break_the_next_one(self):
+        settings = get_settings()
+        lanes, settings.batch_max_concurrency = settings.batch_max_concurrency, 1
+        try:
+            results = self.batch("/api/v1/stats/broken", "/api/v1/stats/branches").json()["results"]
+        finally:
+            settings.batch_max_concurrency = lanes
+        self.assertEqual([r["status"] for r in results], [500, 200])
+        self.assertEqual(results[1]["body"], {"count": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+# Add src to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.crud import CRUD
+from src.database import Base
+from src.model.orm import Customer
+from src.services.email_index import EmailIndex
+from src.utils.bloom import BloomFilter
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, fp_rate=0.01)
+        emails = [f"user{i}@example.com" for i in range(1000)]
+        for email in emails:
+            bloom.add(email)
+        self.assertTrue(all(email in bloom for email in emails))
+
+    def test_false_positive_rate_close_to_target(self):
+        bloom = BloomFilter(capacity=5000, fp_rate=0.01)
+        for i in range(5000):
+            bloom.add(f"user{i}@example.com")
+        false_positives = sum(f"new{i}@example.com" in bloom for i in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+        self.assertAlmostEqual(bloom.expected_fp_rate(), 0.01, delta=0.005)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            BloomFilter(capacity=0, fp_rate=0.01)
+        with self.assertRaises(ValueError):
+            BloomFilter(capacity=10, fp_rate=1.5)
+
+
+class TestEmailIndex(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "emails.db"))
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.index = EmailIndex(capacity=100, fp_rate=0.01, refresh_seconds=60)
+        self.index.load(self.db)
+        # signup by another worker: not in this worker's filter
+        self.db.add(Customer(name="Ann", age=30, email="ann@example.com", password="hash"))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_negative_is_only_trusted_while_fresh(self):
+        self.assertFalse(self.index.might_exist("ann@example.com"))
+        self.index.loaded_at = time.monotonic() - 61
+        self.assertTrue(self.index.might_exist("ann@example.com"))
+        self.index.load(self.db)
+        self.assertTrue(self.index.might_exist("Ann@Example.com"))
+
+    def test_stale_filter_queries_and_rebuilds(self):
+        self.index.loaded_at = time.monotonic() - 61
+        with mock.patch.object(CRUD, "email_index", self.index), \
+                mock.patch("src.utils.refreshable.threading.Thread") as thread:
+            self.assertEqual(CRUD.find_email_owner(self.db, "ann@example.com"), "customer")
+            self.assertEqual(CRUD.find_email_owner(self.db, "ann@example.com"), "customer")
+        thread.assert_called_once_with(target=self.index.refresh, name="email-filter-refresh", daemon=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
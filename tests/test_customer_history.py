@@ -0,0 +1,86 @@
+import os
+import sys
+import unittest
+from datetime import date, time, timedelta
+from decimal import Decimal
+# Add src to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from src.database import Base
+from src.model.orm import Customer, CustomerStats, Transaction
+from src.crud import CRUD
+from src.jobs.rfm import quintile_scores, run_rfm_job
+
+TODAY = date(2024, 6, 30)
+
+
+class TestCustomerHistory(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all([Customer(id=i, name=f"C{i}", age=30, email=f"c{i}@example.com") for i in range(1, 5)])
+        self.db.commit()
+
+    def purchase(self, customer_id, day, at, amount):
+        transaction = Transaction(customer_id=customer_id, total_amount=amount, total=amount,
+                                  dateOfTransaction=day, timeOfTransaction=at)
+        self.db.add(transaction)
+        self.db.flush()
+        CRUD.record_customer_purchase(self.db, customer_id, Decimal(amount), day)
+        self.db.commit()
+        return transaction.id
+
+    def test_pages_are_newest_first_and_complete(self):
+        ids = [self.purchase(1, TODAY - timedelta(days=i // 3), time(10 + i % 3), "5.00") for i in range(10)]
+        ids.append(self.purchase(1, TODAY, time(12), "5.00"))  # same date and time as an earlier one
+        seen, after = [], None
+        while True:
+            page, after = CRUD.get_customer_history(self.db, 1, limit=4, after=after)
+            seen.extend(page)
+            if after is None:
+                break
+        self.assertEqual(sorted(t.id for t in seen), sorted(ids))
+        keys = [(t.dateOfTransaction, t.timeOfTransaction, t.id) for t in seen]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_checkout_maintains_summary(self):
+        self.purchase(2, TODAY - timedelta(days=3), time(9), "10.00")
+        self.purchase(2, TODAY, time(9), "25.50")
+        self.purchase(2, TODAY - timedelta(days=9), time(9), "4.50")
+        stats = CRUD.get_customer_stats(self.db, 2)
+        self.assertEqual((stats.visit_count, stats.lifetime_spend), (3, Decimal("40.00")))
+        self.assertEqual((stats.first_visit, stats.last_visit), (TODAY - timedelta(days=9), TODAY))
+        self.assertEqual(stats.average_basket, Decimal("13.33"))
+
+    def test_rfm_job_covers_all_customers(self):
+        for i in range(6):
+            self.purchase(1, TODAY - timedelta(days=i), time(9), "50.00")
+        self.purchase(2, TODAY - timedelta(days=200), time(9), "3.00")
+        # Customer 3 bought before CUSTOMER_STATS existed: no aggregate row yet
+        self.db.add(Transaction(customer_id=3, total_amount=7, total=7, dateOfTransaction=TODAY, timeOfTransaction=time(9)))
+        self.db.commit()
+
+        result = run_rfm_job(self.db, TODAY)
+        self.assertEqual((result.customers, result.scored), (4, 3))
+        stats = {s.customer_id: s for s in self.db.execute(select(CustomerStats)).scalars()}
+        self.assertEqual(set(stats), {1, 2, 3, 4})
+        self.assertEqual(stats[1].segment, "champions")
+        self.assertTrue(stats[1].membership_candidate)
+        self.assertEqual(stats[2].recency_score, 1)
+        self.assertEqual((stats[3].visit_count, stats[3].lifetime_spend), (1, Decimal("7.00")))
+        self.assertEqual(stats[4].segment, "no_purchases")
+        self.assertEqual([s.customer_id for s in CRUD.get_membership_candidates(self.db)], [1])
+
+    def test_quintile_scores(self):
+        values = [1, 1, 1, 1, 1, 1, 2, 3, 8, 20]
+        self.assertEqual(list(quintile_scores(values)), [1, 1, 1, 1, 1, 1, 4, 4, 5, 5])
+        # Recency: fewer days since the last visit scores higher
+        self.assertEqual(list(quintile_scores(list(range(10)), higher_is_better=False)), [5, 5, 4, 4, 3, 3, 2, 2, 1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, time
+from decimal import Decimal
+# Add src to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import Base
+from src.jobs.export import export_transactions, pa, read_state
+from src.model.orm import Branch, Product, Transaction, TransactionDetail
+
+if pa is not None:
+    import pyarrow.parquet as pq
+
+
+@unittest.skipUnless(pa is not None, "pyarrow is not installed")
+class TestParquetExport(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all([Branch(id=1, name="A", location="x"), Branch(id=2, name="B", location="y"),
+                         Product(id=1, name="Milk", stock=10, sellPrice=Decimal("1.25"), cost=Decimal("0.80"),
+                                 category_id="1", category="dairy")])
+        self.db.commit()
+        self.root = tempfile.mkdtemp()
+        self.next_id = 1
+
+    def sale(self, branch_id, day, transaction_id=None):
+        self.next_id = transaction_id or self.next_id
+        self.db.add(Transaction(id=self.next_id, branch_id=branch_id, total_amount=Decimal("2.50"), total=Decimal("2.50"),
+                                dateOfTransaction=day, timeOfTransaction=time(9, 30)))
+        self.db.add(TransactionDetail(transaction_id=self.next_id, product_id=1, quantity=2, price=Decimal("1.25")))
+        self.db.commit()
+        self.next_id += 1
+
+    def test_partitioned_typed_and_incremental(self):
+        self.sale(1, date(2024, 5, 31))
+        self.sale(2, date(2024, 6, 1))
+        self.sale(1, date(2024, 6, 2))
+        first = export_transactions(self.db, root=self.root, chunk_size=2)
+        self.assertEqual((first.rows, first.files, first.high_water_id), (3, 3, 3))
+        self.assertTrue(os.path.isdir(os.path.join(self.root, "month=2024-06", "branch=2")))
+
+        table = pq.read_table(os.path.join(self.root, "month=2024-06", "branch=1"))
+        self.assertEqual(table.schema.field("price").type, pa.decimal128(10, 2))
+        self.assertEqual(table.schema.field("timeOfTransaction").type, pa.time64("us"))
+        row = table.to_pylist()[0]
+        self.assertEqual((row["product_name"], row["price"], row["quantity"]), ("Milk", Decimal("1.25"), 2))
+
+        # Only the new transaction is written by the next run
+        self.sale(2, date(2024, 6, 2))
+        second = export_transactions(self.db, root=self.root)
+        self.assertEqual((second.rows, second.files, second.high_water_id), (1, 1, 4))
+        self.assertEqual(read_state(self.root)["high_water_id"], 4)
+        self.assertEqual(pq.read_table(self.root).num_rows, 4)
+
+        # A full export rewrites everything
+        full = export_transactions(self.db, root=self.root, full=True)
+        self.assertEqual(full.rows, 4)
+        self.assertEqual(pq.read_table(self.root).num_rows, 4)
+
+    def test_stops_at_a_sale_still_being_committed(self):
+        self.sale(1, date(2024, 6, 1))
+        self.sale(1, date(2024, 6, 1), transaction_id=3)  # id 2 is not committed yet
+        first = export_transactions(self.db, root=self.root)
+        self.assertEqual((first.rows, first.high_water_id), (1, 1))
+
+        self.sale(2, date(2024, 6, 1), transaction_id=2)
+        second = export_transactions(self.db, root=self.root)
+        self.assertEqual((second.rows, second.high_water_id), (2, 3))
+        self.assertEqual(sorted(pq.read_table(self.root).column("transaction_id").to_pylist()), [1, 2, 3])
+
+    def test_skips_a_gap_once_it_has_settled(self):
+        self.sale(1, date(2024, 6, 1))
+        self.sale(1, date(2024, 6, 1), transaction_id=3)  # id 2 was rolled back
+        export_transactions(self.db, root=self.root)
+        # still within the settle time: held back
+        self.assertEqual(export_transactions(self.db, root=self.root).rows, 0)
+        settled = export_transactions(self.db, root=self.root, settle_seconds=0)
+        self.assertEqual((settled.rows, settled.high_water_id), (1, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
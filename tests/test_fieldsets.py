@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, time
+from decimal import Decimal
+# Add src to path
+sys.path.append(os.getcwd())
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.crud import CRUD
+from src.database import Base
+from src.model.MODEL import CustomerInDB, ProductInDB, TransactionInDB
+from src.model.orm import Customer, Product, Transaction
+from src.utils import fieldsets
+
+
+class TestFieldsets(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "fields.db"))
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine, autoflush=False)()
+        CRUD.create_entity(self.db, Product, {"name": "Milk", "stock": 10, "sellPrice": Decimal("2.00"),
+                                              "cost": Decimal("1.00"), "category_id": "1", "category": "food"})
+        CRUD.create_entity(self.db, Customer, {"name": "Ann", "age": 30, "email": "ann@example.com", "password": "hash"})
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: self.statements.append(args[2]))
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_parse_validates_against_the_allow_list(self):
+        self.assertIsNone(fieldsets.parse_fields(ProductInDB, None))
+        self.assertEqual(fieldsets.parse_fields(ProductInDB, "stock, id,name,stock"), ("name", "stock", "id"))
+        for bad in ("", " , ", "id,password", "nope"):
+            with self.assertRaises(HTTPException) as raised:
+                fieldsets.parse_fields(CustomerInDB, bad)
+            self.assertEqual(raised.exception.status_code, 400)
+        self.assertNotIn("password", fieldsets.allowed_fields(CustomerInDB))
+
+    def test_sql_and_response_are_narrowed(self):
+        selected = fieldsets.parse_fields(ProductInDB, "id,stock")
+        rows = CRUD.get_products(self.db, fields=selected)
+        self.assertNotIn("name", self.statements[-1].split("FROM")[0])
+        body = json.loads(fieldsets.respond(ProductInDB, selected, rows).body)
+        self.assertEqual(body, [{"stock": 10, "id": 1}])
+
+        customer = CRUD.get_customer(self.db, 1, fields=("email",))
+        self.assertEqual(json.loads(fieldsets.respond(CustomerInDB, ("email",), customer, many=False).body),
+                         {"email": "ann@example.com"})
+        self.assertIsNone(CRUD.get_customer(self.db, 2, fields=("email",)))
+
+    def test_transactions_keep_their_merge_key(self):
+        CRUD.create_entity(self.db, Transaction, {"total_amount": Decimal("2.00"), "total": Decimal("2.00"),
+                                                  "dateOfTransaction": date(2025, 3, 1), "timeOfTransaction": time(12)})
+        rows = CRUD.get_transactions(self.db, fields=("total",))
+        self.assertEqual(set(rows[0]), {"total", "id"})
+        body = json.loads(fieldsets.respond(TransactionInDB, ("total",), rows).body)
+        self.assertEqual(body, [{"total": "2.00"}])
+        self.assertEqual(CRUD.get_transaction(self.db, rows[0].id, fields=("version",)).version, 1)
+
+    def test_encoders_are_cached_per_fieldset(self):
+        first = fieldsets.encoder(ProductInDB, ("name", "id"))
+        self.assertIs(fieldsets.encoder(ProductInDB, ("name", "id")), first)
+        self.assertIsNot(fieldsets.encoder(ProductInDB, ("name",)), first)
+        self.assertIs(fieldsets.fieldset_model(ProductInDB, ("name", "id")),
+                      fieldsets.fieldset_model(ProductInDB, ("name", "id")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+from unittest import mock
+# Add src to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.crud import CRUD
+from src.database import Base
+from src.model.orm import Customer, Employee
+from src.services.identity import CUSTOMER, EMPLOYEE, find_identity, kind_for_role, model_for_kind
+
+
+class TestIdentityLookup(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")  # compares case-sensitively, like a binary collation
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        # Hashing is not what is tested here
+        patch = mock.patch("src.utils.security.hash_password", side_effect=lambda password: "hash:" + password)
+        patch.start()
+        self.addCleanup(patch.stop)
+        CRUD.create_customer(self.db, {"name": "A", "age": 30, "email": " Ann@Example.com", "password": "x"})
+        CRUD.create_employee(self.db, {"name": "B", "age": 40, "email": "Bob@Example.com", "role": "ADMIN",
+                                       "password": "y"})
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_emails_are_stored_lower_cased(self):
+        self.assertEqual(self.db.query(Customer.email).scalar(), "ann@example.com")
+        CRUD.update_employee(self.db, 1, {"email": "Robert@Example.com"})
+        self.assertEqual(self.db.query(Employee.email).scalar(), "robert@example.com")
+
+    def test_lookup_ignores_case(self):
+        identity = find_identity(self.db, "ANN@example.COM")
+        self.assertEqual((identity.kind, identity.id, identity.role, identity.password_hash),
+                         (CUSTOMER, 1, CUSTOMER, "hash:x"))
+        self.assertEqual(find_identity(self.db, "bob@EXAMPLE.com", EMPLOYEE).role, "ADMIN")
+        self.assertEqual(CRUD.find_email_owner(self.db, "BOB@example.com"), "employee")
+
+    def test_lookup_by_kind(self):
+        self.assertIsNone(find_identity(self.db, "bob@example.com", CUSTOMER))
+        self.assertIsNone(find_identity(self.db, "nobody@example.com"))
+
+    def test_no_orm_objects_are_loaded(self):
+        self.db.expunge_all()
+        find_identity(self.db, "ann@example.com")
+        self.assertEqual(len(self.db.identity_map), 0)
+
+    def test_kinds(self):
+        self.assertEqual((kind_for_role("customer"), kind_for_role("admin")), (CUSTOMER, EMPLOYEE))
+        self.assertEqual((model_for_kind(CUSTOMER), model_for_kind(EMPLOYEE)), (Customer, Employee))
+
+
+if __name__ == "__main__":
+    unittest.main()
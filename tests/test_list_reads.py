@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+import unittest
+from decimal import Decimal
+from typing import List
+# Add src to path
+sys.path.append(os.getcwd())
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.crud import CRUD
+from src.database import Base
+from src.model.MODEL import CustomerInDB, ProductInDB
+from src.model.orm import Customer, Product
+
+product_list_adapter = TypeAdapter(List[ProductInDB])
+
+
+class TestListReads(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "lists.db"))
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine, autoflush=False)()
+        for i, price in enumerate(("1.00", "2.50", "4.00")):
+            CRUD.create_entity(self.db, Product, {"name": f"P{i}", "stock": i, "sellPrice": Decimal(price),
+                                                  "cost": Decimal("0.50"), "category_id": "1", "category": "food"})
+        CRUD.create_entity(self.db, Customer, {"name": "Ann", "age": 30, "email": "ann@example.com", "password": "hash"})
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_rows_bypass_the_identity_map(self):
+        rows = CRUD.get_products(self.db)
+        self.assertEqual([row.name for row in rows], ["P0", "P1", "P2"])
+        self.assertEqual(len(self.db.identity_map), 0)
+        dumped = product_list_adapter.dump_python(product_list_adapter.validate_python(rows, from_attributes=True))
+        self.assertEqual(dumped[1]["sellPrice"], Decimal("2.50"))
+        self.assertEqual(dumped[1]["version"], 1)
+
+    def test_only_response_columns_are_selected(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        [row] = CRUD.get_customers(self.db)
+        self.assertNotIn("password", statements[-1])
+        self.assertNotIn("password", row)
+        self.assertIsInstance(row, CRUD.Record)
+        self.assertEqual(CustomerInDB.model_validate(row, from_attributes=True).email, "ann@example.com")
+        self.assertEqual(len(CRUD.list_columns(Product, ProductInDB)), len(ProductInDB.model_fields))
+
+    def test_filters(self):
+        self.assertEqual([row.name for row in CRUD.get_products(self.db, sellPrice__gte=2, sellPrice__lte=3)], ["P1"])
+        self.assertEqual([row.name for row in CRUD.get_products(self.db, name="P2", unknown=1)], ["P2"])
+        self.assertEqual(len(CRUD.get_products(self.db, skip=1, limit=1)), 1)
+        self.assertEqual(CRUD.get_customers(self.db, email="nobody@example.com"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+import unittest
+# Add src to path
+sys.path.append(os.getcwd())
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from src.database import Base
+import src.model.orm  # noqa: F401
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "migrations.db")
+        self.config = Config(os.path.join(ROOT, "alembic.ini"))
+        self.config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+        self.config.attributes["database_url"] = self.url
+
+    def test_head_matches_models(self):
+        command.upgrade(self.config, "head")
+        engine = create_engine(self.url)
+        with engine.connect() as conn:
+            diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+        # The models declare some nullable production columns (stock, size, ...) as NOT NULL
+        structural = [d for d in diff if not (isinstance(d, list) and d[0][0] == "modify_nullable")]
+        self.assertEqual(structural, [])
+
+    def test_baseline_has_only_original_tables(self):
+        command.upgrade(self.config, "0001")
+        tables = set(inspect(create_engine(self.url)).get_table_names()) - {"alembic_version"}
+        self.assertEqual(tables, {"CUSTOMERS", "BRANCHES", "EMPLOYEES", "PRODUCTS", "TRANSACTIONS", "TRANSACTION_DETAILS"})
+
+    def test_index_migration_round_trip(self):
+        command.upgrade(self.config, "head")
+        command.downgrade(self.config, "0002")
+        indexes = {i["name"] for i in inspect(create_engine(self.url)).get_indexes("TRANSACTIONS")}
+        self.assertNotIn("idx_transactions_branch_date_time", indexes)
+        command.upgrade(self.config, "head")
+        indexes = {i["name"] for i in inspect(create_engine(self.url)).get_indexes("TRANSACTIONS")}
+        self.assertIn("idx_transactions_branch_date_time", indexes)
+
+    def insert_customers(self, *emails):
+        with create_engine(self.url).begin() as conn:
+            for i, email in enumerate(emails, 1):
+                conn.execute(text("INSERT INTO CUSTOMERS (id, name, age, email, password) VALUES (:id, 'A', 30, :email, 'x')"),
+                             {"id": i, "email": email})
+
+    def test_emails_are_lower_cased(self):
+        command.upgrade(self.config, "0006")
+        self.insert_customers("Ann@Example.com", "bob@example.com")
+        command.upgrade(self.config, "head")
+        with create_engine(self.url).connect() as conn:
+            emails = conn.execute(text("SELECT email FROM CUSTOMERS ORDER BY id")).scalars().all()
+        self.assertEqual(emails, ["ann@example.com", "bob@example.com"])
+
+    def test_emails_differing_only_in_case_stop_the_upgrade(self):
+        command.upgrade(self.config, "0006")
+        self.insert_customers("Ann@Example.com", "ann@example.com")
+        with self.assertRaises(RuntimeError):
+            command.upgrade(self.config, "head")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+from decimal import Decimal
+# Add src to path
+sys.path.append(os.getcwd())
+
+from fastapi import FastAPI
+
+from src.api.routers import products
+from src.crud import CRUD
+from src.model.MODEL import MAX_LOOKUP_IDS
+from tests.helpers import AppTestCase
+
+app = FastAPI()
+app.include_router(products.router, prefix="/api/v1")
+
+
+class TestMultiGet(AppTestCase):
+    app = app
+
+    def setUp(self):
+        super().setUp()
+        db = self.Session()
+        for i in (1, 2, 3):
+            CRUD.create_product(db, {"id": i, "name": f"P{i}", "stock": i, "sellPrice": Decimal("2.50"),
+                                     "cost": Decimal("1.00"), "category_id": "1", "category": "food"})
+        db.close()
+
+    def test_ids_keep_request_order(self):
+        response = self.client.get("/api/v1/products/", params={"ids": "3,1,2"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["id"] for p in response.json()], [3, 1, 2])
+        self.assertNotIn("X-Missing-Ids", response.headers)
+
+    def test_missing_ids_header(self):
+        response = self.client.get("/api/v1/products/", params={"ids": "2,99,1,2,42"})
+        self.assertEqual([p["id"] for p in response.json()], [2, 1])
+        self.assertEqual(response.headers["X-Missing-Ids"], "99,42")
+
+    def test_missing_ids_header_with_fields(self):
+        response = self.client.get("/api/v1/products/", params={"ids": "3,7", "fields": "id,stock"})
+        self.assertEqual(response.json(), [{"id": 3, "stock": 3}])
+        self.assertEqual(response.headers["X-Missing-Ids"], "7")
+
+    def test_invalid_ids(self):
+        for ids in ("1,x", ",", ",".join(["1"] * (MAX_LOOKUP_IDS + 1))):
+            self.assertEqual(self.client.get("/api/v1/products/", params={"ids": ids}).status_code, 400, ids)
+
+    def test_lookup(self):
+        response = self.client.post("/api/v1/products/lookup", json={"ids": [2, 5, 3]})
+        body = response.json()
+        self.assertEqual(([p["id"] for p in body["items"]], body["missing"]), ([2, 3], [5]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+# Add src to path
+sys.path.append(os.getcwd())
+
+from argon2 import PasswordHasher
+from fastapi import FastAPI
+
+from src.api.routers import auth
+from src.model.orm import Customer
+from src.utils import argon2_calibration
+from src.utils.argon2_calibration import calibrate, write_env
+from src.utils.security import needs_rehash, verify_password
+from tests.helpers import AppTestCase
+
+app = FastAPI()
+app.include_router(auth.router, prefix="/api/v1")
+
+# Hashes made with parameters older (weaker) than the configured ones
+old_hasher = PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1)
+
+
+def fake_verify_ms(time_cost, memory_cost, parallelism, samples=5):
+    return time_cost * memory_cost / 1024  # 1 ms per MiB per pass
+
+
+class TestCalibration(unittest.TestCase):
+    def calibrate(self, target_ms, max_memory_kib):
+        with mock.patch.object(argon2_calibration, "measure_verify_ms", side_effect=fake_verify_ms):
+            return calibrate(target_ms, max_memory_kib, parallelism=2)
+
+    def test_raises_time_cost_within_the_target(self):
+        params = self.calibrate(300, 65536)
+        self.assertEqual((params.time_cost, params.memory_cost, params.parallelism), (4, 65536, 2))
+        self.assertEqual(params.verify_ms, 256)
+
+    def test_halves_memory_when_one_pass_is_too_slow(self):
+        params = self.calibrate(100, 262144)
+        self.assertEqual((params.time_cost, params.memory_cost), (1, 65536))
+
+    def test_write_env_replaces_and_appends(self):
+        path = Path(tempfile.mkdtemp()) / ".env"
+        path.write_text("SECRET_KEY=x\nARGON2_TIME_COST=3\n", encoding="utf-8")
+        write_env(path, {"ARGON2_TIME_COST": "5", "ARGON2_MEMORY_COST": "32768"})
+        self.assertEqual(path.read_text(encoding="utf-8"),
+                         "SECRET_KEY=x\nARGON2_TIME_COST=5\nARGON2_MEMORY_COST=32768\n")
+
+
+class TestRehashOnLogin(AppTestCase):
+    app = app
+    role = None
+
+    def setUp(self):
+        super().setUp()
+        self.patch(mock.patch.object(auth, "SessionLocal", self.Session))
+        db = self.Session()
+        self.old_hash = old_hasher.hash("Password123")
+        db.add(Customer(id=1, name="A", age=30, email="a@b.com", password=self.old_hash))
+        db.commit()
+        db.close()
+
+    def stored_hash(self):
+        db = self.Session()
+        try:
+            return db.get(Customer, 1).password
+        finally:
+            db.close()
+
+    def test_login_upgrades_an_old_hash(self):
+        self.assertTrue(needs_rehash(self.old_hash))
+        response = self.client.post("/api/v1/auth/login",
+                                    json={"email": "a@b.com", "password": "Password123", "role": "customer"})
+        self.assertEqual(response.status_code, 200)
+        # background tasks have run once the test client returns
+        upgraded = self.stored_hash()
+        self.assertNotEqual(upgraded, self.old_hash)
+        self.assertFalse(needs_rehash(upgraded))
+        self.assertTrue(verify_password("Password123", upgraded))
+
+    def test_upgrade_waits_while_the_hash_cap_is_full(self):
+        with mock.patch.object(auth.hash_limiter, "limit", 0):
+            auth.upgrade_password_hash(Customer, 1, self.old_hash, "Password123")
+        self.assertEqual(self.stored_hash(), self.old_hash)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+# Add src to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import Base
+from src.model.orm import Product
+from src.services.pricing import PriceSnapshot, PricingError, price_snapshot, verify_basket
+
+
+def product(id, sell_price, cost="0.50", stock=10):
+    return SimpleNamespace(id=id, sellPrice=Decimal(sell_price), cost=Decimal(cost), stock=stock)
+
+
+class TestPriceSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = PriceSnapshot(capacity=4)
+        for p in (product(1, "0.10"), product(2, "0.20"), product(40, "19.99")):
+            self.snapshot.apply_product(p)
+
+    def test_quote_is_exact(self):
+        # 3 * 0.10 + 0.20 is 0.5000000000000001 in floating point
+        quote = self.snapshot.quote([1, 2], [3, 1])
+        self.assertEqual(quote.total, Decimal("0.50"))
+        self.assertEqual(quote.line_totals, [Decimal("0.30"), Decimal("0.20")])
+        self.assertEqual(quote.cost, Decimal("2.00"))
+
+    def test_grows_and_removes(self):
+        self.assertEqual(self.snapshot.quote([40], [2]).total, Decimal("39.98"))
+        self.snapshot.remove_product(40)
+        with self.assertRaises(PricingError):
+            self.snapshot.quote([40], [1])
+
+    def test_reduce_stock_floors_at_zero(self):
+        self.snapshot.reduce_stock([1, 1, 2], [4, 4, 50])
+        self.assertEqual(self.snapshot.get_stock(1), 2)
+        self.assertEqual(self.snapshot.get_stock(2), 0)
+
+
+class TestVerifyBasket(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "pricing.db"))
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all([
+            Product(id=7, name="Tea", stock=10, sellPrice=Decimal("2.35"), cost=Decimal("1.00"), category_id="1", category="food"),
+            Product(id=8, name="Jam", stock=10, sellPrice=Decimal("3.00"), cost=Decimal("1.00"), category_id="1", category="food"),
+        ])
+        self.db.commit()
+        price_snapshot.load(self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_accepts_matching_basket(self):
+        details = [{"product_id": 7, "quantity": 3, "price": 2.35}]
+        self.assertEqual(verify_basket(self.db, details, 7.05, Decimal("7.05")).total, Decimal("7.05"))
+
+    def test_rejects_mismatches(self):
+        with self.assertRaises(PricingError):
+            verify_basket(self.db, [{"product_id": 7, "quantity": 1, "price": 1.00}], 1.00, 1.00)
+        with self.assertRaises(PricingError):
+            verify_basket(self.db, [{"product_id": 7, "quantity": 1, "price": 2.35}], 2.35, 2.00)
+        with self.assertRaises(PricingError):
+            verify_basket(self.db, [{"product_id": 99, "quantity": 1, "price": 1.00}], 1.00, 1.00)
+
+    def test_rereads_products_before_rejecting(self):
+        # another worker changed a price and added a product after the snapshot was loaded
+        self.db.query(Product).filter(Product.id == 8).update({"sellPrice": Decimal("3.50")})
+        self.db.add(Product(id=9, name="Oats", stock=5, sellPrice=Decimal("1.25"), cost=Decimal("0.50"),
+                            category_id="1", category="food"))
+        self.db.commit()
+        details = [{"product_id": 8, "quantity": 1, "price": 3.50}, {"product_id": 9, "quantity": 2, "price": 1.25}]
+        self.assertEqual(verify_basket(self.db, details, 6.00, 6.00).total, Decimal("6.00"))
+        self.assertEqual(price_snapshot.quote([8], [1]).total, Decimal("3.50"))
+
+        # a client still sending the old price is rejected once the database agrees
+        with self.assertRaises(PricingError):
+            verify_basket(self.db, [{"product_id": 8, "quantity": 1, "price": 3.00}], 3.00, 3.00)
+
+    def test_stale_snapshot_is_refreshed_in_the_background(self):
+        details = [{"product_id": 7, "quantity": 1, "price": 2.35}]
+        with mock.patch("src.utils.refreshable.threading.Thread") as thread:
+            verify_basket(self.db, details, 2.35, 2.35)
+            thread.assert_not_called()
+            price_snapshot.loaded_at = time.monotonic() - price_snapshot.refresh_seconds - 1
+            verify_basket(self.db, details, 2.35, 2.35)
+            verify_basket(self.db, details, 2.35, 2.35)
+        thread.assert_called_once_with(target=price_snapshot.refresh, name="price-snapshot-refresh", daemon=True)
+        price_snapshot._refreshing = False
+
+if __name__ == "__main__":
+    unittest.main()
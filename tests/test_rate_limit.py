@@ -0,0 +1,47 @@
+import os
+import sys
+import unittest
+from unittest import mock
+# Add src to path
+sys.path.append(os.getcwd())
+
+from src.utils.rate_limit import RateLimiter, ConcurrencyLimiter, RateLimitExceeded
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_then_reject(self):
+        limiter = RateLimiter(rate=1.0, burst=3)
+        with mock.patch("src.utils.rate_limit.time.monotonic", return_value=100.0):
+            self.assertEqual([limiter.acquire("ip") for _ in range(3)], [0.0, 0.0, 0.0])
+            self.assertAlmostEqual(limiter.acquire("ip"), 1.0)
+            # Other keys have their own bucket
+            self.assertEqual(limiter.acquire("other"), 0.0)
+
+    def test_refill(self):
+        limiter = RateLimiter(rate=2.0, burst=1)
+        with mock.patch("src.utils.rate_limit.time.monotonic", return_value=0.0):
+            limiter.acquire("ip")
+            self.assertGreater(limiter.acquire("ip"), 0)
+        with mock.patch("src.utils.rate_limit.time.monotonic", return_value=0.5):
+            self.assertEqual(limiter.acquire("ip"), 0.0)
+
+    def test_key_count_is_bounded(self):
+        limiter = RateLimiter(rate=1.0, burst=1, max_keys=10)
+        for i in range(100):
+            limiter.acquire(f"key{i}")
+        self.assertEqual(len(limiter), 10)
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+    def test_rejects_when_full(self):
+        limiter = ConcurrencyLimiter(limit=1)
+        with limiter.slot():
+            self.assertEqual(limiter.in_flight, 1)
+            with self.assertRaises(RateLimitExceeded):
+                with limiter.slot():
+                    pass
+        self.assertEqual(limiter.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+import unittest
+from datetime import datetime, timedelta
+# Add src to path
+sys.path.append(os.getcwd())
+
+from fastapi import FastAPI
+
+from src.api.routers.auth import issue_tokens, router as auth_router
+from src.model.orm import RevokedToken
+from src.services.token_store import FAMILY, revocation_store
+from tests.helpers import AppTestCase
+
+app = FastAPI()
+app.include_router(auth_router, prefix="/api/v1")
+
+
+class TestRefreshTokens(AppTestCase):
+    app = app
+    role = None
+
+    def setUp(self):
+        super().setUp()
+        self.state = (revocation_store.loaded, revocation_store.loaded_at)
+        revocation_store.loaded, revocation_store.loaded_at = True, float("inf")
+
+    def tearDown(self):
+        revocation_store.loaded, revocation_store.loaded_at = self.state
+
+    def refresh(self, tokens):
+        return self.client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    def me(self, tokens):
+        return self.client.get("/api/v1/auth/me", headers={"Authorization": "Bearer " + tokens["access_token"]})
+
+    def test_refresh_rotates(self):
+        tokens = issue_tokens("a@b.com", "CUSTOMER")
+        response = self.refresh(tokens)
+        self.assertEqual(response.status_code, 200)
+        rotated = response.json()
+        self.assertNotEqual(rotated["refresh_token"], tokens["refresh_token"])
+        self.assertEqual(self.me(rotated).json()["email"], "a@b.com")
+        self.assertEqual(self.refresh(rotated).status_code, 200)
+
+    def test_reuse_revokes_the_session(self):
+        tokens = issue_tokens("a@b.com", "CUSTOMER")
+        rotated = self.refresh(tokens).json()
+        self.assertEqual(self.refresh(tokens).status_code, 401)
+        # the copy that was rotated legitimately stops working as well
+        self.assertEqual(self.refresh(rotated).status_code, 401)
+        self.assertEqual(self.me(rotated).status_code, 401)
+
+    def test_logout(self):
+        tokens = issue_tokens("a@b.com", "CUSTOMER")
+        self.assertEqual(self.client.post("/api/v1/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+                         .status_code, 204)
+        self.assertEqual(self.me(tokens).status_code, 401)
+        self.assertEqual(self.refresh(tokens).status_code, 401)
+
+    def revoke_elsewhere(self, family):
+        """A logout through another worker: only the table knows."""
+        db = self.Session()
+        db.add(RevokedToken(token_id=family, scope=FAMILY, expires_at=datetime.utcnow() + timedelta(days=1)))
+        db.commit()
+        db.close()
+
+    def test_before_the_deny_list_is_loaded_the_table_is_asked(self):
+        revocation_store.loaded = False
+        tokens = issue_tokens("a@b.com", "CUSTOMER", family="elsewhere1")
+        self.assertEqual(self.me(tokens).status_code, 200)
+        self.revoke_elsewhere("elsewhere1")
+        self.assertEqual(self.me(tokens).status_code, 401)
+
+    def test_stale_deny_list_is_refreshed_and_purged(self):
+        tokens = issue_tokens("a@b.com", "CUSTOMER", family="elsewhere2")
+        self.revoke_elsewhere("elsewhere2")
+        db = self.Session()
+        db.add(RevokedToken(token_id="old", scope=FAMILY, expires_at=datetime.utcnow() - timedelta(days=1)))
+        db.commit()
+        self.assertEqual(self.me(tokens).status_code, 200)  # fresh deny-list, not revoked here yet
+
+        revocation_store.loaded_at = 0.0
+        self.me(tokens)  # starts the refresh
+        for thread in threading.enumerate():
+            if thread.name == "revocations-refresh":
+                thread.join(5)
+        self.assertEqual(self.me(tokens).status_code, 401)
+        self.assertIsNone(db.get(RevokedToken, "old"))
+        db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import unittest
+from datetime import date, time, timedelta
+from decimal import Decimal
+# Add src to path
+sys.path.append(os.getcwd())
+
+import numpy as np
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from src.database import Base
+from src.model.orm import Branch, Product, ReorderSuggestion, Transaction, TransactionDetail
+from src.jobs.reorder import ReorderParameters, run_reorder_job
+
+TODAY = date(2024, 3, 1)
+PARAMS = ReorderParameters(history_days=30, window_days=7, lead_time_days=4,
+                           review_days=7, service_z=1.65, chunk_size=7)
+
+
+class TestReorderJob(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all([
+            Branch(id=1, name="A", location="x"), Branch(id=2, name="B", location="y"),
+            Product(id=1, name="Milk", stock=10, sellPrice=Decimal("1.00"), cost=Decimal("0.50"), category_id="1", category="c"),
+            Product(id=2, name="Salt", stock=500, sellPrice=Decimal("1.00"), cost=Decimal("0.50"), category_id="1", category="c"),
+        ])
+        # Milk: 2 units/day at branch 1 for 30 days, 6 units/day at branch 2 during the last week
+        # Salt: 1 unit every day at branch 1
+        self.daily = {(1, 1): [2] * 30, (1, 2): [0] * 23 + [6] * 7, (2, 1): [1] * 30}
+        for (product_id, branch_id), quantities in self.daily.items():
+            for day, quantity in enumerate(quantities):
+                if quantity:
+                    self.add_sale(product_id, branch_id, TODAY - timedelta(days=30 - day), quantity)
+        self.add_sale(1, 1, TODAY - timedelta(days=40), 100)  # outside the history window
+        self.db.commit()
+
+    def add_sale(self, product_id, branch_id, day, quantity):
+        transaction = Transaction(branch_id=branch_id, total_amount=quantity, total=quantity,
+                                  dateOfTransaction=day, timeOfTransaction=time(10, 0))
+        self.db.add(transaction)
+        self.db.flush()
+        self.db.add(TransactionDetail(transaction_id=transaction.id, product_id=product_id, quantity=quantity, price=1))
+
+    def test_statistics_match_numpy(self):
+        result = run_reorder_job(self.db, PARAMS, TODAY)
+        self.assertEqual(result.suggestions, 3)
+        rows = {(r.product_id, r.branch_id): r for r in self.db.execute(select(ReorderSuggestion)).scalars()}
+        for key, quantities in self.daily.items():
+            series = np.array(quantities, dtype=float)
+            self.assertAlmostEqual(rows[key].avg_daily_demand, series.mean())
+            self.assertAlmostEqual(rows[key].demand_std, series.std())
+            self.assertAlmostEqual(rows[key].moving_avg_demand, series[-7:].mean())
+            expected = series[-7:].mean() * 4 + 1.65 * series.std() * 2
+            self.assertAlmostEqual(rows[key].reorder_point, expected)
+
+    def test_suggested_quantities(self):
+        run_reorder_job(self.db, PARAMS, TODAY)
+        rows = {(r.product_id, r.branch_id): r for r in self.db.execute(select(ReorderSuggestion)).scalars()}
+        # Salt has plenty of stock, Milk is short at both branches
+        self.assertEqual(rows[(2, 1)].suggested_quantity, 0)
+        self.assertGreater(rows[(1, 2)].suggested_quantity, rows[(1, 1)].suggested_quantity)
+        need = sum(r.reorder_point + r.moving_avg_demand * 7 for key, r in rows.items() if key[0] == 1)
+        self.assertAlmostEqual(rows[(1, 1)].suggested_quantity + rows[(1, 2)].suggested_quantity, need - 10, delta=2)
+
+    def test_rerun_replaces_rows(self):
+        run_reorder_job(self.db, PARAMS, TODAY)
+        run_reorder_job(self.db, PARAMS, TODAY)
+        self.assertEqual(len(self.db.execute(select(ReorderSuggestion)).all()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
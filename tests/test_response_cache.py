@@ -0,0 +1,98 @@
+import os
+import sys
+import unittest
+from decimal import Decimal
+from unittest import mock
+# Add src to path
+sys.path.append(os.getcwd())
+
+from fastapi import FastAPI
+from sqlalchemy import update
+
+from src.api.routers import products
+from src.crud import CRUD
+from src.model.orm import Product
+from src.utils.response_cache import ResponseCache, table_versions
+from tests.helpers import AppTestCase
+
+app = FastAPI()
+app.include_router(products.router, prefix="/api/v1")
+
+
+class TestResponseCache(AppTestCase):
+    app = app
+
+    def setUp(self):
+        super().setUp()
+        db = self.Session()
+        for i in (1, 2):
+            CRUD.create_product(db, {"id": i, "name": f"P{i}", "stock": 10, "sellPrice": Decimal("2.50"),
+                                     "cost": Decimal("1.00"), "category_id": "1", "category": "food"})
+        db.close()
+        self.cache = ResponseCache(ttl=5, stale_ttl=60, max_entries=100)
+        self.patch(mock.patch.object(products, "response_cache", self.cache))
+
+    def names(self, response):
+        return [product["name"] for product in response.json()]
+
+    def rename_elsewhere(self, product_id, name):
+        """A write made through another worker: this worker's table versions do not change."""
+        db = self.Session()
+        db.execute(update(Product).where(Product.id == product_id).values(name=name))
+        db.commit()
+        db.close()
+
+    def age_entries(self, seconds):
+        for entry in self.cache._entries.values():
+            entry.stored_at -= seconds
+
+    def test_etag_and_not_modified(self):
+        first = self.client.get("/api/v1/products/")
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers["ETag"]
+        again = self.client.get("/api/v1/products/", headers={"If-None-Match": etag})
+        self.assertEqual((again.status_code, again.content), (304, b""))
+        self.assertEqual(again.headers["ETag"], etag)
+        self.assertEqual(self.client.get("/api/v1/products/", headers={"If-None-Match": '"other"'}).status_code, 200)
+
+    def test_etag_depends_on_the_body_only(self):
+        etag = self.client.get("/api/v1/products/").headers["ETag"]
+        # another worker (or a write that changed nothing) has different table versions
+        table_versions.bump("products")
+        response = self.client.get("/api/v1/products/", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_invalidates(self):
+        etag = self.client.get("/api/v1/products/").headers["ETag"]
+        self.assertEqual(self.client.put("/api/v1/products/1", json={"name": "Renamed", "sellPrice": "2.50"}).status_code, 200)
+        response = self.client.get("/api/v1/products/", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(self.names(response), ["Renamed", "P2"])
+
+    def test_stale_is_served_while_revalidating(self):
+        self.client.get("/api/v1/products/")
+        self.rename_elsewhere(1, "Elsewhere")
+        # fresh: the other worker's write is not seen yet
+        self.assertEqual(self.names(self.client.get("/api/v1/products/")), ["P1", "P2"])
+
+        self.age_entries(10)
+        stale = self.client.get("/api/v1/products/")
+        self.assertEqual(self.names(stale), ["P1", "P2"])
+        self.assertIn("Warning", stale.headers)
+        # the revalidation ran after that response was sent
+        fresh = self.client.get("/api/v1/products/")
+        self.assertEqual(self.names(fresh), ["Elsewhere", "P2"])
+        self.assertNotIn("Warning", fresh.headers)
+
+    def test_expired_entry_is_rebuilt(self):
+        self.client.get("/api/v1/products/")
+        self.rename_elsewhere(2, "Elsewhere")
+        self.age_entries(100)
+        response = self.client.get("/api/v1/products/")
+        self.assertEqual(self.names(response), ["P1", "Elsewhere"])
+        self.assertNotIn("Warning", response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
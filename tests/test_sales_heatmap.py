@@ -0,0 +1,71 @@
+import os
+import sys
+import unittest
+from datetime import date, time, timedelta
+from decimal import Decimal
+# Add src to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import Base
+from src.model.orm import Branch, Transaction
+from src.services.sales_heatmap import branch_heatmap, closed_days
+
+TODAY = date(2024, 6, 12)  # a Wednesday
+
+
+class TestSalesHeatmap(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all([Branch(id=1, name="A", location="x"), Branch(id=2, name="B", location="y")])
+        self.db.commit()
+        closed_days.invalidate()
+
+    def sale(self, branch_id, day, hour, amount):
+        self.db.add(Transaction(branch_id=branch_id, total_amount=amount, total=amount,
+                                dateOfTransaction=day, timeOfTransaction=time(hour, 15)))
+        self.db.commit()
+
+    def test_buckets_by_weekday_and_hour(self):
+        self.sale(1, TODAY, 9, "4.00")                       # Wed 09
+        self.sale(1, TODAY - timedelta(days=7), 9, "6.00")   # Wed 09, a week earlier
+        self.sale(1, TODAY - timedelta(days=2), 18, "2.50")  # Mon 18
+        self.sale(2, TODAY, 9, "99.00")                      # other branch
+        heatmap = branch_heatmap(self.db, 1, TODAY - timedelta(days=13), TODAY, today=TODAY)
+        self.assertEqual(heatmap["transactions"][2][9], 2)
+        self.assertEqual(heatmap["revenue"][2][9], Decimal("10.00"))
+        self.assertEqual(heatmap["transactions"][0][18], 1)
+        self.assertEqual(sum(map(sum, heatmap["transactions"])), 3)
+
+    def test_closed_days_are_cached_and_invalidated(self):
+        yesterday = TODAY - timedelta(days=1)
+        self.sale(1, yesterday, 10, "1.00")
+        branch_heatmap(self.db, 1, yesterday, TODAY, today=TODAY)
+        self.assertIsNotNone(closed_days.get(1, yesterday))
+        self.assertIsNone(closed_days.get(1, TODAY))  # today is still open
+
+        # Cached: a new row for yesterday is not seen until the entry is invalidated
+        self.sale(1, yesterday, 10, "1.00")
+        self.assertEqual(branch_heatmap(self.db, 1, yesterday, yesterday, today=TODAY)["transactions"][1][10], 1)
+        closed_days.invalidate(1, yesterday)
+        self.assertEqual(branch_heatmap(self.db, 1, yesterday, yesterday, today=TODAY)["transactions"][1][10], 2)
+
+    def test_closed_days_expire(self):
+        # a backdated sale through another worker never invalidates this worker's entry
+        yesterday = TODAY - timedelta(days=1)
+        self.sale(1, yesterday, 10, "1.00")
+        branch_heatmap(self.db, 1, yesterday, yesterday, today=TODAY)
+        self.sale(1, yesterday, 10, "1.00")
+        ttl, closed_days.ttl = closed_days.ttl, 0
+        try:
+            self.assertEqual(branch_heatmap(self.db, 1, yesterday, yesterday, today=TODAY)["transactions"][1][10], 2)
+        finally:
+            closed_days.ttl = ttl
+
+
+if __name__ == "__main__":
+    unittest.main()
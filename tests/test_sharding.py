@@ -0,0 +1,125 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, time
+from decimal import Decimal
+# Add src to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import func, select
+
+from src.crud import CRUD
+from src.database import DATABASE_URL, SHARD_ID_SPAN, Base, prepare_shard, shard_router
+from src.jobs.export import export_transactions, pa
+from src.jobs.reorder import ReorderParameters, run_reorder_job
+from src.jobs.rfm import run_rfm_job
+from src.model.orm import Branch, Customer, Product, Transaction
+from src.services.pricing import price_snapshot
+from src.services.sales_heatmap import hourly_sales
+
+
+class TestTransactionShards(unittest.TestCase):
+    """Three SQLite files: shard 0 also holds products and customers, like DATABASE_URL."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.urls = [f"sqlite:///{os.path.join(directory, f'shard{i}.db')}" for i in range(3)]
+        shard_router.configure(self.urls, {5: 0})
+        Base.metadata.create_all(shard_router.engines[0])
+        for shard in (1, 2):
+            prepare_shard(shard_router.engines[shard], shard)
+        self.db = shard_router.factories[0]()
+        CRUD.create_product(self.db, {"id": 1, "name": "Milk", "stock": 100, "sellPrice": Decimal("2.00"),
+                                      "cost": Decimal("1.00"), "category_id": "1", "category": "food"})
+        price_snapshot.load(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        shard_router.configure([DATABASE_URL])
+
+    def sell(self, branch_id, customer_id=None, day=date(2025, 3, 1), hour=12):
+        return CRUD.create_transaction(
+            self.db,
+            {"branch_id": branch_id, "customer_id": customer_id, "total_amount": Decimal("2.00"),
+             "total": Decimal("2.00"), "dateOfTransaction": day, "timeOfTransaction": time(hour, 0)},
+            [{"product_id": 1, "quantity": 1, "price": Decimal("2.00")}],
+        )
+
+    def count(self, shard):
+        with shard_router.session(self.db, shard) as session:
+            return session.execute(select(func.count()).select_from(Transaction)).scalar()
+
+    def test_branch_routing_and_id_ranges(self):
+        self.assertEqual([shard_router.for_branch(b) for b in (None, 1, 2, 3, 5)], [0, 1, 2, 0, 0])
+        sales = [self.sell(branch) for branch in (1, 2, 3, 5)]
+        self.assertEqual([self.count(shard) for shard in range(3)], [2, 1, 1])
+        self.assertEqual([shard_router.for_transaction(sale.id) for sale in sales], [1, 2, 0, 0])
+        self.assertGreater(sales[1].id, 2 * SHARD_ID_SPAN)
+        # Stock lives in the main database whichever shard took the sale
+        self.db.expire_all()
+        self.assertEqual(self.db.get(Product, 1).stock, 96)
+
+    def test_reads_by_id_find_the_shard(self):
+        sale = self.sell(2)
+        self.assertEqual(CRUD.get_transaction(self.db, sale.id).branch_id, 2)
+        self.assertEqual(len(CRUD.get_transaction_details(self.db, sale.id)), 1)
+        CRUD.update_transaction(self.db, sale.id, {"total": Decimal("1.50")})
+        self.assertEqual(CRUD.get_transaction(self.db, sale.id).total, Decimal("1.50"))
+        self.assertTrue(CRUD.delete_transaction(self.db, sale.id))
+        self.assertIsNone(CRUD.get_transaction(self.db, sale.id))
+
+    def test_list_merges_shards_in_id_order(self):
+        ids = sorted(self.sell(branch).id for branch in (1, 2, 3, 1, 2, 3))
+        self.assertEqual([t.id for t in CRUD.get_transactions(self.db, skip=0, limit=100)], ids)
+        self.assertEqual([t.id for t in CRUD.get_transactions(self.db, skip=2, limit=3)], ids[2:5])
+        self.assertEqual({t.branch_id for t in CRUD.get_transactions(self.db, branch_id=2)}, {2})
+
+    def test_branch_reads_find_rows_from_before_sharding(self):
+        shard_router.configure(self.urls[:1])
+        old = self.sell(2)
+        shard_router.configure(self.urls, {5: 0})
+        new = self.sell(2)
+        self.assertEqual([self.count(shard) for shard in range(3)], [1, 0, 1])
+        self.assertEqual([t.id for t in CRUD.get_transactions(self.db, branch_id=2)], [old.id, new.id])
+        self.assertEqual(CRUD.get_transaction(self.db, old.id).branch_id, 2)
+        rows = hourly_sales(self.db, 2, date(2025, 3, 1), date(2025, 3, 1))
+        self.assertEqual(sum(count for day, hour, count, revenue in rows), 2)
+
+        shard_router.configure(self.urls, {5: 0}, legacy_reads=False)
+        self.assertEqual([t.id for t in CRUD.get_transactions(self.db, branch_id=2)], [new.id])
+
+    def test_customer_history_spans_shards(self):
+        for day, branch in ((1, 1), (2, 2), (3, 3), (4, 1)):
+            self.sell(branch, customer_id=9, day=date(2025, 3, day))
+        page, after = CRUD.get_customer_history(self.db, 9, limit=3)
+        self.assertEqual([t.dateOfTransaction.day for t in page], [4, 3, 2])
+        rest, after = CRUD.get_customer_history(self.db, 9, limit=3, after=after)
+        self.assertEqual(([t.dateOfTransaction.day for t in rest], after), ([1], None))
+        self.assertEqual(CRUD.get_customer_stats(self.db, 9).visit_count, 4)
+
+    def test_jobs_read_every_shard(self):
+        self.db.add_all([Branch(id=i, name=f"B{i}", location="x") for i in (1, 2, 3)])
+        self.db.add(Customer(id=9, name="Ann", age=30, email="ann@example.com", password="hash"))
+        self.db.commit()
+        for branch in (1, 2, 3):
+            self.sell(branch, customer_id=9)
+
+        params = ReorderParameters(history_days=30, window_days=7, lead_time_days=4, review_days=7,
+                                   service_z=1.65, chunk_size=100)
+        self.assertEqual(run_reorder_job(self.db, params, today=date(2025, 3, 10)).rows_read, 3)
+        self.assertEqual(run_rfm_job(self.db, today=date(2025, 3, 10), rebuild_aggregates=True).scored, 1)
+        self.db.expire_all()
+        stats = CRUD.get_customer_stats(self.db, 9)
+        self.assertEqual((stats.visit_count, stats.lifetime_spend), (3, Decimal("6.00")))
+
+        if pa is not None:
+            root = tempfile.mkdtemp()
+            self.assertEqual(export_transactions(self.db, root=root).rows, 3)
+            # shard 0's newer sale has a lower id than the exported ones of shards 1 and 2
+            self.sell(3)
+            self.assertEqual(export_transactions(self.db, root=root).rows, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
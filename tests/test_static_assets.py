@@ -0,0 +1,92 @@
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+# Add src to path
+sys.path.append(os.getcwd())
+
+from starlette.requests import Request
+
+from src.services.static_assets import IMMUTABLE, REVALIDATE, StaticAssets
+
+
+def request(**headers):
+    return Request({"type": "http", "method": "GET", "path": "/",
+                    "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]})
+
+
+class TestStaticAssets(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.write("app.js", "console.log('hello');\n" * 50)
+        self.write("style.css", "body { background: url(/static/bg.svg); }\n")
+        self.write("bg.svg", "<svg></svg>")
+        self.write("page.html", '<link href="/static/style.css"><script src="/static/app.js?v=3"></script>'
+                                '<script src="https://cdn.example.com/static/app.js"></script>')
+        self.assets = StaticAssets(self.dir, memory_max_bytes=2000)
+        self.assets.load()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, text):
+        with open(os.path.join(self.dir, name), "w") as f:
+            f.write(text)
+
+    def test_pages_point_at_fingerprinted_names(self):
+        page = self.assets.page("page.html", request()).body.decode()
+        self.assertIn(f'href="{self.assets.url_for("style.css")}"', page)
+        self.assertIn(f'src="{self.assets.url_for("app.js")}"', page)  # ?v= cache buster dropped
+        self.assertIn("https://cdn.example.com/static/app.js", page)  # other hosts untouched
+        self.assertRegex(self.assets.url_for("app.js"), r"^/static/app\.[0-9a-f]{12}\.js$")
+        css = self.assets.response("style.css", request()).body.decode()
+        self.assertIn(self.assets.url_for("bg.svg"), css)
+
+    def test_cache_headers(self):
+        hashed = self.assets.response(self.assets.url_for("app.js")[len("/static/"):], request())
+        self.assertEqual(hashed.headers["cache-control"], IMMUTABLE)
+        self.assertEqual(self.assets.response("app.js", request()).headers["cache-control"], REVALIDATE)
+        page = self.assets.page("page.html", request())
+        self.assertEqual(page.headers["cache-control"], REVALIDATE)
+        again = self.assets.page("page.html", request(if_none_match=page.headers["etag"]))
+        self.assertEqual((again.status_code, again.body), (304, b""))
+        self.assertEqual(self.assets.response("missing.js", request()).status_code, 404)
+
+    def test_content_encoding(self):
+        plain = self.assets.response("app.js", request())
+        zipped = self.assets.response("app.js", request(accept_encoding="br;q=0, gzip"))
+        self.assertNotIn("content-encoding", plain.headers)
+        self.assertEqual(zipped.headers["content-encoding"], "gzip")
+        self.assertEqual(zipped.headers["vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(zipped.body), plain.body)
+        self.assertLess(len(zipped.body), len(plain.body))
+        self.assertNotEqual(zipped.headers["etag"], plain.headers["etag"])
+        # Too small to be worth compressing
+        self.assertNotIn("content-encoding", self.assets.response("bg.svg", request(accept_encoding="gzip")).headers)
+
+    def test_large_files_are_served_from_disk(self):
+        self.write("big.js", "x" * 5000)
+        self.assets.load()
+        self.assertIsNone(self.assets.by_name["big.js"].body)
+        response = self.assets.response(self.assets.url_for("big.js")[len("/static/"):], request())
+        self.assertEqual(response.headers["cache-control"], IMMUTABLE)
+
+    def test_large_rewritten_files_stay_in_memory(self):
+        self.write("big.css", "body { background: url(/static/bg.svg); }\n" * 100)
+        self.assets.load()
+        response = self.assets.response(self.assets.url_for("big.css")[len("/static/"):], request())
+        self.assertIn(self.assets.url_for("bg.svg"), response.body.decode())
+        self.assertNotIn("url(/static/bg.svg)", response.body.decode())
+
+    def test_new_content_gets_a_new_name(self):
+        before = self.assets.url_for("app.js")
+        self.write("app.js", "console.log('changed');")
+        self.assets.load()
+        self.assertNotEqual(self.assets.url_for("app.js"), before)
+        self.assertEqual(self.assets.response(before[len("/static/"):], request()).status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+import unittest
+# Add src to path
+sys.path.append(os.getcwd())
+
+from src.services.stock_hub import StockHub
+
+
+def parse(message):
+    event, data = message.strip().split("\n")
+    return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+class TestStockHub(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Long flush interval: the tests flush by hand
+        self.hub = StockHub(max_subscribers=2, flush_seconds=60, heartbeat_seconds=60, max_queued=3)
+
+    async def open(self):
+        stream = self.hub.events()
+        self.assertEqual(await stream.__anext__(), "retry: 3000\n\n")
+        return stream
+
+    async def test_coalesces_changes_per_flush(self):
+        stream = await self.open()
+        self.hub.publish(1, 10)
+        self.hub.publish(1, 9)
+        self.hub.publish(2, 0)
+        self.assertEqual(self.hub.flush(), 1)
+        self.assertEqual(parse(await stream.__anext__()), ("stock", {"stock": {"1": 9, "2": 0}}))
+        await stream.aclose()
+        self.assertEqual(len(self.hub), 0)
+
+    async def test_every_subscriber_gets_every_change(self):
+        # stock is shared: a sale at any branch changes what every till shows
+        first, second = await self.open(), await self.open()
+        self.hub.publish(1, 5)
+        self.hub.publish(2, 50)
+        self.assertEqual(self.hub.flush(), 2)
+        for stream in (first, second):
+            self.assertEqual(parse(await stream.__anext__()), ("stock", {"stock": {"1": 5, "2": 50}}))
+            await stream.aclose()
+
+    async def test_slow_subscriber_is_told_to_resync(self):
+        slow = await self.open()
+        fast = await self.open()
+        for stock in range(5):  # slow never reads while these are flushed
+            self.hub.publish(1, stock)
+            self.hub.flush()
+            self.assertEqual(parse(await fast.__anext__()), ("stock", {"stock": {"1": stock}}))
+        # Its queue filled up (max_queued=3) and was dropped: one resync instead of stale updates
+        self.assertEqual(parse(await slow.__anext__()), ("resync", {}))
+        self.hub.publish(1, 7)
+        self.hub.flush()
+        self.assertEqual(parse(await slow.__anext__()), ("stock", {"stock": {"1": 7}}))
+        await slow.aclose()
+        await fast.aclose()
+
+    async def test_capacity(self):
+        first, second = await self.open(), await self.open()
+        self.assertTrue(self.hub.is_full())
+        await first.aclose()
+        self.assertFalse(self.hub.is_full())
+        await second.aclose()
+
+    async def test_publish_without_subscribers_is_dropped(self):
+        self.hub.publish(1, 3)
+        self.assertEqual(self.hub.flush(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import os
+import sys
+import unittest
+# Add src to path
+sys.path.append(os.getcwd())
+
+from src.services.stock_index import StockIndex
+
+
+class TestStockIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = StockIndex(refresh_seconds=30)
+        for product_id, stock in [(1, 5), (2, 0), (3, 12), (4, 3), (5, 3)]:
+            self.index.set(product_id, f"P{product_id}", stock)
+
+    def test_lowest_is_ordered_and_bounded(self):
+        self.assertEqual([e.product_id for e in self.index.lowest(5, 10)], [2, 4, 5, 1])
+        self.assertEqual([e.product_id for e in self.index.lowest(5, 2)], [2, 4])
+        self.assertEqual(self.index.lowest(-1, 10), [])
+
+    def test_updates_move_entries(self):
+        self.index.set_stock(3, 1)
+        self.index.set_stock(2, 50)
+        self.index.remove(4)
+        self.assertEqual([(e.product_id, e.stock) for e in self.index.lowest(5, 10)], [(3, 1), (5, 3), (1, 5)])
+        self.assertEqual(len(self.index), 4)
+
+    def test_set_stock_ignores_unknown_products(self):
+        self.index.set_stock(99, 0)
+        self.assertEqual(len(self.index), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+# Add src to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from src.config import get_settings
+from src.crud import CRUD
+from src.database import SHARD_ID_SPAN, Base, ShardRouter, enable_wal, prepare_shard
+from src.jobs import sync
+from src.jobs.sync import pull_catalog, push_sales, sync_once, track_catalog_changes, track_outbox
+from src.model.orm import Product, ProductChange, SyncOutbox, SyncReceipt, Transaction
+from src.services.pricing import price_snapshot
+
+BRANCH = 3
+
+
+class TestBranchSync(unittest.TestCase):
+    """A branch node and the central database, as two SQLite files."""
+
+    def setUp(self):
+        self.directory = directory = tempfile.mkdtemp()
+        self.central_url = "sqlite:///" + os.path.join(directory, "central.db")
+        central_engine = create_engine(self.central_url)
+        local_engine = create_engine("sqlite:///" + os.path.join(directory, "branch.db"))
+        enable_wal(local_engine)
+        for engine in (central_engine, local_engine):
+            Base.metadata.create_all(engine)
+        Central = sessionmaker(bind=central_engine, autoflush=False)
+        Local = sessionmaker(bind=local_engine, autoflush=False)
+        self.settings = get_settings()
+        self.sync_enabled = self.settings.branch_sync_enabled
+        self.settings.branch_sync_enabled = True
+        track_catalog_changes(Central)
+        track_outbox(Local)
+        self.central, self.local = Central(), Local()
+
+        for product_id, stock in ((1, 10), (2, 5)):
+            CRUD.create_product(self.central, {"id": product_id, "name": f"P{product_id}", "stock": stock,
+                                               "sellPrice": Decimal("2.50"), "cost": Decimal("1.00"),
+                                               "category_id": "1", "category": "food"})
+        sync_once(self.local, self.central, BRANCH)  # first sync copies the catalog
+        price_snapshot.load(self.local)
+
+    def tearDown(self):
+        self.settings.branch_sync_enabled = self.sync_enabled
+        self.local.close()
+        self.central.close()
+
+    def sell(self, product_id, quantity, customer_id=None):
+        total = Decimal("2.50") * quantity
+        return CRUD.create_transaction(
+            self.local,
+            {"branch_id": BRANCH, "customer_id": customer_id, "total_amount": total, "total": total,
+             "dateOfTransaction": date.today(), "timeOfTransaction": time(12, 0)},
+            [{"product_id": product_id, "quantity": quantity, "price": Decimal("2.50")}],
+        )
+
+    def stock(self, session, product_id):
+        session.expire_all()
+        return session.get(Product, product_id).stock
+
+    def test_first_sync_copies_catalog(self):
+        self.assertEqual(self.local.execute(select(func.count()).select_from(Product)).scalar(), 2)
+        self.assertEqual(self.stock(self.local, 1), 10)
+
+    def test_sales_are_pushed_once(self):
+        sale = self.sell(1, 3, customer_id=7)
+        self.assertEqual(self.stock(self.local, 1), 7)
+        result = sync_once(self.local, self.central, BRANCH)
+        self.assertEqual((result.push.sales, result.pending), (1, 0))
+
+        pushed = self.central.execute(select(Transaction)).scalar_one()
+        self.assertEqual((pushed.branch_id, pushed.total), (BRANCH, Decimal("7.50")))
+        self.assertEqual(self.stock(self.central, 1), 7)
+        self.assertEqual(CRUD.get_customer_stats(self.central, 7).visit_count, 1)
+        outbox = self.local.execute(select(SyncOutbox)).scalar_one()
+        self.assertEqual((outbox.transaction_id, outbox.central_id), (sale.id, pushed.id))
+
+        # The node stopped before recording the push: the receipt prevents a second copy
+        self.local.execute(update(SyncOutbox).values(pushed_at=None))
+        self.local.commit()
+        again = push_sales(self.local, self.central, BRANCH, batch_size=10)
+        self.assertEqual((again.sales, again.already_received), (0, 1))
+        self.assertEqual(self.central.execute(select(func.count()).select_from(Transaction)).scalar(), 1)
+        self.assertEqual(self.central.execute(select(func.count()).select_from(SyncReceipt)).scalar(), 1)
+
+    def test_node_sales_are_not_in_its_change_log(self):
+        settings = get_settings()
+        mode = settings.node_mode
+        settings.node_mode = "branch"
+        try:
+            self.sell(1, 2)
+        finally:
+            settings.node_mode = mode
+        self.assertEqual(self.local.execute(select(func.count()).select_from(ProductChange)).scalar(), 0)
+        sync_once(self.local, self.central, BRANCH)
+        self.assertEqual(self.stock(self.central, 1), 8)
+
+    def test_sales_go_to_the_branch_shard(self):
+        shards = ShardRouter()
+        shards.configure([self.central_url, "sqlite:///" + os.path.join(self.directory, "shard1.db")])
+        prepare_shard(shards.engines[1], 1)
+        self.sell(1, 3, customer_id=7)
+        result = sync_once(self.local, self.central, BRANCH, shards=shards)
+        self.assertEqual(result.push.sales, 1)
+
+        with shards.factories[1]() as shard:
+            self.assertGreater(shard.execute(select(Transaction.id)).scalar_one(), SHARD_ID_SPAN)
+            self.assertEqual(shard.execute(select(func.count()).select_from(SyncReceipt)).scalar(), 1)
+        self.assertEqual(self.central.execute(select(func.count()).select_from(Transaction)).scalar(), 0)
+        self.assertEqual(self.stock(self.central, 1), 7)
+        self.assertEqual(CRUD.get_customer_stats(self.central, 7).visit_count, 1)
+
+        # The receipt on the shard prevents a second copy
+        self.local.execute(update(SyncOutbox).values(pushed_at=None))
+        self.local.commit()
+        again = push_sales(self.local, self.central, BRANCH, batch_size=10, shards=shards)
+        self.assertEqual((again.sales, again.already_received), (0, 1))
+
+    def test_pull_keeps_unpushed_sales(self):
+        self.sell(1, 3)  # offline, not pushed yet
+        CRUD.restock_product(self.central, 1, 50)  # delivery booked centrally: 60
+        CRUD.update_product(self.central, 2, {"sellPrice": Decimal("3.10")})
+        CRUD.delete_product(self.central, 2)
+        CRUD.create_product(self.central, {"id": 9, "name": "New", "stock": 4, "sellPrice": Decimal("1.00"),
+                                           "cost": Decimal("0.50"), "category_id": "1", "category": "food"})
+
+        result = pull_catalog(self.local, self.central, batch_size=2)
+        self.assertEqual((result.changed, result.removed), ({1, 9}, {2}))
+        self.assertEqual(self.stock(self.local, 1), 57)  # central 60 minus the 3 not pushed
+        self.assertIsNone(self.local.get(Product, 2))
+        self.assertEqual(self.stock(self.local, 9), 4)
+
+        sync_once(self.local, self.central, BRANCH)
+        self.assertEqual((self.stock(self.central, 1), self.stock(self.local, 1)), (57, 57))
+
+    def test_central_price_wins_but_sale_keeps_its_price(self):
+        self.sell(1, 1)
+        CRUD.update_product(self.central, 1, {"sellPrice": Decimal("2.99")})
+        sync_once(self.local, self.central, BRANCH)
+        self.local.expire_all()
+        self.assertEqual(self.local.get(Product, 1).sellPrice, Decimal("2.99"))
+        line = CRUD.get_transaction_details(self.central, self.central.execute(select(Transaction.id)).scalar_one())
+        self.assertEqual(line[0].price, Decimal("2.50"))
+
+    def test_oversold_stock_stops_at_zero(self):
+        self.sell(2, 4)  # the node still has 5
+        CRUD.update_product(self.central, 2, {"stock": 1})  # meanwhile sold elsewhere
+        result = sync_once(self.local, self.central, BRANCH)
+        self.assertEqual(result.push.oversold, 1)
+        self.assertEqual((self.stock(self.central, 2), self.stock(self.local, 2)), (0, 0))
+
+    def test_cursor_waits_at_a_gap_in_the_change_log(self):
+        cursor = self.central.execute(select(func.max(ProductChange.seq))).scalar()
+        now = datetime.utcnow()
+        # seq cursor+1 is still uncommitted (or was rolled back)
+        self.central.execute(insert(ProductChange), [{"seq": cursor + 2, "product_id": 1, "changed_at": now}])
+        self.central.commit()
+        pull_catalog(self.local, self.central, batch_size=10)
+        self.assertEqual(sync._get_state(self.local, sync.CATALOG_CURSOR), str(cursor))
+
+        original = sync.HOLE_GRACE_SECONDS
+        sync.HOLE_GRACE_SECONDS = -1
+        try:
+            pull_catalog(self.local, self.central, batch_size=10)
+        finally:
+            sync.HOLE_GRACE_SECONDS = original
+        self.assertEqual(sync._get_state(self.local, sync.CATALOG_CURSOR), str(cursor + 2))
+
+    def test_no_change_log_without_branch_sync(self):
+        self.settings.branch_sync_enabled = False
+        before = self.central.execute(select(func.count()).select_from(ProductChange)).scalar()
+        CRUD.update_product(self.central, 1, {"sellPrice": Decimal("2.99")})
+        CRUD.restock_product(self.central, 2, 5)
+        self.assertEqual(self.central.execute(select(func.count()).select_from(ProductChange)).scalar(), before)
+
+    def test_runner_prunes_the_change_log_hourly(self):
+        old = datetime.utcnow() - timedelta(days=self.settings.sync_change_log_keep_days + 1)
+        self.central.execute(update(ProductChange).values(changed_at=old))
+        self.central.commit()
+        runner = sync.SyncRunner()
+        runner._prune_change_log(self.central)
+        self.assertEqual(self.central.execute(select(func.count()).select_from(ProductChange)).scalar(), 0)
+
+        CRUD.update_product(self.central, 1, {"sellPrice": Decimal("2.99")})
+        self.central.execute(update(ProductChange).values(changed_at=old))
+        self.central.commit()
+        runner._prune_change_log(self.central)  # pruned less than an hour ago
+        self.assertEqual(self.central.execute(select(func.count()).select_from(ProductChange)).scalar(), 1)
+
+    def test_local_database_uses_wal(self):
+        mode = self.local.connection().exec_driver_sql("PRAGMA journal_mode").scalar()
+        self.assertEqual(mode, "wal")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import random
+import sys
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import Decimal
+# Add src to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from src.database import Base
+from src.model.orm import Branch, Product, Transaction, TransactionDetail
+from src.services.top_sellers import TopSellers, HOUR, TODAY, WEEK
+from src.utils.space_saving import SpaceSaving
+
+NOW = datetime(2024, 5, 10, 15, 30)
+
+
+def zipf_stream(items: int, length: int, seed: int = 7):
+    rng = random.Random(seed)
+    weights = [1 / (rank ** 1.1) for rank in range(1, items + 1)]
+    return rng.choices(range(1, items + 1), weights=weights, k=length)
+
+
+class TestSpaceSaving(unittest.TestCase):
+    def assert_bounds(self, sketch, exact):
+        bound = sketch.error_bound()
+        for item, count, error in sketch.top(sketch.capacity):
+            self.assertLessEqual(exact[item], count)
+            self.assertLessEqual(count, exact[item] + bound)
+            self.assertLessEqual(count - error, exact[item])
+        reported = set(sketch.counts)
+        for item, true_count in exact.items():
+            if true_count > bound:
+                self.assertIn(item, reported)
+
+    def test_error_bounds_hold(self):
+        rng = random.Random(0)
+        sketch = SpaceSaving(capacity=50)
+        exact = Counter()
+        for item in zipf_stream(items=2000, length=50_000):
+            weight = rng.randint(1, 3)
+            sketch.offer(item, weight)
+            exact[item] += weight
+        self.assert_bounds(sketch, exact)
+        self.assertEqual([hit.item for hit in sketch.top(3)], [item for item, _ in exact.most_common(3)])
+
+    def test_merge_keeps_bounds(self):
+        exact = Counter()
+        sketches = []
+        for day in range(7):
+            sketch = SpaceSaving(capacity=40)
+            for item in zipf_stream(items=1000, length=5000, seed=day):
+                sketch.offer(item)
+                exact[item] += 1
+            sketches.append(sketch)
+        self.assert_bounds(SpaceSaving.merge(sketches, 40), exact)
+
+
+class TestTopSellersAgainstSQL(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all([Branch(id=b, name=f"B{b}", location="x") for b in (1, 2)])
+        self.db.add_all([
+            Product(id=p, name=f"P{p}", stock=0, sellPrice=Decimal(1), cost=Decimal(1), category_id="1", category="c")
+            for p in range(1, 301)
+        ])
+        self.db.commit()
+
+    def exact(self, branch_id, since):
+        query = (
+            select(TransactionDetail.product_id, func.sum(TransactionDetail.quantity))
+            .join(Transaction, Transaction.id == TransactionDetail.transaction_id)
+            .where(Transaction.dateOfTransaction >= since)
+            .group_by(TransactionDetail.product_id)
+        )
+        if branch_id is not None:
+            query = query.where(Transaction.branch_id == branch_id)
+        return Counter(dict(self.db.execute(query).all()))
+
+    def test_live_sketches_match_sql_within_bound(self):
+        sellers = TopSellers(capacity=30, refresh_seconds=60)
+        rng = random.Random(3)
+        for i, product_id in enumerate(zipf_stream(items=300, length=3000)):
+            when = NOW - timedelta(days=rng.randint(0, 6), minutes=rng.randint(0, 60))
+            branch_id, quantity = rng.choice((1, 2)), rng.randint(1, 4)
+            self.db.add(Transaction(id=i + 1, branch_id=branch_id, total_amount=1, total=1,
+                                    dateOfTransaction=when.date(), timeOfTransaction=when.time()))
+            self.db.add(TransactionDetail(transaction_id=i + 1, product_id=product_id, quantity=quantity, price=1))
+            sellers.record(branch_id, [(product_id, quantity)], when, NOW)
+        self.db.commit()
+
+        for branch_id in (None, 1, 2):
+            for window, since in ((TODAY, NOW.date()), (WEEK, NOW.date() - timedelta(days=6))):
+                sketch = sellers.window(branch_id, window, NOW)
+                exact = self.exact(branch_id, since)
+                self.assertEqual(sketch.total, sum(exact.values()))
+                TestSpaceSaving.assert_bounds(self, sketch, exact)
+
+        # Rebuilding from the database gives the same totals
+        sellers.load(self.db, NOW)
+        self.assertEqual(sellers.window(None, WEEK, NOW).total, sum(self.exact(None, NOW.date() - timedelta(days=6)).values()))
+
+    def test_backdated_sale_counts_on_its_day(self):
+        sellers = TopSellers(capacity=30, refresh_seconds=60)
+        sellers.record(1, [(7, 2)], NOW, NOW)
+        sellers.record(1, [(8, 5)], NOW - timedelta(days=2), NOW)
+        sellers.record(1, [(9, 1)], NOW - timedelta(days=30), NOW)  # outside every window
+        self.assertEqual([hit.item for hit in sellers.window(1, TODAY, NOW).top(5)], [7])
+        self.assertEqual([hit.item for hit in sellers.window(1, WEEK, NOW).top(5)], [8, 7])
+        self.assertEqual([hit.item for hit in sellers.window(1, HOUR, NOW).top(5)], [7])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+# Add src to path
+sys.path.append(os.getcwd())
+
+import main
+from src.config import get_settings
+from src.factory import warmup
+from tests.helpers import AppTestCase, bearer
+
+
+class TestWarmup(AppTestCase):
+    app = main.app
+    role = None
+
+    def setUp(self):
+        super().setUp()
+        self.settings = main.settings
+        self.enabled = self.settings.warmup_on_startup
+        self.release = threading.Event()
+        self.ready_during_step = []
+        # The real database steps are not run; the cache loads are replaced by one step
+        patches = [mock.patch.object(warmup, name) for name in ("configure_mappers", "open_pool_connections",
+                                                               "compile_hot_statements")]
+        patches.append(mock.patch.object(warmup, "_warmup_steps", [self.step]))
+        self.patch(*patches)
+
+    def tearDown(self):
+        self.settings.warmup_on_startup = self.enabled
+        self.release.set()
+
+    def step(self):
+        self.ready_during_step.append(main.app.state.ready)
+        self.release.wait(5)
+
+    def test_settings_are_loaded_once(self):
+        self.assertIs(get_settings(), get_settings())
+        self.assertIs(main.settings, get_settings())
+
+    def test_warm_up_runs_the_steps_before_ready(self):
+        self.settings.warmup_on_startup = True
+        self.release.set()
+        with self.client as client:
+            self.assertEqual(self.ready_during_step, [False])
+            self.assertEqual(client.get("/ready").json(), {"status": "ready"})
+        warmup.open_pool_connections.assert_called_once()
+
+    def test_without_warm_up_the_steps_run_in_the_background(self):
+        self.settings.warmup_on_startup = False
+        with self.client as client:
+            # ready while the step is still waiting
+            self.assertEqual(client.get("/ready").status_code, 200)
+            self.release.set()
+            for thread in threading.enumerate():
+                if thread.name == "warmup":
+                    thread.join(5)
+        self.assertEqual(len(self.ready_during_step), 1)
+        warmup.open_pool_connections.assert_not_called()
+
+    def test_metrics_need_an_admin_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", headers=bearer("CASHIER")).status_code, 403)
+        self.assertIn("response_cache.hit_ratio", self.client.get("/metrics", headers=bearer()).json())
+
+
+if __name__ == "__main__":
+    unittest.main()
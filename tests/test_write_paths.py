@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date, time
+from decimal import Decimal
+# Add src to path
+sys.path.append(os.getcwd())
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from src.crud import CRUD
+from src.database import Base
+from src.model.orm import Customer, CustomerStats, Product, Transaction, TransactionDetail
+from src.services.pricing import price_snapshot
+
+MILK = {"name": "Milk", "stock": 10, "sellPrice": Decimal("2.00"), "cost": Decimal("1.00"),
+        "category_id": "1", "category": "food"}
+
+
+class TestWritePaths(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "writes.db"))
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine, autoflush=False)()
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+
+    def tearDown(self):
+        self.db.close()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement.split(None, 1)[0].upper())
+
+    def count(self, fn, *args):
+        """Run fn and return (its result, the data statements it sent: no BEGIN/COMMIT)."""
+        self.statements.clear()
+        result = fn(*args)
+        return result, [s for s in self.statements if s in ("SELECT", "INSERT", "UPDATE", "DELETE")]
+
+    def test_create_needs_no_refresh(self):
+        product, statements = self.count(CRUD.create_entity, self.db, Product, dict(MILK))
+        self.assertEqual(statements, ["INSERT"])
+        self.statements.clear()
+        self.assertEqual((product.id, product.stock, product.version), (1, 10, 1))
+        self.assertEqual(self.statements, [])  # attributes were not expired
+
+    def test_update_is_one_statement(self):
+        product = CRUD.create_entity(self.db, Product, dict(MILK))
+        updated, statements = self.count(CRUD.update_entity, self.db, Product, product.id, {"stock": 7, "bogus": 1})
+        self.assertEqual(statements, ["UPDATE"])  # UPDATE ... RETURNING
+        self.assertEqual((updated.stock, updated.version, updated.name), (7, 2, "Milk"))
+        missing, statements = self.count(CRUD.update_entity, self.db, Product, 99, {"stock": 1})
+        self.assertIsNone(missing)
+        self.assertEqual(statements, ["UPDATE"])
+
+    def test_stale_version_is_refused(self):
+        product = CRUD.create_entity(self.db, Product, dict(MILK))
+        CRUD.update_entity(self.db, Product, product.id, {"stock": 5, "version": 1})
+        with self.assertRaises(CRUD.VersionConflictError) as raised:
+            CRUD.update_entity(self.db, Product, product.id, {"stock": 3, "version": 1})
+        self.assertEqual(raised.exception.current, 2)
+        self.assertEqual(self.db.get(Product, product.id).stock, 5)
+        self.assertIsNone(CRUD.update_entity(self.db, Product, 99, {"stock": 3, "version": 1}))
+
+    def test_delete_does_not_load_rows(self):
+        customer = CRUD.create_entity(self.db, Customer, {"name": "Ann", "age": 30, "email": "ann@example.com"})
+        CRUD.create_entity(self.db, Product, dict(MILK))
+        price_snapshot.load(self.db)
+        sale = CRUD.create_transaction(
+            self.db,
+            {"branch_id": None, "customer_id": customer.id, "total_amount": Decimal("4.00"), "total": Decimal("4.00"),
+             "dateOfTransaction": date(2025, 3, 1), "timeOfTransaction": time(12)},
+            [{"product_id": 1, "quantity": 2, "price": Decimal("2.00")}],
+        )
+        self.assertEqual(self.db.get(Product, 1).stock, 8)
+
+        deleted, statements = self.count(CRUD.delete_entity, self.db, Transaction, sale.id)
+        self.assertTrue(deleted)
+        self.assertNotIn("SELECT", statements)
+        self.assertEqual(self.db.execute(select(func.count()).select_from(TransactionDetail)).scalar(), 0)
+
+        # ON DELETE CASCADE for the stats row
+        self.assertTrue(CRUD.delete_entity(self.db, Customer, customer.id))
+        self.assertIsNone(self.db.get(CustomerStats, customer.id))
+        self.assertFalse(CRUD.delete_entity(self.db, Customer, customer.id))
+
+    def test_checkout_stock_update_does_not_read_first(self):
+        CRUD.create_entity(self.db, Product, dict(MILK))
+        price_snapshot.load(self.db)
+        sale_data = {"branch_id": None, "customer_id": None, "total_amount": Decimal("22.00"), "total": Decimal("22.00"),
+                     "dateOfTransaction": date(2025, 3, 1), "timeOfTransaction": time(12)}
+        _, statements = self.count(CRUD.create_transaction, self.db, sale_data,
+                                   [{"product_id": 1, "quantity": 11, "price": Decimal("2.00")}])
+        self.assertEqual(statements.count("SELECT"), 0)
+        product = self.db.get(Product, 1)
+        self.assertEqual((product.stock, product.version), (0, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()